@@ -1,116 +1,126 @@
 #!/usr/bin/env python3
 """
 分析并统计 FlowDroid 结果
+（查询 results_store 结果库，覆盖所有运行，包括重试和阶梯）
 """
 
-import csv
-from pathlib import Path
-
-OUTPUT_BASE = Path.home() / "LDFA-dataset/TaintBench/output"
-APK_DIR = Path.home() / "LDFA-dataset/TaintBench/apks"
-
-# 定义输出目录模式
-MODE_PATTERNS = {
-    'full': '*39apps-max-precision',
-    'ne': '*39apps-no-exceptions',
-    'ns': '*39apps-no-static', 
-    'ne_ns': '*39apps-no-exception-no-static',
-}
-
-print("=" * 80)
-print("FlowDroid TaintBench 分析结果统计")
-print("=" * 80)
-print()
-
-# 统计各模式
-for mode, pattern in MODE_PATTERNS.items():
-    # 找到匹配的目录（取最新的非 retry 目录）
-    matching_dirs = sorted([d for d in OUTPUT_BASE.glob(pattern) if 'retry' not in str(d)], reverse=True)
-    if not matching_dirs:
-        continue
-    
-    csv_file = matching_dirs[0] / "results_summary.csv"
-    if not csv_file.exists():
-        continue
-    
-    with open(csv_file, 'r') as f:
-        rows = list(csv.DictReader(f))
-    
-    total = len([r for r in rows if r['apk_name']])
-    success = len([r for r in rows if r['status'] == 'SUCCESS'])
-    failed = len([r for r in rows if r['status'] == 'FAILED'])
-    skipped = len([r for r in rows if r['status'] == 'SKIPPED'])
-    
-    print(f"模式: {mode.upper()}")
-    print(f"  文件: {matching_dirs[0].name}")
-    print(f"  成功: {success}")
-    print(f"  失败: {failed}")
-    print(f"  跳过: {skipped}")
-    print(f"  总计: {total}")
-    
-    if failed > 0:
-        print(f"  失败的 APK:")
-        for r in rows:
-            if r['status'] == 'FAILED':
-                print(f"    - {r['apk_name']} (退出码: {r['exit_code']}, 时间: {r['total_time_sec']}s)")
+from collections import Counter
+
+from flowdroid_engine import APK_DIR
+from results_store import EXIT_CLASSES, PHASE_COLUMNS, ResultsStore, config_label
+
+
+def main():
+    store = ResultsStore()
+    stats = store.ingest()
+
+    print("=" * 80)
+    print("FlowDroid TaintBench 分析结果统计")
+    print("=" * 80)
+    print(f"结果库: {store.db_path} (新导入 {stats['ingested']} 个运行目录, 共 {stats['scanned']} 个)")
     print()
 
-print("=" * 80)
-print("综合统计")
-print("=" * 80)
-print()
-
-# 统计所有 APK 在所有模式下的状态
-all_apks = sorted([f.stem for f in APK_DIR.glob("*.apk")])
-
-# 读取各模式结果
-mode_results = {}
-for mode, pattern in MODE_PATTERNS.items():
-    matching_dirs = sorted([d for d in OUTPUT_BASE.glob(pattern) if 'retry' not in str(d)], reverse=True)
-    if not matching_dirs:
-        continue
-    
-    csv_file = matching_dirs[0] / "results_summary.csv"
-    if not csv_file.exists():
-        continue
-    
-    mode_results[mode] = {}
-    with open(csv_file, 'r') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            mode_results[mode][row['apk_name']] = row['status']
-
-# 统计
-always_success = []
-all_modes_fail = []
-partial_fail = []
-
-for apk in all_apks:
-    statuses = []
-    for mode in ['full', 'ne', 'ns', 'ne_ns']:
-        if mode in mode_results and apk in mode_results[mode]:
-            statuses.append(mode_results[mode][apk])
-    
-    if all(s == 'SUCCESS' for s in statuses):
-        always_success.append(apk)
-    elif all(s in ['FAILED', 'SKIPPED'] for s in statuses if s != 'SKIPPED'):
-        all_modes_fail.append(apk)
-    elif any(s == 'FAILED' for s in statuses):
-        partial_fail.append(apk)
-
-print(f"所有模式都成功: {len(always_success)} 个")
-print(f"所有模式都失败或跳过: {len(all_modes_fail)} 个")
-print(f"部分模式失败: {len(partial_fail)} 个")
-print()
-
-if partial_fail:
-    print("部分模式失败的 APK:")
-    for apk in partial_fail:
-        print(f"\n  {apk}:")
-        for mode in ['full', 'ne', 'ns', 'ne_ns']:
-            if mode in mode_results and apk in mode_results[mode]:
-                status = mode_results[mode][apk]
-                print(f"    {mode}: {status}")
-
-print()
-print("=" * 80)
+    configs = store.configs()
+    labels = [config_label(c['mode'], c['timeout_multiplier'], c['callgraph'], c['source_sink'], c['jar'])
+              for c in configs]
+    effective = store.effective()
+
+    # 统计各配置（同一 APK 多次运行时任一次成功即为成功，否则取最新一次）
+    for label in labels:
+        rows = [results[label] for results in effective.values() if label in results]
+        statuses = Counter(r['status'] for r in rows)
+        classes = Counter(r['exit_class'] for r in rows if r['status'] == 'FAILED')
+        runs = sorted({r['path'] for r in rows})
+
+        print(f"配置: {label}")
+        print(f"  运行: {len(runs)} 个目录, 其中重试 / 阶梯 "
+              f"{len({r['path'] for r in rows if r['kind'] in ('retry', 'ladder')})} 个")
+        print(f"  成功: {statuses['SUCCESS']}")
+        print(f"  失败: {statuses['FAILED']}"
+              + (f" ({', '.join(f'{c} {classes[c]}' for c in EXIT_CLASSES if classes[c])})" if classes else ""))
+        print(f"  跳过: {statuses['SKIPPED']}")
+        if statuses['CANCELLED']:
+            print(f"  中断: {statuses['CANCELLED']}")
+        print(f"  总计: {len(rows)}")
+
+        failed = sorted((r for r in rows if r['status'] == 'FAILED'), key=lambda r: r['apk'])
+        if failed:
+            print(f"  失败的 APK:")
+            for r in failed:
+                reason = f" {r['timeout_reason']}" if r['timeout_reason'] else ""
+                print(f"    - {r['apk']} ({r['exit_class']}{reason}, 退出码: {r['exit_code']}, "
+                      f"时间: {r['total_sec']}s, {r['path']})")
+        print()
+
+    # 各配置成功作业的阶段平均耗时（FlowDroid 报告值，缺失时为日志跟踪的墙钟时间）
+    breakdown = store.phase_breakdown()
+    if breakdown:
+        print("各阶段平均耗时（秒，成功作业）:")
+        for label in labels:
+            phases = breakdown.get(label)
+            if phases is None:
+                continue
+            parts = [f"{name} {phases[column]:.1f}" for column, name in PHASE_COLUMNS
+                     if phases[column] is not None]
+            print(f"  {label} ({phases['n']} 个): " + ", ".join(parts)
+                  + f"; 总计 {phases['total_sec']:.1f}")
+        print()
+
+    # 其他运行中失败、但在重试或阶梯中成功的 (APK, 配置)
+    recovered = store.query(
+        "SELECT e.apk, e.path, e.mode, e.timeout_multiplier, e.callgraph, e.source_sink, e.jar FROM effective e "
+        "WHERE e.status = 'SUCCESS' AND e.kind IN ('retry', 'ladder') AND EXISTS ("
+        "  SELECT 1 FROM jobs j JOIN runs r ON r.id = j.run_id WHERE j.apk = e.apk AND j.status = 'FAILED'"
+        "  AND r.mode = e.mode AND r.timeout_multiplier = e.timeout_multiplier AND r.callgraph = e.callgraph"
+        "  AND r.source_sink = e.source_sink AND r.jar = e.jar) ORDER BY e.apk")
+    if recovered:
+        print(f"重试后成功: {len(recovered)} 个")
+        for r in recovered:
+            label = config_label(r['mode'], r['timeout_multiplier'], r['callgraph'], r['source_sink'], r['jar'])
+            print(f"  - {r['apk']} {label} ({r['path']})")
+        print()
+
+    print("=" * 80)
+    print("综合统计")
+    print("=" * 80)
+    print()
+
+    # 统计所有 APK 在所有配置下的状态
+    all_apks = sorted({f.stem for f in APK_DIR.glob("*.apk")} | set(effective))
+    always_success = []
+    all_modes_fail = []
+    partial_fail = []
+
+    for apk in all_apks:
+        statuses = [effective.get(apk, {})[label]['status'] for label in labels
+                    if label in effective.get(apk, {})]
+        ran = [s for s in statuses if s != 'SKIPPED']
+
+        if ran and all(s == 'SUCCESS' for s in ran):
+            always_success.append(apk)
+        elif not any(s == 'SUCCESS' for s in ran):
+            all_modes_fail.append(apk)
+        elif any(s == 'FAILED' for s in ran):
+            partial_fail.append(apk)
+
+    print(f"所有配置都成功: {len(always_success)} 个")
+    print(f"所有配置都失败或跳过: {len(all_modes_fail)} 个")
+    print(f"部分配置失败: {len(partial_fail)} 个")
+    print()
+
+    if partial_fail:
+        print("部分配置失败的 APK:")
+        for apk in partial_fail:
+            print(f"\n  {apk}:")
+            for label in labels:
+                row = effective[apk].get(label)
+                if row is not None:
+                    detail = f" ({row['exit_class']})" if row['status'] == 'FAILED' else ""
+                    print(f"    {label}: {row['status']}{detail}")
+
+    print()
+    print("=" * 80)
+
+
+if __name__ == '__main__':
+    main()
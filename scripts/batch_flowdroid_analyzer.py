@@ -1,346 +1,77 @@
 #!/usr/bin/env python3
 """
 FlowDroid 批量分析脚本
-支持多种运行模式和超时控制
+支持多种运行模式和超时控制；--callgraphs 扫描多个调用图算法，--matrix 一次运行整个实验矩阵
+（实际的调度和运行由 flowdroid_engine 完成）
 """
 
-import os
-import subprocess
-import time
-import csv
-import re
-import shutil
-from datetime import datetime
+import sys
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
 
-# 配置
-APK_DIR = Path.home() / "LDFA-dataset/TaintBench/apks"
-SOURCE_SINK = Path.home() / "LDFA-dataset/TaintBench/TB_SourcesAndSinks.txt"
-OUTPUT_BASE = Path.home() / "LDFA-dataset/TaintBench/output"
-FLOWDROID_JAR = Path.home() / "FlowDroid/jars/soot-infoflow-cmd-2.14.1-jar-with-dependencies.jar"
-ANDROID_PLATFORMS = Path.home() / "Android/sdk/platforms"
-MAX_MEM = "180g"
-
-# 超时配置（秒）
-CALLGRAPH_TIMEOUT = 600    # 10 分钟
-DATAFLOW_TIMEOUT = 1800    # 30 分钟
-RESULT_TIMEOUT = 120       # 2 分钟
-
-# SDKMAN 环境
-SDKMAN_INIT = Path.home() / ".sdkman/bin/sdkman-init.sh"
-
-
-class APKAnalyzer:
-    def __init__(self, mode: str = "full", blacklist: Optional[List[str]] = None):
-        """
-        初始化分析器
-        
-        Args:
-            mode: 运行模式
-                  - "full": 完整运行（无优化标志）
-                  - "ne": 使用 -ne 标志（不跟踪异常流）
-                  - "ns": 使用 -ns 标志（不跟踪静态字段）
-                  - "ne_ns": 同时使用 -ne 和 -ns
-            blacklist: 需要跳过的 APK 列表
-        """
-        self.mode = mode
-        self.blacklist = blacklist or []
-        
-        # 根据模式设置标志
-        self.flags = []
-        if mode == "ne":
-            self.flags = ["-ne"]
-        elif mode == "ns":
-            self.flags = ["-ns"]
-        elif mode == "ne_ns":
-            self.flags = ["-ne", "-ns"]
-        # "full" 模式不添加任何标志
-        
-        # 创建输出目录
-        timestamp = datetime.now().strftime("%Y%m%d-%H%M")
-        mode_name = {
-            "full": "max-precision",
-            "ne": "no-exceptions",
-            "ns": "no-static",
-            "ne_ns": "no-exception-no-static"
-        }[mode]
-        self.output_dir = OUTPUT_BASE / f"{timestamp}-39apps-{mode_name}"
-        self.output_dir.mkdir(parents=True, exist_ok=True)
-        
-        # 日志文件
-        self.log_file = self.output_dir / "analysis_summary.log"
-        self.summary_file = self.output_dir / "results_summary.csv"
-        self.blacklist_file = self.output_dir / "blacklist.txt"
-        
-        # 初始化 CSV
-        self._init_csv()
-        
-    def _init_csv(self):
-        """初始化 CSV 文件"""
-        with open(self.summary_file, 'w', newline='') as f:
-            writer = csv.writer(f)
-            writer.writerow([
-                'apk_name', 'status', 'leaks_found', 'sources_found', 'sinks_found',
-                'callgraph_time_sec', 'dataflow_time_sec', 'result_time_sec',
-                'total_time_sec', 'peak_memory_gb', 'exit_code', 'timeout_reason',
-                'output_file'
-            ])
-    
-    def _log(self, message: str):
-        """记录日志"""
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        log_msg = f"[{timestamp}] {message}"
-        print(log_msg)
-        with open(self.log_file, 'a') as f:
-            f.write(log_msg + '\n')
-    
-    def _parse_log_file(self, log_file: Path) -> Dict:
-        """解析 FlowDroid 日志文件"""
-        result = {
-            'leaks': 'N/A',
-            'sources': 'N/A',
-            'sinks': 'N/A',
-            'callgraph_time': 'N/A',
-            'dataflow_time': 'N/A',
-            'memory_gb': 'N/A',
-        }
-        
-        try:
-            with open(log_file, 'r') as f:
-                content = f.read()
-                
-            if not content.strip():
-                return result
-                
-            # 提取泄露数
-            leaks_match = re.search(r'Found (\d+) leaks', content)
-            if leaks_match:
-                result['leaks'] = leaks_match.group(1)
-            
-            # 提取源点和汇点数
-            sources_match = re.search(r'found (\d+) sources and (\d+) sinks', content)
-            if sources_match:
-                result['sources'] = sources_match.group(1)
-                result['sinks'] = sources_match.group(2)
-            
-            # 提取时间信息
-            cg_match = re.search(r'Callgraph construction took ([\d.]+) seconds', content)
-            if cg_match:
-                result['callgraph_time'] = cg_match.group(1)
-            
-            df_match = re.search(r'Data flow solver took ([\d.]+) seconds', content)
-            if df_match:
-                result['dataflow_time'] = df_match.group(1)
-            
-            # 提取内存使用
-            memory_match = re.search(r'Maximum memory consumption: ([\d.]+) GB', content)
-            if memory_match:
-                result['memory_gb'] = memory_match.group(1)
-                
-        except Exception as e:
-            self._log(f"解析日志文件失败: {e}")
-        
-        return result
-    
-    def _run_flowdroid(self, apk_path: Path) -> Tuple[int, str, float]:
-        """
-        运行 FlowDroid 分析
-        
-        Returns:
-            (exit_code, timeout_reason, total_time)
-        """
-        apk_name = apk_path.stem
-        output_xml = self.output_dir / f"{apk_name}_results.xml"
-        log_file = self.output_dir / f"{apk_name}.log"
-        
-        # 构建命令 - 直接使用 java 命令，设置环境
-        env = os.environ.copy()
-        # 设置 PATH 以使用正确的 java
-        env['PATH'] = f"{Path.home()}/.sdkman/candidates/java/current/bin:{env.get('PATH', '')}"
-        
-        cmd = [
-            "java",
-            f"-Xmx{MAX_MEM}",
-            "-jar", str(FLOWDROID_JAR),
-            "-a", str(apk_path),
-            "-p", str(ANDROID_PLATFORMS),
-            "-s", str(SOURCE_SINK),
-            "-cg", "CHA",
-            f"-ct", str(CALLGRAPH_TIMEOUT),
-            f"-dt", str(DATAFLOW_TIMEOUT),
-            f"-rt", str(RESULT_TIMEOUT),
-            *self.flags,
-            "-o", str(output_xml)
-        ]
-        
-        start_time = time.time()
-        timeout_reason = ""
-        
-        try:
-            # 运行命令，捕获输出
-            with open(log_file, 'w') as lf:
-                result = subprocess.run(
-                    cmd,
-                    stdout=lf,
-                    stderr=subprocess.STDOUT,
-                    env=env,
-                    timeout=None
-                )
-            exit_code = result.returncode
-            
-        except subprocess.TimeoutExpired:
-            exit_code = 124
-            timeout_reason = "SUBPROCESS_TIMEOUT"
-            
-        except Exception as e:
-            exit_code = -1
-            timeout_reason = f"ERROR: {str(e)}"
-            
-        total_time = time.time() - start_time
-        
-        # 检查日志中的超时信息
-        if exit_code != 0:
-            try:
-                with open(log_file, 'r') as f:
-                    log_content = f.read()
-                    
-                if "Callgraph creation timed out" in log_content:
-                    timeout_reason = "CALLGRAPH_TIMEOUT"
-                elif "Data flow computation timed out" in log_content:
-                    timeout_reason = "DATAFLOW_TIMEOUT"
-                elif "Result computation timed out" in log_content:
-                    timeout_reason = "RESULT_TIMEOUT"
-                elif "Running out of memory" in log_content or "OutOfMemoryError" in log_content:
-                    timeout_reason = "OUT_OF_MEMORY"
-                elif "UnsupportedClassVersionError" in log_content:
-                    timeout_reason = "JAVA_VERSION_ERROR"
-                    
-            except Exception:
-                pass
-        
-        return exit_code, timeout_reason, total_time
-    
-    def run_analysis(self) -> Dict:
-        """运行完整的批量分析"""
-        self._log("=" * 60)
-        self._log(f"FlowDroid 批量分析 - 模式: {self.mode}")
-        self._log(f"开始时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        self._log(f"输出目录: {self.output_dir}")
-        self._log(f"标志: {' '.join(self.flags) if self.flags else '无（完整模式）'}")
-        self._log(f"超时设置: CT={CALLGRAPH_TIMEOUT}s, DT={DATAFLOW_TIMEOUT}s, RT={RESULT_TIMEOUT}s")
-        self._log("=" * 60)
-        
-        # 记录黑名单
-        if self.blacklist:
-            with open(self.blacklist_file, 'w') as f:
-                f.write("Blacklisted APKs:\\n")
-                for apk in self.blacklist:
-                    f.write(f"  - {apk}\\n")
-            self._log(f"黑名单: {', '.join(self.blacklist)}")
-        
-        # 统计
-        total = 0
-        success = 0
-        failed = 0
-        skipped = 0
-        
-        # 遍历所有 APK
-        apk_files = sorted(APK_DIR.glob("*.apk"))
-        
-        for apk_path in apk_files:
-            apk_name = apk_path.stem
-            
-            # 检查黑名单
-            if apk_name in self.blacklist:
-                self._log(f"跳过 (黑名单): {apk_name}")
-                skipped += 1
-                with open(self.summary_file, 'a', newline='') as f:
-                    writer = csv.writer(f)
-                    writer.writerow([apk_name, "SKIPPED", 0, 0, 0, 0, 0, 0, 0, 0, 0, "BLACKLISTED", ""])
-                continue
-            
-            total += 1
-            self._log(f"[{total}/{len(apk_files)}] 正在分析: {apk_name}")
-            
-            # 运行分析
-            exit_code, timeout_reason, total_time = self._run_flowdroid(apk_path)
-            
-            # 解析日志
-            log_file = self.output_dir / f"{apk_name}.log"
-            parsed = self._parse_log_file(log_file)
-            
-            # 确定状态
-            if exit_code == 0:
-                status = "SUCCESS"
-                success += 1
-            else:
-                status = f"FAILED"
-                failed += 1
-            
-            # 记录结果
-            with open(self.summary_file, 'a', newline='') as f:
-                writer = csv.writer(f)
-                writer.writerow([
-                    apk_name,
-                    status,
-                    parsed['leaks'],
-                    parsed['sources'],
-                    parsed['sinks'],
-                    parsed['callgraph_time'],
-                    parsed['dataflow_time'],
-                    'N/A',  # result_time 暂不支持
-                    f"{total_time:.2f}",
-                    parsed['memory_gb'],
-                    exit_code,
-                    timeout_reason,
-                    str(self.output_dir / f"{apk_name}_results.xml")
-                ])
-            
-            # 输出摘要
-            self._log(f"  状态: {status}")
-            self._log(f"  泄露数: {parsed['leaks']}")
-            self._log(f"  源点数: {parsed['sources']}, 汇点数: {parsed['sinks']}")
-            self._log(f"  时间: CG={parsed['callgraph_time']}s, DF={parsed['dataflow_time']}s, 总计={total_time:.2f}s")
-            self._log(f"  内存: {parsed['memory_gb']} GB")
-            if timeout_reason:
-                self._log(f"  超时原因: {timeout_reason}")
-            self._log("")
-        
-        # 输出汇总
-        self._log("=" * 60)
-        self._log("分析完成!")
-        self._log(f"总计: {total} 个 APK")
-        self._log(f"成功: {success}")
-        self._log(f"失败: {failed}")
-        self._log(f"跳过: {skipped}")
-        self._log("=" * 60)
-        self._log(f"汇总文件: {self.summary_file}")
-        self._log(f"日志文件: {self.log_file}")
-        
-        return {
-            'total': total,
-            'success': success,
-            'failed': failed,
-            'skipped': skipped
-        }
+from flowdroid_engine import (
+    FlowDroidEngine, MatrixSpec, OUTPUT_BASE, RunConfig, Cell, MODE_NAMES,
+    CALLGRAPH_ALGORITHM, CALLGRAPH_CHOICES,
+    add_engine_arguments, apk_paths, engine_kwargs, timestamp
+)
 
 
 def main():
     import argparse
-    
+
     parser = argparse.ArgumentParser(description='FlowDroid 批量分析')
-    parser.add_argument('--mode', choices=['full', 'ne', 'ns', 'ne_ns'], 
+    parser.add_argument('--mode', choices=['full', 'ne', 'ns', 'ne_ns'],
                        default='full', help='运行模式')
-    parser.add_argument('--blacklist', nargs='*', default=[], 
+    parser.add_argument('--blacklist', nargs='*', default=[],
                        help='黑名单 APK（不含 .apk 后缀）')
-    
+    parser.add_argument('--callgraphs', nargs='+', choices=CALLGRAPH_CHOICES,
+                       default=[CALLGRAPH_ALGORITHM], metavar='CG',
+                       help=f'调用图算法，多个时每个算法一个子目录（{" / ".join(CALLGRAPH_CHOICES)}，'
+                            f'默认 {CALLGRAPH_ALGORITHM}）')
+    parser.add_argument('--matrix', type=Path, default=None, metavar='SPEC.json',
+                       help='实验矩阵定义（JSON），一次调度所有单元格（忽略 --mode）')
+    add_engine_arguments(parser)
+    parser.add_argument('--ladder', action='store_true',
+                       help='精度降级阶梯：失败的 APK 依次用更便宜的设置重试（忽略 --mode）')
+    parser.add_argument('--ladder-rungs', nargs='*', default=None, metavar='MODE[:MULT]',
+                       help='自定义阶梯（默认 full:1 ne:1 ns:1 ne_ns:1 ne_ns:3）')
+
     args = parser.parse_args()
-    
-    analyzer = APKAnalyzer(mode=args.mode, blacklist=args.blacklist)
-    result = analyzer.run_analysis()
-    
+    common = engine_kwargs(args)
+
+    if args.ladder:
+        from precision_ladder import PrecisionLadder, parse_rung
+        if len(set(args.callgraphs)) > 1:
+            parser.error('--ladder 只支持一个调用图算法（--callgraphs）')
+        rungs = [parse_rung(r) for r in args.ladder_rungs] if args.ladder_rungs else None
+        ladder = PrecisionLadder(rungs=rungs, blacklist=args.blacklist, callgraph=args.callgraphs[0], **common)
+        result = ladder.run()
+    else:
+        if args.matrix:
+            spec = MatrixSpec.from_file(args.matrix)
+            spec.blacklist = list(dict.fromkeys(spec.blacklist + args.blacklist))
+            output_dir = OUTPUT_BASE / f"{timestamp()}-matrix-{spec.name}"
+            cells = spec.cells(output_dir)
+            output_dir.mkdir(parents=True, exist_ok=True)
+            with open(args.matrix, 'r') as src, open(output_dir / "matrix.json", 'w') as dst:
+                dst.write(src.read())
+        else:
+            output_dir = OUTPUT_BASE / f"{timestamp()}-39apps-{MODE_NAMES[args.mode]}"
+            if len(set(args.callgraphs)) > 1:
+                # 调用图扫描：同一次调度，每个算法一个单元格（<算法>-<模式目录名>）
+                spec = MatrixSpec(name="callgraphs", modes=[args.mode], callgraphs=args.callgraphs,
+                                  blacklist=args.blacklist)
+                cells = spec.cells(output_dir)
+            else:
+                cells = [Cell(RunConfig(mode=args.mode, callgraph=args.callgraphs[0]),
+                              apk_paths(), output_dir, args.blacklist)]
+        engine = FlowDroidEngine(output_dir / "analysis_summary.log", **common)
+        result = engine.run(cells)
+        result.pop('results')
+
     print(f"\\n分析结果: {result}")
+    # 被 Ctrl-C / --deadline 中断时以 130 退出，便于外层脚本区分
+    if result.get('cancelled'):
+        sys.exit(130)
 
 
 if __name__ == '__main__':
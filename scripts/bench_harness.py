@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+批量分析框架自身的评测（不需要 FlowDroid jar / Android SDK）
+用 stub_flowdroid.py 代替 FlowDroid，在 39 / 1000 / 10000 个合成 APK 上测量：
+  - 调度开销：展开与缓存键、耗时 / 堆 / 失败预测和 makespan 模拟（engine.expand + engine.plan）
+  - 吞吐量：端到端每秒完成的作业数，以及扣除替身进程本身耗时后每个作业的框架开销
+  - 解析开销：日志解析（engine._parse_log_file）和结果 XML 解析（callgraph_report.detected_pairs）
+  - 结果读取：大型结果 XML（含重建路径）上 results_reader 流式读取与 ET.parse 整棵树的耗时和峰值内存
+所有文件写入临时目录，结果缓存也放在临时目录，不影响 OUTPUT_BASE。
+"""
+
+import asyncio
+import contextlib
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+import zipfile
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import compressed_io
+import stub_flowdroid
+from callgraph_report import detected_pairs
+from flowdroid_engine import Cell, FlowDroidEngine, RunConfig
+from result_cache import ResultCache
+from results_reader import read_results
+
+STUB = Path(__file__).resolve().parent / "stub_flowdroid.py"
+DEFAULT_SIZES = [39, 1000, 10000]
+# 合成 APK 的 classes.dex 大小范围（KB），决定无历史时的耗时 / 堆估计
+DEX_KB = (20, 2000)
+STUB_SAMPLES = 10
+DEFAULT_READER_RESULTS = [1000, 10000]
+
+
+def make_apks(apk_dir: Path, count: int, seed: int = 0) -> List[Path]:
+    """生成 count 个只含 classes.dex 的合成 APK（除序号外为零字节，压缩后很小）"""
+    apk_dir.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(seed)
+    apks = []
+    for i in range(count):
+        path = apk_dir / f"bench_{i:05d}.apk"
+        if not path.exists():
+            with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED, compresslevel=1) as zf:
+                # 开头写入序号，保证内容（即缓存键）各不相同，不会被去重
+                zf.writestr("classes.dex", i.to_bytes(4, 'big') + bytes(rng.randint(*DEX_KB) * 1024))
+        apks.append(path)
+    return apks
+
+
+def _engine(work: Path, name: str, **kwargs) -> FlowDroidEngine:
+    engine = FlowDroidEngine(work / name / "analysis_summary.log", force=True,
+                             object_store=work / "objects", **kwargs)
+    engine.cache = ResultCache(work / "cache")
+    return engine
+
+
+def _cells(work: Path, name: str, apks: List[Path], config: RunConfig) -> List[Cell]:
+    return [Cell(config, apks, work / name / "cell")]
+
+
+def bench_scheduling(work: Path, apks: List[Path], config: RunConfig, jobs: int) -> Dict:
+    """展开 + 预测（不启动进程）"""
+    engine = _engine(work, f"plan-{len(apks)}", jobs=jobs, cores=jobs)
+    start = time.perf_counter()
+    expanded, owners = engine.expand(_cells(work, f"plan-{len(apks)}", apks, config))
+    expand_sec = time.perf_counter() - start
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        engine.plan(expanded, owners)
+    total = time.perf_counter() - start
+    return {'expand_sec': round(expand_sec, 3), 'plan_sec': round(total - expand_sec, 3),
+            'schedule_ms_per_job': round(total / len(apks) * 1000, 3)}
+
+
+def stub_process_sec(apk: Path, env: Dict[str, str]) -> float:
+    """直接启动一次替身进程的平均耗时（解释器启动 + 输出），从框架开销中扣除"""
+    cmd = [sys.executable, str(STUB), "-a", str(apk), "-ct", "600", "-dt", "1800", "-rt", "120",
+           "-o", os.devnull]
+    start = time.perf_counter()
+    for _ in range(STUB_SAMPLES):
+        subprocess.run(cmd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False)
+    return (time.perf_counter() - start) / STUB_SAMPLES
+
+
+def bench_throughput(work: Path, apks: List[Path], config: RunConfig, jobs: int,
+                     compress: str, env: Dict[str, str]) -> Dict:
+    """用替身端到端运行所有 APK"""
+    name = f"run-{len(apks)}"
+    engine = _engine(work, name, jobs=jobs, cores=jobs, compress=compress,
+                     launcher=f"{sys.executable} {STUB}")
+    saved = os.environ.copy()
+    os.environ.update(env)
+    try:
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            start = time.perf_counter()
+            result = asyncio.run(engine.run_async(_cells(work, name, apks, config)))
+            elapsed = time.perf_counter() - start
+    finally:
+        os.environ.clear()
+        os.environ.update(saved)
+    per_process = stub_process_sec(apks[0], {**os.environ, **env})
+    # 并发数超过核数时按核数计
+    slots = min(engine._effective_slots(), os.cpu_count() or 1)
+    return {
+        'success': result['success'],
+        'failed': result['failed'],
+        'wall_sec': round(elapsed, 2),
+        'jobs_per_sec': round(len(apks) / elapsed, 2),
+        'stub_process_ms': round(per_process * 1000, 1),
+        # 每个槽位上平均每个作业的时间减去替身进程本身的耗时
+        'overhead_ms_per_job': round((elapsed * slots / len(apks) - per_process) * 1000, 1),
+    }
+
+
+def bench_parsing(work: Path, count: int, results: int, compress: str) -> Dict:
+    """生成 count 份日志和结果 XML，测量解析耗时"""
+    out = work / f"parse-{count}"
+    out.mkdir(parents=True, exist_ok=True)
+    log_bytes = xml_bytes = 0
+    for i in range(count):
+        apk_name = f"bench_{i:05d}"
+        log = out / f"{apk_name}.log"
+        xml = out / f"{apk_name}_results.xml"
+        with open(log, 'w') as f:
+            f.write('\n'.join(stub_flowdroid.synthetic_log(apk_name, 12, 30, 40, 20, results)) + '\n')
+        with open(xml, 'w') as f:
+            f.write(stub_flowdroid.results_xml(apk_name, results))
+        log_bytes += log.stat().st_size
+        xml_bytes += xml.stat().st_size
+        compressed_io.compress_outputs([log, xml], compress)
+
+    engine = _engine(work, f"parse-{count}")
+    start = time.perf_counter()
+    for i in range(count):
+        engine._parse_log_file(out / f"bench_{i:05d}.log")
+    log_sec = time.perf_counter() - start
+    start = time.perf_counter()
+    for i in range(count):
+        detected_pairs(out / f"bench_{i:05d}_results.xml")
+    xml_sec = time.perf_counter() - start
+    return {
+        'log_ms_per_file': round(log_sec / count * 1000, 3),
+        'log_mb_per_sec': round(log_bytes / 1024 ** 2 / log_sec, 1),
+        'xml_ms_per_file': round(xml_sec / count * 1000, 3),
+        'xml_mb_per_sec': round(xml_bytes / 1024 ** 2 / xml_sec, 1),
+    }
+
+
+def _etree_results(xml_file: Path) -> List[Dict]:
+    """原先比较脚本的读法：ET.parse 整棵树，每个 Sink / Source 一个字符串字典"""
+    with compressed_io.open_binary(xml_file) as f:
+        root = ET.parse(f).getroot()
+    results = []
+    for result in root.findall('.//Result'):
+        sink = result.find('Sink')
+        results.append({
+            'sink': {'statement': sink.get('Statement'), 'method': sink.get('Method'),
+                     'definition': sink.get('MethodSourceSinkDefinition')},
+            'sources': [{'statement': s.get('Statement'), 'method': s.get('Method'),
+                         'definition': s.get('MethodSourceSinkDefinition')}
+                        for s in result.find('Sources').findall('Source')],
+        })
+    return results
+
+
+def _measure(read) -> Tuple[float, float]:
+    """(耗时秒数, 峰值 Python 内存 MB)；耗时不在 tracemalloc 下测量"""
+    start = time.perf_counter()
+    read()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    try:
+        read()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return elapsed, peak / 1024 ** 2
+
+
+def bench_reader(work: Path, results: int, path_length: int, compress: str) -> Dict:
+    """
+    results 个 Result（每个 2 个 Source，各带 path_length 步重建路径）的结果 XML 上比较：
+      etree   ET.parse + 字典（只保留语句 / 方法 / 定义，保存全部结果）
+      records results_reader 的完整记录（含访问路径和重建路径，保存全部结果）
+      stream  results_reader 逐个处理、不保存（只取 source-sink 对），即流式用法的内存上界
+    """
+    xml = work / f"reader-{results}" / "bench_results.xml"
+    xml.parent.mkdir(parents=True, exist_ok=True)
+    with open(xml, 'w') as f:
+        f.write(stub_flowdroid.results_xml("bench", results, path_length=path_length))
+    xml_mb = xml.stat().st_size / 1024 ** 2
+    compressed_io.compress_outputs([xml], compress)
+
+    def stream():
+        for result in read_results(xml, access_paths=False, taint_paths=False):
+            for source in result.sources:
+                (source.definition, result.sink.definition)
+
+    entry = {'xml_mb': round(xml_mb, 1)}
+    for name, read in (('etree', lambda: _etree_results(xml)), ('records', lambda: list(read_results(xml))),
+                       ('stream', stream)):
+        elapsed, peak = _measure(read)
+        entry[f'{name}_sec'] = round(elapsed, 3)
+        entry[f'{name}_peak_mb'] = round(peak, 1)
+    return entry
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='批量分析框架评测（FlowDroid 替身）')
+    parser.add_argument('--sizes', nargs='+', type=int, default=DEFAULT_SIZES,
+                        help=f'APK 数（默认 {" ".join(map(str, DEFAULT_SIZES))}）')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1,
+                        help='并发作业数（默认 CPU 核数）')
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='替身每个作业的平均耗时秒数（默认 0，只测框架开销）')
+    parser.add_argument('--results', type=int, default=10, help='每个结果 XML 的平均泄露数（默认 10）')
+    parser.add_argument('--fail-rate', type=float, default=0.0, help='替身失败 APK 比例（默认 0）')
+    parser.add_argument('--compress', choices=['gzip', 'zstd', 'none'], default=compressed_io.DEFAULT_CODEC,
+                        help=f'输出压缩算法（默认 {compressed_io.DEFAULT_CODEC}）')
+    parser.add_argument('--reader-results', nargs='+', type=int, default=DEFAULT_READER_RESULTS,
+                        help=f'结果读取评测的 Result 数（默认 {" ".join(map(str, DEFAULT_READER_RESULTS))}）')
+    parser.add_argument('--path-length', type=int, default=5,
+                        help='结果读取评测中每个 Source 的重建路径步数（默认 5）')
+    parser.add_argument('--skip', nargs='*', choices=['scheduling', 'throughput', 'parsing', 'reader'], default=[],
+                        help='跳过的评测项')
+    parser.add_argument('--work-dir', type=Path, default=None, help='工作目录（默认临时目录，结束后删除）')
+    parser.add_argument('--output', type=Path, default=None, metavar='BENCH.json', help='保存结果')
+    args = parser.parse_args()
+
+    env = {'STUB_FLOWDROID_LATENCY': str(args.latency), 'STUB_FLOWDROID_RESULTS': str(args.results),
+           'STUB_FLOWDROID_FAIL_RATE': str(args.fail_rate)}
+    with contextlib.ExitStack() as stack:
+        work = args.work_dir or Path(stack.enter_context(tempfile.TemporaryDirectory(prefix="bench-")))
+        work.mkdir(parents=True, exist_ok=True)
+        source_sink = work / "SourcesAndSinks.txt"
+        jar = work / "stub.jar"
+        source_sink.write_text("<android.telephony.TelephonyManager: java.lang.String getDeviceId()> -> _SOURCE_\n")
+        jar.write_bytes(b"stub")
+        config = RunConfig(source_sink=source_sink, jar=jar)
+
+        report = {'jobs': args.jobs, 'latency_sec': args.latency, 'compress': args.compress, 'sizes': {}}
+        for size in args.sizes:
+            apks = make_apks(work / "apks", max(args.sizes))[:size]
+            entry = {}
+            if 'scheduling' not in args.skip:
+                entry['scheduling'] = bench_scheduling(work, apks, config, args.jobs)
+            if 'throughput' not in args.skip:
+                entry['throughput'] = bench_throughput(work, apks, config, args.jobs, args.compress, env)
+            if 'parsing' not in args.skip:
+                entry['parsing'] = bench_parsing(work, size, args.results, args.compress)
+            report['sizes'][size] = entry
+            print(f"{size} 个 APK: {json.dumps(entry, ensure_ascii=False)}", flush=True)
+        if 'reader' not in args.skip:
+            report['reader'] = {'path_length': args.path_length, 'results': {}}
+            for results in args.reader_results:
+                entry = bench_reader(work, results, args.path_length, args.compress)
+                report['reader']['results'][results] = entry
+                print(f"{results} 个 Result: {json.dumps(entry, ensure_ascii=False)}", flush=True)
+
+    print(f"\n并发 {args.jobs}, 替身耗时 {args.latency}s, 压缩 {args.compress}")
+    print("| APK 数 | 调度 s | 调度 ms/作业 | 吞吐 作业/s | 框架开销 ms/作业 | 日志解析 ms/个 | XML 解析 ms/个 |")
+    print("|--------|--------|--------------|-------------|------------------|----------------|----------------|")
+    for size, entry in report['sizes'].items():
+        s = entry.get('scheduling')
+        t = entry.get('throughput', {})
+        p = entry.get('parsing', {})
+        sched = round(s['expand_sec'] + s['plan_sec'], 3) if s else None
+        cells = [sched, (s or {}).get('schedule_ms_per_job'), t.get('jobs_per_sec'),
+                 t.get('overhead_ms_per_job'), p.get('log_ms_per_file'), p.get('xml_ms_per_file')]
+        print(f"| {size} | " + " | ".join('-' if c is None else str(c) for c in cells) + " |")
+    if 'reader' in report:
+        print(f"\n结果读取（每个 Source {args.path_length} 步重建路径）")
+        print("| Result 数 | XML MB | ET.parse s | ET.parse 峰值 MB | 记录 s | 记录 峰值 MB | 流式 s | 流式 峰值 MB |")
+        print("|-----------|--------|------------|------------------|--------|--------------|--------|--------------|")
+        for results, e in report['reader']['results'].items():
+            print(f"| {results} | {e['xml_mb']} | {e['etree_sec']} | {e['etree_peak_mb']} | {e['records_sec']} | "
+                  f"{e['records_peak_mb']} | {e['stream_sec']} | {e['stream_peak_mb']} |")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"结果已保存: {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+调用图算法（及其他配置）的 时间 / 内存 / 召回率 Pareto 报告
+从结果库取每个 (APK, 配置) 的代表结果，用 findings/*_findings.json 的真实泄露计算召回率，
+给出每个 APK 和整体的 Pareto 前沿（耗时越少、内存越小、召回率越高越好）。
+
+召回率按 source / sink 方法签名对匹配（与 flowdroid_analysis/precise_comparison.py 相同）：
+真实泄露的 source、sink 签名出现在同一个 FlowDroid Result 中即视为检出。
+"""
+
+import json
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from flowdroid_engine import OUTPUT_BASE
+from results_reader import READ_ERRORS, flow_pairs, success_pairs
+from results_store import ResultsStore, config_label
+
+FINDINGS_DIR = Path.home() / "LDFA-dataset/TaintBench/findings"
+
+
+def _signature(ir: str) -> str:
+    """从 Jimple 语句中提取 <类: 方法签名>"""
+    if '<' in ir and '>' in ir:
+        return ir[ir.find('<'):ir.rfind('>') + 1]
+    return ir
+
+
+def load_ground_truth(findings_dir: Path = FINDINGS_DIR) -> Dict[str, Set[Tuple[str, str]]]:
+    """{APK: {(source 签名, sink 签名)}}，只取真实泄露（isNegative 为 false）"""
+    truth = {}
+    for path in sorted(findings_dir.glob("*_findings.json")):
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        pairs = set()
+        for finding in data['findings']:
+            if finding.get('isNegative') or not finding['source']['IRs'] or not finding['sink']['IRs']:
+                continue
+            pairs.add((_signature(finding['source']['IRs'][0]['IRstatement']),
+                       _signature(finding['sink']['IRs'][0]['IRstatement'])))
+        truth[path.name[:-len("_findings.json")]] = pairs
+    return truth
+
+
+def detected_pairs(xml_file: Path) -> Set[Tuple[str, str]]:
+    """FlowDroid 结果中的 (source 定义, sink 定义) 对；文件缺失或损坏时为空"""
+    try:
+        return flow_pairs(xml_file)
+    except READ_ERRORS:
+        return set()
+
+
+def pareto_front(points: List[Dict]) -> List[Dict]:
+    """cost、mem 越小、recall 越大越好；mem 未知时视为最差"""
+    def key(p):
+        return p['cost'], p['mem'] if p['mem'] is not None else float('inf'), -p['recall']
+
+    front = []
+    for p in points:
+        kp = key(p)
+        dominated = any(
+            all(a <= b for a, b in zip(key(q), kp)) and key(q) != kp
+            for q in points if q is not p)
+        if not dominated:
+            front.append(p)
+    return sorted(front, key=key)
+
+
+def _fmt(value: Optional[float], spec: str = ".2f") -> str:
+    return format(value, spec) if value is not None else 'N/A'
+
+
+def build_points(store: ResultsStore, truth: Dict[str, Set[Tuple[str, str]]],
+                 output_base: Path = OUTPUT_BASE) -> Dict[str, Dict[str, Dict]]:
+    """
+    {APK: {配置列名: {'cost', 'mem', 'detected', 'expected', 'recall', 'status'}}}
+
+    结果文件缺失或损坏的 SUCCESS 不参与比较（不按召回率 0 计）；没有泄露、没有结果文件的成功为空结果
+    """
+    points: Dict[str, Dict[str, Dict]] = {}
+    for row in store.query("SELECT * FROM effective WHERE mode IS NOT NULL AND status IN ('SUCCESS', 'FAILED')"):
+        expected = truth.get(row['apk'])
+        if not expected:
+            continue
+        found = set()
+        if row['status'] == 'SUCCESS':
+            found = success_pairs(output_base / row['path'] / f"{row['apk']}_results.xml", row['leaks'])
+            if found is None:
+                continue
+        detected = len(expected & found)
+        mems = [m for m in (row['peak_rss_gb'], row['peak_memory_gb']) if m is not None]
+        label = config_label(row['mode'], row['timeout_multiplier'], row['callgraph'],
+                             row['source_sink'], row['jar'])
+        points.setdefault(row['apk'], {})[label] = {
+            'label': label,
+            'status': row['status'],
+            # CPU 时间缺失（旧记录）时按墙钟时间计
+            'cost': row['cpu_sec'] if row['cpu_sec'] is not None else (row['total_sec'] or 0.0),
+            'mem': max(mems) if mems else None,
+            'detected': detected,
+            'expected': len(expected),
+            'recall': detected / len(expected),
+        }
+    return points
+
+
+def aggregate(points: Dict[str, Dict[str, Dict]], min_coverage: float) -> Tuple[List[Dict], List[str]]:
+    """
+    整体指标：只在所有入选配置都运行过的 APK 上比较
+
+    入选配置为覆盖至少 min_coverage 比例（相对覆盖最多的配置）APK 的配置。
+    Returns:
+        (每个配置的汇总, 参与比较的 APK)
+    """
+    coverage: Dict[str, int] = {}
+    for results in points.values():
+        for label in results:
+            coverage[label] = coverage.get(label, 0) + 1
+    if not coverage:
+        return [], []
+    most = max(coverage.values())
+    labels = [label for label, n in coverage.items() if n >= most * min_coverage]
+    apks = sorted(apk for apk, results in points.items() if all(label in results for label in labels))
+
+    summary = []
+    for label in labels:
+        rows = [points[apk][label] for apk in apks]
+        cpu_hours = sum(r['cost'] for r in rows) / 3600
+        detected = sum(r['detected'] for r in rows)
+        expected = sum(r['expected'] for r in rows)
+        mems = [r['mem'] for r in rows if r['mem'] is not None]
+        summary.append({
+            'label': label,
+            'success': sum(1 for r in rows if r['status'] == 'SUCCESS'),
+            'detected': detected,
+            'expected': expected,
+            'recall': detected / expected if expected else 0.0,
+            'cost': cpu_hours,
+            'mem': max(mems) if mems else None,
+            'per_cpu_hour': detected / cpu_hours if cpu_hours > 0 else None,
+        })
+    return summary, apks
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='调用图算法 时间 / 内存 / 召回率 Pareto 报告')
+    parser.add_argument('--findings', type=Path, default=FINDINGS_DIR,
+                        help=f'TaintBench findings 目录（默认 {FINDINGS_DIR}）')
+    parser.add_argument('--min-coverage', type=float, default=0.9,
+                        help='整体比较只纳入 APK 覆盖率不低于覆盖最多的配置该比例的配置（默认 0.9）')
+    parser.add_argument('--output', type=Path, default=OUTPUT_BASE / "CALLGRAPH_PARETO.md",
+                        help='报告文件')
+    args = parser.parse_args()
+
+    start = time.time()
+    store = ResultsStore()
+    store.ingest()
+    truth = load_ground_truth(args.findings)
+    points = build_points(store, truth)
+    summary, apks = aggregate(points, args.min_coverage)
+    front = {p['label'] for p in pareto_front(summary)}
+
+    output = []
+    output.append("# FlowDroid 配置 Pareto 报告（耗时 / 内存 / 召回率）\n")
+    output.append(f"- 真实泄露: {sum(len(p) for p in truth.values())} 个（{len(truth)} 个 APK，{args.findings}）")
+    output.append(f"- 整体比较基于 {len(apks)} 个所有入选配置都运行过的 APK")
+    output.append("- 成本为 CPU 时间（旧记录无 CPU 时间时按墙钟时间），内存为峰值 RSS 与 FlowDroid 报告值中的较大者")
+    output.append("- ★ 为 Pareto 前沿：没有其他配置同时更快、更省内存且召回率不低\n")
+    output.append("## 整体\n")
+    output.append("| 配置 | 前沿 | 成功 | 检出 / 真实 | 召回率 | CPU·h | 峰值内存 GB | 检出 / CPU·h |")
+    output.append("|------|------|------|-------------|--------|-------|-------------|--------------|")
+    for s in sorted(summary, key=lambda s: (-s['recall'], s['cost'])):
+        output.append(f"| {s['label']} | {'★' if s['label'] in front else ''} | {s['success']}/{len(apks)} | "
+                      f"{s['detected']}/{s['expected']} | {s['recall']:.1%} | {s['cost']:.3f} | "
+                      f"{_fmt(s['mem'])} | {_fmt(s['per_cpu_hour'], '.1f')} |")
+
+    overall = len(output)
+    output.append("\n## 每个 APK 的 Pareto 前沿\n")
+    output.append("| APK | 配置 | 状态 | 检出 / 真实 | CPU 秒 | 峰值内存 GB |")
+    output.append("|-----|------|------|-------------|--------|-------------|")
+    for apk in sorted(points):
+        for p in pareto_front(list(points[apk].values())):
+            output.append(f"| {apk} | {p['label']} | {p['status']} | {p['detected']}/{p['expected']} | "
+                          f"{p['cost']:.1f} | {_fmt(p['mem'])} |")
+
+    with open(args.output, 'w') as f:
+        f.write('\n'.join(output) + '\n')
+
+    print('\n'.join(output[:overall]))
+    print(f"\nPareto 报告已生成: {args.output} ({time.time() - start:.2f}s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+FlowDroid 结果和日志的压缩存储
+每个作业结束后 <apk>_results.xml 和 <apk>.log 压缩为 .gz（默认）或 .zst（需要 zstandard 包），
+所有读取方用逻辑路径（不带压缩后缀）调用 open_binary / open_text，压缩与未压缩文件同样处理；
+解压是流式的，不会把整个文件载入内存。
+
+results_summary.csv、events.jsonl 等仍在追加写入的文件保持不压缩。
+
+运行目录中不存在的文件再查该目录的 manifest.jsonl（object_store.py 写入）：结果和日志移入
+内容寻址的对象库后，逻辑路径解析到对象文件，读取方同样不需要改动。
+"""
+
+import gzip
+import io
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterable, List, Optional, TextIO, Tuple
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# 压缩算法 -> 文件后缀
+CODECS = {"gzip": ".gz", "zstd": ".zst"}
+DEFAULT_CODEC = "gzip"
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 10
+CHUNK_SIZE = 1 << 20
+
+# migrate 压缩的文件（运行目录中的结果和日志，以及结果缓存中的条目）
+COMPRESSIBLE = ("*_results.xml", "*.log", "results.xml", "analysis.log")
+# 仍会被追加写入的日志不压缩（运行汇总日志、work_queue 的 worker 日志）
+APPEND_ONLY = ("analysis_summary.log",)
+
+# 运行目录中移入对象库的文件清单：每行 {"name", "object"（相对运行目录）, "sha256", "size"}，同名以最后一行为准
+MANIFEST = "manifest.jsonl"
+
+_manifests: Dict[Path, Tuple[Tuple[int, int], Dict[str, Dict]]] = {}
+
+
+def check_codec(codec: str) -> str:
+    """
+    检查压缩算法是否可用（"none" 表示不压缩）
+
+    Raises:
+        ValueError: 未知算法
+        RuntimeError: zstd 但没有安装 zstandard
+    """
+    if codec == "none":
+        return codec
+    if codec not in CODECS:
+        raise ValueError(f"未知压缩算法: {codec}")
+    if codec == "zstd" and zstandard is None:
+        raise RuntimeError("zstd 压缩需要 zstandard 包（pip install zstandard），或使用 gzip")
+    return codec
+
+
+def codec_suffix(real: Path) -> str:
+    """实际文件的压缩后缀（未压缩时为空串）"""
+    return next((suffix for suffix in CODECS.values() if real.name.endswith(suffix)), "")
+
+
+def manifest_entries(run_dir: Path) -> Dict[str, Dict]:
+    """运行目录 manifest.jsonl 中每个逻辑文件名的最新记录（按 mtime / 大小缓存，没有清单时为空）"""
+    manifest = run_dir / MANIFEST
+    try:
+        st = manifest.stat()
+    except OSError:
+        return {}
+    stamp = (st.st_mtime_ns, st.st_size)
+    cached = _manifests.get(manifest)
+    if cached and cached[0] == stamp:
+        return cached[1]
+    entries = {}
+    with open(manifest, 'r') as f:
+        for line in f:
+            # 写入中途的行没有换行符；没有锁的 NFS 上并发追加可能产生交错、残缺的行
+            if not line.endswith('\n'):
+                continue
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if (isinstance(entry, dict) and isinstance(entry.get('name'), str)
+                    and isinstance(entry.get('object'), str)):
+                entries[entry['name']] = entry
+    _manifests[manifest] = (stamp, entries)
+    return entries
+
+
+def resolve(path: Path) -> Optional[Path]:
+    """
+    逻辑路径对应的实际文件，不存在时返回 None
+
+    依次查找未压缩文件、.gz / .zst，最后是所在目录 manifest.jsonl 登记的对象文件。
+    """
+    for candidate in [path] + [path.with_name(path.name + suffix) for suffix in CODECS.values()]:
+        if candidate.exists():
+            return candidate
+    entry = manifest_entries(path.parent).get(path.name)
+    if entry:
+        candidate = Path(os.path.normpath(path.parent / entry['object']))
+        if candidate.exists():
+            return candidate
+    return None
+
+
+def exists(path: Path) -> bool:
+    return resolve(path) is not None
+
+
+def open_binary(path: Path) -> BinaryIO:
+    """
+    以二进制流打开逻辑路径对应的文件（按后缀流式解压）
+
+    Raises:
+        FileNotFoundError: 各种后缀的文件都不存在
+    """
+    real = resolve(path)
+    if real is None:
+        raise FileNotFoundError(str(path))
+    if real.suffix == CODECS["gzip"]:
+        return gzip.open(real, 'rb')
+    if real.suffix == CODECS["zstd"]:
+        check_codec("zstd")
+        reader = zstandard.ZstdDecompressor().stream_reader(open(real, 'rb'), closefd=True)
+        return io.BufferedReader(reader, CHUNK_SIZE)
+    return open(real, 'rb')
+
+
+def open_text(path: Path, encoding: str = 'utf-8', errors: str = 'replace') -> TextIO:
+    """以文本流打开逻辑路径对应的文件"""
+    return io.TextIOWrapper(open_binary(path), encoding=encoding, errors=errors)
+
+
+def _open_writer(path: Path, codec: str) -> BinaryIO:
+    if codec == "gzip":
+        return gzip.open(path, 'wb', compresslevel=GZIP_LEVEL)
+    check_codec(codec)
+    return zstandard.ZstdCompressor(level=ZSTD_LEVEL).stream_writer(open(path, 'wb'), closefd=True)
+
+
+def compress_file(path: Path, codec: str = DEFAULT_CODEC) -> Path:
+    """
+    压缩单个未压缩文件并删除原文件，返回压缩后的路径
+
+    先写临时文件再原子重命名，保留原修改时间；中途失败时原文件不受影响。
+    """
+    target = path.with_name(path.name + CODECS[codec])
+    tmp = path.with_name(f".{target.name}.tmp")
+    try:
+        with open(path, 'rb') as src, _open_writer(tmp, codec) as dst:
+            shutil.copyfileobj(src, dst, CHUNK_SIZE)
+        st = path.stat()
+        os.utime(tmp, ns=(st.st_atime_ns, st.st_mtime_ns))
+        os.replace(tmp, target)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    path.unlink()
+    return target
+
+
+def compress_outputs(paths: Iterable[Path], codec: str = DEFAULT_CODEC) -> List[Path]:
+    """压缩作业的输出文件（逻辑路径；不存在或已压缩的跳过）"""
+    if codec == "none":
+        return []
+    return [compress_file(p, codec) for p in paths if p.exists()]
+
+
+def copy(src: Path, dst: Path) -> Optional[Path]:
+    """把逻辑路径 src 的实际文件复制为 dst（保留压缩后缀），src 不存在时返回 None"""
+    real = resolve(src)
+    if real is None:
+        return None
+    target = dst.with_name(dst.name + codec_suffix(real))
+    shutil.copyfile(real, target)
+    return target
+
+
+def migrate(roots: List[Path], codec: str = DEFAULT_CODEC, min_age_sec: float = 3600,
+            dry_run: bool = False) -> Dict[str, int]:
+    """
+    压缩已有运行目录（及结果缓存）中未压缩的结果和日志
+
+    最近 min_age_sec 秒内修改过的文件跳过，避免压缩正在运行的作业的日志。
+    Returns:
+        {'files', 'skipped', 'bytes_before', 'bytes_after'}
+    """
+    check_codec(codec)
+    now = time.time()
+    stats = {'files': 0, 'skipped': 0, 'bytes_before': 0, 'bytes_after': 0}
+    seen = set()
+    for root in roots:
+        for pattern in COMPRESSIBLE:
+            for path in sorted(root.rglob(pattern)):
+                if (path in seen or not path.is_file() or path.name.startswith('.')
+                        or path.name in APPEND_ONLY or path.parent.name == "workers"):
+                    continue
+                seen.add(path)
+                st = path.stat()
+                if now - st.st_mtime < min_age_sec:
+                    stats['skipped'] += 1
+                    continue
+                stats['files'] += 1
+                stats['bytes_before'] += st.st_size
+                if dry_run:
+                    continue
+                stats['bytes_after'] += compress_file(path, codec).stat().st_size
+    return stats
+
+
+def main():
+    import argparse
+
+    from flowdroid_engine import OUTPUT_BASE
+
+    parser = argparse.ArgumentParser(description='FlowDroid 结果和日志的压缩存储')
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('migrate', help='压缩已有运行目录中的结果和日志')
+    p.add_argument('paths', nargs='*', type=Path, default=[OUTPUT_BASE],
+                   help=f'运行目录或其上级目录（默认 {OUTPUT_BASE}，包括结果缓存）')
+    p.add_argument('--codec', choices=sorted(CODECS), default=DEFAULT_CODEC,
+                   help=f'压缩算法（默认 {DEFAULT_CODEC}）')
+    p.add_argument('--min-age', type=float, default=60, metavar='MIN',
+                   help='跳过最近 MIN 分钟内修改过的文件（默认 60）')
+    p.add_argument('--dry-run', action='store_true', help='只统计，不压缩')
+    p = sub.add_parser('cat', help='解压输出文件到标准输出（路径可省略压缩后缀）')
+    p.add_argument('path', type=Path)
+    args = parser.parse_args()
+
+    if args.command == 'migrate':
+        stats = migrate(args.paths, args.codec, args.min_age * 60, args.dry_run)
+        before, after = stats['bytes_before'], stats['bytes_after']
+        message = (f"{'待压缩' if args.dry_run else '已压缩'} {stats['files']} 个文件"
+                   f"（跳过最近修改的 {stats['skipped']} 个）: {before / 1024 ** 2:.1f} MB")
+        if not args.dry_run and before:
+            message += f" -> {after / 1024 ** 2:.1f} MB（{after / before:.1%}）"
+        print(message)
+    else:
+        import sys
+        name = args.path.name
+        for suffix in CODECS.values():
+            if name.endswith(suffix):
+                args.path = args.path.with_name(name[:-len(suffix)])
+        with open_binary(args.path) as f:
+            shutil.copyfileobj(f, sys.stdout.buffer, CHUNK_SIZE)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,394 @@
+#!/usr/bin/env python3
+"""
+FlowDroid 失败归因与聚类
+按块流式扫描所有失败作业的日志（压缩、对象库中的同样处理），提取异常类型和栈顶帧，
+规范化为指纹后跨 OUTPUT_BASE 中的所有运行聚类，报告每类的次数、涉及的 APK / 配置，
+以及同一 APK 换更便宜的模式（或更长超时、原配置重跑）后是否成功。
+
+指纹的来源按优先级：
+  exception  未捕获的 Java 异常（Exception in thread ...）：最底层 Caused by 的类型和
+             前 FRAME_DEPTH 个非 JDK 栈帧（去掉行号、匿名类 / lambda 编号）
+  marker     FlowDroid 自身的超时 / 内存不足标志行
+  signal     被外部终止（SIGKILL、阶段 / RSS 预算、cgroup OOM）：终止原因加上最后到达的阶段
+  exception  日志中最后一个被捕获的异常（同上规范化）
+  error      最后一条 ERROR / FATAL 日志（数字、路径、引号内容替换为占位符）
+  signal     没有任何线索时按 timeout_reason / 退出码加上最后到达的阶段
+"""
+
+import hashlib
+import io
+import json
+import re
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, TextIO, Tuple
+
+import compressed_io
+from flowdroid_engine import OUTPUT_BASE
+from log_monitor import PHASES
+from precision_ladder import MODE_FLAGS, classify_failure
+from results_reader import success_pairs
+from results_store import ResultsStore, config_label
+
+FRAME_DEPTH = 3
+MAX_FRAMES = 32
+BLOCK_SIZE = 1 << 20
+# 栈帧中不参与指纹的 JDK 包（异常几乎总是从这些通用代码抛出，区分度低）
+JDK_PREFIXES = ("java.", "javax.", "jdk.", "sun.", "com.sun.")
+# 只由异常类型决定、栈帧无意义的异常（触发位置是随机的）
+FRAMELESS = ("java.lang.OutOfMemoryError", "java.lang.StackOverflowError")
+
+# 日志中的 FlowDroid 失败标志 -> 名称（与引擎的 timeout_reason 一致）
+MARKERS = [
+    ("Callgraph creation timed out", "CALLGRAPH_TIMEOUT"),
+    ("Data flow computation timed out", "DATAFLOW_TIMEOUT"),
+    ("Result computation timed out", "RESULT_TIMEOUT"),
+    ("Running out of memory", "OUT_OF_MEMORY"),
+]
+
+# 异常头（含 Caused by / Exception in thread）及其后紧跟的栈帧块（按块扫描，re.M）
+EXCEPTION_RE = re.compile(
+    r'^[ \t]*(Exception in thread "[^"\n]*" |Caused by: )?'
+    r'((?:[a-zA-Z_$][\w$]*\.)+[A-Z][\w$]*(?:Exception|Error|Throwable))(?::[ \t]*([^\n]*))?\n', re.M)
+FRAMES_RE = re.compile(r'(?:[ \t]+(?:at [^\n]*|\.\.\. \d+ more)\n)*')
+FRAME_RE = re.compile(r'^[ \t]+at ([\w$.<>/]+)\(', re.M)
+ERROR_LEVELS = ("ERROR", "FATAL", "SEVERE")
+# 规范化：匿名类 / lambda / 生成类编号，消息中的可变部分
+ANON_RE = re.compile(r'\$\d+|\$\$Lambda\$[\w/]+|\$\$[\w]+\$\$\w+|/0x[0-9a-f]+')
+VARIABLE_RES = [
+    (re.compile(r'"[^"]*"|\'[^\']*\''), '"*"'),
+    (re.compile(r'<[^<>]*:[^<>]*>'), '<sig>'),
+    (re.compile(r'(?:/[\w.@+-]+)+/?'), '<path>'),
+    (re.compile(r'\b0x[0-9a-fA-F]+\b|\b[0-9a-f]{8,}\b'), '<hex>'),
+    (re.compile(r'\d+(?:\.\d+)?'), 'N'),
+]
+# 外部终止的 timeout_reason 前缀（日志中之前的异常 / ERROR 不是失败原因）
+EXTERNAL_REASONS = ("BUDGET_", "CGROUP_", "KILLED", "CANCELLED")
+LOG_PREFIX_RE = re.compile(r'^\[[^\]]*\]\s+(?:ERROR|FATAL|SEVERE)\s+\S+\s+-\s+')
+MESSAGE_LEN = 160
+
+
+def normalize_message(message: str) -> str:
+    """把消息中的数字、路径、引号内容、方法签名替换为占位符"""
+    message = LOG_PREFIX_RE.sub('', message.strip())
+    for pattern, placeholder in VARIABLE_RES:
+        message = pattern.sub(placeholder, message)
+    return message[:MESSAGE_LEN]
+
+
+def normalize_frame(frame: str) -> str:
+    return ANON_RE.sub('$*', frame)
+
+
+@dataclass
+class Fingerprint:
+    """一次失败的指纹（kind 见模块文档字符串）"""
+    kind: str
+    exception: str = ""
+    frames: Tuple[str, ...] = ()
+    message: str = ""
+    phase: str = ""
+
+    @property
+    def id(self) -> str:
+        if self.kind == "exception":
+            detail = [self.exception, *self.frames]
+            # 没有可用栈帧时用消息区分
+            if not self.frames and self.exception not in FRAMELESS:
+                detail.append(self.message)
+        elif self.kind == "error":
+            detail = [self.message]
+        else:
+            # marker / signal 本身不说明原因，按失败阶段区分
+            detail = [self.exception, self.phase]
+        return hashlib.sha1('\n'.join([self.kind, *detail]).encode()).hexdigest()[:12]
+
+    @property
+    def label(self) -> str:
+        if self.kind == "exception":
+            text = self.exception.rsplit('.', 1)[-1]
+            if self.exception in FRAMELESS and self.message:
+                text += f": {self.message}"
+            elif self.frames:
+                text += f" @ {self.frames[0]}"
+            elif self.message:
+                text += f": {self.message}"
+            return text
+        if self.kind == "error":
+            return self.message
+        return f"{self.exception} @ {self.phase or 'startup'}"
+
+
+@dataclass
+class _Trace:
+    """扫描中的一个异常链"""
+    uncaught: bool
+    causes: List[Tuple[str, str, List[str]]] = field(default_factory=list)  # (类型, 消息, 栈帧)
+
+
+def _blocks(stream: TextIO) -> Iterator[str]:
+    """按 BLOCK_SIZE 读取文本，每块以完整的行结束"""
+    rest = ""
+    while True:
+        data = stream.read(BLOCK_SIZE)
+        if not data:
+            if rest:
+                yield rest + "\n"
+            return
+        data = rest + data
+        cut = data.rfind("\n") + 1
+        if cut == 0:
+            rest = data
+            continue
+        rest = data[cut:]
+        yield data[:cut]
+
+
+def _is_word(char: str) -> bool:
+    return char.isalnum() or char == '_'
+
+
+def _last_error(block: str) -> int:
+    """块中最后一个 ERROR / FATAL / SEVERE 单词的位置（-1 表示没有）；rfind 比逐位置的正则快得多"""
+    last = -1
+    for level in ERROR_LEVELS:
+        pos = block.rfind(level)
+        while pos > last:
+            end = pos + len(level)
+            if not (pos and _is_word(block[pos - 1])) and not (end < len(block) and _is_word(block[end])):
+                last = pos
+                break
+            pos = block.rfind(level, 0, pos)
+    return last
+
+
+def scan_log(stream: TextIO) -> Tuple[Optional[_Trace], Optional[str], Optional[str], str]:
+    """
+    流式扫描一份日志：按块读取，每块只做几次正则搜索，内存占用与日志大小无关
+
+    Returns:
+        (选中的异常链, FlowDroid 失败标志, 最后一条 ERROR 日志, 最后到达的阶段)
+    """
+    chosen: Optional[_Trace] = None
+    current: Optional[_Trace] = None
+    marker = error = None
+    phase_index = 0
+    for block in _blocks(stream):
+        # 上一块以异常链结尾时，本块开头的栈帧和 Caused by 仍属于同一异常链
+        trace_end = -1
+        if current is not None:
+            trace_end = FRAMES_RE.match(block).end()
+            frames = current.causes[-1][2]
+            frames += FRAME_RE.findall(block, 0, trace_end)[:MAX_FRAMES - len(frames)]
+        for match in EXCEPTION_RE.finditer(block):
+            prefix, exc, message = match.group(1), match.group(2), match.group(3) or ""
+            frames_end = FRAMES_RE.match(block, match.end()).end()
+            frames = FRAME_RE.findall(block, match.end(), frames_end)[:MAX_FRAMES]
+            if prefix == 'Caused by: ' and current is not None and match.start() == trace_end:
+                current.causes.append((exc, message, frames))
+            else:
+                current = _Trace(uncaught=bool(prefix) and prefix.startswith('Exception in thread'))
+                current.causes.append((exc, message, frames))
+                # 未捕获的异常优先，否则保留最后一个
+                if chosen is None or not chosen.uncaught or current.uncaught:
+                    chosen = current
+            trace_end = frames_end
+        if trace_end != len(block):
+            current = None
+
+        for text, name in MARKERS:
+            if text in block:
+                marker = name
+        last = _last_error(block)
+        if last >= 0:
+            error = block[block.rfind('\n', 0, last) + 1:block.find('\n', last)]
+        for index in range(len(PHASES) - 1, phase_index, -1):
+            if PHASES[index][1].search(block):
+                phase_index = index
+                break
+    return chosen, marker, error, PHASES[phase_index][0]
+
+
+def fingerprint(stream: TextIO, timeout_reason: str = "", exit_code: Optional[int] = None) -> Fingerprint:
+    """失败作业的指纹（stream 为日志文本流，日志缺失时传空的 io.StringIO）"""
+    trace, marker, error, phase = scan_log(stream)
+    reason = classify_failure(exit_code, timeout_reason or "")
+    if trace is not None and trace.uncaught:
+        return _exception(trace, phase)
+    if marker:
+        return Fingerprint("marker", marker, phase=phase)
+    if reason.startswith(EXTERNAL_REASONS):
+        return Fingerprint("signal", reason, phase=phase)
+    if trace is not None:
+        return _exception(trace, phase)
+    if error:
+        return Fingerprint("error", message=normalize_message(error), phase=phase)
+    return Fingerprint("signal", reason, phase=phase)
+
+
+def _exception(trace: _Trace, phase: str) -> Fingerprint:
+    exc, message, frames = trace.causes[-1]
+    if exc in FRAMELESS:
+        top: Tuple[str, ...] = ()
+    else:
+        own = [f for f in frames if not f.startswith(JDK_PREFIXES)] or frames
+        top = tuple(normalize_frame(f) for f in own[:FRAME_DEPTH])
+    return Fingerprint("exception", exc, top, normalize_message(message), phase)
+
+
+def fingerprint_log(log_file: Path, timeout_reason: str = "", exit_code: Optional[int] = None) -> Fingerprint:
+    """日志文件（逻辑路径，可压缩或在对象库中）的指纹；日志缺失时只按终止原因"""
+    try:
+        with compressed_io.open_text(log_file) as f:
+            return fingerprint(f, timeout_reason, exit_code)
+    except (OSError, EOFError):
+        return fingerprint(io.StringIO(), timeout_reason, exit_code)
+
+
+def triage(store: ResultsStore, output_base: Path = OUTPUT_BASE) -> List[Dict]:
+    """
+    对结果库中所有失败作业（所有运行，不只代表结果）计算指纹并聚类
+
+    状态取结果库规范化后的值（旧版 "FAILED (exit: N)" 为 FAILED，没有结果的"成功"为 FAILED / NO_RESULT）；
+    作为"修复"的成功还须结果文件可读（success_pairs），文件缺失或损坏的成功不算
+
+    Returns:
+        按次数降序的聚类 [{'id', 'kind', 'label', 'exception', 'frames', 'message', 'count',
+                         'apks', 'configs', 'exit_classes', 'phases', 'fixed', 'example'}]；
+        fixed 为 {'cheaper_mode': 在更便宜的模式（标志严格更多）下成功过的 APK 数, 'longer_timeout': ...,
+                  'same_config': 原配置重跑成功过的, 'never': 其他配置都没有成功过的}，前三项可以重叠；
+        fix_modes 为 {更便宜的模式: APK 数}
+    """
+    # 每个 APK 成功过的配置（所有运行，只计结果可读的）
+    successes: Dict[str, List] = {}
+    for row in store.query("SELECT j.apk, j.leaks, r.path, r.mode, r.timeout_multiplier, r.callgraph, "
+                           "r.source_sink, r.jar FROM jobs j JOIN runs r ON r.id = j.run_id "
+                           "WHERE j.status = 'SUCCESS' AND r.mode IS NOT NULL"):
+        if success_pairs(output_base / row['path'] / f"{row['apk']}_results.xml", row['leaks']) is None:
+            continue
+        successes.setdefault(row['apk'], []).append(row)
+
+    clusters: Dict[str, Dict] = {}
+    failures = store.query(
+        "SELECT j.apk, j.exit_code, j.timeout_reason, j.exit_class, r.path, r.mode, r.timeout_multiplier, "
+        "r.callgraph, r.source_sink, r.jar FROM jobs j JOIN runs r ON r.id = j.run_id "
+        "WHERE j.status = 'FAILED' ORDER BY r.started, r.path, j.apk")
+    for row in failures:
+        log_file = output_base / row['path'] / f"{row['apk']}.log"
+        fp = fingerprint_log(log_file, row['timeout_reason'], row['exit_code'])
+        cluster = clusters.get(fp.id)
+        if cluster is None:
+            cluster = clusters[fp.id] = {
+                'id': fp.id, 'kind': fp.kind, 'label': fp.label, 'exception': fp.exception,
+                'frames': list(fp.frames), 'message': fp.message, 'count': 0,
+                'apks': Counter(), 'configs': Counter(), 'exit_classes': Counter(), 'phases': Counter(),
+                'fixed': {}, 'example': str(compressed_io.resolve(log_file) or log_file),
+            }
+        cluster['count'] += 1
+        cluster['apks'][row['apk']] += 1
+        label = config_label(row['mode'], row['timeout_multiplier'], row['callgraph'], row['source_sink'],
+                             row['jar']) if row['mode'] else row['path']
+        cluster['configs'][label] += 1
+        cluster['exit_classes'][row['exit_class']] += 1
+        cluster['phases'][fp.phase] += 1
+
+        # 同一 APK 在其他配置下是否成功（调用图 / 列表 / jar 相同；按 APK 汇总，几种修复可以同时成立）
+        fixes = cluster['fixed'].setdefault(row['apk'], set())
+        flags = MODE_FLAGS.get(row['mode'], set())
+        for s in successes.get(row['apk'], []):
+            if any(s[k] != row[k] for k in ('callgraph', 'source_sink', 'jar')):
+                continue
+            if s['mode'] == row['mode']:
+                if s['timeout_multiplier'] == row['timeout_multiplier']:
+                    fixes.add('same_config')
+                elif s['timeout_multiplier'] > row['timeout_multiplier']:
+                    fixes.add('longer_timeout')
+            elif flags < MODE_FLAGS.get(s['mode'], set()):
+                fixes.add(f"cheaper_mode:{s['mode']}")
+
+    result = []
+    for cluster in sorted(clusters.values(), key=lambda c: (-c['count'], c['label'])):
+        per_apk = cluster['fixed'].values()
+        cluster['fix_modes'] = dict(Counter(f.split(':')[1] for fixes in per_apk for f in fixes if ':' in f))
+        cluster['fixed'] = {
+            'cheaper_mode': sum(1 for fixes in per_apk if any(f.startswith('cheaper_mode') for f in fixes)),
+            'longer_timeout': sum(1 for fixes in per_apk if 'longer_timeout' in fixes),
+            'same_config': sum(1 for fixes in per_apk if 'same_config' in fixes),
+            'never': sum(1 for fixes in per_apk if not fixes),
+        }
+        for key in ('apks', 'configs', 'exit_classes', 'phases'):
+            cluster[key] = dict(cluster[key].most_common())
+        result.append(cluster)
+    return result
+
+
+def format_report(clusters: List[Dict], top_apks: int = 8) -> List[str]:
+    """Markdown 报告"""
+    total = sum(c['count'] for c in clusters)
+    lines = ["# FlowDroid 失败聚类\n",
+             f"- 失败作业: {total} 个（所有运行），{len(clusters)} 类",
+             f"- 指纹: 异常类型 + 前 {FRAME_DEPTH} 个非 JDK 栈帧 / FlowDroid 超时标志 / 最后一条 ERROR 日志 / "
+             "终止原因 + 最后到达的阶段",
+             "- 修复: 同一 APK 在更便宜的模式、更长超时或原配置重跑中成功过（按 APK 计，可以重叠）\n",
+             "| # | 指纹 | 类型 | 次数 | APK 数 | 配置 | 退出分类 | 更便宜模式修复 | 更长超时修复 | 重跑成功 | 从未成功 |",
+             "|---|------|------|------|--------|------|----------|----------------|--------------|----------|----------|"]
+    for i, c in enumerate(clusters, 1):
+        configs = ', '.join(f"{k} ×{v}" for k, v in c['configs'].items())
+        classes = ', '.join(c['exit_classes'])
+        cheaper = str(c['fixed']['cheaper_mode'])
+        if c['fix_modes']:
+            cheaper += f" ({', '.join(f'{m} {n}' for m, n in c['fix_modes'].items())})"
+        label = c['label'].replace('|', '\\|')
+        lines.append(f"| {i} | `{c['id']}` {label} | {c['kind']} | {c['count']} | {len(c['apks'])} | {configs} | "
+                     f"{classes} | {cheaper} | {c['fixed']['longer_timeout']} | {c['fixed']['same_config']} | "
+                     f"{c['fixed']['never']} |")
+    lines.append("\n## 详情\n")
+    for i, c in enumerate(clusters, 1):
+        lines.append(f"### {i}. {c['label']}\n")
+        lines.append(f"- 指纹 `{c['id']}`（{c['kind']}），{c['count']} 次")
+        if c['exception']:
+            lines.append(f"- 异常 / 原因: `{c['exception']}`" + (f"，消息: `{c['message']}`" if c['message'] else ""))
+        elif c['message']:
+            lines.append(f"- 日志: `{c['message']}`")
+        for frame in c['frames']:
+            lines.append(f"  - at `{frame}`")
+        lines.append(f"- 阶段: {', '.join(f'{k} ×{v}' for k, v in c['phases'].items())}")
+        apks = list(c['apks'].items())
+        lines.append(f"- APK: {', '.join(f'{k} ×{v}' for k, v in apks[:top_apks])}"
+                     + (f" 等 {len(apks)} 个" if len(apks) > top_apks else ""))
+        lines.append(f"- 示例日志: `{c['example']}`\n")
+    return lines
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='FlowDroid 失败归因与聚类（所有运行）')
+    parser.add_argument('--output', type=Path, default=OUTPUT_BASE / "FAILURE_CLUSTERS.md", help='报告文件')
+    parser.add_argument('--json', type=Path, default=None, metavar='CLUSTERS.json', help='同时保存聚类结果')
+    parser.add_argument('--top', type=int, default=10, help='控制台列出的聚类数（默认 10）')
+    args = parser.parse_args()
+
+    start = time.time()
+    store = ResultsStore()
+    store.ingest()
+    clusters = triage(store)
+    output = format_report(clusters)
+    with open(args.output, 'w') as f:
+        f.write('\n'.join(output) + '\n')
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(clusters, f, ensure_ascii=False, indent=2)
+
+    print(f"失败作业 {sum(c['count'] for c in clusters)} 个, {len(clusters)} 类")
+    for c in clusters[:args.top]:
+        fixed = c['fixed']
+        print(f"  {c['count']:4d}  {c['label']}  ({len(c['apks'])} 个 APK; 更便宜模式修复 {fixed['cheaper_mode']}, "
+              f"更长超时 {fixed['longer_timeout']}, 重跑 {fixed['same_config']}, 从未成功 {fixed['never']})")
+    print(f"\n失败聚类报告已生成: {args.output} ({time.time() - start:.2f}s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+运行之间的数据流差异
+analyze_results.py 只比较各模式的成功 / 失败，看不出用 -ne / -ns 换速度时丢掉了哪些泄露。
+这里把两个或更多运行（运行目录或配置）中每个 APK 的结果读成规范化的流键集合，
+以第一个为基准，逐个用集合运算得到新增、消失和共同的流，并把流对应到 TaintBench finding：
+基准检出而对比方未检出的真实泄露即为该模式丢掉的泄露。
+
+流键 = (source 语句, source 所在方法, sink 语句, sink 所在方法)，语句经 jimple_ir 规范化（局部变量重命名），
+不同 Soot 版本的运行之间也可比较。finding 的对应方式与 ground_truth_eval.py --match statement 相同。
+
+每个 APK 一个进程池任务，依次流式读取各方的结果 XML，只保留该 APK 的流键集合；同一文件只读一次。
+"""
+
+import csv
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+import compressed_io
+from callgraph_report import FINDINGS_DIR
+from flowdroid_engine import OUTPUT_BASE
+from jimple_ir import Statement, StatementKey, jimple_method_keys, parse_statement, taintbench_keys
+from results_reader import READ_ERRORS, read_results
+from results_store import ResultsStore, config_label
+
+FlowKey = Tuple[Statement, str, Statement, str]  # (source 语句, source 所在方法, sink 语句, sink 所在方法)
+# 一个 APK 的标注：[(finding ID, 是否 isNegative, [(source 语句键, sink 语句键)])]
+Annotations = List[Tuple[int, bool, List[Tuple[StatementKey, StatementKey]]]]
+
+COLUMNS = ['apk', 'baseline', 'other', 'baseline_status', 'other_status', 'baseline_flows', 'other_flows',
+           'common', 'added', 'removed', 'lost_findings', 'gained_findings', 'lost_negatives']
+FLOW_COLUMNS = ['apk', 'baseline', 'other', 'change', 'source_method', 'source', 'sink_method', 'sink',
+                'findings']
+
+
+def flow_keys(xml_file: Path) -> Set[FlowKey]:
+    """结果 XML 中的规范化流键（流式读取，不构造访问路径和重建路径）"""
+    flows = set()
+    for result in read_results(xml_file, access_paths=False, taint_paths=False):
+        sink = result.sink
+        if sink is None or not sink.statement:
+            continue
+        sink_statement = parse_statement(sink.statement)
+        for source in result.sources:
+            if source.statement:
+                flows.add((parse_statement(source.statement), source.method or "",
+                           sink_statement, sink.method or ""))
+    return flows
+
+
+def load_annotations(findings_dir: Path = FINDINGS_DIR) -> Dict[str, Annotations]:
+    """{APK: [(finding ID, isNegative, 候选语句键对)]}"""
+    annotations = {}
+    for path in sorted(findings_dir.glob("*_findings.json")):
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        entries = []
+        for finding in data['findings']:
+            sinks = taintbench_keys(finding['sink'])
+            keys = [(source, sink) for source in taintbench_keys(finding['source']) for sink in sinks]
+            if keys:
+                entries.append((finding['ID'], bool(finding.get('isNegative')), keys))
+        annotations[path.name[:-len("_findings.json")]] = entries
+    return annotations
+
+
+def _flow_findings(flow: FlowKey, index: Dict[Tuple[StatementKey, StatementKey], Set[int]]) -> Set[int]:
+    """一个流对应的 finding ID"""
+    source, source_method, sink, sink_method = flow
+    found: Set[int] = set()
+    for source_key in jimple_method_keys(source_method):
+        for sink_key in jimple_method_keys(sink_method):
+            found |= index.get(((source, source_key), (sink, sink_key)), set())
+    return found
+
+
+# (方名, 状态, 结果 XML 实际路径)；没有泄露时 FlowDroid 不写结果文件，这样的成功路径为 None（空流集合）
+Side = Tuple[str, str, Optional[str]]
+
+
+def _diff_apk(task: Tuple[str, List[Side], Annotations, bool]) -> Tuple[List[Dict], List[Dict]]:
+    """
+    进程池任务：一个 APK 在各方之间的差异
+
+    Args:
+        task: (APK, 各方（第一个为基准）, 该 APK 的标注, 是否列出每个差异流)
+    Returns:
+        (汇总行, 差异流行)
+    """
+    apk, sides, annotations, list_flows = task
+    index: Dict[Tuple[StatementKey, StatementKey], Set[int]] = {}
+    for fid, _, keys in annotations:
+        for key in keys:
+            index.setdefault(key, set()).add(fid)
+    negative = {fid for fid, is_negative, _ in annotations if is_negative}
+
+    def hit(flow_set: Set[FlowKey]) -> Set[int]:
+        return set().union(*(_flow_findings(flow, index) for flow in flow_set)) if index else set()
+
+    # 同一文件（共享、缓存命中）只读取一次
+    cache: Dict[str, Optional[Tuple[Set[FlowKey], Set[int]]]] = {}
+    flows: List[Optional[Set[FlowKey]]] = []
+    hits: List[Set[int]] = []
+    for _, status, xml_file in sides:
+        if status == 'SUCCESS' and xml_file is None:
+            flows.append(set())
+            hits.append(set())
+            continue
+        if status == 'SUCCESS' and xml_file not in cache:
+            try:
+                flow_set = flow_keys(Path(xml_file))
+                cache[xml_file] = (flow_set, hit(flow_set))
+            except READ_ERRORS:
+                cache[xml_file] = None
+        entry = cache.get(xml_file) if status == 'SUCCESS' else None
+        flows.append(entry[0] if entry else None)
+        hits.append(entry[1] if entry else set())
+
+    def status_of(i: int) -> str:
+        status = sides[i][1]
+        return 'UNREADABLE' if status == 'SUCCESS' and flows[i] is None else status
+
+    base, base_hit = flows[0], hits[0]
+    rows, flow_rows = [], []
+    for i in range(1, len(sides)):
+        row = {'apk': apk, 'baseline': sides[0][0], 'other': sides[i][0],
+               'baseline_status': status_of(0), 'other_status': status_of(i),
+               'baseline_flows': len(base) if base is not None else None,
+               'other_flows': len(flows[i]) if flows[i] is not None else None}
+        if base is None or flows[i] is None:
+            rows.append(row)
+            continue
+        other = flows[i]
+        added, removed = other - base, base - other
+        other_hit = hits[i]
+        lost = base_hit - other_hit
+        row.update({
+            'common': len(base & other),
+            'added': len(added),
+            'removed': len(removed),
+            'lost_findings': ' '.join(str(fid) for fid in sorted(lost - negative)),
+            'gained_findings': ' '.join(str(fid) for fid in sorted(other_hit - base_hit - negative)),
+            'lost_negatives': ' '.join(str(fid) for fid in sorted(lost & negative)),
+        })
+        rows.append(row)
+        if list_flows:
+            for change, changed in (('removed', removed), ('added', added)):
+                for source, source_method, sink, sink_method in sorted(
+                        changed, key=lambda f: (f[1], f[0].text, f[3], f[2].text)):
+                    flow_rows.append({
+                        'apk': apk, 'baseline': sides[0][0], 'other': sides[i][0], 'change': change,
+                        'source_method': source_method, 'source': source.text,
+                        'sink_method': sink_method, 'sink': sink.text,
+                        'findings': ' '.join(str(fid) for fid in sorted(
+                            _flow_findings((source, source_method, sink, sink_method), index))),
+                    })
+    return rows, flow_rows
+
+
+def resolve_side(store: ResultsStore, spec: str) -> Tuple[str, Dict[str, Tuple[str, str, Optional[int]]]]:
+    """
+    把一方（运行目录或配置）解析为 {APK: (状态, 相对 OUTPUT_BASE 的运行目录, 泄露数)}
+
+    spec 依次尝试：运行目录（相对 OUTPUT_BASE 或绝对路径）、配置列名（如 "ne (1x)"）、
+    模式名（如 ne，有多个配置时取默认超时倍数的）；配置取各 APK 的代表结果（重试 / 阶梯成功的也算）。
+    """
+    path = Path(spec)
+    run = (str(path.resolve().relative_to(OUTPUT_BASE.resolve())) if path.is_absolute()
+           else str(path).rstrip('/'))
+    rows = store.query("SELECT j.apk, j.status, j.leaks, r.path FROM jobs j JOIN runs r ON r.id = j.run_id "
+                       "WHERE r.path = ?", (run,))
+    if rows:
+        return run, {row['apk']: (row['status'], row['path'], row['leaks']) for row in rows}
+
+    configs = {config_label(c['mode'], c['timeout_multiplier'], c['callgraph'], c['source_sink'], c['jar']): c['mode']
+               for c in store.configs()}
+    label = spec if spec in configs else None
+    if label is None:
+        candidates = [l for l, mode in configs.items() if mode == spec]
+        label = config_label(spec, 1) if config_label(spec, 1) in candidates else (
+            candidates[0] if len(candidates) == 1 else None)
+        if label is None:
+            raise ValueError(f"未知的运行目录或配置: {spec}" + (f"（可选: {', '.join(candidates)}）"
+                                                              if candidates else ""))
+    return label, {apk: (row['status'], row['path'], row['leaks']) for apk, results in store.effective().items()
+                   for l, row in results.items() if l == label}
+
+
+def diff(sides: List[Tuple[str, Dict[str, Tuple[str, str, Optional[int]]]]], annotations: Dict[str, Annotations],
+         output_base: Path = OUTPUT_BASE, workers: int = os.cpu_count() or 1,
+         list_flows: bool = False) -> Tuple[List[Dict], List[Dict]]:
+    """
+    所有 APK 的差异（只比较基准中出现的 APK）
+
+    Returns:
+        (汇总行（每个 APK × 对比方一行，COLUMNS）, 差异流行（list_flows 时，FLOW_COLUMNS）)
+    """
+    tasks = []
+    for apk in sorted(sides[0][1]):
+        side_files = []
+        for name, jobs in sides:
+            status, run, leaks = jobs.get(apk, ('MISSING', None, None))
+            xml_file = None
+            if status == 'SUCCESS':
+                path = output_base / run / f"{apk}_results.xml"
+                real = compressed_io.resolve(path)
+                # 与 results_reader.success_pairs 相同：0 泄露且没有结果文件是空集，其余缺失的文件读取时记为 UNREADABLE
+                if real or leaks != 0:
+                    xml_file = os.path.realpath(real) if real else str(path)
+            side_files.append((name, status, xml_file))
+        tasks.append((apk, side_files, annotations.get(apk, []), list_flows))
+
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+            results = list(pool.map(_diff_apk, tasks, chunksize=max(1, len(tasks) // (workers * 4))))
+    else:
+        results = list(map(_diff_apk, tasks))
+    return [row for rows, _ in results for row in rows], [row for _, rows in results for row in rows]
+
+
+def _write_csv(path: Path, columns: List[str], rows: List[Dict]) -> None:
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=columns)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow({k: '' if row.get(k) is None else row[k] for k in columns})
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='运行之间的数据流差异（第一个为基准）')
+    parser.add_argument('sides', nargs='+',
+                        help=f'运行目录（相对 {OUTPUT_BASE} 或绝对路径）、配置列名（如 "ne (1x)"）或模式名（如 ne）')
+    parser.add_argument('--findings', type=Path, default=FINDINGS_DIR,
+                        help=f'TaintBench findings 目录（默认 {FINDINGS_DIR}）')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='进程数（默认 CPU 核数）')
+    parser.add_argument('--output', type=Path, default=OUTPUT_BASE / "FLOW_DIFF.csv",
+                        help='汇总表（每个 APK × 对比方一行）')
+    parser.add_argument('--flows', type=Path, help='同时写出每个新增 / 消失的流及其对应的 finding')
+    args = parser.parse_args()
+    if len(args.sides) < 2:
+        parser.error("至少需要两个运行目录或配置")
+
+    start = time.time()
+    store = ResultsStore()
+    store.ingest()
+    try:
+        sides = [resolve_side(store, spec) for spec in args.sides]
+    except ValueError as e:
+        parser.error(str(e))
+    rows, flow_rows = diff(sides, load_annotations(args.findings), workers=args.workers,
+                           list_flows=args.flows is not None)
+
+    _write_csv(args.output, COLUMNS, rows)
+    if args.flows:
+        _write_csv(args.flows, FLOW_COLUMNS, flow_rows)
+
+    print(f"基准: {sides[0][0]} ({len(sides[0][1])} 个 APK)")
+    print("| 对比 | 双方成功 | 共同流 | 新增 | 消失 | 丢失的真实泄露 | 新检出的真实泄露 |")
+    print("|------|----------|--------|------|------|----------------|------------------|")
+    for name, _ in sides[1:]:
+        compared = [r for r in rows if r['other'] == name and r.get('common') is not None]
+        lost = sum(len(r['lost_findings'].split()) for r in compared)
+        gained = sum(len(r['gained_findings'].split()) for r in compared)
+        print(f"| {name} | {len(compared)} | {sum(r['common'] for r in compared)} | "
+              f"{sum(r['added'] for r in compared)} | {sum(r['removed'] for r in compared)} | {lost} | {gained} |")
+    for row in rows:
+        if row.get('lost_findings'):
+            print(f"  {row['other']} 丢失 {row['apk']}: finding {row['lost_findings']}")
+    print(f"\n分析结果: {len(rows)} 行 -> {args.output}"
+          + (f", {len(flow_rows)} 个差异流 -> {args.flows}" if args.flows else "")
+          + f" ({time.time() - start:.2f}s)")
+
+
+if __name__ == '__main__':
+    main()
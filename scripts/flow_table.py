@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+跨运行的列式数据流表
+各分析脚本每次都把结果 XML 重新解析成字符串字典的列表，"哪些 APK 在任一模式下有 getDeviceId -> sendTextMessage"
+这类跨运行的问题每问一次就要读一遍 OUTPUT_BASE。这里把所有成功作业的每个 (source, sink) 流读一次，存成列式表：
+
+  列（每行一个流，均为 int32）：run、config、apk、source、sink、source_method、sink_method、
+                                source_statement、sink_statement
+  字典：所有列共用一个字符串表（字符串 -> 下标），重复的签名、方法、运行目录只存一次
+
+缓存文件 OUTPUT_BASE/flow_table.bin 的结构：
+  MAGIC | 头部长度 (uint32 小端) | 头部 JSON（行数、列名、字节序、字典、结果库指纹）| 补齐到 4 字节 |
+  各列依次排列的 int32 数组
+载入时只解析头部，各列通过 mmap 直接映射为 memoryview（不复制；NumPy 可用 np.frombuffer 零拷贝查看）。
+结果库中的成功作业有变化（指纹不同）时重新构建。
+
+查询先在字典上把条件（子串）解析为 ID 集合，再对整数列做一次扫描，分组计数同样只比较整数；
+字符串只在输出时查字典。语句列为 jimple_ir 规范化后的语句。
+NumPy / Arrow 不是本仓库的依赖，这里只用标准库的 array 和 mmap。
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import compressed_io
+from flowdroid_engine import OUTPUT_BASE
+from jimple_ir import parse_statement
+from results_reader import READ_ERRORS, read_results
+from results_store import ResultsStore, config_label
+
+TABLE_FILE = OUTPUT_BASE / "flow_table.bin"
+MAGIC = b"FLOWTBL1"
+COLUMNS = ('run', 'config', 'apk', 'source', 'sink', 'source_method', 'sink_method',
+           'source_statement', 'sink_statement')
+assert array('i').itemsize == 4
+
+
+def fingerprint(store: ResultsStore) -> str:
+    """结果库中成功作业的指纹（运行目录、APK，以及运行目录 CSV 的修改时间和大小）"""
+    digest = hashlib.sha256()
+    for row in store.query("SELECT r.path, r.csv_mtime_ns, r.csv_size, j.apk FROM jobs j "
+                           "JOIN runs r ON r.id = j.run_id WHERE j.status = 'SUCCESS' ORDER BY r.path, j.apk"):
+        digest.update(f"{row['path']}\t{row['csv_mtime_ns']}\t{row['csv_size']}\t{row['apk']}\n".encode())
+    return digest.hexdigest()
+
+
+class _Builder:
+    """构建时的字符串字典和列"""
+
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+        self.strings: List[str] = []
+        self.columns = {name: array('i') for name in COLUMNS}
+
+    def intern(self, value: Optional[str]) -> int:
+        value = value or ""
+        index = self.ids.get(value)
+        if index is None:
+            index = self.ids[value] = len(self.strings)
+            self.strings.append(value)
+        return index
+
+    def flows(self, xml_file: Path) -> List[Tuple[int, ...]]:
+        """一个结果 XML 中的流：[(source, sink, source_method, sink_method, source_statement, sink_statement)]"""
+        rows = []
+        for result in read_results(xml_file, access_paths=False, taint_paths=False):
+            sink = result.sink
+            if sink is None:
+                continue
+            sink_ids = (self.intern(sink.definition), self.intern(sink.method),
+                        self.intern(parse_statement(sink.statement).text if sink.statement else ""))
+            for source in result.sources:
+                statement = parse_statement(source.statement).text if source.statement else ""
+                rows.append((self.intern(source.definition), sink_ids[0], self.intern(source.method), sink_ids[1],
+                             self.intern(statement), sink_ids[2]))
+        return rows
+
+
+def build(store: ResultsStore, output_base: Path = OUTPUT_BASE, table_file: Path = TABLE_FILE) -> Dict[str, int]:
+    """
+    读取所有成功作业的结果并写出缓存文件（同一实际文件只读一次）
+
+    Returns:
+        {'rows', 'strings', 'files', 'unreadable'}
+    """
+    builder = _Builder()
+    cache: Dict[str, List[Tuple[int, ...]]] = {}
+    unreadable = 0
+    columns = builder.columns
+    for row in store.query(
+            "SELECT j.apk, j.leaks, r.path, r.mode, r.timeout_multiplier, r.callgraph, r.source_sink, r.jar "
+            "FROM jobs j JOIN runs r ON r.id = j.run_id WHERE j.status = 'SUCCESS' ORDER BY r.path, j.apk"):
+        path = output_base / row['path'] / f"{row['apk']}_results.xml"
+        real = compressed_io.resolve(path)
+        # 与 results_reader.success_pairs 相同：没有泄露时 FlowDroid 不写结果文件，这样的成功没有流
+        if real is None and row['leaks'] == 0:
+            continue
+        key = os.path.realpath(real) if real else str(path)
+        if key not in cache:
+            try:
+                cache[key] = builder.flows(Path(key))
+            except READ_ERRORS:
+                cache[key] = []
+                unreadable += 1
+        flows = cache[key]
+        label = (config_label(row['mode'], row['timeout_multiplier'], row['callgraph'], row['source_sink'],
+                              row['jar']) if row['mode'] else "")
+        run, config, apk = builder.intern(row['path']), builder.intern(label), builder.intern(row['apk'])
+        n = len(flows)
+        columns['run'].extend([run] * n)
+        columns['config'].extend([config] * n)
+        columns['apk'].extend([apk] * n)
+        for i, name in enumerate(COLUMNS[3:]):
+            columns[name].extend(flow[i] for flow in flows)
+
+    rows = len(columns['run'])
+    header = json.dumps({'rows': rows, 'columns': list(COLUMNS), 'byteorder': sys.byteorder,
+                         'fingerprint': fingerprint(store), 'strings': builder.strings},
+                        ensure_ascii=False).encode('utf-8')
+    prefix = MAGIC + struct.pack('<I', len(header)) + header
+    tmp = table_file.with_name(table_file.name + ".tmp")
+    with open(tmp, 'wb') as f:
+        f.write(prefix + b"\0" * (-len(prefix) % 4))
+        for name in COLUMNS:
+            columns[name].tofile(f)
+    os.replace(tmp, table_file)
+    return {'rows': rows, 'strings': len(builder.strings), 'files': len(cache), 'unreadable': unreadable}
+
+
+class FlowTable:
+    """
+    载入的列式表：strings 为字典，columns[列名] 为 int32 的 memoryview（mmap 映射，只读）
+
+    查询条件为 {列名: 子串或子串列表}（同一列的多个子串为"或"，不同列为"且"），
+    值为空字符串匹配空值（如没有 Method 属性）。
+    """
+
+    def __init__(self, table_file: Path = TABLE_FILE):
+        self.table_file = table_file
+        with open(table_file, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"不是数据流表文件: {table_file}")
+            (length,) = struct.unpack('<I', f.read(4))
+            header = json.loads(f.read(length).decode('utf-8'))
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.rows: int = header['rows']
+        self.fingerprint: str = header['fingerprint']
+        self.strings: List[str] = header['strings']
+        offset = len(MAGIC) + 4 + length
+        offset += -offset % 4
+        self._view = memoryview(self._mmap)
+        self.columns: Dict[str, Sequence[int]] = {}
+        for name in header['columns']:
+            column = self._view[offset:offset + 4 * self.rows].cast('i')
+            if header['byteorder'] != sys.byteorder:
+                swapped = array('i', column)
+                swapped.byteswap()
+                column = swapped
+            self.columns[name] = column
+            offset += 4 * self.rows
+
+    def close(self) -> None:
+        # 先释放映射上的 memoryview，mmap 才能关闭
+        for column in self.columns.values():
+            if isinstance(column, memoryview):
+                column.release()
+        self.columns = {}
+        self._view.release()
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def ids(self, patterns) -> Set[int]:
+        """字典中包含任一子串的字符串 ID"""
+        if isinstance(patterns, str):
+            patterns = [patterns]
+        return {i for i, value in enumerate(self.strings)
+                if any(p in value if p else not value for p in patterns)}
+
+    def select(self, **filters) -> List[int]:
+        """满足所有条件的行号"""
+        rows: Iterable[int] = range(self.rows)
+        # 匹配 ID 少的列先过滤
+        for ids, column in sorted(((self.ids(p), self.columns[c]) for c, p in filters.items()),
+                                  key=lambda f: len(f[0])):
+            if not ids:
+                return []
+            rows = [i for i in rows if column[i] in ids]
+        return list(rows)
+
+    def group_count(self, by: Sequence[str], rows: Optional[Iterable[int]] = None) -> Counter:
+        """按列分组计数：{(字符串, ...): 行数}"""
+        columns = [self.columns[c] for c in by]
+        rows = range(self.rows) if rows is None else rows
+        counts = Counter(tuple(column[i] for column in columns) for i in rows)
+        return Counter({tuple(self.strings[v] for v in key): n for key, n in counts.items()})
+
+
+def load(store: Optional[ResultsStore] = None, table_file: Path = TABLE_FILE,
+         output_base: Path = OUTPUT_BASE) -> FlowTable:
+    """载入缓存文件；不存在、损坏或结果库有新的成功作业时先重新构建"""
+    if store is None:
+        store = ResultsStore()
+        store.ingest(output_base)
+    try:
+        table = FlowTable(table_file)
+        if table.fingerprint == fingerprint(store):
+            return table
+        table.close()
+    except (OSError, ValueError, KeyError, struct.error):
+        pass
+    build(store, output_base, table_file)
+    return FlowTable(table_file)
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='跨运行的列式数据流表（构建缓存 / 查询）')
+    parser.add_argument('--table', type=Path, default=TABLE_FILE, help=f'缓存文件（默认 {TABLE_FILE}）')
+    parser.add_argument('--rebuild', action='store_true', help='强制重新构建缓存文件')
+    for column in COLUMNS:
+        parser.add_argument(f"--{column.replace('_', '-')}", action='append', metavar='SUBSTR',
+                            help=f'{column} 包含该子串（可重复，任一即可）')
+    parser.add_argument('--group-by', nargs='+', choices=COLUMNS, default=['apk'],
+                        help='分组计数的列（默认 apk）')
+    parser.add_argument('--limit', type=int, default=50, help='最多输出的分组数（默认 50，0 为不限）')
+    args = parser.parse_args()
+
+    start = time.time()
+    store = ResultsStore()
+    store.ingest()
+    if args.rebuild:
+        stats = build(store, table_file=args.table)
+        print(f"构建: {stats['files']} 个结果文件（{stats['unreadable']} 个无法读取）, {stats['rows']} 行, "
+              f"字典 {stats['strings']} 项 -> {args.table} ({args.table.stat().st_size / 1e6:.2f} MB, "
+              f"{time.time() - start:.2f}s)")
+    loaded = time.time()
+    with load(store, args.table) as table:
+        opened = time.time()
+        filters = {c: getattr(args, c) for c in COLUMNS if getattr(args, c)}
+        rows = table.select(**filters) if filters else None
+        groups = table.group_count(args.group_by, rows)
+        queried = time.time()
+
+        print(f"| {' | '.join(args.group_by)} | 流数 |")
+        print(f"|{'|'.join('---' for _ in args.group_by)}|------|")
+        for key, n in groups.most_common(args.limit or None):
+            print(f"| {' | '.join(key)} | {n} |")
+        matched = table.rows if rows is None else len(rows)
+        print(f"\n分析结果: {matched}/{table.rows} 行, {len(groups)} 组 "
+              f"(载入 {(opened - loaded) * 1000:.1f}ms, 查询 {(queried - opened) * 1000:.1f}ms)")
+
+
+if __name__ == '__main__':
+    main()
@@ -3,10 +3,14 @@
 对比 FlowDroid 分析结果与 TaintBench 预期结果
 """
 import json
-import xml.etree.ElementTree as ET
+import sys
 from pathlib import Path
 from collections import defaultdict
 
+# 结果文件可能已压缩（.gz / .zst），通过上级目录的 results_reader 流式读取
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from results_reader import read_results  # noqa: E402
+
 
 def parse_taintbench_findings(json_file):
     """解析 TaintBench 预期结果"""
@@ -39,34 +43,8 @@ def parse_taintbench_findings(json_file):
 
 
 def parse_flowdroid_results(xml_file):
-    """解析 FlowDroid 结果"""
-    tree = ET.parse(xml_file)
-    root = tree.getroot()
-
-    results = []
-    for result in root.findall('.//Result'):
-        sink_elem = result.find('Sink')
-        sources_elem = result.find('Sources')
-
-        sink_info = {
-            'statement': sink_elem.get('Statement'),
-            'method': sink_elem.get('Method'),
-            'definition': sink_elem.get('MethodSourceSinkDefinition')
-        }
-
-        sources = []
-        for source in sources_elem.findall('Source'):
-            sources.append({
-                'statement': source.get('Statement'),
-                'method': source.get('Method'),
-                'definition': source.get('MethodSourceSinkDefinition')
-            })
-
-        results.append({
-            'sink': sink_info,
-            'sources': sources
-        })
-    return results
+    """解析 FlowDroid 结果（Result 记录：result.sink / result.sources，各有 statement / method / definition）"""
+    return list(read_results(Path(xml_file), access_paths=False, taint_paths=False))
 
 
 def extract_signature(ir_statement):
@@ -94,9 +72,9 @@ def compare_results(taintbench_findings, flowdroid_results):
 
     # 构建 FlowDroid 的 source-sink 对
     for result in flowdroid_results:
-        sink_sig = result['sink']['definition']
-        for source in result['sources']:
-            source_sig = source['definition']
+        sink_sig = result.sink.definition
+        for source in result.sources:
+            source_sig = source.definition
             fd_signatures.add((source_sig, sink_sig))
 
     return tb_signatures, fd_signatures
@@ -125,7 +103,7 @@ def main():
 
     print(f"\n【FlowDroid 检测结果】")
     print(f"  检测到的泄露: {len(fd_results)}")
-    print(f"  涉及的源点总数: {sum(len(r['sources']) for r in fd_results)}")
+    print(f"  涉及的源点总数: {sum(len(r.sources) for r in fd_results)}")
 
     # 对比
     tb_sigs, fd_sigs = compare_results(tb_findings, fd_results)
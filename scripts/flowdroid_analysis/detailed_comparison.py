@@ -3,9 +3,13 @@
 详细分析 FlowDroid 检测到的 TaintBench 预期泄露
 """
 import json
-import xml.etree.ElementTree as ET
+import sys
 from pathlib import Path
 
+# 结果文件可能已压缩（.gz / .zst），通过上级目录的 results_reader 流式读取
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from results_reader import read_results  # noqa: E402
+
 
 def parse_taintbench_findings(json_file):
     """解析 TaintBench 预期结果"""
@@ -31,34 +35,8 @@ def parse_taintbench_findings(json_file):
 
 
 def parse_flowdroid_results(xml_file):
-    """解析 FlowDroid 结果"""
-    tree = ET.parse(xml_file)
-    root = tree.getroot()
-
-    results = []
-    for result in root.findall('.//Result'):
-        sink_elem = result.find('Sink')
-        sources_elem = result.find('Sources')
-
-        sink_info = {
-            'statement': sink_elem.get('Statement'),
-            'method': sink_elem.get('Method'),
-            'definition': sink_elem.get('MethodSourceSinkDefinition')
-        }
-
-        sources = []
-        for source in sources_elem.findall('Source'):
-            sources.append({
-                'statement': source.get('Statement'),
-                'method': source.get('Method'),
-                'definition': source.get('MethodSourceSinkDefinition')
-            })
-
-        results.append({
-            'sink': sink_info,
-            'sources': sources
-        })
-    return results
+    """解析 FlowDroid 结果（Result 记录：result.sink / result.sources，各有 statement / method / definition）"""
+    return list(read_results(Path(xml_file), access_paths=False, taint_paths=False))
 
 
 def extract_method_name(signature):
@@ -96,11 +74,11 @@ def main():
     # 构建 FlowDroid 的 source-sink 映射
     fd_sink_sources = defaultdict(list)
     for result in fd_results:
-        sink_def = result['sink']['definition']
+        sink_def = result.sink.definition
         sink_method = extract_method_name(sink_def)
         sink_class = extract_class_name(sink_def)
-        for source in result['sources']:
-            source_def = source['definition']
+        for source in result.sources:
+            source_def = source.definition
             fd_sink_sources[(sink_class, sink_method)].append({
                 'source_def': source_def,
                 'source_method': extract_method_name(source_def),
@@ -2,9 +2,119 @@
 """
 精确对比 FlowDroid 和 TaintBench 的检测结果
 通过 IR 语句直接匹配
+
+FlowDroid 结果读取一次并建立索引（sink 定义 -> source 定义集合、语句对、所在方法对），
+每个 finding 的查找为 O(1)，完整 / 部分 / 未检测的分类由集合运算得到。
+"Jimple 语句一致"按 jimple_ir 规范化后的语句键比较（局部变量名不同也能匹配）。
 """
 import json
-import xml.etree.ElementTree as ET
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+# 结果文件可能已压缩（.gz / .zst），通过上级目录的 results_reader 流式读取
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from jimple_ir import FlowStatementIndex, taintbench_keys  # noqa: E402
+from results_reader import read_results  # noqa: E402
+
+
+def extract_signature(ir_statement):
+    """从 IR 语句中提取 <ClassName: ReturnType method(Params)> 部分"""
+    if ir_statement and '<' in ir_statement and '>' in ir_statement:
+        return ir_statement[ir_statement.find('<'):ir_statement.rfind('>') + 1]
+    return ir_statement
+
+
+def flowdroid_method_key(method):
+    """FlowDroid 的 Method 属性 <ClassName: ReturnType name(Params)> -> (类名, 方法名)"""
+    if not method or ': ' not in method:
+        return None
+    class_name, _, rest = method.strip('<>').partition(': ')
+    return class_name, rest.split('(')[0].split()[-1]
+
+
+def taintbench_method_key(location):
+    """TaintBench 的 className + methodName（Java 声明，如 public void onCreate()）-> (类名, 方法名)"""
+    method = location.get('methodName') or ''
+    if '(' not in method:
+        return None
+    return location.get('className'), method.split('(')[0].split()[-1]
+
+
+class FlowIndex:
+    """FlowDroid 结果的索引（读取时一次建立）"""
+
+    def __init__(self, results):
+        self.sink_sources = defaultdict(set)  # sink 定义 -> source 定义
+        self.sources = set()
+        self.sinks = set()
+        self.pairs = set()                    # (source 定义, sink 定义)
+        self.statements = FlowStatementIndex()  # (source 语句键, sink 语句键)
+        self.method_pairs = set()             # (source 定义, source 所在方法, sink 定义, sink 所在方法)
+        for result in results:
+            sink = result.sink
+            if sink is None:
+                continue
+            sink_method = flowdroid_method_key(sink.method)
+            self.statements.add(result)
+            self.sinks.add(sink.definition)
+            for source in result.sources:
+                self.sink_sources[sink.definition].add(source.definition)
+                self.sources.add(source.definition)
+                self.pairs.add((source.definition, sink.definition))
+                self.method_pairs.add((source.definition, flowdroid_method_key(source.method),
+                                       sink.definition, sink_method))
+
+    def sources_of(self, sink_sig):
+        """到达该 sink 定义的所有 source 定义"""
+        return self.sink_sources.get(sink_sig, set())
+
+
+def expected_flow(finding):
+    """finding 的 source / sink IR 语句、签名和所在方法"""
+    source_ir = finding['source']['IRs'][0]['IRstatement'] if finding['source']['IRs'] else None
+    sink_ir = finding['sink']['IRs'][0]['IRstatement'] if finding['sink']['IRs'] else None
+    return {
+        'source_ir': source_ir,
+        'sink_ir': sink_ir,
+        'source_sig': extract_signature(source_ir),
+        'sink_sig': extract_signature(sink_ir),
+        'source_method': taintbench_method_key(finding['source']),
+        'sink_method': taintbench_method_key(finding['sink']),
+        'source_keys': taintbench_keys(finding['source']),
+        'sink_keys': taintbench_keys(finding['sink']),
+    }
+
+
+def classify(flows, index):
+    """
+    按集合运算分类
+
+    Args:
+        flows: {finding ID: expected_flow(...)}
+    Returns:
+        {'complete', 'partial', 'missed', 'same_method', 'same_statement'}，值为 finding ID 集合；
+        complete 为 source、sink 签名出现在同一个 Result 中，partial 为两端都检测到但不在同一个 Result 中，
+        same_method / same_statement 为 complete 中所在方法 / 规范化的 Jimple 语句也一致的
+    """
+    pair = {fid: (f['source_sig'], f['sink_sig']) for fid, f in flows.items()}
+    found = set(pair.values()) & index.pairs
+    sources_found = {s for s, _ in pair.values()} & index.sources
+    sinks_found = {k for _, k in pair.values()} & index.sinks
+    complete = {fid for fid, p in pair.items() if p in found}
+    partial = {fid for fid, (s, k) in pair.items() if s in sources_found and k in sinks_found} - complete
+
+    located = {fid: (f['source_sig'], f['source_method'], f['sink_sig'], f['sink_method'])
+               for fid, f in flows.items()}
+    same_method = set(located.values()) & index.method_pairs
+    return {
+        'complete': complete,
+        'partial': partial,
+        'missed': set(flows) - complete - partial,
+        'same_method': {fid for fid in complete if located[fid] in same_method},
+        'same_statement': {fid for fid in complete
+                           if index.statements.detects(flows[fid]['source_keys'], flows[fid]['sink_keys'])},
+    }
 
 
 def main():
@@ -17,21 +127,10 @@ def main():
 
     tb_positive = [f for f in tb_data['findings'] if not f['isNegative']]
 
-    # 加载 FlowDroid
-    tree = ET.parse(fd_file)
-    root = tree.getroot()
-
-    # 收集 FlowDroid 检测到的所有 source 和 sink
-    fd_sources = set()
-    fd_sinks = set()
-
-    for result in root.findall('.//Result'):
-        sink = result.find('Sink')
-        fd_sinks.add(sink.get('MethodSourceSinkDefinition'))
-
-        sources = result.find('Sources')
-        for source in sources.findall('Source'):
-            fd_sources.add(source.get('MethodSourceSinkDefinition'))
+    # 加载 FlowDroid 并建立索引（只需要定义、语句和所在方法）
+    index = FlowIndex(read_results(Path(fd_file), access_paths=False, taint_paths=False))
+    fd_sources = index.sources
+    fd_sinks = index.sinks
 
     print("=" * 100)
     print("TaintBench vs FlowDroid 精确对比")
@@ -44,61 +143,46 @@ def main():
     # 逐个检查 TaintBench 的 positive findings
     print(f"\n【TaintBench 预期的 {len(tb_positive)} 个真实泄露】\n")
 
-    detected = 0
-    for finding in tb_positive:
-        source_ir = finding['source']['IRs'][0]['IRstatement'] if finding['source']['IRs'] else None
-        sink_ir = finding['sink']['IRs'][0]['IRstatement'] if finding['sink']['IRs'] else None
+    flows = {finding['ID']: expected_flow(finding) for finding in tb_positive}
+    classes = classify(flows, index)
 
-        # 提取方法签名
-        if '<' in source_ir and '>' in source_ir:
-            source_sig = source_ir[source_ir.find('<'):source_ir.rfind('>')+1]
-        else:
-            source_sig = source_ir
+    for finding in tb_positive:
+        fid = finding['ID']
+        flow = flows[fid]
+        source_found = flow['source_sig'] in fd_sources
+        sink_found = flow['sink_sig'] in fd_sinks
 
-        if '<' in sink_ir and '>' in sink_ir:
-            sink_sig = sink_ir[sink_ir.find('<'):sink_ir.rfind('>')+1]
-        else:
-            sink_sig = sink_ir
-
-        # 检查是否被检测到
-        source_found = source_sig in fd_sources
-        sink_found = sink_sig in fd_sinks
-
-        # 同时检查 source 和 sink 是否在同一个结果中
-        flow_found = False
-        for result in root.findall('.//Result'):
-            sink = result.find('Sink')
-            if sink.get('MethodSourceSinkDefinition') == sink_sig:
-                sources = result.find('Sources')
-                for source in sources.findall('Source'):
-                    if source.get('MethodSourceSinkDefinition') == source_sig:
-                        flow_found = True
-                        break
-            if flow_found:
-                break
-
-        if flow_found:
-            detected += 1
+        if fid in classes['complete']:
             status = "✓ 检测到"
-        elif source_found and sink_found:
+        elif fid in classes['partial']:
             status = "△ 部分 (source 和 sink 都检测到，但可能不在同一流中)"
         else:
             status = "✗ 未检测"
 
-        print(f"【Finding {finding['ID']}】 {status}")
+        print(f"【Finding {fid}】 {status}")
         print(f"  {finding['description']}")
         print(f"  Source: {finding['source']['statement']}")
-        print(f"    IR: {source_ir}")
-        print(f"    签名: {source_sig}")
+        print(f"    IR: {flow['source_ir']}")
+        print(f"    签名: {flow['source_sig']}")
         print(f"    检测: {'✓' if source_found else '✗'}")
         print(f"  Sink: {finding['sink']['statement']}")
-        print(f"    IR: {sink_ir}")
-        print(f"    签名: {sink_sig}")
+        print(f"    IR: {flow['sink_ir']}")
+        print(f"    签名: {flow['sink_sig']}")
         print(f"    检测: {'✓' if sink_found else '✗'}")
+        if fid in classes['partial']:
+            reaching = sorted(index.sources_of(flow['sink_sig']))
+            print(f"  到达该 sink 的 source ({len(reaching)} 个): " + ", ".join(reaching[:3])
+                  + (" ..." if len(reaching) > 3 else ""))
+        if fid in classes['complete']:
+            print(f"  位置: 所在方法 {'✓' if fid in classes['same_method'] else '✗'}, "
+                  f"Jimple 语句 {'✓' if fid in classes['same_statement'] else '✗'}")
         print()
 
+    detected = len(classes['complete'])
     print("=" * 100)
     print(f"完整流检测率: {detected}/{len(tb_positive)} = {detected/len(tb_positive)*100:.1f}%")
+    print(f"部分: {len(classes['partial'])}, 未检测: {len(classes['missed'])}; 完整流中所在方法一致 "
+          f"{len(classes['same_method'])}, Jimple 语句一致 {len(classes['same_statement'])}")
     print("=" * 100)
 
     # 列出 FlowDroid 检测到的 Intent.getStringExtra 相关的流
@@ -0,0 +1,1183 @@
+#!/usr/bin/env python3
+"""
+FlowDroid 实验矩阵引擎
+把 APK × 模式 × 超时倍数 × Source/Sink 列表 × 调用图算法 × FlowDroid jar 的矩阵
+展开为按缓存键去重的作业集合，在同一个并发预算池上调度运行并复用结果缓存。
+所有 JVM 由单个 asyncio 事件循环启动和监控；Ctrl-C 或 --deadline 到期时
+杀掉运行中作业的整个进程树，仍写出它们的 CSV 行和汇总。
+batch_flowdroid_analyzer.py / batch_flowdroid_retry.py / precision_ladder.py 都是它的前端。
+"""
+
+import asyncio
+import csv
+import io
+import itertools
+import json
+import os
+import re
+import shlex
+import subprocess
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import compressed_io
+from flowdroid_pool import AsyncMemoryBudgetPool, format_mem, parse_mem_gb
+from heap_model import HeapModel
+from job_cgroup import DEFAULT_PARENT as CGROUP_PARENT, MEM_LIMIT_FACTOR, JobCgroup, check_parent
+from job_scheduler import FailureModel, HistoryScheduler, load_history, simulate_schedule
+from log_monitor import EventLog, LogTailer, PhaseMonitor, kill_process_tree, parse_budgets
+from object_store import ObjectStore
+from proc_sampler import ProcessSampler
+from result_cache import ResultCache, cache_key
+from results_reader import performance_data
+from sweep_planner import plan_accuracy
+
+# 配置
+APK_DIR = Path.home() / "LDFA-dataset/TaintBench/apks"
+SOURCE_SINK = Path.home() / "LDFA-dataset/TaintBench/TB_SourcesAndSinks.txt"
+DEFAULT_OUTPUT_BASE = Path.home() / "LDFA-dataset/TaintBench/output"
+# 替身启动器（--launcher）的运行必须指向别的输出目录，不污染真实运行的历史、堆模型和结果缓存
+OUTPUT_BASE = Path(os.environ.get("FLOWDROID_OUTPUT_BASE") or DEFAULT_OUTPUT_BASE)
+FLOWDROID_JAR = Path.home() / "FlowDroid/jars/soot-infoflow-cmd-2.14.1-jar-with-dependencies.jar"
+ANDROID_PLATFORMS = Path.home() / "Android/sdk/platforms"
+MAX_MEM = "180g"           # 堆上限，每个 APK 的 -Xmx 由 HeapModel 预测
+CALLGRAPH_ALGORITHM = "CHA"
+# FlowDroid -cg 支持的算法（扫描维度的可选值）
+CALLGRAPH_CHOICES = ["CHA", "RTA", "VTA", "SPARK", "GEOM"]
+CACHE_DIR = OUTPUT_BASE / ".cache"
+OBJECT_STORE = OUTPUT_BASE / "objects"  # 结果 XML 和日志的内容寻址存储（object_store.py）
+
+# 并发配置
+HOST_MEM_BUDGET = "180g"   # 所有并发 JVM 堆预留之和的上限
+HOST_CORES = os.cpu_count() or 1
+JOB_CORES = 1              # 每个 JVM 预留的核数（并发时同时传给 -mt）
+
+# 资源采样间隔（秒）
+SAMPLE_INTERVAL = 1.0
+# 日志跟踪 / 预算检查间隔（秒）
+MONITOR_INTERVAL = 0.5
+
+# 超时配置（秒），按超时倍数放大
+CALLGRAPH_TIMEOUT = 600    # 10 分钟
+DATAFLOW_TIMEOUT = 1800    # 30 分钟
+RESULT_TIMEOUT = 120       # 2 分钟
+
+# 模式 -> FlowDroid 标志
+MODE_FLAGS = {
+    "full": [],
+    "ne": ["-ne"],
+    "ns": ["-ns"],
+    "ne_ns": ["-ne", "-ns"],
+}
+
+# 模式 -> 输出目录名
+MODE_NAMES = {
+    "full": "max-precision",
+    "ne": "no-exceptions",
+    "ns": "no-static",
+    "ne_ns": "no-exception-no-static"
+}
+
+# 日志跟踪得到的阶段墙钟时间 -> CSV 列（FlowDroid 自身不报告这些阶段的耗时）
+OBSERVED_PHASE_COLUMNS = {
+    'jvm_start': 'jvm_start_sec',      # JVM 启动到第一行日志
+    'manifest': 'manifest_sec',        # Manifest / 资源解析
+    'soot_setup': 'soot_setup_sec',    # Soot 初始化、加载 dex
+    'source_sink': 'source_sink_sec',  # 源汇点查找
+    'serialize': 'serialize_sec',      # 最后一条分析日志到进程退出（写结果 XML）
+}
+# FlowDroid 报告的阶段 -> 缺失时使用的日志跟踪阶段
+REPORTED_PHASES = {'callgraph_time': 'callgraph', 'dataflow_time': 'dataflow', 'result_time': 'results'}
+
+CSV_HEADER = [
+    'apk_name', 'status', 'leaks_found', 'sources_found', 'sinks_found',
+    'callgraph_time_sec', 'dataflow_time_sec', 'result_time_sec',
+    'jvm_start_sec', 'manifest_sec', 'soot_setup_sec', 'source_sink_sec', 'serialize_sec',
+    'total_time_sec', 'heap_gb', 'peak_memory_gb', 'peak_rss_gb', 'cpu_time_sec',
+    'exit_code', 'timeout_reason', 'cache_hit', 'accounting',
+    'output_file'
+]
+
+
+@dataclass(frozen=True)
+class RunConfig:
+    """矩阵中除 APK 以外的一组取值（即一个单元格的配置）"""
+    mode: str = "full"
+    timeout_multiplier: int = 1
+    callgraph: str = CALLGRAPH_ALGORITHM
+    source_sink: Path = SOURCE_SINK
+    jar: Path = FLOWDROID_JAR
+
+    @property
+    def flags(self) -> List[str]:
+        return MODE_FLAGS[self.mode]
+
+    @property
+    def timeouts(self) -> Tuple[int, int, int]:
+        m = self.timeout_multiplier
+        return CALLGRAPH_TIMEOUT * m, DATAFLOW_TIMEOUT * m, RESULT_TIMEOUT * m
+
+    def to_dict(self) -> Dict:
+        ct, dt, rt = self.timeouts
+        return {
+            'mode': self.mode,
+            'flags': self.flags,
+            'timeout_multiplier': self.timeout_multiplier,
+            'timeouts': {'callgraph': ct, 'dataflow': dt, 'result': rt},
+            'callgraph': self.callgraph,
+            'source_sink': str(self.source_sink),
+            'jar': str(self.jar),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'RunConfig':
+        """to_dict() 的逆操作（cell.json / 工作队列中保存的配置）"""
+        return cls(data['mode'], data['timeout_multiplier'], data['callgraph'],
+                   Path(data['source_sink']), Path(data['jar']))
+
+
+@dataclass
+class Cell:
+    """矩阵的一个单元格：一组 APK 在同一配置下的运行，结果写入独立目录"""
+    config: RunConfig
+    apks: List[Path]
+    output_dir: Path
+    blacklist: List[str] = field(default_factory=list)
+
+    @property
+    def summary_file(self) -> Path:
+        return self.output_dir / "results_summary.csv"
+
+
+@dataclass(frozen=True)
+class Job:
+    """去重后的一次 FlowDroid 运行"""
+    apk: Path
+    config: RunConfig
+    key: str
+
+
+def apk_paths(apk_list: Optional[List[str]] = None) -> List[Path]:
+    """APK_DIR 下的 APK（apk_list 为不含 .apk 后缀的名称，None 表示全部）"""
+    if apk_list:
+        files = [APK_DIR / f"{apk}.apk" for apk in apk_list]
+        return [f for f in files if f.exists()]
+    return sorted(APK_DIR.glob("*.apk"))
+
+
+def _jar_label(jar: Path) -> str:
+    version = re.search(r'(\d+\.\d+(?:\.\d+)?)', jar.name)
+    return f"fd{version.group(1)}" if version else jar.stem
+
+
+@dataclass
+class MatrixSpec:
+    """
+    声明式实验矩阵
+
+    JSON 示例（省略的维度取默认值，路径支持 ~）:
+        {"name": "modes", "modes": ["full", "ne", "ns", "ne_ns"],
+         "timeout_multipliers": [1, 3], "callgraphs": ["CHA", "SPARK"]}
+    """
+    name: str = "matrix"
+    apks: Optional[List[str]] = None
+    blacklist: List[str] = field(default_factory=list)
+    modes: List[str] = field(default_factory=lambda: ["full"])
+    timeout_multipliers: List[int] = field(default_factory=lambda: [1])
+    source_sinks: List[Path] = field(default_factory=lambda: [SOURCE_SINK])
+    callgraphs: List[str] = field(default_factory=lambda: [CALLGRAPH_ALGORITHM])
+    jars: List[Path] = field(default_factory=lambda: [FLOWDROID_JAR])
+
+    @classmethod
+    def from_file(cls, path: Path) -> 'MatrixSpec':
+        with open(path, 'r') as f:
+            data = json.load(f)
+        unknown = set(data) - set(cls.__dataclass_fields__)
+        if unknown:
+            raise ValueError(f"未知的矩阵字段: {', '.join(sorted(unknown))}")
+        for key in ('source_sinks', 'jars'):
+            if key in data:
+                data[key] = [Path(p).expanduser() for p in data[key]]
+        spec = cls(**data)
+        for mode in spec.modes:
+            if mode not in MODE_FLAGS:
+                raise ValueError(f"未知模式: {mode}")
+        for cg in spec.callgraphs:
+            if cg not in CALLGRAPH_CHOICES:
+                raise ValueError(f"未知调用图算法: {cg}")
+        return spec
+
+    def configs(self) -> List[RunConfig]:
+        """所有维度的笛卡尔积（重复取值只保留一次）"""
+        dims = [list(dict.fromkeys(d)) for d in (
+            self.modes, self.timeout_multipliers, self.callgraphs, self.source_sinks, self.jars)]
+        return [RunConfig(mode, mult, cg, ss, jar)
+                for mode, mult, cg, ss, jar in itertools.product(*dims)]
+
+    def cell_name(self, config: RunConfig) -> str:
+        """单元格目录名：只包含取值多于一个的维度，以模式目录名结尾"""
+        parts = []
+        if len(set(self.callgraphs)) > 1:
+            parts.append(config.callgraph)
+        if len(set(self.source_sinks)) > 1:
+            parts.append(config.source_sink.stem.replace("_SourcesAndSinks", ""))
+        if len(set(self.jars)) > 1:
+            parts.append(_jar_label(config.jar))
+        if len(set(self.timeout_multipliers)) > 1:
+            parts.append(f"{config.timeout_multiplier}x")
+        parts.append(MODE_NAMES[config.mode])
+        return "-".join(parts)
+
+    def cells(self, output_dir: Path) -> List[Cell]:
+        apks = apk_paths(self.apks)
+        return [Cell(config, apks, output_dir / self.cell_name(config), list(self.blacklist))
+                for config in self.configs()]
+
+
+def not_started_outcome(heap_gb: Optional[float]) -> Dict:
+    """还在等待预算池时被取消的作业（没有启动 JVM）写出 CANCELLED 行时使用的结果"""
+    return {
+        'exit_code': -1,
+        'timeout_reason': 'CANCELLED',
+        'total_time': 0.0,
+        'usage': {'peak_rss_gb': 'N/A', 'cpu_time_sec': 'N/A', 'accounting': 'proc', 'phases': {}},
+        'parsed': {k: 'N/A' for k in ('leaks', 'sources', 'sinks', 'callgraph_time',
+                                      'dataflow_time', 'result_time', 'memory_gb')},
+        'heap_gb': heap_gb,
+        'cached': False,
+        'started': False,
+    }
+
+
+class FlowDroidEngine:
+    def __init__(self, log_file: Path, jobs: int = 1, heap: str = "auto",
+                 mem_budget: str = HOST_MEM_BUDGET, cores: int = HOST_CORES,
+                 job_cores: int = JOB_CORES, sample_interval: float = SAMPLE_INTERVAL,
+                 force: bool = False, schedule: str = "ljf",
+                 phase_budgets: Optional[Dict[str, float]] = None,
+                 rss_budget: Optional[str] = None, cgroup: bool = False,
+                 cgroup_parent: Path = CGROUP_PARENT, deadline: Optional[float] = None,
+                 compress: str = compressed_io.DEFAULT_CODEC, launcher: Optional[str] = None,
+                 object_store: Optional[Path] = OBJECT_STORE):
+        """
+        初始化引擎
+
+        Args:
+            log_file: 运行日志（analysis_summary.log）
+            jobs: 最大并发 JVM 数（1 为串行）
+            heap: 每个 JVM 的 -Xmx；"auto" 时按历史峰值和 dex 大小为每个 APK 预测
+                  （上限 MAX_MEM），JVM 报 OUT_OF_MEMORY 后自动放大重跑
+            mem_budget: 主机内存预算，并发 JVM 的堆预留之和不超过该值
+            cores: 主机可用核数
+            job_cores: 每个 JVM 预留的核数
+            sample_interval: 通过 /proc 采样 JVM 进程树 RSS/CPU 的间隔（秒）
+            force: 忽略结果缓存，强制重新分析（新结果仍会写入缓存）
+            schedule: 作业顺序
+                  - "ljf": 按历史耗时最长预期优先（无历史时按 dex 大小估计）
+                  - "alpha": 按单元格和名称顺序
+            phase_budgets: 各阶段墙钟预算秒数（如 {"callgraph": 900}），随作业的超时倍数放大；
+                  超出时杀掉整个进程树，提前释放并发槽位
+            rss_budget: 进程树 RSS 预算（如 "100g"），超出时同样提前终止
+            cgroup: 每个 JVM 放入独立的 cgroup v2（memory.max = 堆 × MEM_LIMIT_FACTOR，
+                  cpu.max = job_cores），峰值内存 / CPU / OOM 直接读取 cgroup 计量；
+                  内存预算按 memory.max 预留，保证所有作业的硬上限之和不超过预算
+            cgroup_parent: 已委派的父 cgroup 目录
+            deadline: 整次运行的墙钟上限（秒），到期后终止所有运行中的作业并写出部分结果
+            compress: 作业结束后结果 XML 和日志的压缩算法（"gzip" / "zstd" / "none"），
+                  读取方通过 compressed_io 透明解压
+            launcher: 替代 "java -Xmx<堆> -jar <jar>" 的启动命令（如 stub_flowdroid.py），
+                  其后接 soot-infoflow-cmd 的参数，堆通过环境变量 FLOWDROID_XMX 传入
+            object_store: 内容寻址对象库目录，作业结束后结果 XML 和日志移入其中，
+                  运行目录只保留 manifest.jsonl；None 时保留在运行目录
+        """
+        self.log_file = log_file
+        self.log_file.parent.mkdir(parents=True, exist_ok=True)
+        self.jobs = max(1, jobs)
+        self.heap = heap
+        self.job_cores = job_cores
+        self.sample_interval = sample_interval
+        self.force = force
+        self.schedule = schedule
+        self.phase_budgets = phase_budgets or {}
+        self.rss_budget_gb = parse_mem_gb(rss_budget) if rss_budget else None
+        self.cgroup_parent = check_parent(cgroup_parent) if cgroup else None
+        self.mem_budget_gb = parse_mem_gb(mem_budget)
+        self.max_cores = cores
+        self.deadline = deadline
+        self.compress = compressed_io.check_codec(compress)
+        self.launcher = shlex.split(launcher) if launcher else None
+        self.objects = ObjectStore(object_store) if object_store else None
+        self.cache = ResultCache(CACHE_DIR, self.objects)
+        self.history = load_history(OUTPUT_BASE)
+        self.heap_models: Dict[str, HeapModel] = {}
+        self.heaps: Dict[str, float] = {}
+        self._events: Dict[Path, EventLog] = {}
+        self.pool: Optional[AsyncMemoryBudgetPool] = None
+        self._started = 0
+
+    @property
+    def _use_cache(self) -> bool:
+        """
+        是否读写结果缓存
+
+        替身启动器的输出还取决于命令行以外的环境变量（如 STUB_FLOWDROID_FAIL_RATE），
+        缓存键区分不了，所以替身运行既不命中也不写入缓存
+        """
+        return not self.force and not self.launcher
+
+    def _log(self, message: str):
+        """记录日志"""
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        log_msg = f"[{timestamp}] {message}"
+        print(log_msg)
+        with open(self.log_file, 'a') as f:
+            f.write(log_msg + '\n')
+
+    def _write_row(self, cell: Cell, row: List):
+        """向单元格的 CSV 追加一行（整行一次写入）"""
+        buf = io.StringIO()
+        csv.writer(buf).writerow(row)
+        with open(cell.summary_file, 'a', newline='') as f:
+            f.write(buf.getvalue())
+
+    def _parse_log_file(self, log_file: Path, output_xml: Optional[Path] = None) -> Dict:
+        """
+        解析 FlowDroid 日志文件（及结果 XML 中的 PerformanceData）
+
+        阶段耗时优先取日志中的报告值，其次取 XML 的 PerformanceData；内存统一换算为 GB。
+        """
+        result = {
+            'leaks': 'N/A',
+            'sources': 'N/A',
+            'sinks': 'N/A',
+            'callgraph_time': 'N/A',
+            'dataflow_time': 'N/A',
+            'result_time': 'N/A',
+            'memory_gb': 'N/A',
+        }
+
+        try:
+            with compressed_io.open_text(log_file) as f:
+                content = f.read()
+
+            if not content.strip():
+                return result
+
+            # 提取泄露数
+            leaks_match = re.search(r'Found (\d+) leaks', content)
+            if leaks_match:
+                result['leaks'] = leaks_match.group(1)
+
+            # 提取源点和汇点数
+            sources_match = re.search(r'found (\d+) sources and (\d+) sinks', content)
+            if sources_match:
+                result['sources'] = sources_match.group(1)
+                result['sinks'] = sources_match.group(2)
+
+            # 提取时间信息
+            cg_match = re.search(r'Callgraph construction took ([\d.]+) seconds', content)
+            if cg_match:
+                result['callgraph_time'] = cg_match.group(1)
+
+            df_match = re.search(r'Data flow solver took ([\d.]+) seconds', content)
+            if df_match:
+                result['dataflow_time'] = df_match.group(1)
+
+            rt_match = re.search(r'Path reconstruction took ([\d.]+) seconds', content)
+            if rt_match:
+                result['result_time'] = rt_match.group(1)
+
+            # 提取内存使用（FlowDroid 2.x 以 MB 报告）
+            memory_match = re.search(r'Maximum memory consumption: ([\d.]+) (MB|GB)', content)
+            if memory_match:
+                value = float(memory_match.group(1))
+                result['memory_gb'] = f"{value / 1024 if memory_match.group(2) == 'MB' else value:.2f}"
+
+        except Exception as e:
+            self._log(f"解析日志文件失败: {e}")
+
+        if output_xml is not None:
+            performance = performance_data(output_xml)
+            for key, entry in (('callgraph_time', 'CallgraphConstructionSeconds'),
+                               ('dataflow_time', 'TaintPropagationSeconds'),
+                               ('result_time', 'PathReconstructionSeconds')):
+                if result[key] == 'N/A' and entry in performance:
+                    result[key] = performance[entry]
+            if result['memory_gb'] == 'N/A' and 'MaxMemoryConsumption' in performance:
+                result['memory_gb'] = f"{float(performance['MaxMemoryConsumption']) / 1024:.2f}"
+
+        return result
+
+    def _command(self, job: Job, heap_gb: float, output_xml: Path) -> List[str]:
+        """构建 FlowDroid 命令行"""
+        config = job.config
+        ct, dt, rt = config.timeouts
+        launcher = self.launcher or ["java", f"-Xmx{format_mem(heap_gb)}", "-jar", str(config.jar)]
+        cmd = [
+            *launcher,
+            "-a", str(job.apk),
+            "-p", str(ANDROID_PLATFORMS),
+            "-s", str(config.source_sink),
+            "-cg", config.callgraph,
+            "-ct", str(ct),
+            "-dt", str(dt),
+            "-rt", str(rt),
+            *config.flags,
+            "-o", str(output_xml)
+        ]
+        # 并发运行时限制 FlowDroid 求解器线程数，与预留核数保持一致
+        if self.jobs > 1:
+            cmd[-2:-2] = ["-mt", str(self.job_cores)]
+        return cmd
+
+    async def _run_flowdroid(self, job: Job, heap_gb: float, output_dir: Path) -> Tuple[int, str, float, Dict]:
+        """
+        运行 FlowDroid 分析（-Xmx 为 heap_gb）
+
+        被取消时杀掉整个进程树并等待其退出，返回 timeout_reason "CANCELLED"，
+        由调用方写出该作业的部分结果后再继续传播取消。
+
+        Returns:
+            (exit_code, timeout_reason, total_time, usage)
+            usage 为 {'peak_rss_gb', 'cpu_time_sec', 'accounting', 'phases'}，无论进程如何结束都会填写；
+            accounting 为 "cgroup"（读自 cgroup 文件）或 "proc"（/proc 采样），
+            phases 为日志跟踪得到的各阶段墙钟秒数（PhaseMonitor.timings()）
+        """
+        apk_name = job.apk.stem
+        output_xml = output_dir / f"{apk_name}_results.xml"
+        log_file = output_dir / f"{apk_name}.log"
+
+        # 直接使用 java 命令，PATH 指向 SDKMAN 安装的 JDK
+        env = os.environ.copy()
+        env['PATH'] = f"{Path.home()}/.sdkman/candidates/java/current/bin:{env.get('PATH', '')}"
+        env['FLOWDROID_XMX'] = format_mem(heap_gb)
+        cmd = self._command(job, heap_gb, output_xml)
+
+        start_time = time.time()
+        timeout_reason = ""
+        usage = {'peak_rss_gb': 'N/A', 'cpu_time_sec': 'N/A', 'accounting': 'proc', 'phases': {}}
+        cgroup = None
+        proc = None
+        sampler = None
+
+        try:
+            if self.cgroup_parent:
+                # cgroup 文件读写（及删除残留 cgroup 时的等待）不放在事件循环线程
+                cgroup = await asyncio.to_thread(JobCgroup, self.cgroup_parent, f"{apk_name}-{job.key[:12]}",
+                                                 self._reservation(heap_gb), self.job_cores)
+                cmd = cgroup.wrap(cmd)
+            # 以独立会话启动（pgid 即 pid），超预算或取消时可以杀掉整个进程树
+            with open(log_file, 'w') as lf:
+                proc = await asyncio.create_subprocess_exec(
+                    *cmd,
+                    stdout=lf,
+                    stderr=subprocess.STDOUT,
+                    env=env,
+                    start_new_session=True
+                )
+            sampler = ProcessSampler(proc.pid, self.sample_interval)
+            timeout_reason, usage['phases'] = await self._monitor(proc, job, log_file, sampler,
+                                                                  output_dir, cgroup)
+            exit_code = proc.returncode
+
+        except asyncio.CancelledError:
+            timeout_reason = "CANCELLED"
+            exit_code = -1
+            if proc is not None and proc.returncode is None:
+                if cgroup:
+                    await asyncio.to_thread(cgroup.kill)
+                kill_process_tree(proc.pid)
+                await proc.wait()
+                exit_code = proc.returncode
+
+        except Exception as e:
+            exit_code = -1
+            timeout_reason = f"ERROR: {str(e)}"
+            # 启动后在监控中出错：与取消相同，不留下无人管理的 JVM 进程树
+            if proc is not None and proc.returncode is None:
+                if cgroup:
+                    await asyncio.to_thread(cgroup.kill)
+                kill_process_tree(proc.pid)
+                await proc.wait()
+
+        finally:
+            if sampler is not None:
+                sampler.write_series(output_dir / f"{apk_name}.resources.csv")
+                usage.update({
+                    'peak_rss_gb': f"{sampler.peak_rss_gb:.2f}",
+                    'cpu_time_sec': f"{sampler.cpu_time_sec:.2f}",
+                    'accounting': 'proc'
+                })
+            if cgroup:
+                stats = await asyncio.to_thread(cgroup.stats)
+                usage.update(self._cgroup_usage(stats, apk_name))
+                # 内核在该 cgroup 内触发 OOM kill：明确是本作业超出 memory.max
+                if stats['oom_kills'] and not timeout_reason:
+                    timeout_reason = "CGROUP_OOM"
+                await asyncio.to_thread(cgroup.remove)
+
+        total_time = time.time() - start_time
+
+        # 检查日志中的超时信息（被预算终止、取消或 cgroup OOM 时以其为准）
+        if exit_code != 0 and not timeout_reason.startswith(("BUDGET_", "CGROUP_", "CANCELLED")):
+            try:
+                with open(log_file, 'r') as f:
+                    log_content = f.read()
+
+                if "Callgraph creation timed out" in log_content:
+                    timeout_reason = "CALLGRAPH_TIMEOUT"
+                elif "Data flow computation timed out" in log_content:
+                    timeout_reason = "DATAFLOW_TIMEOUT"
+                elif "Result computation timed out" in log_content:
+                    timeout_reason = "RESULT_TIMEOUT"
+                elif "Running out of memory" in log_content or "OutOfMemoryError" in log_content:
+                    timeout_reason = "OUT_OF_MEMORY"
+                elif "UnsupportedClassVersionError" in log_content:
+                    timeout_reason = "JAVA_VERSION_ERROR"
+
+            except Exception:
+                pass
+
+        return exit_code, timeout_reason, total_time, usage
+
+    def _cgroup_usage(self, stats: Dict, apk_name: str) -> Dict:
+        """JobCgroup.stats() 的计量转为 usage 字段（内核不支持 memory.peak 时保留 /proc 采样值）"""
+        usage = {'accounting': 'cgroup'}
+        if stats['peak_gb'] is not None:
+            usage['peak_rss_gb'] = f"{stats['peak_gb']:.2f}"
+        if stats['cpu_time_sec'] is not None:
+            usage['cpu_time_sec'] = f"{stats['cpu_time_sec']:.2f}"
+        if stats['throttled_sec']:
+            self._log(f"  {apk_name} cpu.max 限流 {stats['throttled_sec']:.1f}s")
+        return usage
+
+    def _reservation(self, heap_gb: float) -> float:
+        """作业在内存预算中的预留量：启用 cgroup 时为硬上限 memory.max，否则为堆"""
+        return heap_gb * MEM_LIMIT_FACTOR if self.cgroup_parent else heap_gb
+
+    async def _monitor(self, proc: asyncio.subprocess.Process, job: Job, log_file: Path,
+                       sampler: ProcessSampler, output_dir: Path,
+                       cgroup: Optional[JobCgroup] = None) -> Tuple[str, Dict[str, float]]:
+        """
+        等待 FlowDroid 结束，期间跟踪日志阶段、采样资源并检查预算
+
+        Returns:
+            (预算终止原因，未超预算时为空串; PhaseMonitor.timings() 的各阶段墙钟秒数)
+        """
+        apk_name = job.apk.stem
+        budgets = {phase: sec * job.config.timeout_multiplier
+                   for phase, sec in self.phase_budgets.items()}
+        tailer = LogTailer(log_file)
+        monitor = PhaseMonitor(apk_name, budgets, self.rss_budget_gb)
+        budget_reason = ""
+        exited = asyncio.ensure_future(proc.wait())
+        try:
+            while True:
+                done, _ = await asyncio.wait({exited}, timeout=MONITOR_INTERVAL)
+                self._emit(output_dir, monitor.feed(tailer.poll()))
+                if done:
+                    self._emit(output_dir, monitor.finish())
+                    return budget_reason, monitor.timings()
+                if sampler.due():
+                    sampler.sample()
+                if not budget_reason:
+                    if cgroup:
+                        rss_gb = await asyncio.to_thread(lambda: cgroup.current_gb)
+                    else:
+                        rss_gb = sampler.last_rss_gb
+                    budget_reason = monitor.check_budget(rss_gb) or ""
+                    if budget_reason:
+                        self._log(f"  {apk_name} 超出预算 {budget_reason}（阶段 {monitor.phase}），终止进程树")
+                        self._emit(output_dir, [monitor.event('budget_exceeded', time.time(),
+                                                              reason=budget_reason)])
+                        if cgroup:
+                            await asyncio.to_thread(cgroup.kill)
+                        kill_process_tree(proc.pid)
+        finally:
+            exited.cancel()
+
+    def _emit(self, output_dir: Path, events: List[Dict]):
+        """写入进度事件并在控制台输出阶段变化"""
+        if output_dir not in self._events:
+            self._events[output_dir] = EventLog(output_dir / "events.jsonl")
+        self._events[output_dir].write(events)
+        for e in events:
+            if e['event'] == 'phase':
+                self._log(f"  {e['apk']}: {e['previous']} ({e['previous_sec']}s) -> {e['phase']}")
+            elif e['event'] == 'sources_sinks':
+                self._log(f"  {e['apk']}: 找到 {e['sources']} 个源点, {e['sinks']} 个汇点")
+
+    def _effective_slots(self) -> int:
+        """不考虑内存时最多能同时运行的作业数（内存约束由模拟按各作业的堆处理）"""
+        by_cores = self.max_cores // max(1, self.job_cores)
+        return max(1, min(self.jobs, by_cores))
+
+    def _heap_model(self, mode: str) -> HeapModel:
+        if mode not in self.heap_models:
+            self.heap_models[mode] = HeapModel(OUTPUT_BASE, mode, max_heap_gb=parse_mem_gb(MAX_MEM),
+                                               history=self.history)
+        return self.heap_models[mode]
+
+    def _by_mode(self, jobs: List[Job]) -> Dict[str, List[Job]]:
+        groups: Dict[str, List[Job]] = {}
+        for job in jobs:
+            groups.setdefault(job.config.mode, []).append(job)
+        return groups
+
+    def _heap_for(self, job: Job) -> float:
+        """单个作业的 -Xmx（不输出预测汇总，供队列 worker 逐个领取作业时使用）"""
+        if self.heap != "auto":
+            return parse_mem_gb(self.heap)
+        return self._heap_model(job.config.mode).predict(job.apk)[0]
+
+    def _plan_heaps(self, jobs: List[Job]):
+        """为每个作业确定 -Xmx（同一模式的 APK 共用一个堆模型）"""
+        if self.heap != "auto":
+            self.heaps.update({job.key: parse_mem_gb(self.heap) for job in jobs})
+            return
+        sources = []
+        for mode, group in self._by_mode(jobs).items():
+            plan = self._heap_model(mode).plan([job.apk for job in group])
+            for job in group:
+                gb, src = plan[job.apk.stem]
+                self.heaps[job.key] = gb
+                sources.append(src)
+        heaps = [self.heaps[job.key] for job in jobs]
+        self._log(f"堆预测: 历史 {sources.count('history')} 个, OOM 放大 {sources.count('oom')} 个, "
+                  f"曾被杀 {sources.count('killed')} 个, "
+                  f"按 dex 估计 {sources.count('dex')} 个; "
+                  f"范围 {min(heaps, default=0)}-{max(heaps, default=0)} GB")
+
+    def order(self, jobs: List[Job]) -> Tuple[List[Job], Dict[str, Tuple[float, str]]]:
+        """最长预期优先排序，返回 (作业顺序, {缓存键: (预测秒数, 来源)})"""
+        predictions = {}
+        for mode, group in self._by_mode(jobs).items():
+            by_apk = HistoryScheduler(OUTPUT_BASE, mode, history=self.history).predict(
+                [job.apk for job in group])
+            for job in group:
+                predictions[job.key] = by_apk[job.apk.stem]
+        ordered = sorted(jobs, key=lambda j: (-predictions[j.key][0], j.apk.stem))
+        return ordered, predictions
+
+    def plan(self, jobs: List[Job], owners: Dict[str, List[Cell]]) -> Tuple[List[Job], Dict]:
+        """
+        不启动 JVM 预测一次运行：每个作业的耗时、堆、失败概率，以及 makespan 和峰值内存预留
+
+        同时确定每个作业的 -Xmx（self.heaps）。缓存命中的作业（未 --force 时）按 0 秒、
+        不占预算计；预测耗时不超过作业的超时之和（FlowDroid 到时即退出）。
+        Returns:
+            (调度顺序的作业, 预测)；预测的结构见 sweep_planner.py
+        """
+        ordered, predictions = self.order(jobs)
+        if self.schedule != "ljf":
+            ordered = jobs
+        self._plan_heaps(ordered)
+        failures = FailureModel(OUTPUT_BASE, APK_DIR, history=self.history)
+
+        entries = []
+        for job in ordered:
+            sec, source = predictions[job.key]
+            cached = self._use_cache and self.cache.lookup(job.key) is not None
+            p_fail, fail_source, reason = failures.probability(
+                job.apk, job.config.mode, job.config.timeout_multiplier)
+            entries.append({
+                'key': job.key,
+                'apk': job.apk.stem,
+                'mode': job.config.mode,
+                'timeout_multiplier': job.config.timeout_multiplier,
+                'callgraph': job.config.callgraph,
+                'cells': [cell.output_dir.name for cell in owners[job.key]],
+                'cached': cached,
+                'predicted_sec': 0.0 if cached else round(min(sec, sum(job.config.timeouts)), 2),
+                'time_source': "cache" if cached else source,
+                'heap_gb': self.heaps[job.key],
+                'p_fail': 0.0 if cached else round(p_fail, 3),
+                'fail_source': "cache" if cached else fail_source,
+                'fail_reason': "" if cached else reason,
+            })
+
+        slots = self._effective_slots()
+        sim = simulate_schedule([e['predicted_sec'] for e in entries], slots,
+                                mems=[0.0 if e['cached'] else self._reservation(e['heap_gb'])
+                                      for e in entries],
+                                mem_budget=self.mem_budget_gb)
+        for e, start in zip(entries, sim['starts']):
+            e['predicted_start'] = round(start, 2)
+        return ordered, {
+            'created': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'slots': slots,
+            'mem_budget_gb': self.mem_budget_gb,
+            'cache_hits': sum(1 for e in entries if e['cached']),
+            'makespan_sec': round(sim['makespan'], 2),
+            'serial_sec': round(sum(e['predicted_sec'] for e in entries), 2),
+            'peak_mem_gb': round(sim['peak_mem'], 2),
+            'peak_jobs': sim['peak_running'],
+            'expected_failures': round(sum(e['p_fail'] for e in entries), 2),
+            'jobs': entries,
+        }
+
+    def prepare_cell(self, cell: Cell) -> int:
+        """创建单元格目录，写入配置、CSV 表头和黑名单行，返回跳过的 APK 数"""
+        cell.output_dir.mkdir(parents=True, exist_ok=True)
+        with open(cell.output_dir / "cell.json", 'w') as f:
+            json.dump(cell.config.to_dict(), f, indent=2)
+        with open(cell.summary_file, 'w', newline='') as f:
+            csv.writer(f).writerow(CSV_HEADER)
+
+        if cell.blacklist:
+            with open(cell.output_dir / "blacklist.txt", 'w') as f:
+                f.write("Blacklisted APKs:\\n")
+                for apk in cell.blacklist:
+                    f.write(f"  - {apk}\\n")
+
+        skipped = 0
+        for apk_path in cell.apks:
+            if apk_path.stem in cell.blacklist:
+                skipped += 1
+                self._write_row(cell, [apk_path.stem, "SKIPPED", 0, 0, 0, 0, 0, 0,
+                                       *[0] * len(OBSERVED_PHASE_COLUMNS), 0, 0, 0, 0, 0, 0,
+                                       "BLACKLISTED", "no", "", ""])
+        return skipped
+
+    async def _execute(self, job: Job, output_dir: Path, total_jobs: int) -> Dict:
+        """在预算池中运行一个作业（缓存命中时直接复用），结果文件写入 output_dir"""
+        apk_name = job.apk.stem
+        output_xml = output_dir / f"{apk_name}_results.xml"
+        log_file = output_dir / f"{apk_name}.log"
+        cached = self.cache.lookup(job.key) if self._use_cache else None
+        self._started += 1
+        index = self._started
+
+        if cached:
+            self._log(f"[{index}/{total_jobs}] 缓存命中: {apk_name} ({job.config.mode}, {job.key[:12]})")
+            await asyncio.to_thread(self.cache.restore, job.key, output_xml, log_file)
+            await self._store_outputs([output_xml, log_file])
+            return {
+                'exit_code': cached['exit_code'],
+                'timeout_reason': cached['timeout_reason'],
+                'total_time': cached['total_time'],
+                'usage': cached['usage'],
+                'parsed': cached['parsed'],
+                'heap_gb': cached.get('heap_gb'),
+                'cached': True,
+            }
+
+        heap_gb = self.heaps[job.key]
+        while True:
+            try:
+                async with self.pool.reserve(self._reservation(heap_gb), self.job_cores):
+                    self._log(f"[{index}/{total_jobs}] 正在分析: {apk_name} "
+                              f"({job.config.mode} {job.config.timeout_multiplier}x {job.config.callgraph}, "
+                              f"-Xmx{format_mem(heap_gb)})")
+                    exit_code, timeout_reason, total_time, usage = await self._run_flowdroid(
+                        job, heap_gb, output_dir)
+            except asyncio.CancelledError:
+                # _run_flowdroid 自己处理取消，这里只会是还在等待预算池时被取消：没有启动 JVM
+                self._log(f"[{index}/{total_jobs}] 等待内存预算时被取消: {apk_name}")
+                return not_started_outcome(heap_gb)
+
+            # JVM 堆不足或超出本作业 cgroup 上限时放大重跑
+            # （被主机 OOM killer 杀掉不属于此类，放大堆无济于事）
+            if self.heap != "auto" or timeout_reason not in ("OUT_OF_MEMORY", "CGROUP_OOM"):
+                break
+            bumped = self._heap_model(job.config.mode).bump(heap_gb)
+            if bumped <= heap_gb:
+                break
+            self._log(f"  {apk_name} {timeout_reason}，堆 {format_mem(heap_gb)} -> {format_mem(bumped)} 重跑")
+            heap_gb = bumped
+
+        parsed = self._parse_log_file(log_file, output_xml)
+        await asyncio.to_thread(compressed_io.compress_outputs, [output_xml, log_file], self.compress)
+        await self._store_outputs([output_xml, log_file])
+
+        # 只缓存成功的运行
+        if exit_code == 0 and self._use_cache:
+            await asyncio.to_thread(self.cache.store, job.key, output_xml, log_file, {
+                'apk_name': apk_name,
+                'mode': job.config.mode,
+                'exit_code': exit_code,
+                'timeout_reason': timeout_reason,
+                'total_time': total_time,
+                'usage': usage,
+                'parsed': parsed,
+                'heap_gb': heap_gb,
+            })
+
+        return {
+            'exit_code': exit_code,
+            'timeout_reason': timeout_reason,
+            'total_time': total_time,
+            'usage': usage,
+            'parsed': parsed,
+            'heap_gb': heap_gb,
+            'cached': False,
+        }
+
+    async def execute(self, job: Job, output_dir: Path, total_jobs: int = 0) -> Dict:
+        """
+        在本引擎的预算池中运行单个作业，返回结果（不写 CSV）
+
+        供 work_queue 的 worker 使用：作业由队列逐个分配，结果交回协调者统一汇总。
+        """
+        if self.pool is None:
+            self.pool = AsyncMemoryBudgetPool(self.mem_budget_gb, self.max_cores)
+        if job.key not in self.heaps:
+            self.heaps[job.key] = self._heap_for(job)
+        return await self._execute(job, output_dir, total_jobs)
+
+    async def _store_outputs(self, paths: List[Path]):
+        """把结果 XML 和日志移入对象库（未启用时不做任何事）"""
+        if self.objects:
+            await asyncio.to_thread(self.objects.put_outputs, paths)
+
+    def copy_outputs(self, apk_name: str, src_dir: Path, dst_dir: Path):
+        """把作业的结果文件复制到另一个引用它的单元格（已在对象库中的只登记引用）"""
+        for suffix in ("_results.xml", ".log", ".resources.csv"):
+            name = f"{apk_name}{suffix}"
+            if self.objects and self.objects.link(src_dir / name, dst_dir / name):
+                continue
+            compressed_io.copy(src_dir / name, dst_dir / name)
+
+    def record(self, cell: Cell, apk_name: str, outcome: Dict, shared: bool) -> Dict:
+        """把作业结果写入单元格的 CSV 并返回该单元格的结果"""
+        output_xml = cell.output_dir / f"{apk_name}_results.xml"
+        parsed = outcome['parsed']
+        usage = outcome['usage']
+        heap_gb = outcome['heap_gb']
+        # 旧缓存条目没有 result_time 和 phases
+        phases = usage.get('phases', {})
+        reported = {key: parsed.get(key, 'N/A') for key in REPORTED_PHASES}
+        for key, phase in REPORTED_PHASES.items():
+            # FlowDroid 未报告（如该阶段超时被终止）时用日志跟踪的墙钟时间
+            if reported[key] == 'N/A' and phase in phases:
+                reported[key] = f"{phases[phase]:.2f}"
+        if outcome['timeout_reason'] == "CANCELLED":
+            status = "CANCELLED"
+        else:
+            status = "SUCCESS" if outcome['exit_code'] == 0 else "FAILED"
+
+        self._write_row(cell, [
+            apk_name,
+            status,
+            parsed['leaks'],
+            parsed['sources'],
+            parsed['sinks'],
+            reported['callgraph_time'],
+            reported['dataflow_time'],
+            reported['result_time'],
+            *(f"{phases[phase]:.2f}" if phase in phases else 'N/A' for phase in OBSERVED_PHASE_COLUMNS),
+            f"{outcome['total_time']:.2f}",
+            f"{heap_gb:g}" if heap_gb else 'N/A',
+            parsed['memory_gb'],
+            usage['peak_rss_gb'],
+            usage['cpu_time_sec'],
+            outcome['exit_code'],
+            outcome['timeout_reason'],
+            'yes' if outcome['cached'] or shared else 'no',
+            usage.get('accounting', 'proc'),
+            str(output_xml)
+        ])
+
+        return {'apk_name': apk_name, 'cell': cell.output_dir.name, 'status': status,
+                'total_time': outcome['total_time'], 'cached': outcome['cached'], 'shared': shared,
+                'exit_code': outcome['exit_code'], 'timeout_reason': outcome['timeout_reason'],
+                'leaks': parsed['leaks'], 'output_file': str(output_xml),
+                'started': outcome.get('started', True)}
+
+    async def _run_job(self, job: Job, cells: List[Cell], total_jobs: int, results: List[Dict]):
+        """
+        运行一个去重后的作业，并把结果分发到所有引用它的单元格（追加到 results）
+
+        运行中被取消时仍写出部分结果行（状态 CANCELLED），然后继续传播取消。
+        """
+        apk_name = job.apk.stem
+        primary = cells[0]
+        outcome = await self._execute(job, primary.output_dir, total_jobs)
+        first = len(results)
+        results.append(self.record(primary, apk_name, outcome, shared=False))
+        for cell in cells[1:]:
+            self.copy_outputs(apk_name, primary.output_dir, cell.output_dir)
+            results.append(self.record(cell, apk_name, outcome, shared=True))
+
+        # 输出摘要（单线程事件循环，整块输出不会与其他作业交错）
+        parsed = outcome['parsed']
+        self._log(f"  {apk_name} ({job.config.mode}) 状态: {results[first]['status']}")
+        self._log(f"  泄露数: {parsed['leaks']}")
+        self._log(f"  源点数: {parsed['sources']}, 汇点数: {parsed['sinks']}")
+        self._log(f"  时间: CG={parsed['callgraph_time']}s, DF={parsed['dataflow_time']}s, "
+                  f"RT={parsed.get('result_time', 'N/A')}s, 总计={outcome['total_time']:.2f}s")
+        self._log(f"  内存: 堆 {outcome['heap_gb'] or 'N/A'} GB, 报告 {parsed['memory_gb']} GB "
+                  f"(峰值 RSS: {outcome['usage']['peak_rss_gb']} GB, "
+                  f"CPU: {outcome['usage']['cpu_time_sec']}s)")
+        if outcome['timeout_reason']:
+            self._log(f"  超时原因: {outcome['timeout_reason']}")
+        if len(cells) > 1:
+            self._log(f"  结果同时用于: {', '.join(c.output_dir.name for c in cells[1:])}")
+        self._log("")
+
+        if outcome['timeout_reason'] == "CANCELLED":
+            raise asyncio.CancelledError()
+
+    async def _worker(self, queue: asyncio.Queue, owners: Dict[str, List[Cell]],
+                      total_jobs: int, results: List[Dict]):
+        """按调度顺序依次取作业运行（jobs 个 worker 即最多 jobs 个并发 JVM）"""
+        while True:
+            try:
+                job = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            await self._run_job(job, owners[job.key], total_jobs, results)
+
+    def expand(self, cells: List[Cell]) -> Tuple[List[Job], Dict[str, List[Cell]]]:
+        """
+        把单元格展开为作业，按缓存键去重
+
+        Returns:
+            (按单元格顺序的唯一作业, {缓存键: 引用该作业的单元格})
+        """
+        jobs: List[Job] = []
+        owners: Dict[str, List[Cell]] = {}
+        for cell in cells:
+            ct, dt, rt = cell.config.timeouts
+            for apk_path in cell.apks:
+                if apk_path.stem in cell.blacklist:
+                    continue
+                key = cache_key(apk_path, cell.config.source_sink, cell.config.jar,
+                                cell.config.flags, cell.config.callgraph, (ct, dt, rt), self.launcher)
+                if key not in owners:
+                    owners[key] = []
+                    jobs.append(Job(apk_path, cell.config, key))
+                if cell not in owners[key]:
+                    owners[key].append(cell)
+        return jobs, owners
+
+    def run(self, cells: List[Cell]) -> Dict:
+        """运行一组单元格，返回汇总统计（Ctrl-C 时返回已完成部分的统计，cancelled 为 True）"""
+        return asyncio.run(self.run_async(cells))
+
+    async def run_async(self, cells: List[Cell]) -> Dict:
+        """run() 的协程版本"""
+        self._log("=" * 60)
+        self._log(f"FlowDroid 批量分析 - {len(cells)} 个单元格")
+        self._log(f"开始时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        for cell in cells:
+            c = cell.config
+            ct, dt, rt = c.timeouts
+            self._log(f"  {cell.output_dir}")
+            self._log(f"    模式: {c.mode}, 标志: {' '.join(c.flags) if c.flags else '无（完整模式）'}, "
+                      f"调用图: {c.callgraph}, {len(cell.apks)} 个 APK")
+            self._log(f"    超时设置: CT={ct}s, DT={dt}s, RT={rt}s ({c.timeout_multiplier}x)")
+            self._log(f"    Source/Sink: {c.source_sink}, jar: {c.jar.name}")
+        self._log(f"结果缓存: {CACHE_DIR}{'（--force，忽略已有缓存）' if self.force else ''}")
+        self._log(f"并发设置: jobs={self.jobs}, 堆={self.heap} (上限 {MAX_MEM}), "
+                  f"内存预算={self.mem_budget_gb:g}GB, 核数={self.max_cores}")
+        if self.cgroup_parent:
+            self._log(f"cgroup 隔离: {self.cgroup_parent}（memory.max = 堆 × {MEM_LIMIT_FACTOR}, "
+                      f"cpu.max = {self.job_cores} 核）")
+        self._log("=" * 60)
+
+        skipped = sum(self.prepare_cell(cell) for cell in cells)
+        blacklisted = sorted({apk for cell in cells for apk in cell.blacklist})
+        if blacklisted:
+            self._log(f"黑名单: {', '.join(blacklisted)}")
+
+        jobs, owners = self.expand(cells)
+        placements = sum(len(owners[job.key]) for job in jobs)
+        self._log(f"作业: {placements} 个单元格条目, 去重后 {len(jobs)} 个")
+
+        # 调度：最长预期优先，减少并发扫描末尾的长尾
+        jobs, plan = self.plan(jobs, owners)
+        if self.schedule == "ljf":
+            from_history = sum(1 for e in plan['jobs'] if e['time_source'] == "history")
+            self._log(f"调度: 最长预期优先（{from_history} 个来自历史, "
+                      f"{len(jobs) - from_history - plan['cache_hits']} 个按 dex 大小估计）")
+            for e in [e for e in plan['jobs'] if not e['cached']][:5]:
+                self._log(f"  {e['apk']} ({e['mode']}): 预计 {e['predicted_sec']:.1f}s ({e['time_source']})")
+        self._log(f"预测: makespan {plan['makespan_sec']:.2f}s, 峰值内存预留 {plan['peak_mem_gb']:g} GB "
+                  f"({plan['peak_jobs']} 个并发), 预计失败 {plan['expected_failures']:.1f} 个, "
+                  f"缓存命中 {plan['cache_hits']} 个")
+        plan_file = (cells[0].output_dir if len(cells) == 1 else self.log_file.parent) / "plan.json"
+        with open(plan_file, 'w') as f:
+            json.dump(plan, f, ensure_ascii=False, indent=2)
+
+        # 所有单元格的作业共用一个并发池（jobs=1 时退化为串行）
+        self.pool = AsyncMemoryBudgetPool(self.mem_budget_gb, self.max_cores)
+        self._started = 0
+        queue: asyncio.Queue = asyncio.Queue()
+        for job in jobs:
+            queue.put_nowait(job)
+        results: List[Dict] = []
+        sweep_start = time.time()
+        workers = [asyncio.create_task(self._worker(queue, owners, len(jobs), results))
+                   for _ in range(self.jobs)]
+        cancelled = False
+        try:
+            _, pending = await asyncio.wait(workers, timeout=self.deadline)
+            if pending:
+                cancelled = True
+                self._log("超过 deadline，终止运行中的作业并写出部分结果")
+        except asyncio.CancelledError:
+            cancelled = True
+            self._log("收到取消，终止运行中的作业并写出部分结果")
+        if cancelled:
+            # 每个 worker 只取消一次，再等所有 worker 杀掉进程树、写完部分结果
+            for w in workers:
+                w.cancel()
+        for outcome in await asyncio.gather(*workers, return_exceptions=True):
+            if isinstance(outcome, Exception):
+                raise outcome
+        makespan = time.time() - sweep_start
+        # 未开始：仍在队列中的作业（没有 CSV 行），以及等待预算池时被取消的作业（有 CANCELLED 行）
+        not_started = queue.qsize() + sum(1 for r in results if not r['started'] and not r['shared'])
+
+        # 统计
+        total = len(results)
+        success = sum(1 for r in results if r['status'] == 'SUCCESS')
+        cancelled_rows = sum(1 for r in results if r['status'] == 'CANCELLED')
+        interrupted = sum(1 for r in results if r['status'] == 'CANCELLED' and r['started'])
+        failed = total - success - cancelled_rows
+        cache_hits = sum(1 for r in results if r['cached'] and not r['shared'])
+        shared = sum(1 for r in results if r['shared'])
+        serial_time = sum(r['total_time'] for r in results if not r['cached'] and not r['shared'])
+        speedup = serial_time / makespan if makespan > 0 else 0.0
+
+        # 输出汇总
+        self._log("=" * 60)
+        self._log("分析完成!")
+        self._log(f"总计: {total} 个 APK × 单元格")
+        self._log(f"成功: {success}")
+        self._log(f"失败: {failed}")
+        self._log(f"跳过: {skipped}")
+        if cancelled:
+            self._log(f"已取消: 运行中 {interrupted}, 未开始 {not_started} 个作业")
+        self._log(f"缓存命中: {cache_hits}, 单元格间共享: {shared}")
+        self._log(f"总耗时 (makespan): {makespan:.2f}s")
+        self._log(f"串行基线 (各作业耗时之和): {serial_time:.2f}s, 加速比: {speedup:.2f}x")
+        accuracy = plan_accuracy(plan, results, makespan, self.pool.peak_mem_gb)
+        plan['accuracy'] = accuracy
+        with open(plan_file, 'w') as f:
+            json.dump(plan, f, ensure_ascii=False, indent=2)
+        self._log(f"预测 makespan: {plan['makespan_sec']:.2f}s, 实际: {makespan:.2f}s")
+        self._log(f"预测峰值内存预留: {plan['peak_mem_gb']:g} GB, 实际: {self.pool.peak_mem_gb:g} GB")
+        if accuracy['jobs_compared']:
+            self._log(f"作业耗时预测误差: 平均 {accuracy['time_mape']:.0%}, "
+                      f"{accuracy['time_within_50pct']:.0%} 在 ±50% 以内（{accuracy['jobs_compared']} 个作业）")
+            self._log(f"预计失败 {accuracy['expected_failures']:.1f} 个, 实际 {accuracy['actual_failures']} 个 "
+                      f"(Brier {accuracy['brier']:.3f})")
+        self._log("=" * 60)
+        for cell in cells:
+            self._log(f"汇总文件: {cell.summary_file}")
+        self._log(f"日志文件: {self.log_file}")
+
+        return {
+            'total': total,
+            'success': success,
+            'failed': failed,
+            'skipped': skipped,
+            'cancelled': cancelled,
+            'interrupted': interrupted,
+            'not_started': not_started,
+            'cache_hits': cache_hits,
+            'shared': shared,
+            'makespan_sec': round(makespan, 2),
+            'serial_time_sec': round(serial_time, 2),
+            'predicted_makespan_sec': plan['makespan_sec'],
+            'predicted_peak_mem_gb': plan['peak_mem_gb'],
+            'predicted_failures': plan['expected_failures'],
+            'results': results
+        }
+
+
+def add_spec_arguments(parser):
+    """扫描范围参数（矩阵文件或 模式 × APK × 超时倍数 × 调用图，work_queue / sweep_planner 共用）"""
+    parser.add_argument('--matrix', type=Path, default=None, metavar='SPEC.json',
+                        help='实验矩阵定义（JSON），给出时忽略 --modes / --apks / --timeout-multipliers / --callgraphs')
+    parser.add_argument('--modes', nargs='+', choices=list(MODE_FLAGS), default=['full'],
+                        help='运行模式（默认 full）')
+    parser.add_argument('--apks', nargs='*', default=[],
+                        help='只分析这些 APK（不含 .apk 后缀），默认全部')
+    parser.add_argument('--timeout-multipliers', nargs='+', type=int, default=[1],
+                        help='超时倍数（默认 1）')
+    parser.add_argument('--callgraphs', nargs='+', choices=CALLGRAPH_CHOICES, default=[CALLGRAPH_ALGORITHM],
+                        help=f'调用图算法（默认 {CALLGRAPH_ALGORITHM}）')
+    parser.add_argument('--blacklist', nargs='*', default=[],
+                        help='黑名单 APK（不含 .apk 后缀）')
+
+
+def spec_from_args(args, name: str) -> MatrixSpec:
+    """把 add_spec_arguments 解析出的参数转换为 MatrixSpec（无 --matrix 时以 name 命名）"""
+    if args.matrix:
+        spec = MatrixSpec.from_file(args.matrix)
+    else:
+        spec = MatrixSpec(name=name, apks=args.apks or None, modes=args.modes,
+                          timeout_multipliers=args.timeout_multipliers, callgraphs=args.callgraphs)
+    spec.blacklist = list(dict.fromkeys(spec.blacklist + args.blacklist))
+    return spec
+
+
+def add_engine_arguments(parser):
+    """并发、缓存、调度和预算相关的命令行参数（各前端共用）"""
+    parser.add_argument('--jobs', type=int, default=1,
+                        help='最大并发 JVM 数（默认 1，即串行）')
+    parser.add_argument('--heap', default='auto',
+                        help=f'每个 JVM 的 -Xmx；auto（默认）按历史峰值和 dex 大小预测，上限 {MAX_MEM}')
+    parser.add_argument('--mem-budget', default=HOST_MEM_BUDGET,
+                        help=f'主机内存预算，并发 JVM 堆之和上限（默认 {HOST_MEM_BUDGET}）')
+    parser.add_argument('--cores', type=int, default=HOST_CORES,
+                        help=f'主机可用核数（默认 {HOST_CORES}）')
+    parser.add_argument('--job-cores', type=int, default=JOB_CORES,
+                        help=f'每个 JVM 预留的核数（默认 {JOB_CORES}）')
+    parser.add_argument('--force', action='store_true',
+                        help='忽略结果缓存，强制重新分析所有 APK')
+    parser.add_argument('--sample-interval', type=float, default=SAMPLE_INTERVAL,
+                        help=f'进程资源采样间隔秒数（默认 {SAMPLE_INTERVAL}）')
+    parser.add_argument('--schedule', choices=['ljf', 'alpha'], default='ljf',
+                        help='作业顺序：ljf 按历史耗时最长优先（默认），alpha 按名称')
+    parser.add_argument('--phase-budget', nargs='*', default=[], metavar='PHASE=SEC',
+                        help='阶段墙钟预算，超出即终止（阶段: manifest soot_setup callgraph source_sink dataflow results）')
+    parser.add_argument('--rss-budget', default=None,
+                        help='进程树 RSS 预算（如 100g），超出即终止')
+    parser.add_argument('--deadline', type=float, default=None, metavar='SEC',
+                        help='整次运行的墙钟上限，到期后终止运行中的作业并写出部分结果')
+    parser.add_argument('--cgroup', action='store_true',
+                        help='每个 JVM 放入独立的 cgroup v2（memory.max / cpu.max），按 cgroup 计量')
+    parser.add_argument('--cgroup-parent', type=Path, default=CGROUP_PARENT,
+                        help=f'已委派的父 cgroup（默认 {CGROUP_PARENT}）')
+    parser.add_argument('--compress', choices=['gzip', 'zstd', 'none'], default=compressed_io.DEFAULT_CODEC,
+                        help=f'结果 XML 和日志的压缩算法（默认 {compressed_io.DEFAULT_CODEC}；zstd 需要 zstandard 包）')
+    parser.add_argument('--object-store', default=str(OBJECT_STORE), metavar='DIR',
+                        help=f'结果 XML 和日志的内容寻址对象库（默认 {OBJECT_STORE}）；none 时保留在运行目录')
+    parser.add_argument('--launcher', default=None, metavar='CMD',
+                        help='替代 "java -Xmx -jar <jar>" 的启动命令（如 "python3 scripts/stub_flowdroid.py"）；'
+                             '需要用 FLOWDROID_OUTPUT_BASE 指定单独的输出目录，且不读写结果缓存')
+
+
+def engine_kwargs(args) -> Dict:
+    """把 add_engine_arguments 解析出的参数转换为 FlowDroidEngine 的关键字参数"""
+    if args.launcher and OUTPUT_BASE == DEFAULT_OUTPUT_BASE:
+        raise ValueError(f"--launcher 需要用 FLOWDROID_OUTPUT_BASE 指定 {DEFAULT_OUTPUT_BASE} 以外的输出目录")
+    return dict(
+        jobs=args.jobs,
+        heap=args.heap,
+        mem_budget=args.mem_budget,
+        cores=args.cores,
+        job_cores=args.job_cores,
+        sample_interval=args.sample_interval,
+        force=args.force,
+        schedule=args.schedule,
+        phase_budgets=parse_budgets(args.phase_budget),
+        rss_budget=args.rss_budget,
+        cgroup=args.cgroup,
+        cgroup_parent=args.cgroup_parent,
+        deadline=args.deadline,
+        compress=args.compress,
+        launcher=args.launcher,
+        object_store=None if args.object_store == 'none' else Path(args.object_store)
+    )
+
+
+def timestamp() -> str:
+    return datetime.now().strftime("%Y%m%d-%H%M")
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+FlowDroid 并发执行池
+按主机内存预算和 CPU 核数准入作业，多个 JVM 同时运行时不超配
+"""
+
+import asyncio
+import re
+from contextlib import asynccontextmanager
+
+
+def parse_mem_gb(value: str) -> float:
+    """
+    将 JVM 风格的内存字符串转换为 GB
+
+    Args:
+        value: 如 "180g"、"512m"、"64G"、"32"（无单位按 GB 处理）
+
+    Returns:
+        以 GB 为单位的浮点数
+    """
+    match = re.fullmatch(r'\s*([\d.]+)\s*([kKmMgGtT]?)[bB]?\s*', str(value))
+    if not match:
+        raise ValueError(f"无法解析内存大小: {value}")
+    number = float(match.group(1))
+    unit = match.group(2).lower()
+    factor = {'k': 1 / (1024 * 1024), 'm': 1 / 1024, 'g': 1, 't': 1024, '': 1}[unit]
+    return number * factor
+
+
+def format_mem(gb: float) -> str:
+    """将 GB 数值格式化为 -Xmx 可接受的字符串（整数 GB 用 g，否则用 m）"""
+    if float(gb).is_integer():
+        return f"{int(gb)}g"
+    return f"{int(round(gb * 1024))}m"
+
+
+class AsyncMemoryBudgetPool:
+    """
+    内存 / 核数预算池（asyncio）
+
+    每个作业在启动前预留其 JVM 堆大小和核数，只有当所有运行中作业的预留总和
+    不超过主机预算时才放行。单个作业的预留超过整个预算时，在池空闲时独占运行，
+    避免永久阻塞。等待中的作业按到达顺序被唤醒后重新检查预算。
+    asyncio.Condition 绑定首次使用它的事件循环，每次 asyncio.run 需新建一个池。
+    """
+
+    def __init__(self, mem_budget_gb: float, max_cores: int):
+        self.mem_budget_gb = mem_budget_gb
+        self.max_cores = max_cores
+        self.used_mem_gb = 0.0
+        self.used_cores = 0
+        self.running = 0
+        self.peak_mem_gb = 0.0     # 运行期间的最大预留之和（与 sweep 预测比较）
+        self.peak_running = 0
+        self._cond = asyncio.Condition()
+
+    def _fits(self, mem_gb: float, cores: int) -> bool:
+        if self.running == 0:
+            return True
+        return (self.used_mem_gb + mem_gb <= self.mem_budget_gb
+                and self.used_cores + cores <= self.max_cores)
+
+    async def acquire(self, mem_gb: float, cores: int = 1):
+        """等待直到预算允许该作业运行"""
+        async with self._cond:
+            await self._cond.wait_for(lambda: self._fits(mem_gb, cores))
+            self.used_mem_gb += mem_gb
+            self.used_cores += cores
+            self.running += 1
+            self.peak_mem_gb = max(self.peak_mem_gb, self.used_mem_gb)
+            self.peak_running = max(self.peak_running, self.running)
+
+    async def release(self, mem_gb: float, cores: int = 1):
+        """归还预留并唤醒等待的作业"""
+        async with self._cond:
+            self.used_mem_gb -= mem_gb
+            self.used_cores -= cores
+            self.running -= 1
+            self._cond.notify_all()
+
+    @asynccontextmanager
+    async def reserve(self, mem_gb: float, cores: int = 1):
+        """async with 语句形式的 acquire / release"""
+        await self.acquire(mem_gb, cores)
+        try:
+            yield
+        finally:
+            await self.release(mem_gb, cores)
@@ -1,97 +1,95 @@
 #!/usr/bin/env python3
 """
 生成 FlowDroid 分析结果综合表格
+（查询 results_store 结果库，覆盖所有运行，包括重试和阶梯）
 """
 
-import csv
+import time
 from pathlib import Path
-from collections import defaultdict
 
-# 配置
-OUTPUT_BASE = Path.home() / "LDFA-dataset/TaintBench/output"
-APK_DIR = Path.home() / "LDFA-dataset/TaintBench/apks"
+from flowdroid_engine import APK_DIR, OUTPUT_BASE, RunConfig
+from results_store import PHASE_COLUMNS, ResultsStore, config_label
 
-# 定义输出目录模式
-MODE_PATTERNS = {
-    'full (1x)': '*39apps-max-precision',
-    'ne (1x)': '*39apps-no-exceptions',
-    'ns (1x)': '*39apps-no-static', 
-    'ne_ns (1x)': '*39apps-no-exception-no-static',
-}
 
-# 读取所有 APK 列表
-all_apks = sorted([f.stem for f in APK_DIR.glob("*.apk")])
+def cell_text(row) -> str:
+    """表格单元格：✓ 成功 / ✗ (退出码) 失败 / ○ 黑名单 / ⊘ 被中断"""
+    if row is None:
+        return '-'
+    if row['status'] == 'SUCCESS':
+        return '✓ (重试)' if row['kind'] in ('retry', 'ladder') else '✓'
+    if row['status'] == 'SKIPPED':
+        return '○ (黑名单)'
+    if row['status'] == 'CANCELLED':
+        return '⊘ (中断)'
+    exit_code = row['exit_code'] if row['exit_code'] is not None else ''
+    return f'✗ ({exit_code})'
 
-# 存储结果
-results = {}
 
-for apk in all_apks:
-    results[apk] = {
-        'path': str(APK_DIR / f"{apk}.apk"),
-        'full (1x)': '-',
-        'ne (1x)': '-',
-        'ns (1x)': '-',
-        'ne_ns (1x)': '-',
-    }
+def main():
+    start = time.time()
+    store = ResultsStore()
+    store.ingest()
 
-# 读取各模式的结果
-for mode, pattern in MODE_PATTERNS.items():
-    # 找到匹配的目录（取最新的）
-    matching_dirs = sorted(OUTPUT_BASE.glob(pattern), reverse=True)
-    if not matching_dirs:
-        continue
-    
-    # 使用最新的非 retry 目录
-    for dir_path in matching_dirs:
-        if 'retry' not in str(dir_path):
-            csv_file = dir_path / "results_summary.csv"
-            break
-    else:
-        # 如果都包含 retry，使用第一个
-        csv_file = matching_dirs[0] / "results_summary.csv"
-    
-    if not csv_file.exists():
-        continue
-    
-    # 读取 CSV
-    with open(csv_file, 'r') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            apk_name = row['apk_name']
-            status = row['status']
-            
-            if apk_name in results:
-                if status == 'SUCCESS':
-                    results[apk_name][mode] = '✓'
-                elif status == 'FAILED':
-                    # 显示退出码
-                    exit_code = row.get('exit_code', '')
-                    results[apk_name][mode] = f'✗ ({exit_code})'
-                elif status == 'SKIPPED':
-                    results[apk_name][mode] = '○ (黑名单)'
+    configs = store.configs()
+    labels = [config_label(c['mode'], c['timeout_multiplier'], c['callgraph'], c['source_sink'], c['jar'])
+              for c in configs]
+    effective = store.effective()
+    all_apks = sorted({f.stem for f in APK_DIR.glob("*.apk")} | set(effective))
 
-# 生成 Markdown 表格
-output = []
-output.append("# FlowDroid TaintBench 分析结果综合表格\n")
-output.append("## 配置说明\n")
-output.append("- **1x**: 原始超时设置 (CT=600s, DT=1800s, RT=120s)")
-output.append("- **✓**: 成功")
-output.append("- **✗ (-9)**: 失败 (内存不足, SIGKILL)")
-output.append("- **○ (黑名单)**: 已跳过\n")
-output.append("| APK | APK 路径 | Full (1x) | ne (1x) | ns (1x) | ne_ns (1x) |")
-output.append("|-----|----------|-----------|---------|---------|------------|")
+    # 生成 Markdown 表格
+    output = []
+    output.append("# FlowDroid TaintBench 分析结果综合表格\n")
+    output.append("## 配置说明\n")
+    for mult in sorted({c['timeout_multiplier'] for c in configs}):
+        ct, dt, rt = RunConfig(mode='full', timeout_multiplier=mult).timeouts
+        output.append(f"- **{mult}x**: {'原始' if mult == 1 else f'{mult} 倍'}超时设置 (CT={ct}s, DT={dt}s, RT={rt}s)")
+    output.append("- **✓**: 成功；**✓ (重试)**: 在重试或精度阶梯运行中成功")
+    output.append("- **✗ (-9)**: 失败 (内存不足, SIGKILL)")
+    output.append("- **○ (黑名单)**: 已跳过")
+    output.append("- **⊘ (中断)**: 运行被取消或超过 deadline")
+    output.append("- 同一 APK 同一配置有多次运行时，任一次成功即记为成功，否则取最新一次\n")
+    output.append("| APK | APK 路径 | " + " | ".join(labels) + " |")
+    output.append("|-----|----------|" + "|".join("-" * (len(label) + 2) for label in labels) + "|")
 
-for apk in sorted(results.keys()):
-    r = results[apk]
-    apk_path_short = r['path'].replace(str(Path.home()), '~')
-    output.append(f"| {apk} | `{apk_path_short}` | {r['full (1x)']} | {r['ne (1x)']} | {r['ns (1x)']} | {r['ne_ns (1x)']} |")
+    for apk in all_apks:
+        apk_path_short = str(APK_DIR / f"{apk}.apk").replace(str(Path.home()), '~')
+        cells = [cell_text(effective.get(apk, {}).get(label)) for label in labels]
+        output.append(f"| {apk} | `{apk_path_short}` | " + " | ".join(cells) + " |")
 
-# 保存到文件
-output_file = OUTPUT_BASE / "COMPREHENSIVE_SUMMARY.md"
-with open(output_file, 'w') as f:
-    f.write('\n'.join(output))
+    breakdown = store.phase_breakdown()
+    if breakdown:
+        output.append("\n## 各阶段耗时\n")
+        output.append("成功作业的平均秒数；调用图 / 数据流 / 路径重建为 FlowDroid 报告值（缺失时为日志跟踪值），"
+                      "其余为日志跟踪的墙钟时间，JVM 启动为进程启动到第一行日志\n")
+        output.append("| 配置 | 作业数 | " + " | ".join(name for _, name in PHASE_COLUMNS) + " | 总计 |")
+        output.append("|------|--------|" + "|".join("-" * (len(name) + 2) for _, name in PHASE_COLUMNS) + "|------|")
+        for label in labels:
+            phases = breakdown.get(label)
+            if phases is None:
+                continue
+            cells = [f"{phases[column]:.1f}" if phases[column] is not None else 'N/A'
+                     for column, _ in PHASE_COLUMNS + [('total_sec', '')]]
+            output.append(f"| {label} | {phases['n']} | " + " | ".join(cells) + " |")
 
-print(f"综合表格已生成: {output_file}")
-print("\n表格预览:")
-print('\n'.join(output[:20]))  # 显示前 20 行
-print("... (完整内容见文件)")
+    output.append("\n## 运行记录\n")
+    output.append("| 运行目录 | 类型 | 配置 | 成功 | 失败 | 跳过 | 中断 |")
+    output.append("|----------|------|------|------|------|------|------|")
+    for run in store.run_counts():
+        label = (config_label(run['mode'], run['timeout_multiplier'], run['callgraph'],
+                              run['source_sink'], run['jar']) if run['mode'] else '-')
+        output.append(f"| `{run['path']}` | {run['kind']} | {label} | {run['success'] or 0} | "
+                      f"{run['failed'] or 0} | {run['skipped'] or 0} | {run['cancelled'] or 0} |")
+
+    # 保存到文件
+    output_file = OUTPUT_BASE / "COMPREHENSIVE_SUMMARY.md"
+    with open(output_file, 'w') as f:
+        f.write('\n'.join(output) + '\n')
+
+    print(f"综合表格已生成: {output_file} ({time.time() - start:.3f}s)")
+    print("\n表格预览:")
+    print('\n'.join(output[:20]))  # 显示前 20 行
+    print("... (完整内容见文件)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+TaintBench 真实标注评估（所有 APK × 模式 × 运行，一次并行完成）
+把结果库中选定运行目录（单元格）的每个作业与 findings/*_findings.json 对照，
+在进程池中逐个流式读取结果 XML，输出一张整洁表：每个 (运行, APK) 一行的 TP / FN / FP、召回率和精确率。
+
+两种匹配方式（--match）：
+  statement  默认。finding 的 source、sink IR 语句经 jimple_ir 规范化（局部变量重命名）后，
+             连同所在方法与同一个 FlowDroid Result 中的 Source / Sink 语句键相同即视为检出
+  signature  与 callgraph_report.py 相同：source、sink 方法签名出现在同一个 Result 中即视为检出
+             （同一 API 的任一调用点都算，会多计）
+按 finding 计数：
+  TP  检出的真实泄露（isNegative 为 false）
+  FN  未检出的真实泄露（作业失败时全部计为 FN）
+  FP  检出的 isNegative finding（TaintBench 标注的非泄露）；未标注的 FlowDroid 结果不计入
+  precision = TP / (TP + FP)，recall = TP / (TP + FN)
+相同内容的结果 XML（缓存命中、单元格间共享、对象库中的同一对象）只读取一次。
+"""
+
+import csv
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Hashable, List, Optional, Set, Tuple
+
+import compressed_io
+from callgraph_report import FINDINGS_DIR, _signature
+from flowdroid_engine import OUTPUT_BASE
+from jimple_ir import FlowStatementIndex, taintbench_keys
+from results_reader import READ_ERRORS, flow_pairs, read_results
+from results_store import ResultsStore, config_label
+
+Pair = Tuple[Hashable, Hashable]  # (source 键, sink 键)：签名或 jimple_ir 语句键
+Finding = List[Pair]             # 一个 finding 的候选键对，任一出现在结果中即检出
+MATCH_MODES = ('statement', 'signature')
+
+COLUMNS = ['run', 'mode', 'timeout_multiplier', 'callgraph', 'config', 'apk', 'match', 'status',
+           'tp', 'fn', 'fp', 'positives', 'negatives', 'detected_pairs', 'recall', 'precision']
+
+
+def _finding_keys(finding: Dict, match: str) -> Finding:
+    """一个 finding 的候选 (source, sink) 键对"""
+    if match == 'signature':
+        return [(_signature(finding['source']['IRs'][0]['IRstatement']),
+                 _signature(finding['sink']['IRs'][0]['IRstatement']))]
+    sinks = taintbench_keys(finding['sink'])
+    return [(source, sink) for source in taintbench_keys(finding['source']) for sink in sinks]
+
+
+def load_findings(findings_dir: Path = FINDINGS_DIR,
+                  match: str = 'statement') -> Dict[str, Tuple[List[Finding], List[Finding]]]:
+    """{APK: ([真实泄露的候选键对], [isNegative finding 的候选键对])}，每个 finding 一项"""
+    findings = {}
+    for path in sorted(findings_dir.glob("*_findings.json")):
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        positives, negatives = [], []
+        for finding in data['findings']:
+            if not finding['source']['IRs'] or not finding['sink']['IRs']:
+                continue
+            (negatives if finding.get('isNegative') else positives).append(_finding_keys(finding, match))
+        findings[path.name[:-len("_findings.json")]] = (positives, negatives)
+    return findings
+
+
+def _detected(task: Tuple[str, str]) -> Tuple[str, Optional[Set[Pair]]]:
+    """进程池任务：结果 XML 中的 (source, sink) 键对；读取失败时为 None"""
+    xml_file, match = task
+    try:
+        if match == 'signature':
+            return xml_file, flow_pairs(Path(xml_file))
+        return xml_file, FlowStatementIndex(read_results(Path(xml_file), access_paths=False,
+                                                         taint_paths=False)).pairs
+    except READ_ERRORS:
+        return xml_file, None
+
+
+def select_jobs(store: ResultsStore, runs: List[str]) -> List:
+    """
+    选定运行目录中已完成（SUCCESS / FAILED）的作业
+
+    runs 为相对 OUTPUT_BASE 的路径，包含其下的所有单元格；为空时选择所有运行
+    """
+    rows = store.query(
+        "SELECT j.apk, j.status, j.leaks, r.path, r.mode, r.timeout_multiplier, r.callgraph, r.source_sink, r.jar "
+        "FROM jobs j JOIN runs r ON r.id = j.run_id "
+        "WHERE j.status IN ('SUCCESS', 'FAILED') ORDER BY r.path, j.apk")
+    if not runs:
+        return rows
+    prefixes = tuple(run.rstrip('/') + '/' for run in runs)
+    return [row for row in rows if row['path'] in runs or row['path'].startswith(prefixes)]
+
+
+def evaluate(jobs: List, findings: Dict[str, Tuple[List[Finding], List[Finding]]],
+             output_base: Path = OUTPUT_BASE, workers: int = os.cpu_count() or 1,
+             match: str = 'statement') -> List[Dict]:
+    """
+    在进程池中读取所有成功作业的结果并与标注对照（findings 须由相同 match 的 load_findings 得到）
+
+    Returns:
+        每个 (运行, APK) 一行（COLUMNS）；没有标注的 APK 跳过
+    """
+    xml_files: Dict[Tuple[str, str], str] = {}
+    empty: Set[Tuple[str, str]] = set()
+    for row in jobs:
+        if row['apk'] in findings and row['status'] == 'SUCCESS':
+            path = output_base / row['path'] / f"{row['apk']}_results.xml"
+            real = compressed_io.resolve(path)
+            # 与 results_reader.success_pairs 相同：没有泄露时 FlowDroid 不写结果文件，检出为空集
+            if real is None and row['leaks'] == 0:
+                empty.add((row['path'], row['apk']))
+                continue
+            # 按实际文件去重：共享、缓存或对象库中的同一内容只读一次
+            xml_files[(row['path'], row['apk'])] = os.path.realpath(real) if real else str(path)
+    unique = [(xml_file, match) for xml_file in sorted(set(xml_files.values()))]
+    if workers > 1 and len(unique) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(unique))) as pool:
+            detected = dict(pool.map(_detected, unique, chunksize=max(1, len(unique) // (workers * 4))))
+    else:
+        detected = dict(map(_detected, unique))
+
+    table = []
+    for row in jobs:
+        if row['apk'] not in findings:
+            continue
+        positives, negatives = findings[row['apk']]
+        key = (row['path'], row['apk'])
+        pairs = set() if key in empty else detected.get(xml_files.get(key))
+        status = row['status'] if pairs is not None or row['status'] != 'SUCCESS' else 'UNREADABLE'
+        pairs = pairs or set()
+        tp = sum(1 for keys in positives if any(p in pairs for p in keys))
+        fp = sum(1 for keys in negatives if any(p in pairs for p in keys))
+        table.append({
+            'run': row['path'],
+            'mode': row['mode'],
+            'timeout_multiplier': row['timeout_multiplier'],
+            'callgraph': row['callgraph'],
+            'config': config_label(row['mode'], row['timeout_multiplier'], row['callgraph'],
+                                   row['source_sink'], row['jar']) if row['mode'] else row['path'],
+            'apk': row['apk'],
+            'match': match,
+            'status': status,
+            'tp': tp,
+            'fn': len(positives) - tp,
+            'fp': fp,
+            'positives': len(positives),
+            'negatives': len(negatives),
+            'detected_pairs': len(pairs),
+            'recall': round(tp / len(positives), 4) if positives else None,
+            'precision': round(tp / (tp + fp), 4) if tp + fp else None,
+        })
+    return table
+
+
+def summarize(table: List[Dict]) -> List[Dict]:
+    """按运行目录（单元格）汇总（micro：先加总 TP / FN / FP 再算比率）"""
+    runs: Dict[str, Dict] = {}
+    for row in table:
+        s = runs.setdefault(row['run'], {'run': row['run'], 'config': row['config'], 'apks': 0,
+                                         'success': 0, 'tp': 0, 'fn': 0, 'fp': 0})
+        s['apks'] += 1
+        s['success'] += row['status'] == 'SUCCESS'
+        for key in ('tp', 'fn', 'fp'):
+            s[key] += row[key]
+    for s in runs.values():
+        s['recall'] = s['tp'] / (s['tp'] + s['fn']) if s['tp'] + s['fn'] else None
+        s['precision'] = s['tp'] / (s['tp'] + s['fp']) if s['tp'] + s['fp'] else None
+    return sorted(runs.values(), key=lambda s: s['run'])
+
+
+def _pct(value: Optional[float]) -> str:
+    return f"{value:.1%}" if value is not None else 'N/A'
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='TaintBench 真实标注评估（APK × 模式 × 运行，并行）')
+    parser.add_argument('runs', nargs='*', type=Path,
+                        help=f'运行目录（相对 {OUTPUT_BASE} 或绝对路径，包含其下的单元格；默认所有运行）')
+    parser.add_argument('--findings', type=Path, default=FINDINGS_DIR,
+                        help=f'TaintBench findings 目录（默认 {FINDINGS_DIR}）')
+    parser.add_argument('--match', choices=MATCH_MODES, default='statement',
+                        help='statement: 规范化的 Jimple 语句 + 所在方法（默认）；signature: 只比较方法签名')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='进程数（默认 CPU 核数）')
+    parser.add_argument('--output', type=Path, default=OUTPUT_BASE / "GROUND_TRUTH_EVAL.csv",
+                        help='整洁表（每个运行 × APK 一行）')
+    args = parser.parse_args()
+
+    start = time.time()
+    store = ResultsStore()
+    store.ingest()
+    runs = [str(p.resolve().relative_to(OUTPUT_BASE.resolve())) if p.is_absolute() else str(p).rstrip('/')
+            for p in args.runs]
+    findings = load_findings(args.findings, args.match)
+    table = evaluate(select_jobs(store, runs), findings, workers=args.workers, match=args.match)
+
+    with open(args.output, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=COLUMNS)
+        writer.writeheader()
+        for row in table:
+            writer.writerow({k: '' if v is None else v for k, v in row.items()})
+
+    print(f"匹配: {args.match}; 标注: {len(findings)} 个 APK, 真实泄露 {sum(len(p) for p, _ in findings.values())} 个, "
+          f"非泄露 {sum(len(n) for _, n in findings.values())} 个")
+    print("| 运行 | 配置 | 成功 / APK | TP | FN | FP | 召回率 | 精确率 |")
+    print("|------|------|------------|----|----|----|--------|--------|")
+    for s in summarize(table):
+        print(f"| {s['run']} | {s['config']} | {s['success']}/{s['apks']} | {s['tp']} | {s['fn']} | {s['fp']} | "
+              f"{_pct(s['recall'])} | {_pct(s['precision'])} |")
+    print(f"\n分析结果: {len(table)} 行 -> {args.output} ({time.time() - start:.2f}s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+FlowDroid JVM 堆大小预测
+根据历史峰值内存和 APK dex 大小为每个 APK 选择 -Xmx，
+加安全余量，遇到 OUT_OF_MEMORY 时自动放大；
+曾被 SIGKILL（-9 / 137，OOM killer）杀掉的 APK 至少使用当时的 -Xmx，
+旧记录没有 heap_gb 列时按当时的全局上限（max_heap_gb）计
+"""
+
+import math
+import statistics
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from job_scheduler import dex_size_mb, load_history
+
+MIN_HEAP_GB = 4
+SAFETY_MARGIN = 1.5        # 预测堆 = 历史峰值 × 余量
+OOM_BUMP_FACTOR = 2.0      # JVM 报 OutOfMemoryError 后堆放大倍数
+OOM_REASONS = ("OUT_OF_MEMORY", "CGROUP_OOM")
+KILLED_EXIT_CODES = ("-9", "137")
+# 没有任何峰值记录时，每 MB dex 的预估堆需求（GB）
+DEFAULT_GB_PER_DEX_MB = 1.0
+
+
+class HeapModel:
+    def __init__(self, output_base: Path, mode: Optional[str] = None,
+                 max_heap_gb: float = 180, min_heap_gb: float = MIN_HEAP_GB,
+                 margin: float = SAFETY_MARGIN,
+                 history: Optional[Dict[str, List[Dict]]] = None):
+        """
+        初始化堆大小模型
+
+        Args:
+            output_base: 历史运行目录
+            mode: 当前运行模式，优先使用同模式的历史记录
+            max_heap_gb: 堆上限（原全局 MAX_MEM）
+            min_heap_gb: 堆下限
+            margin: 安全余量倍数
+            history: 已加载的历史记录（多个模型共用时避免重复读取）
+        """
+        self.mode = mode
+        self.max_heap_gb = max_heap_gb
+        self.min_heap_gb = min_heap_gb
+        self.margin = margin
+        self.history = history if history is not None else load_history(output_base)
+        self._apk_paths: Dict[str, Path] = {}
+        self._apk_dirs: List[Path] = []
+        self._gb_per_dex_mb = None
+
+    def _records(self, apk_name: str) -> List[Dict]:
+        records = self.history.get(apk_name, [])
+        same_mode = [r for r in records if r['mode'] == self.mode]
+        return same_mode or records
+
+    def _clamp(self, gb: float) -> int:
+        return int(min(self.max_heap_gb, max(self.min_heap_gb, math.ceil(gb))))
+
+    def register(self, apk_paths: List[Path]):
+        """
+        登记 APK 路径，供拟合 dex 系数时找到有历史记录的 APK
+
+        拟合使用已登记 APK 所在目录中的所有历史 APK，而不只是本次登记的那些：
+        一次扫描整体规划和队列 worker 逐个预测同一个 APK 时得到相同的系数
+        """
+        self._apk_paths.update({p.stem: p for p in apk_paths})
+        dirs = sorted(set(self._apk_dirs) | {p.parent for p in apk_paths})
+        if dirs != self._apk_dirs:
+            self._apk_dirs = dirs
+            self._gb_per_dex_mb = None
+
+    def _find_apk(self, apk_name: str) -> Optional[Path]:
+        if apk_name in self._apk_paths:
+            return self._apk_paths[apk_name]
+        for apk_dir in self._apk_dirs:
+            if (apk_dir / f"{apk_name}.apk").exists():
+                return apk_dir / f"{apk_name}.apk"
+        return None
+
+    def _dex_rate(self) -> float:
+        """用有峰值记录的 APK 拟合每 MB dex 的堆需求"""
+        if self._gb_per_dex_mb is None:
+            rates = []
+            for apk_name, records in self.history.items():
+                peaks = [r['peak_gb'] for r in records if r['peak_gb']]
+                apk_path = self._find_apk(apk_name) if peaks else None
+                if apk_path:
+                    size = dex_size_mb(apk_path)
+                    if size > 0:
+                        rates.append(max(peaks) / size)
+            self._gb_per_dex_mb = statistics.median(rates) if rates else DEFAULT_GB_PER_DEX_MB
+        return self._gb_per_dex_mb
+
+    def predict(self, apk_path: Path) -> Tuple[int, str]:
+        """
+        预测某个 APK 的堆大小
+
+        Returns:
+            (堆 GB, 来源 "history" / "oom" / "killed" / "dex")
+        """
+        self.register([apk_path])
+        records = self._records(apk_path.stem)
+        need = 0.0
+        source = "dex"
+
+        peaks = [r['peak_gb'] for r in records if r['status'] == 'SUCCESS' and r['peak_gb']]
+        if peaks:
+            need = max(peaks) * self.margin
+            source = "history"
+
+        for r in records:
+            if r['status'] != 'FAILED':
+                continue
+            heap = r['heap_gb'] or self.max_heap_gb
+            # 曾在某个堆大小下 OOM：至少放大一次
+            if r['timeout_reason'] in OOM_REASONS:
+                if heap * OOM_BUMP_FACTOR > need:
+                    need = heap * OOM_BUMP_FACTOR
+                    source = "oom"
+            # 没有其他线索的 SIGKILL（precision_ladder 归为 KILLED）：更小的堆不会更好，以当时的堆为下限
+            elif not r['timeout_reason'] and r['exit_code'] in KILLED_EXIT_CODES and heap > need:
+                need = heap
+                source = "killed"
+
+        if not need:
+            need = dex_size_mb(apk_path) * self._dex_rate() * self.margin
+
+        return self._clamp(need), source
+
+    def plan(self, apk_paths: List[Path]) -> Dict[str, Tuple[int, str]]:
+        """预测一组 APK 的堆大小"""
+        self.register(apk_paths)
+        return {p.stem: self.predict(p) for p in apk_paths}
+
+    def bump(self, heap_gb: float) -> int:
+        """OUT_OF_MEMORY 后的下一次堆大小；已达上限时返回原值"""
+        return self._clamp(heap_gb * OOM_BUMP_FACTOR)
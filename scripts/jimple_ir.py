@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Jimple 语句的规范化与语句级匹配
+TaintBench 标注的 IRstatement（如 $r9 = virtualinvoke $r4.<...getSimCountryIso()>()）与 FlowDroid 结果中的
+Statement 属性很少逐字相同：局部变量名（$r9、r27、$stack3）随 Soot 版本和前端而变。只按方法签名匹配又会把
+同一 API 的所有调用点都算作检出。
+
+这里把语句解析为 Statement（语句类型、调用类型、被调用方法 / 字段签名、参数形状、是否有返回值），
+局部变量按出现顺序重命名为 v0、v1、...（alpha 重命名，保留同一语句内的别名关系），常量保持原样；
+再加上所在方法（类名、方法名、参数个数）构成语句键，放进哈希表后每次查找为常数时间。
+
+所在方法的两种写法：
+  FlowDroid   <com.foo.Outer$1: void run()>（Jimple 签名，内部类用 $）
+  TaintBench  className = com.foo.Outer.AnonymousClass1 或 com.foo.Outer，methodName = public void run()
+              （JADX 反编译的 Java 声明，匿名类记为 AnonymousClass<n> 或直接记在外部类上）
+FlowDroid 一侧同时登记内部类本身（$ 换成 .）和最外层类两个键，TaintBench 一侧把 AnonymousClass<n> 还原为 <n>，
+两种记法都能命中。
+"""
+
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import FrozenSet, Iterable, List, Optional, Set, Tuple
+
+# 词法单元：字符串常量、方法 / 字段签名（可含 <init>）、@parameter0 等、数值常量、（带点的）标识符、其他单字符
+TOKEN_RE = re.compile(
+    r'(?P<str>"(?:[^"\\]|\\.)*")'
+    r'|(?P<sig><[\w$.]+: [\w$.\[\]]+ (?:<c?l?init>|[\w$]+)(?:\([^()]*\))?>)'
+    r'|(?P<at>@[\w$]+)'
+    r'|(?P<num>-?\d[\w.]*)'
+    r'|(?P<id>[A-Za-z_$][\w$]*(?:\.[A-Za-z_$][\w$]*)*)'
+    r'|(?P<other>\S)')
+INVOKE_KINDS = ("virtualinvoke", "specialinvoke", "staticinvoke", "interfaceinvoke", "dynamicinvoke")
+# 不是局部变量的无点标识符（关键字和基本类型）
+KEYWORDS = frozenset(INVOKE_KINDS + (
+    "new", "newarray", "newmultiarray", "instanceof", "lengthof", "neg", "cmp", "cmpl", "cmpg",
+    "return", "throw", "goto", "if", "entermonitor", "exitmonitor", "null", "nop", "breakpoint",
+    "tableswitch", "lookupswitch", "case", "default", "class", "methodtype", "methodhandle",
+    "boolean", "byte", "char", "short", "int", "long", "float", "double", "void",
+))
+
+# JADX 给匿名类起的名字（Outer.AnonymousClass1 对应 Jimple 的 Outer$1）
+ANONYMOUS_RE = re.compile(r'\.AnonymousClass(\d+)(?=\.|$)')
+
+MethodKey = Tuple[str, str, int]  # (类名, 方法名, 参数个数)
+
+
+@dataclass(frozen=True)
+class Statement:
+    """
+    规范化的 Jimple 语句
+
+    kind: invoke / assign_invoke / identity / field_read / field_write / assign / return / other
+    invoke: 调用类型（virtualinvoke 等，非调用语句为空）
+    signature: 被调用方法或读写字段的签名（没有时为空）
+    args: 参数形状（局部变量为重命名后的 v<n>，常量原样）
+    result: 调用结果是否赋给变量
+    text: 重命名后的完整语句（其他字段相同、语句其余部分不同的语句由它区分）
+    """
+    __slots__ = ('kind', 'invoke', 'signature', 'args', 'result', 'text')
+    kind: str
+    invoke: str
+    signature: str
+    args: Tuple[str, ...]
+    result: bool
+    text: str
+
+    def __reduce__(self):
+        # 带 __slots__ 的冻结数据类默认无法反序列化（进程池传回语句键时需要）
+        return Statement, tuple(getattr(self, name) for name in self.__slots__)
+
+
+def _split_args(tokens: List[str]) -> Tuple[str, ...]:
+    """括号内的词法单元按顶层逗号切分"""
+    args, current, depth = [], [], 0
+    for token in tokens:
+        if token == ',' and depth == 0:
+            args.append(' '.join(current))
+            current = []
+            continue
+        if token in ('(', '['):
+            depth += 1
+        elif token in (')', ']'):
+            depth -= 1
+        current.append(token)
+    if current:
+        args.append(' '.join(current))
+    return tuple(args)
+
+
+@lru_cache(maxsize=1 << 16)
+def parse_statement(text: str) -> Statement:
+    """解析并规范化一条 Jimple 语句（结果缓存，同一语句只解析一次）"""
+    names = {}
+    tokens: List[str] = []
+    kinds: List[str] = []
+    rendered = []
+    pos = 0
+    for match in TOKEN_RE.finditer(text):
+        kind, token = match.lastgroup, match.group()
+        if kind == 'id' and '.' not in token and token not in KEYWORDS:
+            kind = 'local'
+            token = names.setdefault(token, f"v{len(names)}")
+        if rendered and match.start() > pos:
+            rendered.append(' ')
+        rendered.append(token)
+        pos = match.end()
+        tokens.append(token)
+        kinds.append(kind)
+    canonical = ''.join(rendered)
+
+    assign = next((i for i, t in enumerate(tokens)
+                   if t == '=' and (i + 1 == len(tokens) or tokens[i + 1] != '=')
+                   and (i == 0 or tokens[i - 1] not in ('=', '!', '<', '>', ':'))), -1)
+    identity = any(tokens[i] == ':' and tokens[i + 1] == '=' for i in range(len(tokens) - 1))
+    invoke = next((i for i, t in enumerate(tokens) if t in INVOKE_KINDS), -1)
+    if invoke >= 0:
+        sig = next((i for i in range(invoke + 1, len(tokens)) if kinds[i] == 'sig'), -1)
+        args: Tuple[str, ...] = ()
+        if sig >= 0 and sig + 1 < len(tokens) and tokens[sig + 1] == '(':
+            depth, end = 0, len(tokens)
+            for i in range(sig + 1, len(tokens)):
+                depth += tokens[i] == '('
+                depth -= tokens[i] == ')'
+                if depth == 0:
+                    end = i
+                    break
+            args = _split_args(tokens[sig + 2:end])
+        result = 0 <= assign < invoke
+        return Statement("assign_invoke" if result else "invoke", tokens[invoke],
+                         tokens[sig] if sig >= 0 else "", args, result, canonical)
+
+    signature = next((t for t, k in zip(tokens, kinds) if k == 'sig'), "")
+    if identity:
+        kind = "identity"
+    elif tokens[:1] == ["return"]:
+        kind = "return"
+    elif assign >= 0 and signature:
+        kind = "field_write" if 'sig' in kinds[:assign] else "field_read"
+    elif assign >= 0:
+        kind = "assign"
+    else:
+        kind = "other"
+    return Statement(kind, "", signature, (), assign >= 0, canonical)
+
+
+def jimple_method_keys(signature: Optional[str]) -> FrozenSet[MethodKey]:
+    """FlowDroid 的 Method 属性 -> 所在方法键（内部类本身和最外层类两个）"""
+    if not signature or ': ' not in signature or '(' not in signature:
+        return frozenset()
+    class_name, _, rest = signature[1:-1].partition(': ')
+    name = rest[:rest.index('(')].split()[-1]
+    params = rest[rest.index('(') + 1:rest.rindex(')')]
+    arity = len(params.split(',')) if params.strip() else 0
+    return frozenset({(class_name.replace('$', '.'), name, arity),
+                      (class_name.split('$', 1)[0], name, arity)})
+
+
+def _java_params(params: str) -> int:
+    """Java 参数列表的参数个数（忽略泛型中的逗号）"""
+    depth, count, empty = 0, 1, True
+    for char in params:
+        if char == '<':
+            depth += 1
+        elif char == '>':
+            depth -= 1
+        elif char == ',' and depth == 0:
+            count += 1
+        elif not char.isspace():
+            empty = False
+    return 0 if empty else count
+
+
+def java_method_key(class_name: str, declaration: str) -> Optional[MethodKey]:
+    """TaintBench 的 className + methodName（Java 声明）-> 所在方法键；构造方法为 <init>，静态块为 <clinit>"""
+    if not declaration:
+        return None
+    class_name = ANONYMOUS_RE.sub(r'.\1', class_name)
+    if '(' not in declaration:
+        return (class_name, "<clinit>", 0) if declaration.strip().startswith("static") else None
+    head, _, rest = declaration.partition('(')
+    name = head.split()[-1] if head.split() else ""
+    if name == class_name.rsplit('.', 1)[-1]:
+        name = "<init>"
+    return class_name, name, _java_params(rest[:rest.rfind(')')] if ')' in rest else rest)
+
+
+StatementKey = Tuple[Statement, MethodKey]
+
+
+def flowdroid_keys(statement: Optional[str], method: Optional[str]) -> List[StatementKey]:
+    """FlowDroid 的 Source / Sink（Statement, Method 属性）的所有语句键"""
+    if not statement:
+        return []
+    parsed = parse_statement(statement)
+    return [(parsed, key) for key in jimple_method_keys(method)]
+
+
+def taintbench_keys(location: dict) -> List[StatementKey]:
+    """TaintBench finding 的 source / sink（所有 IRs）的语句键"""
+    method = java_method_key(location.get('className') or "", location.get('methodName') or "")
+    if method is None:
+        return []
+    return [(parse_statement(ir['IRstatement']), method) for ir in location.get('IRs') or []
+            if ir.get('IRstatement')]
+
+
+class FlowStatementIndex:
+    """FlowDroid 结果中 (source 语句键, sink 语句键) 对的哈希索引"""
+
+    def __init__(self, results: Iterable = ()):
+        self.pairs: Set[Tuple[StatementKey, StatementKey]] = set()
+        for result in results:
+            self.add(result)
+
+    def add(self, result) -> None:
+        """登记一个 results_reader.Result"""
+        if result.sink is None:
+            return
+        sinks = flowdroid_keys(result.sink.statement, result.sink.method)
+        for source in result.sources:
+            for source_key in flowdroid_keys(source.statement, source.method):
+                for sink_key in sinks:
+                    self.pairs.add((source_key, sink_key))
+
+    def detects(self, source_keys: List[StatementKey], sink_keys: List[StatementKey]) -> bool:
+        """任一 source 语句键与任一 sink 语句键出现在同一个 Result 中"""
+        return any((s, k) in self.pairs for s in source_keys for k in sink_keys)
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Jimple 语句规范化（调试用）')
+    parser.add_argument('statements', nargs='+', help='Jimple 语句')
+    args = parser.parse_args()
+    for text in args.statements:
+        s = parse_statement(text)
+        print(f"{text}\n  -> {s.text}\n     kind={s.kind} invoke={s.invoke or '-'} signature={s.signature or '-'} "
+              f"args={list(s.args)} result={s.result}")
+
+
+if __name__ == '__main__':
+    main()
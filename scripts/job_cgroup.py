@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+FlowDroid 作业的 cgroup v2 隔离与计量
+每个 JVM 放入独立的子 cgroup，设置 memory.max / cpu.max，
+峰值内存、CPU 时间和 OOM 事件直接读取 cgroup 文件。
+内存超限时内核只会杀掉该 cgroup 内的进程，不会误杀同机的其他作业。
+
+需要一个已委派给当前用户的 cgroup v2 父目录（root 或
+`systemd-run --user --scope -p Delegate=yes ...` 下运行），父目录中不能直接有进程。
+"""
+
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+CGROUP_ROOT = Path("/sys/fs/cgroup")
+DEFAULT_PARENT = CGROUP_ROOT / "flowdroid"
+CPU_PERIOD_USEC = 100000
+# memory.max = 堆 × 该倍数：留出元空间、线程栈、GC 和 JIT 等堆外内存
+MEM_LIMIT_FACTOR = 1.25
+
+_setup_lock = threading.Lock()
+
+
+def _write(path: Path, value: str):
+    with open(path, 'w') as f:
+        f.write(value)
+
+
+def _read_keyed(path: Path) -> Dict[str, int]:
+    """读取 "key value" 每行一对的 cgroup 文件（cpu.stat、memory.events）"""
+    result = {}
+    try:
+        with open(path, 'r') as f:
+            for line in f:
+                key, _, value = line.partition(' ')
+                if value.strip().isdigit():
+                    result[key] = int(value)
+    except OSError:
+        pass
+    return result
+
+
+def _read_int(path: Path) -> Optional[int]:
+    try:
+        with open(path, 'r') as f:
+            value = f.read().strip()
+    except OSError:
+        return None
+    return int(value) if value.isdigit() else None
+
+
+def check_parent(parent: Path = DEFAULT_PARENT) -> Path:
+    """
+    确认父 cgroup 可用并为子 cgroup 开启 memory / cpu 控制器
+
+    Raises:
+        RuntimeError: 不是 cgroup v2、控制器不可用或没有写权限
+    """
+    with _setup_lock:
+        if not (CGROUP_ROOT / "cgroup.controllers").exists():
+            raise RuntimeError(f"{CGROUP_ROOT} 不是 cgroup v2（unified）挂载点")
+        try:
+            parent.mkdir(exist_ok=True)
+            with open(parent / "cgroup.controllers", 'r') as f:
+                available = set(f.read().split())
+            missing = {"memory", "cpu"} - available
+            if missing:
+                raise RuntimeError(f"{parent} 缺少控制器: {', '.join(sorted(missing))}"
+                                   f"（需要在上级 cgroup.subtree_control 中开启）")
+            with open(parent / "cgroup.subtree_control", 'r') as f:
+                enabled = set(f.read().split())
+            if not {"memory", "cpu"} <= enabled:
+                _write(parent / "cgroup.subtree_control", "+memory +cpu")
+        except OSError as e:
+            raise RuntimeError(f"无法使用 cgroup {parent}: {e}") from e
+    return parent
+
+
+class JobCgroup:
+    """
+    单个作业的 cgroup
+
+    用法:
+        cg = JobCgroup(parent, "app_ne_1x-<key>", mem_max_gb=40, cpus=4)
+        proc = subprocess.Popen(cg.wrap(cmd), ...)   # 子进程在 exec 前把自己写入 cgroup.procs
+        ...
+        cg.peak_gb, cg.cpu_time_sec, cg.oom_kills    # 或一次读出: cg.stats()
+        cg.remove()
+
+    创建、读取和删除都是阻塞的文件操作（remove 最多等待 5 秒），在事件循环中须经 asyncio.to_thread 调用。
+    """
+
+    def __init__(self, parent: Path, name: str, mem_max_gb: float, cpus: float):
+        self.path = parent / re.sub(r'[^\w.-]', '_', name)
+        self.mem_max_gb = mem_max_gb
+        self.cpus = cpus
+        if self.path.exists():
+            self.remove()
+        self.path.mkdir()
+        _write(self.path / "memory.max", str(int(mem_max_gb * 1024 ** 3)))
+        # 不允许换出到 swap，否则超限的 JVM 会在 swap 上拖很久而不是被杀掉
+        if (self.path / "memory.swap.max").exists():
+            _write(self.path / "memory.swap.max", "0")
+        # OOM 时整组杀掉，避免只杀掉 JVM 的某个线程组留下半死的进程
+        if (self.path / "memory.oom.group").exists():
+            _write(self.path / "memory.oom.group", "1")
+        _write(self.path / "cpu.max", f"{int(cpus * CPU_PERIOD_USEC)} {CPU_PERIOD_USEC}")
+
+    def wrap(self, cmd: List[str]) -> List[str]:
+        """
+        包装命令：先把 shell 自身写入 cgroup.procs 再 exec 原命令
+
+        这样进程从第一条指令起就在 cgroup 内，也不需要在多线程的父进程里使用 preexec_fn。
+        """
+        return ["sh", "-c", 'echo $$ > "$0" && exec "$@"', str(self.path / "cgroup.procs"), *cmd]
+
+    @property
+    def current_gb(self) -> float:
+        return (_read_int(self.path / "memory.current") or 0) / 1024 ** 3
+
+    @property
+    def peak_gb(self) -> Optional[float]:
+        """memory.peak（内核 5.19+），更早的内核没有该文件时返回 None"""
+        peak = _read_int(self.path / "memory.peak")
+        return peak / 1024 ** 3 if peak is not None else None
+
+    @property
+    def cpu_time_sec(self) -> Optional[float]:
+        usage = _read_keyed(self.path / "cpu.stat").get('usage_usec')
+        return usage / 1e6 if usage is not None else None
+
+    @property
+    def throttled_sec(self) -> float:
+        return _read_keyed(self.path / "cpu.stat").get('throttled_usec', 0) / 1e6
+
+    @property
+    def oom_kills(self) -> int:
+        return _read_keyed(self.path / "memory.events").get('oom_kill', 0)
+
+    def stats(self) -> Dict:
+        """一次读出作业结束时的计量：{'peak_gb', 'cpu_time_sec', 'throttled_sec', 'oom_kills'}"""
+        cpu = _read_keyed(self.path / "cpu.stat")
+        return {
+            'peak_gb': self.peak_gb,
+            'cpu_time_sec': cpu['usage_usec'] / 1e6 if 'usage_usec' in cpu else None,
+            'throttled_sec': cpu.get('throttled_usec', 0) / 1e6,
+            'oom_kills': self.oom_kills,
+        }
+
+    def kill(self):
+        """杀掉 cgroup 内所有进程（cgroup.kill，内核 5.14+）"""
+        if (self.path / "cgroup.kill").exists():
+            try:
+                _write(self.path / "cgroup.kill", "1")
+            except OSError:
+                pass
+
+    def remove(self):
+        """删除 cgroup（先杀掉残留进程，等待其退出）"""
+        self.kill()
+        for _ in range(50):
+            try:
+                self.path.rmdir()
+                return
+            except FileNotFoundError:
+                return
+            except OSError:
+                time.sleep(0.1)
@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+"""
+基于历史记录的批量作业调度
+读取 OUTPUT_BASE 下历史 results_summary.csv 预测每个 APK 的耗时和失败概率，
+按最长预期优先（LJF）排序，并用 LPT 模拟预测并发扫描的 makespan 和峰值内存预留
+"""
+
+import csv
+import heapq
+import re
+import statistics
+import zipfile
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import compressed_io
+
+# 没有任何历史时，每 MB dex 的预估秒数
+DEFAULT_SEC_PER_DEX_MB = 10.0
+# 没有任何同模式历史时的失败概率
+DEFAULT_FAILURE_RATE = 0.2
+# 无历史的 APK 参考 dex 大小最接近的 K 个 APK 的失败率
+FAILURE_NEIGHBOURS = 5
+
+# 输出目录名 -> 模式
+DIR_MODES = {
+    "max-precision": "full",
+    "no-exception-no-static": "ne_ns",
+    "no-exceptions": "ne",
+    "no-static": "ns",
+}
+
+
+def mode_from_dir(dir_name: str) -> Optional[str]:
+    """从输出目录名推断运行模式（兼容普通、重试和阶梯目录）"""
+    ladder = re.match(r'rung\d+-(\w+?)-\d+x$', dir_name)
+    if ladder:
+        return ladder.group(1)
+    for suffix, mode in DIR_MODES.items():
+        if dir_name.endswith(suffix):
+            return mode
+    return None
+
+
+def multiplier_from_dir(dir_name: str) -> int:
+    """从输出目录名推断超时倍数（"-3x-" / "-3x" 形式，无标记时为 1）"""
+    match = re.search(r'(?:^|-)(\d+)x(?:-|$)', dir_name)
+    return int(match.group(1)) if match else 1
+
+
+def _to_float(value: str) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+# 旧版 CSV 的状态把退出码写在括号里，如 "FAILED (exit: 137)"
+LEGACY_STATUS_RE = re.compile(r'^(\w+)\s*\(exit:\s*(-?\d+)\)$')
+
+
+def parse_status(row: Dict[str, str]) -> Tuple[str, Optional[int]]:
+    """CSV 行的 (状态, 退出码)；旧版 "FAILED (exit: 137)" 拆为 FAILED 和 137"""
+    status = (row.get('status') or '').strip()
+    exit_code = _to_float(row.get('exit_code'))
+    legacy = LEGACY_STATUS_RE.match(status)
+    if legacy:
+        status = legacy.group(1)
+        if exit_code is None:
+            exit_code = float(legacy.group(2))
+    return status, int(exit_code) if exit_code is not None else None
+
+
+def _legacy_format(row: Dict[str, str]) -> bool:
+    """最早的 CSV 格式：只有 analysis_time_sec，peak_memory_gb 列实际是 MB"""
+    return 'total_time_sec' not in row and 'analysis_time_sec' in row
+
+
+def row_total_time(row: Dict[str, str]) -> Optional[float]:
+    """作业总耗时（秒）：total_time_sec，旧版为 analysis_time_sec，都没有时为调用图 + 数据流"""
+    total = _to_float(row.get('total_time_sec'))
+    if total is None:
+        total = _to_float(row.get('analysis_time_sec'))
+    if total is None:
+        parts = [_to_float(row.get(k)) for k in ('callgraph_time_sec', 'dataflow_time_sec')]
+        total = sum(p for p in parts if p is not None) or None
+    return total
+
+
+def is_no_result(row: Dict[str, str], run_dir: Path) -> bool:
+    """SUCCESS 行既没有泄露数也没有结果文件：启动即退出的无效"成功"（没有泄露时 FlowDroid 不写结果文件）"""
+    return (_to_float(row.get('leaks_found')) is None
+            and compressed_io.resolve(run_dir / f"{row.get('apk_name')}_results.xml") is None)
+
+
+def row_reported_peak_gb(row: Dict[str, str]) -> Optional[float]:
+    """FlowDroid 报告的堆峰值（GB）；旧版以 MB 记录（peak_memory_mb，或旧格式的 peak_memory_gb 列）的换算为 GB"""
+    peak = _to_float(row.get('peak_memory_gb'))
+    if peak is not None and _legacy_format(row):
+        return peak / 1024
+    if peak is None:
+        mb = _to_float(row.get('peak_memory_mb'))
+        return mb / 1024 if mb is not None else None
+    return peak
+
+
+def row_peak_gb(row: Dict[str, str]) -> Optional[float]:
+    """峰值内存（GB）：FlowDroid 报告的堆峰值，其次为采样的峰值 RSS"""
+    return row_reported_peak_gb(row) or _to_float(row.get('peak_rss_gb'))
+
+
+def load_history(output_base: Path) -> Dict[str, List[Dict]]:
+    """
+    读取所有历史运行的耗时
+
+    Returns:
+        {apk_name: [{'mode', 'multiplier', 'status', 'total_time', 'callgraph_time',
+                     'dataflow_time', 'peak_gb', 'heap_gb', 'exit_code', 'timeout_reason'}]}
+        peak_gb 优先取 FlowDroid 报告的堆峰值，其次取采样得到的峰值 RSS；
+        heap_gb 为旧记录（无该列）时为 None
+    旧版 CSV 按 parse_status / row_total_time / row_peak_gb 统一（"FAILED (exit: 137)"、analysis_time_sec、
+    以 MB 记录的峰值）；无效的"成功"（is_no_result）不提供耗时信息，跳过
+    """
+    history: Dict[str, List[Dict]] = {}
+    for csv_file in sorted(output_base.rglob("results_summary.csv")):
+        mode = mode_from_dir(csv_file.parent.name)
+        multiplier = multiplier_from_dir(csv_file.parent.name)
+        try:
+            with open(csv_file, 'r') as f:
+                rows = list(csv.DictReader(f))
+        except (OSError, csv.Error):
+            continue
+        for row in rows:
+            status, exit_code = parse_status(row)
+            if status not in ('SUCCESS', 'FAILED'):
+                continue
+            if status == 'SUCCESS' and is_no_result(row, csv_file.parent):
+                continue
+            total = row_total_time(row)
+            if not total:
+                continue
+            history.setdefault(row['apk_name'], []).append({
+                'mode': mode,
+                'multiplier': multiplier,
+                'status': status,
+                'total_time': total,
+                'callgraph_time': _to_float(row.get('callgraph_time_sec')),
+                'dataflow_time': _to_float(row.get('dataflow_time_sec')),
+                'peak_gb': row_peak_gb(row),
+                'heap_gb': _to_float(row.get('heap_gb')),
+                'exit_code': str(exit_code) if exit_code is not None else '',
+                'timeout_reason': row.get('timeout_reason', '') or '',
+            })
+    return history
+
+
+_dex_memo: Dict[Tuple[str, int, int], float] = {}
+
+
+def dex_size_mb(apk_path: Path) -> float:
+    """APK 内所有 classes*.dex 解压后的总大小（MB，按路径、大小、修改时间缓存）"""
+    try:
+        st = apk_path.stat()
+    except OSError:
+        return 0.0
+    memo_key = (str(apk_path), st.st_size, st.st_mtime_ns)
+    if memo_key not in _dex_memo:
+        try:
+            with zipfile.ZipFile(apk_path) as zf:
+                size = sum(info.file_size for info in zf.infolist()
+                           if re.fullmatch(r'classes\d*\.dex', info.filename))
+        except (OSError, zipfile.BadZipFile):
+            size = st.st_size
+        _dex_memo[memo_key] = size / 1024 ** 2
+    return _dex_memo[memo_key]
+
+
+class HistoryScheduler:
+    """最长预期优先调度器"""
+
+    def __init__(self, output_base: Path, mode: Optional[str] = None,
+                 history: Optional[Dict[str, List[Dict]]] = None):
+        self.mode = mode
+        self.history = history if history is not None else load_history(output_base)
+
+    def _history_time(self, apk_name: str) -> Optional[float]:
+        """历史耗时中位数，优先使用同一模式的记录"""
+        records = self.history.get(apk_name, [])
+        same_mode = [r for r in records if r['mode'] == self.mode]
+        records = same_mode or records
+        if not records:
+            return None
+        return statistics.median(r['total_time'] for r in records)
+
+    def _sec_per_dex_mb(self, apk_paths: List[Path]) -> float:
+        """用有历史记录的 APK 拟合每 MB dex 的耗时"""
+        rates = []
+        for apk_path in apk_paths:
+            t = self._history_time(apk_path.stem)
+            size = dex_size_mb(apk_path)
+            if t is not None and size > 0:
+                rates.append(t / size)
+        return statistics.median(rates) if rates else DEFAULT_SEC_PER_DEX_MB
+
+    def predict(self, apk_paths: List[Path]) -> Dict[str, Tuple[float, str]]:
+        """
+        预测每个 APK 的耗时
+
+        Returns:
+            {apk_name: (预测秒数, 来源 "history" / "dex")}
+        """
+        rate = None
+        predictions = {}
+        for apk_path in apk_paths:
+            t = self._history_time(apk_path.stem)
+            if t is not None:
+                predictions[apk_path.stem] = (t, "history")
+                continue
+            if rate is None:
+                rate = self._sec_per_dex_mb(apk_paths)
+            predictions[apk_path.stem] = (dex_size_mb(apk_path) * rate, "dex")
+        return predictions
+
+    def order(self, apk_paths: List[Path]) -> Tuple[List[Path], Dict[str, Tuple[float, str]]]:
+        """按预测耗时从长到短排序（同耗时按名称保证稳定）"""
+        predictions = self.predict(apk_paths)
+        ordered = sorted(apk_paths, key=lambda p: (-predictions[p.stem][0], p.stem))
+        return ordered, predictions
+
+
+def _is_time_failure(reason: str) -> bool:
+    """超时类失败（FlowDroid 阶段超时或阶段墙钟预算），更长的超时可能修复"""
+    return reason.endswith("_TIMEOUT") or (reason.startswith("BUDGET_") and reason != "BUDGET_RSS")
+
+
+class FailureModel:
+    """
+    预测 (APK, 模式, 超时倍数) 作业失败的概率
+
+    同一模式的历史记录中：成功记录只在其超时倍数不高于计划倍数时计入，
+    超时类失败只在其超时倍数不低于计划倍数时计入（更短超时下的超时不说明更长超时也会失败），
+    其他失败都计入；概率按 (失败 + 0.5) / (计入次数 + 1) 平滑。
+    没有可用记录的 APK 取 dex 大小最接近的 FAILURE_NEIGHBOURS 个 APK 的平均概率。
+    """
+
+    def __init__(self, output_base: Path, apk_dir: Path,
+                 history: Optional[Dict[str, List[Dict]]] = None):
+        self.apk_dir = apk_dir
+        self.history = history if history is not None else load_history(output_base)
+        self._neighbours: Dict[Tuple[str, int], List[Tuple[float, str, float, List[str]]]] = {}
+
+    def _counts(self, apk_name: str, mode: str, multiplier: int) -> Tuple[int, int, List[str]]:
+        """(计入的失败次数, 计入次数, 失败原因)"""
+        failures, n, reasons = 0, 0, []
+        for r in self.history.get(apk_name, []):
+            if r['mode'] != mode:
+                continue
+            mult = r.get('multiplier', 1)
+            if r['status'] == 'SUCCESS':
+                if mult <= multiplier:
+                    n += 1
+                continue
+            reason = r['timeout_reason'] or (
+                "KILLED" if r['exit_code'] in ('-9', '137') else f"EXIT_{r['exit_code']}")
+            if _is_time_failure(reason) and mult < multiplier:
+                continue
+            failures += 1
+            n += 1
+            reasons.append(reason)
+        return failures, n, reasons
+
+    def _candidates(self, mode: str, multiplier: int) -> List[Tuple[float, str, float, List[str]]]:
+        """有可用记录的 APK: [(dex MB, 名称, 失败概率, 失败原因)]（每个模式 / 倍数只计算一次）"""
+        if (mode, multiplier) not in self._neighbours:
+            candidates = []
+            for name in self.history:
+                f, k, reasons = self._counts(name, mode, multiplier)
+                if k:
+                    candidates.append((dex_size_mb(self.apk_dir / f"{name}.apk"), name,
+                                       (f + 0.5) / (k + 1), reasons))
+            self._neighbours[(mode, multiplier)] = candidates
+        return self._neighbours[(mode, multiplier)]
+
+    def probability(self, apk_path: Path, mode: str, multiplier: int = 1) -> Tuple[float, str, str]:
+        """
+        Returns:
+            (失败概率, 来源 "history" / "dex" / "prior", 最常见的失败原因或空串)
+        """
+        failures, n, reasons = self._counts(apk_path.stem, mode, multiplier)
+        if n:
+            reason = max(set(reasons), key=reasons.count) if reasons else ""
+            return (failures + 0.5) / (n + 1), "history", reason
+
+        size = dex_size_mb(apk_path)
+        candidates = [c for c in self._candidates(mode, multiplier) if c[1] != apk_path.stem]
+        if not candidates:
+            return DEFAULT_FAILURE_RATE, "prior", ""
+        nearest = heapq.nsmallest(FAILURE_NEIGHBOURS, candidates, key=lambda c: (abs(c[0] - size), c[1]))
+        reasons = [r for *_, rs in nearest for r in rs]
+        reason = max(set(reasons), key=reasons.count) if reasons else ""
+        return statistics.mean(c[2] for c in nearest), "dex", reason
+
+
+def simulate_schedule(durations: List[float], slots: int,
+                      mems: Optional[List[float]] = None,
+                      mem_budget: Optional[float] = None) -> Dict:
+    """
+    按给定顺序把作业分配到最早空闲的槽位，模拟并发扫描
+
+    输入已按 LJF 排序时即为 LPT 调度。给出 mems / mem_budget 时同时模拟
+    内存预算准入：正在运行的作业内存之和不超过预算（单个超预算的作业独占运行）。
+
+    Returns:
+        {'makespan', 'peak_mem', 'peak_running', 'starts'}，starts 为各作业的模拟开始时间
+    """
+    slots = max(1, slots)
+    mems = mems or [0.0] * len(durations)
+    budget = mem_budget if mem_budget is not None else float('inf')
+
+    now = 0.0
+    used = 0.0
+    running: List[Tuple[float, float]] = []  # (结束时间, 内存)
+    makespan = 0.0
+    peak_mem = 0.0
+    peak_running = 0
+    starts = []
+    for d, m in zip(durations, mems):
+        while running and (len(running) >= slots or used + m > budget):
+            end, freed = heapq.heappop(running)
+            now = max(now, end)
+            used -= freed
+        # 同一时刻结束的作业先释放，再计入新作业
+        while running and running[0][0] <= now:
+            used -= heapq.heappop(running)[1]
+        heapq.heappush(running, (now + d, m))
+        used += m
+        starts.append(now)
+        makespan = max(makespan, now + d)
+        peak_mem = max(peak_mem, used)
+        peak_running = max(peak_running, len(running))
+    return {'makespan': makespan, 'peak_mem': peak_mem, 'peak_running': peak_running, 'starts': starts}
+
+
+def simulate_makespan(durations: List[float], slots: int,
+                      mems: Optional[List[float]] = None,
+                      mem_budget: Optional[float] = None) -> float:
+    """simulate_schedule 的 makespan"""
+    return simulate_schedule(durations, slots, mems, mem_budget)['makespan']
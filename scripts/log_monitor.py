@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+FlowDroid 日志实时跟踪
+在 JVM 运行期间增量读取日志，识别分析阶段（调用图构建、源汇点查找、数据流求解、结果处理），
+产生进度事件，并按阶段墙钟时间 / RSS 预算判断是否需要提前终止
+"""
+
+import json
+import os
+import re
+import signal
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from proc_sampler import process_tree
+
+# 阶段顺序及进入该阶段的日志标志（只向前推进）
+# startup 为 JVM 启动到第一个阶段标志；serialize 为最后一条分析日志到进程退出（写结果 XML、JVM 退出）
+PHASES = [
+    ("startup", None),
+    ("manifest", re.compile(r'[Pp]arsing (the )?(manifest|resource)|ARSCFileParser|AXmlResourceParser')),
+    ("soot_setup", re.compile(r'Initializing Soot|Loading dex files')),
+    ("callgraph", re.compile(r'Constructing the callgraph|Collecting callbacks')),
+    ("source_sink", re.compile(r'Callgraph construction took|Collecting callbacks and building a callgraph took'
+                               r'|Looking for sources and sinks')),
+    ("dataflow", re.compile(r'found \d+ sources and \d+ sinks|Starting infoflow computation'
+                            r'|Running data flow analysis')),
+    ("results", re.compile(r'Data flow solver took|IFDS problem with .* solved')),
+    ("serialize", re.compile(r'Found \d+ leaks|No results found|[Ss]erializing results')),
+]
+PHASE_NAMES = [name for name, _ in PHASES]
+
+SOURCES_SINKS_RE = re.compile(r'found (\d+) sources and (\d+) sinks')
+LEAKS_RE = re.compile(r'Found (\d+) leaks')
+
+
+def parse_budgets(items: List[str]) -> Dict[str, float]:
+    """解析 "phase=seconds" 形式的阶段预算"""
+    budgets = {}
+    for item in items or []:
+        phase, _, seconds = item.partition('=')
+        if phase not in PHASE_NAMES:
+            raise ValueError(f"未知阶段: {phase}（可选: {', '.join(PHASE_NAMES)}）")
+        budgets[phase] = float(seconds)
+    return budgets
+
+
+def kill_process_tree(pid: int):
+    """杀掉整个进程树（子进程以独立会话启动，pgid 即 pid）"""
+    pids = process_tree(pid)
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+    for p in pids:
+        try:
+            os.kill(p, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+
+
+class LogTailer:
+    """增量读取正在写入的日志文件，只返回完整的行"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.offset = 0
+        self._partial = b''
+
+    def poll(self) -> List[str]:
+        try:
+            with open(self.path, 'rb') as f:
+                f.seek(self.offset)
+                data = f.read()
+        except OSError:
+            return []
+        self.offset += len(data)
+        data = self._partial + data
+        lines = data.split(b'\n')
+        self._partial = lines.pop()
+        return [line.decode('utf-8', errors='replace') for line in lines]
+
+
+class PhaseMonitor:
+    """
+    阶段识别与预算检查
+
+    feed() 处理新日志行并返回产生的事件；check_budget() 返回超出的预算名
+    （"BUDGET_<PHASE>" / "BUDGET_RSS"），未超出时返回 None；进程退出后 finish() 结束最后一个阶段，
+    timings() 给出各阶段墙钟秒数和 JVM 启动到第一行日志的延迟。
+    """
+
+    def __init__(self, apk_name: str, phase_budgets: Optional[Dict[str, float]] = None,
+                 rss_budget_gb: Optional[float] = None):
+        self.apk_name = apk_name
+        self.phase_budgets = phase_budgets or {}
+        self.rss_budget_gb = rss_budget_gb
+        self.start = time.time()
+        self.phase_index = 0
+        self.phase_start = self.start
+        self.first_line_at: Optional[float] = None
+        self.durations: Dict[str, float] = {}
+
+    @property
+    def phase(self) -> str:
+        return PHASE_NAMES[self.phase_index]
+
+    def event(self, event: str, now: float, **detail) -> Dict:
+        return {
+            'time': round(now, 3),
+            'apk': self.apk_name,
+            'event': event,
+            'phase': self.phase,
+            'elapsed_sec': round(now - self.start, 2),
+            **detail,
+        }
+
+    def feed(self, lines: List[str], now: Optional[float] = None) -> List[Dict]:
+        now = now or time.time()
+        events = []
+        if lines and self.first_line_at is None:
+            self.first_line_at = now
+            events.append(self.event('first_output', now))
+        for line in lines:
+            for index in range(len(PHASES) - 1, self.phase_index, -1):
+                pattern = PHASES[index][1]
+                if pattern.search(line):
+                    previous, duration = self.phase, now - self.phase_start
+                    self.durations[previous] = duration
+                    self.phase_index = index
+                    self.phase_start = now
+                    events.append(self.event('phase', now, previous=previous,
+                                              previous_sec=round(duration, 2)))
+                    break
+            match = SOURCES_SINKS_RE.search(line)
+            if match:
+                events.append(self.event('sources_sinks', now, sources=int(match.group(1)),
+                                          sinks=int(match.group(2))))
+            match = LEAKS_RE.search(line)
+            if match:
+                events.append(self.event('leaks', now, leaks=int(match.group(1))))
+        return events
+
+    def finish(self, now: Optional[float] = None) -> List[Dict]:
+        """进程已退出：结束当前阶段，返回 exit 事件"""
+        now = now or time.time()
+        duration = now - self.phase_start
+        self.durations[self.phase] = duration
+        return [self.event('exit', now, previous=self.phase, previous_sec=round(duration, 2))]
+
+    def timings(self) -> Dict[str, float]:
+        """{'jvm_start': JVM 启动到第一行日志, <阶段>: 墙钟秒数}（未出现的阶段不包含）"""
+        timings = {phase: round(sec, 2) for phase, sec in self.durations.items()}
+        if self.first_line_at is not None:
+            timings['jvm_start'] = round(self.first_line_at - self.start, 2)
+        return timings
+
+    def check_budget(self, rss_gb: float, now: Optional[float] = None) -> Optional[str]:
+        now = now or time.time()
+        budget = self.phase_budgets.get(self.phase)
+        if budget is not None and now - self.phase_start > budget:
+            return f"BUDGET_{self.phase.upper()}"
+        if self.rss_budget_gb is not None and rss_gb > self.rss_budget_gb:
+            return "BUDGET_RSS"
+        return None
+
+
+class EventLog:
+    """进度事件的 JSONL 文件（并发作业共用，按行追加）"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def write(self, events: List[Dict]):
+        if not events:
+            return
+        data = ''.join(json.dumps(e, ensure_ascii=False) + '\n' for e in events)
+        with self._lock:
+            with open(self.path, 'a') as f:
+                f.write(data)
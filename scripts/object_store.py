@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+FlowDroid 结果和日志的内容寻址对象库
+多次扫描中大量结果 XML / 日志逐字节相同。作业结束后把它们按未压缩内容的 SHA-256 移入
+OUTPUT_BASE/objects/<h[:2]>/<h>[.gz|.zst]，每个内容只存一份；运行目录只保留 manifest.jsonl，
+记录逻辑文件名到对象的引用。compressed_io.resolve 透明地解析这些引用，读取方不需要改动。
+结果缓存（.cache）的条目同样只保存清单，gc 时与运行目录的引用一起计算。
+
+manifest.jsonl 整行追加写入，并持有 POSIX 记录锁（fcntl.lockf）：本地文件系统上 O_APPEND 的单次写入
+本身不会交错，NFS 上 O_APPEND 不是原子的，只有锁能让多台主机的 worker 串行追加；NFS 没有锁服务时
+仍可能出现残缺的行，读取方（compressed_io.manifest_entries）会跳过这样的行。
+先登记再删除运行目录中的文件，任何时刻逻辑路径都可读。
+删除运行目录后其引用的对象由 gc 回收；最近访问过的对象不回收，避免与正在登记的作业竞争。
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import compressed_io
+from compressed_io import CHUNK_SIZE, MANIFEST
+
+try:
+    import fcntl
+except ImportError:  # 非 POSIX 平台：只依赖整行追加
+    fcntl = None
+
+# migrate 移入对象库的文件（不含压缩后缀；结果缓存条目中为 results.xml / analysis.log）
+STORABLE = ("results.xml", ".log")
+# 不含结果的子目录（对象库本身、work_queue 的 worker 日志）；结果缓存 .cache 的条目同样引用对象
+SKIP_DIRS = ("objects", "workers")
+
+
+def content_digest(path: Path) -> Tuple[str, int]:
+    """逻辑路径的未压缩内容的 (SHA-256, 字节数)，压缩算法不同的相同内容得到相同的摘要"""
+    h = hashlib.sha256()
+    size = 0
+    with compressed_io.open_binary(path) as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            h.update(chunk)
+            size += len(chunk)
+    return h.hexdigest(), size
+
+
+class ObjectStore:
+    """对象库（root 为 objects 目录）"""
+
+    def __init__(self, root: Path):
+        self.root = root
+
+    def _object(self, digest: str) -> Path:
+        return self.root / digest[:2] / digest
+
+    def _register(self, path: Path, obj: Path, digest: str, size: int) -> Dict:
+        """在 path 所在目录的 manifest.jsonl 追加一行"""
+        entry = {'name': path.name, 'object': os.path.relpath(obj, path.parent),
+                 'sha256': digest, 'size': size}
+        with open(path.parent / MANIFEST, 'a') as f:
+            if fcntl is not None:
+                fcntl.lockf(f, fcntl.LOCK_EX)  # 关闭文件时释放（先刷新缓冲再解锁）
+            f.write(json.dumps(entry) + '\n')
+        return entry
+
+    def put(self, path: Path) -> Optional[Dict]:
+        """
+        把逻辑路径 path 的实际文件移入对象库并登记到所在目录的清单
+
+        对象已存在时只刷新其 mtime（gc 按此判断最近使用）并删除本地文件。
+        Returns:
+            清单记录加上 'new'（是否新建了对象）；文件不存在或已在对象库中时返回 None
+        """
+        real = compressed_io.resolve(path)
+        if real is None or real.parent != path.parent:
+            return None
+        digest, size = content_digest(path)
+        obj = compressed_io.resolve(self._object(digest))
+        new = obj is None
+        if not new:
+            os.utime(obj)
+        else:
+            obj = self._object(digest).with_name(digest + compressed_io.codec_suffix(real))
+            obj.parent.mkdir(parents=True, exist_ok=True)
+            tmp = obj.with_name(f".{obj.name}.{os.getpid()}.tmp")
+            try:
+                try:
+                    os.link(real, tmp)
+                except OSError:
+                    shutil.copyfile(real, tmp)
+                os.replace(tmp, obj)
+                # 硬链接保留了原文件的 mtime，刷新后 gc 不会在登记前回收
+                os.utime(obj)
+            except BaseException:
+                tmp.unlink(missing_ok=True)
+                raise
+        entry = self._register(path, obj, digest, size)
+        real.unlink()
+        return {**entry, 'new': new}
+
+    def put_outputs(self, paths: List[Path]) -> List[Dict]:
+        """把作业的输出文件移入对象库（逻辑路径；不存在的跳过）"""
+        return [entry for entry in map(self.put, paths) if entry]
+
+    def link(self, src: Path, dst: Path) -> bool:
+        """让 dst 引用 src 已登记的对象（不复制内容）；src 不在对象库中时返回 False"""
+        entry = compressed_io.manifest_entries(src.parent).get(src.name)
+        obj = compressed_io.resolve(src)
+        # 运行目录中的文件优先于清单，说明尚未移入对象库
+        if entry is None or obj is None or obj.parent == src.parent:
+            return False
+        os.utime(obj)
+        self._register(dst, obj, entry['sha256'], entry['size'])
+        return True
+
+    def objects(self) -> Iterator[Path]:
+        """对象库中的所有对象文件"""
+        if not self.root.exists():
+            return
+        for shard in sorted(self.root.iterdir()):
+            if shard.is_dir():
+                yield from (p for p in sorted(shard.iterdir()) if not p.name.startswith('.'))
+
+
+def manifests(output_base: Path) -> Iterator[Path]:
+    """output_base 下所有运行目录（及结果缓存条目）的 manifest.jsonl"""
+    for manifest in sorted(output_base.rglob(MANIFEST)):
+        if not any(part in SKIP_DIRS for part in manifest.relative_to(output_base).parts[:-1]):
+            yield manifest
+
+
+def references(output_base: Path) -> Tuple[Dict[Path, int], int, int]:
+    """
+    所有清单引用的对象
+
+    Returns:
+        ({对象文件: 引用数}, 引用的逻辑字节数, 指向不存在对象的引用数)
+    """
+    refs: Dict[Path, int] = {}
+    logical = missing = 0
+    for manifest in manifests(output_base):
+        for entry in compressed_io.manifest_entries(manifest.parent).values():
+            obj = Path(os.path.realpath(manifest.parent / entry['object']))
+            if not obj.exists():
+                missing += 1
+                continue
+            refs[obj] = refs.get(obj, 0) + 1
+            logical += entry['size']
+    return refs, logical, missing
+
+
+def gc(output_base: Path, store: ObjectStore, min_age_sec: float = 3600, dry_run: bool = False) -> Dict[str, int]:
+    """
+    删除没有被任何清单引用的对象
+
+    最近 min_age_sec 秒内写入或复用过的对象跳过（作业可能已放入对象、尚未写入清单）。
+    Returns:
+        {'objects', 'referenced', 'removed', 'skipped', 'bytes_freed', 'missing'}
+    """
+    refs, _, missing = references(output_base)
+    now = time.time()
+    stats = {'objects': 0, 'referenced': 0, 'removed': 0, 'skipped': 0, 'bytes_freed': 0, 'missing': missing}
+    for obj in store.objects():
+        stats['objects'] += 1
+        if Path(os.path.realpath(obj)) in refs:
+            stats['referenced'] += 1
+            continue
+        st = obj.stat()
+        if now - st.st_mtime < min_age_sec:
+            stats['skipped'] += 1
+            continue
+        stats['removed'] += 1
+        stats['bytes_freed'] += st.st_size
+        if not dry_run:
+            obj.unlink()
+    if not dry_run and store.root.exists():
+        for shard in store.root.iterdir():
+            if shard.is_dir() and not any(shard.iterdir()):
+                shard.rmdir()
+    return stats
+
+
+def migrate(roots: List[Path], store: ObjectStore, min_age_sec: float = 3600,
+            dry_run: bool = False) -> Dict[str, int]:
+    """
+    把已有运行目录中的结果和日志移入对象库
+
+    最近 min_age_sec 秒内修改过的文件跳过，避免移走正在运行的作业的日志。
+    Returns:
+        {'files', 'skipped', 'new_objects', 'bytes_before'}
+    """
+    now = time.time()
+    stats = {'files': 0, 'skipped': 0, 'new_objects': 0, 'bytes_before': 0}
+    for root in roots:
+        for real in sorted(root.rglob("*")):
+            rel_parts = real.relative_to(root).parts[:-1]
+            # .tmp-*：结果缓存正在写入的条目
+            if (not real.is_file() or real.name.startswith('.')
+                    or any(p in SKIP_DIRS or p.startswith('.tmp-') for p in rel_parts)):
+                continue
+            suffix = compressed_io.codec_suffix(real)
+            logical = real.with_name(real.name[:len(real.name) - len(suffix)])
+            if not logical.name.endswith(STORABLE) or logical.name in compressed_io.APPEND_ONLY:
+                continue
+            st = real.stat()
+            if now - st.st_mtime < min_age_sec:
+                stats['skipped'] += 1
+                continue
+            stats['files'] += 1
+            stats['bytes_before'] += st.st_size
+            if dry_run:
+                continue
+            entry = store.put(logical)
+            if entry and entry['new']:
+                stats['new_objects'] += 1
+    return stats
+
+
+def usage(output_base: Path, store: ObjectStore) -> Dict[str, int]:
+    """对象库的去重效果：引用数、对象数、逻辑字节数（未压缩、按引用计）和实际占用字节数"""
+    refs, logical, missing = references(output_base)
+    stored = sum(obj.stat().st_size for obj in store.objects())
+    return {'references': sum(refs.values()), 'objects': sum(1 for _ in store.objects()),
+            'referenced_objects': len(refs), 'logical_bytes': logical, 'stored_bytes': stored,
+            'missing': missing}
+
+
+def main():
+    import argparse
+
+    from flowdroid_engine import OBJECT_STORE, OUTPUT_BASE
+
+    parser = argparse.ArgumentParser(description='FlowDroid 结果和日志的内容寻址对象库')
+    parser.add_argument('--store', type=Path, default=OBJECT_STORE, help=f'对象库目录（默认 {OBJECT_STORE}）')
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('migrate', help='把已有运行目录中的结果和日志移入对象库')
+    p.add_argument('paths', nargs='*', type=Path, default=[OUTPUT_BASE],
+                   help=f'运行目录或其上级目录（默认 {OUTPUT_BASE}）')
+    p.add_argument('--min-age', type=float, default=60, metavar='MIN',
+                   help='跳过最近 MIN 分钟内修改过的文件（默认 60）')
+    p.add_argument('--dry-run', action='store_true', help='只统计，不移动')
+    p = sub.add_parser('gc', help='删除没有被任何运行目录引用的对象')
+    p.add_argument('--min-age', type=float, default=60, metavar='MIN',
+                   help='跳过最近 MIN 分钟内写入或复用过的对象（默认 60）')
+    p.add_argument('--dry-run', action='store_true', help='只统计，不删除')
+    sub.add_parser('du', help='对象库占用和去重比例')
+    args = parser.parse_args()
+
+    store = ObjectStore(args.store)
+    start = time.time()
+    if args.command == 'migrate':
+        stats = migrate(args.paths, store, args.min_age * 60, args.dry_run)
+        print(f"{'待移入' if args.dry_run else '已移入'} {stats['files']} 个文件"
+              f"（跳过最近修改的 {stats['skipped']} 个）: {stats['bytes_before'] / 1024 ** 2:.1f} MB"
+              + ("" if args.dry_run else f", 新对象 {stats['new_objects']} 个"))
+    elif args.command == 'gc':
+        stats = gc(OUTPUT_BASE, store, args.min_age * 60, args.dry_run)
+        print(f"对象 {stats['objects']} 个, 被引用 {stats['referenced']} 个; "
+              f"{'可回收' if args.dry_run else '已回收'} {stats['removed']} 个 "
+              f"({stats['bytes_freed'] / 1024 ** 2:.1f} MB), 最近使用跳过 {stats['skipped']} 个")
+        if stats['missing']:
+            print(f"警告: {stats['missing']} 个清单记录指向不存在的对象")
+    else:
+        stats = usage(OUTPUT_BASE, store)
+        ratio = stats['logical_bytes'] / stats['stored_bytes'] if stats['stored_bytes'] else 0
+        print(f"引用 {stats['references']} 个, 对象 {stats['objects']} 个（被引用 {stats['referenced_objects']} 个）; "
+              f"逻辑 {stats['logical_bytes'] / 1024 ** 2:.1f} MB -> 实际 {stats['stored_bytes'] / 1024 ** 2:.1f} MB"
+              f"（{ratio:.1f}x）")
+        if stats['missing']:
+            print(f"警告: {stats['missing']} 个清单记录指向不存在的对象")
+    print(f"({time.time() - start:.2f}s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+FlowDroid 精度降级阶梯
+一次扫描内对失败的 APK 依次用更便宜的设置重试（full → ne → ns → ne_ns → 更长超时），
+按 timeout_reason 分类跳过无助于该失败原因的阶梯，最后汇总每个 APK 在哪一级成功
+"""
+
+import csv
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from flowdroid_engine import (
+    APK_DIR, CALLGRAPH_ALGORITHM, OUTPUT_BASE, Cell, FlowDroidEngine, RunConfig, timestamp
+)
+
+# (模式, 超时倍数)，按代价从高到低排列
+DEFAULT_RUNGS: List[Tuple[str, int]] = [
+    ("full", 1),
+    ("ne", 1),
+    ("ns", 1),
+    ("ne_ns", 1),
+    ("ne_ns", 3),
+]
+
+MODE_FLAGS = {
+    "full": set(),
+    "ne": {"-ne"},
+    "ns": {"-ns"},
+    "ne_ns": {"-ne", "-ns"},
+}
+
+# 内存类失败：更长超时无济于事，只有更便宜的模式可能成功
+MEMORY_REASONS = {"OUT_OF_MEMORY", "KILLED", "BUDGET_RSS", "CGROUP_OOM"}
+# 调用图阶段失败：-ne/-ns 不影响调用图构建
+CALLGRAPH_REASONS = {"CALLGRAPH_TIMEOUT", "BUDGET_CALLGRAPH"}
+# 环境类失败：任何阶梯都无法修复
+FATAL_PREFIXES = ("JAVA_VERSION_ERROR", "ERROR")
+
+
+def parse_rung(text: str) -> Tuple[str, int]:
+    """解析 "mode:multiplier" 形式的阶梯定义（倍数可省略，默认 1）"""
+    mode, _, mult = text.partition(':')
+    if mode not in MODE_FLAGS:
+        raise ValueError(f"未知模式: {mode}")
+    return mode, int(mult) if mult else 1
+
+
+def classify_failure(exit_code: int, timeout_reason: str) -> str:
+    """
+    失败分类
+
+    被 SIGKILL 杀掉（-9 / 137）且日志中没有其他线索时，几乎都是 OOM killer，
+    归为 KILLED，按内存类失败处理。
+    """
+    if timeout_reason:
+        return timeout_reason
+    if exit_code in (-9, 137):
+        return "KILLED"
+    return "UNKNOWN"
+
+
+def rung_can_help(rung: Tuple[str, int], attempts: List[Dict]) -> bool:
+    """
+    判断某一阶梯是否可能修复该 APK 之前的失败
+
+    对每次失败的尝试 a：
+      - 内存类失败: 只有标志不是 a 的子集（即在某方面更便宜）的模式才有意义
+      - CALLGRAPH_TIMEOUT: -ne/-ns 不影响调用图构建，只有更长超时有意义
+      - 其他超时 / 未知失败: 模式更便宜或超时更长才有意义
+      - 环境类失败: 停止
+    """
+    mode, mult = rung
+    flags = MODE_FLAGS[mode]
+    for a in attempts:
+        reason = a['reason']
+        a_flags = MODE_FLAGS[a['mode']]
+        if reason.startswith(FATAL_PREFIXES):
+            return False
+        if reason in MEMORY_REASONS:
+            if flags <= a_flags:
+                return False
+        elif reason in CALLGRAPH_REASONS:
+            if mult <= a['multiplier']:
+                return False
+        elif flags <= a_flags and mult <= a['multiplier']:
+            return False
+    return True
+
+
+class PrecisionLadder:
+    def __init__(self, rungs: List[Tuple[str, int]] = None, blacklist: List[str] = None,
+                 callgraph: str = CALLGRAPH_ALGORITHM, **engine_kwargs):
+        """
+        初始化精度阶梯
+
+        Args:
+            rungs: [(模式, 超时倍数)]，第一级对所有 APK 运行，之后只重试失败的
+            blacklist: 需要跳过的 APK 列表
+            callgraph: 调用图算法（各级相同）
+            engine_kwargs: 传给 FlowDroidEngine 的并发 / 缓存等参数（各级共用一个引擎）
+        """
+        self.rungs = rungs or DEFAULT_RUNGS
+        self.blacklist = blacklist or []
+        self.callgraph = callgraph
+
+        self.output_dir = OUTPUT_BASE / f"{timestamp()}-39apps-ladder"
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.summary_file = self.output_dir / "ladder_summary.csv"
+        self.engine = FlowDroidEngine(self.output_dir / "analysis_summary.log", **engine_kwargs)
+
+    def run(self) -> Dict:
+        """运行所有阶梯，返回汇总统计"""
+        pending = [f.stem for f in sorted(APK_DIR.glob("*.apk"))
+                   if f.stem not in self.blacklist]
+        attempts: Dict[str, List[Dict]] = {apk: [] for apk in pending}
+        final: Dict[str, Dict] = {}
+        cancelled = False
+
+        for level, rung in enumerate(self.rungs, 1):
+            mode, mult = rung
+            # 剩余阶梯都无法修复的 APK 不再重试
+            pending = [apk for apk in pending
+                       if any(rung_can_help(r, attempts[apk]) for r in self.rungs[level - 1:])]
+            todo = [apk for apk in pending if rung_can_help(rung, attempts[apk])]
+            if not todo:
+                continue
+
+            cell = Cell(
+                RunConfig(mode=mode, timeout_multiplier=mult, callgraph=self.callgraph),
+                [APK_DIR / f"{apk}.apk" for apk in todo],
+                self.output_dir / f"rung{level}-{mode}-{mult}x"
+            )
+            self.engine._log(f"精度阶梯第 {level}/{len(self.rungs)} 级: {mode} {mult}x, "
+                             f"{len(todo)} 个 APK")
+            result = self.engine.run([cell])
+
+            for r in result['results']:
+                apk = r['apk_name']
+                record = {
+                    'level': level,
+                    'mode': mode,
+                    'multiplier': mult,
+                    'status': r['status'],
+                    'reason': classify_failure(r['exit_code'], r['timeout_reason']),
+                    'total_time': r['total_time'],
+                    'leaks': r['leaks'],
+                    'output_file': r['output_file'],
+                }
+                attempts[apk].append(record)
+                if r['status'] == 'SUCCESS':
+                    final[apk] = record
+
+            # Ctrl-C / deadline：已写出部分结果，不再进入下一级
+            if result['cancelled']:
+                cancelled = True
+                break
+
+            pending = [apk for apk in pending if apk not in final]
+            if not pending:
+                break
+
+        return self._write_summary(attempts, final, cancelled)
+
+    def _write_summary(self, attempts: Dict[str, List[Dict]], final: Dict[str, Dict],
+                       cancelled: bool = False) -> Dict:
+        """
+        写入 ladder_summary.csv，记录每个 APK 最终在哪一级成功
+
+        中断时还没轮到或正在运行的 APK 记为 CANCELLED，不算作失败
+        """
+        statuses = {}
+        for apk, history in attempts.items():
+            if apk in final:
+                statuses[apk] = 'SUCCESS'
+            elif cancelled and (not history or history[-1]['status'] == 'CANCELLED'):
+                statuses[apk] = 'CANCELLED'
+            else:
+                statuses[apk] = 'FAILED'
+        with open(self.summary_file, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow([
+                'apk_name', 'final_status', 'final_rung', 'final_mode',
+                'timeout_multiplier', 'attempts', 'attempt_history',
+                'leaks_found', 'total_time_sec', 'output_file'
+            ])
+            for apk in self.blacklist:
+                writer.writerow([apk, 'SKIPPED', '', '', '', 0, 'BLACKLISTED', '', 0, ''])
+            for apk in sorted(attempts):
+                history = attempts[apk]
+                ok = final.get(apk)
+                writer.writerow([
+                    apk,
+                    statuses[apk],
+                    ok['level'] if ok else '',
+                    ok['mode'] if ok else '',
+                    ok['multiplier'] if ok else '',
+                    len(history),
+                    ';'.join(f"{a['mode']}@{a['multiplier']}x:{a['status'] if a['status'] == 'SUCCESS' else a['reason']}"
+                             for a in history),
+                    ok['leaks'] if ok else 'N/A',
+                    f"{sum(a['total_time'] for a in history):.2f}",
+                    ok['output_file'] if ok else '',
+                ])
+
+        succeeded = [apk for apk in attempts if final.get(apk)]
+        failed = sum(1 for status in statuses.values() if status == 'FAILED')
+        interrupted = sum(1 for status in statuses.values() if status == 'CANCELLED')
+        by_level = {}
+        for apk in succeeded:
+            level = final[apk]['level']
+            by_level[level] = by_level.get(level, 0) + 1
+
+        print("=" * 60)
+        print("精度阶梯完成!")
+        for level, (mode, mult) in enumerate(self.rungs, 1):
+            print(f"  第 {level} 级 {mode} {mult}x: 成功 {by_level.get(level, 0)}")
+        print(f"  最终失败: {failed}")
+        if cancelled:
+            print(f"  已中断：{interrupted} 个 APK 未完成，未进入后续阶梯")
+        print(f"汇总文件: {self.summary_file}")
+        print("=" * 60)
+
+        return {
+            'total': len(attempts),
+            'success': len(succeeded),
+            'failed': failed,
+            'interrupted': interrupted,
+            'skipped': len(self.blacklist),
+            'by_rung': by_level,
+            'cancelled': cancelled,
+        }
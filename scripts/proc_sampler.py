@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+FlowDroid 子进程资源采样
+通过 /proc 周期性读取 JVM 进程树的 RSS 和 CPU 时间，记录峰值和时间序列
+"""
+
+import csv
+import os
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE')
+CLK_TCK = os.sysconf('SC_CLK_TCK')
+
+
+def _read_stat(pid: int) -> Tuple[int, float]:
+    """
+    读取 /proc/<pid>/stat
+
+    Returns:
+        (ppid, cpu 秒数 = utime + stime)
+    """
+    with open(f'/proc/{pid}/stat', 'r') as f:
+        data = f.read()
+    # comm 字段可能包含空格和括号，从最后一个 ')' 之后开始切分
+    fields = data[data.rfind(')') + 2:].split()
+    ppid = int(fields[1])
+    cpu_ticks = int(fields[11]) + int(fields[12])
+    return ppid, cpu_ticks / CLK_TCK
+
+
+def _read_rss(pid: int) -> int:
+    """读取进程 RSS（字节）"""
+    with open(f'/proc/{pid}/statm', 'r') as f:
+        return int(f.read().split()[1]) * PAGE_SIZE
+
+
+def _read_hwm(pid: int) -> int:
+    """读取进程 RSS 峰值 VmHWM（字节），内核记录，不受采样间隔影响"""
+    with open(f'/proc/{pid}/status', 'r') as f:
+        for line in f:
+            if line.startswith('VmHWM:'):
+                return int(line.split()[1]) * 1024
+    return 0
+
+
+def process_tree(root_pid: int) -> List[int]:
+    """返回 root_pid 及其所有后代进程的 pid 列表"""
+    children: Dict[int, List[int]] = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            ppid, _ = _read_stat(int(entry))
+        except (OSError, ValueError, IndexError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+
+    tree = [root_pid]
+    i = 0
+    while i < len(tree):
+        tree.extend(children.get(tree[i], []))
+        i += 1
+    return tree
+
+
+class ProcessSampler:
+    """
+    进程树资源采样器
+
+    sample() 做一次采样，due() 判断距上次采样是否已过 interval，由调用方的等待循环驱动。
+    峰值取各进程 VmHWM（内核记录的 RSS 高水位）之和，采样之间的短暂尖峰也不会漏掉；
+    进程退出后 /proc 中的数据即消失，最后一次采样之后的增长无法观测
+    （需要精确值时使用 --cgroup 的 memory.peak）。
+    """
+
+    def __init__(self, pid: int, interval: float = 1.0):
+        self.pid = pid
+        self.interval = interval
+        self.peak_rss_bytes = 0
+        self.cpu_time_sec = 0.0
+        self.series: List[Tuple[float, float, float]] = []
+        self.last_rss_gb = 0.0
+        self._start = time.time()
+        self._last_sample = 0.0
+
+    def sample(self) -> Tuple[int, float]:
+        """
+        对进程树做一次采样
+
+        Returns:
+            (RSS 字节数, CPU 秒数)；进程已退出时返回 (0, 0.0)
+        """
+        self._last_sample = time.time()
+        rss = 0
+        hwm = 0
+        cpu = 0.0
+        for pid in process_tree(self.pid):
+            try:
+                rss += _read_rss(pid)
+                hwm += _read_hwm(pid)
+                cpu += _read_stat(pid)[1]
+            except (OSError, ValueError, IndexError):
+                continue
+        if rss == 0:
+            return 0, 0.0
+
+        self.last_rss_gb = rss / 1024 ** 3
+        self.peak_rss_bytes = max(self.peak_rss_bytes, rss, hwm)
+        self.cpu_time_sec = max(self.cpu_time_sec, cpu)
+        self.series.append((time.time() - self._start, rss / 1024 ** 3, cpu))
+        return rss, cpu
+
+    def due(self) -> bool:
+        """距上次采样是否已超过采样间隔"""
+        return time.time() - self._last_sample >= self.interval
+
+    @property
+    def peak_rss_gb(self) -> float:
+        return self.peak_rss_bytes / 1024 ** 3
+
+    def write_series(self, path: Path):
+        """将时间序列写入 CSV（elapsed_sec, rss_gb, cpu_sec）"""
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['elapsed_sec', 'rss_gb', 'cpu_sec'])
+            for elapsed, rss_gb, cpu in self.series:
+                writer.writerow([f"{elapsed:.1f}", f"{rss_gb:.3f}", f"{cpu:.1f}"])
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+FlowDroid 结果缓存
+以 APK、Source/Sink 列表、FlowDroid jar 的 SHA-256 以及运行参数为键，
+相同输入的 APK 不再重复分析
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import compressed_io
+from object_store import ObjectStore
+
+CACHE_VERSION = 1
+
+_digest_memo: Dict[Tuple[str, int, int], str] = {}
+_memo_lock = threading.Lock()
+
+
+def file_sha256(path: Path) -> str:
+    """计算文件 SHA-256（按路径、大小、修改时间缓存，同一进程内只读一次）"""
+    stat = path.stat()
+    memo_key = (str(path.resolve()), stat.st_size, stat.st_mtime_ns)
+    with _memo_lock:
+        if memo_key in _digest_memo:
+            return _digest_memo[memo_key]
+
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    digest = h.hexdigest()
+
+    with _memo_lock:
+        _digest_memo[memo_key] = digest
+    return digest
+
+
+def cache_key(apk: Path, source_sink: Path, jar: Path, flags: List[str],
+              callgraph: str, timeouts: Tuple[int, int, int],
+              launcher: Optional[List[str]] = None) -> str:
+    """
+    计算缓存键
+
+    Args:
+        apk: APK 文件
+        source_sink: Source/Sink 列表文件
+        jar: FlowDroid jar
+        flags: 运行模式对应的标志（如 ["-ne", "-ns"]）
+        callgraph: 调用图算法（如 "CHA"）
+        timeouts: (CT, DT, RT) 秒数
+        launcher: 替代 java 的启动命令；真实运行为 None，不进入键（已有缓存仍然有效）
+    """
+    payload = {
+        'version': CACHE_VERSION,
+        'apk': file_sha256(apk),
+        'source_sink': file_sha256(source_sink),
+        'jar': file_sha256(jar),
+        'flags': sorted(flags),
+        'callgraph': callgraph,
+        'timeouts': list(timeouts),
+    }
+    if launcher:
+        payload['launcher'] = list(launcher)
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+class ResultCache:
+    """
+    内容寻址的结果缓存
+
+    目录结构: <cache_dir>/<key[:2]>/<key>/{results.xml, analysis.log, metrics.json}
+    results.xml / analysis.log 保持写入时的压缩后缀（.gz / .zst），复制时不解压。
+    启用对象库时（objects）输出已在对象库中，条目只在 manifest.jsonl 中登记对对象的引用，
+    恢复时同样只登记引用，不保存第二份内容。
+    只缓存成功的运行：失败（如 OOM）与堆大小、机器负载有关，不具备可复现性。
+    """
+
+    def __init__(self, cache_dir: Path, objects: Optional[ObjectStore] = None):
+        self.cache_dir = cache_dir
+        self.objects = objects
+
+    def _entry(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / key
+
+    def lookup(self, key: str) -> Optional[Dict]:
+        """查找缓存，命中时返回缓存的指标，否则返回 None"""
+        metrics_file = self._entry(key) / "metrics.json"
+        if not metrics_file.exists():
+            return None
+        try:
+            with open(metrics_file, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _put(self, src: Path, dst: Path):
+        """dst 引用 src 在对象库中的对象；src 不在对象库中（或未启用对象库）时复制"""
+        if not (self.objects and self.objects.link(src, dst)):
+            compressed_io.copy(src, dst)
+
+    def restore(self, key: str, output_xml: Path, log_file: Path):
+        """将缓存的结果 XML 和日志放到本次运行的输出目录"""
+        entry = self._entry(key)
+        self._put(entry / "results.xml", output_xml)
+        self._put(entry / "analysis.log", log_file)
+
+    def store(self, key: str, output_xml: Path, log_file: Path, metrics: Dict):
+        """写入缓存（先写临时目录再原子重命名，并发写同一键时只保留一份）"""
+        entry = self._entry(key)
+        if entry.exists():
+            return
+        entry.parent.mkdir(parents=True, exist_ok=True)
+        tmp = Path(tempfile.mkdtemp(dir=entry.parent, prefix=".tmp-"))
+        try:
+            # 清单中是相对路径，tmp 与 entry 同级，重命名后引用仍然有效
+            self._put(output_xml, tmp / "results.xml")
+            self._put(log_file, tmp / "analysis.log")
+            with open(tmp / "metrics.json", 'w') as f:
+                json.dump(metrics, f, indent=2)
+            os.rename(tmp, entry)
+        except OSError:
+            shutil.rmtree(tmp, ignore_errors=True)
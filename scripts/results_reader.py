@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+FlowDroid 结果 XML 的流式读取
+开启路径重建或分析大型 APK 时 _results.xml 可达数百 MB，ET.parse 整棵树加上每个 Source 一个字符串字典
+的内存是文件大小的数倍。这里用 iterparse 逐个 <Result> 构造紧凑的记录（带 __slots__ 的数据类），
+处理完立即清除对应的元素，内存占用只与单个 Result 的大小有关；重复出现的方法签名、
+source / sink 定义、类型等字符串用 sys.intern 共享同一个对象。
+
+文件结构（FlowDroid XMLResultsWriter）：
+    <DataFlowResults FileFormatVersion TerminationState>
+      <Results><Result>
+        <Sink Statement Method MethodSourceSinkDefinition>
+          <AccessPath Value Type TaintSubFields><Fields><Field Value Type/>...</Fields></AccessPath>
+        </Sink>
+        <Sources><Source ...同上...><AccessPath .../><TaintPath><PathElement Statement Method>
+          <AccessPath .../></PathElement>...</TaintPath></Source>...</Sources>
+      </Result>...</Results>
+      <PerformanceData><PerformanceEntry Name Value/>...</PerformanceData>
+    </DataFlowResults>
+压缩的、对象库中的结果文件通过 compressed_io 透明读取。
+"""
+
+import sys
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Set, Tuple
+
+import compressed_io
+
+# 读取失败时调用方通常按"没有结果"处理的异常
+READ_ERRORS = (OSError, EOFError, ET.ParseError)
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    return sys.intern(value) if value is not None else None
+
+
+@dataclass(frozen=True)
+class AccessPath:
+    """污点访问路径：变量、类型和字段链 ((字段签名, 类型), ...)"""
+    __slots__ = ('value', 'type', 'taint_sub_fields', 'fields')
+    value: Optional[str]
+    type: Optional[str]
+    taint_sub_fields: bool
+    fields: Tuple[Tuple[str, str], ...]
+
+
+@dataclass(frozen=True)
+class PathElement:
+    """路径重建得到的一步传播（TaintPath 中的 PathElement）"""
+    __slots__ = ('statement', 'method', 'access_path')
+    statement: Optional[str]
+    method: Optional[str]
+    access_path: Optional[AccessPath]
+
+
+@dataclass(frozen=True)
+class Endpoint:
+    """Source 或 Sink：语句、所在方法、匹配的 source / sink 定义、访问路径，以及（仅 Source）重建的路径"""
+    __slots__ = ('statement', 'method', 'definition', 'access_path', 'path')
+    statement: Optional[str]
+    method: Optional[str]
+    definition: Optional[str]
+    access_path: Optional[AccessPath]
+    path: Tuple[PathElement, ...]
+
+
+@dataclass(frozen=True)
+class Result:
+    """一个 <Result>：sink 和到达它的所有 source"""
+    __slots__ = ('sink', 'sources')
+    sink: Optional[Endpoint]
+    sources: Tuple[Endpoint, ...]
+
+
+def _access_path(elem: Optional[ET.Element]) -> Optional[AccessPath]:
+    if elem is None:
+        return None
+    fields = tuple((_intern(f.get('Value')), _intern(f.get('Type'))) for f in elem.iter('Field'))
+    return AccessPath(_intern(elem.get('Value')), _intern(elem.get('Type')),
+                      elem.get('TaintSubFields') == 'true', fields)
+
+
+def _endpoint(elem: ET.Element, access_paths: bool, taint_paths: bool) -> Endpoint:
+    path: Tuple[PathElement, ...] = ()
+    if taint_paths:
+        taint_path = elem.find('TaintPath')
+        if taint_path is not None:
+            path = tuple(PathElement(_intern(p.get('Statement')), _intern(p.get('Method')),
+                                     _access_path(p.find('AccessPath')) if access_paths else None)
+                         for p in taint_path.iter('PathElement'))
+    return Endpoint(_intern(elem.get('Statement')), _intern(elem.get('Method')),
+                    _intern(elem.get('MethodSourceSinkDefinition')),
+                    _access_path(elem.find('AccessPath')) if access_paths else None, path)
+
+
+class ResultsReader:
+    """
+    流式读取一个结果 XML：迭代得到 Result 记录
+
+    termination_state / file_format_version 在开始迭代后即可用，performance 在迭代结束后可用。
+    access_paths / taint_paths 为 False 时不构造访问路径 / 重建路径（只需要 source-sink 对时更快）。
+    文件缺失、截断或损坏时迭代抛出 READ_ERRORS 中的异常。
+    """
+
+    def __init__(self, xml_file: Path, access_paths: bool = True, taint_paths: bool = True):
+        self.xml_file = xml_file
+        self.access_paths = access_paths
+        self.taint_paths = taint_paths
+        self.termination_state: Optional[str] = None
+        self.file_format_version: Optional[str] = None
+        self.performance: Dict[str, str] = {}
+
+    def __iter__(self) -> Iterator[Result]:
+        with compressed_io.open_binary(self.xml_file) as f:
+            parent: Optional[ET.Element] = None
+            for event, elem in ET.iterparse(f, events=('start', 'end')):
+                tag = elem.tag
+                if event == 'start':
+                    if tag == 'DataFlowResults':
+                        self.termination_state = elem.get('TerminationState')
+                        self.file_format_version = elem.get('FileFormatVersion')
+                    elif tag in ('Results', 'PerformanceData'):
+                        parent = elem
+                    continue
+                if tag == 'Result':
+                    sink = elem.find('Sink')
+                    sources = elem.find('Sources')
+                    yield Result(
+                        _endpoint(sink, self.access_paths, self.taint_paths) if sink is not None else None,
+                        tuple(_endpoint(s, self.access_paths, self.taint_paths)
+                              for s in sources.iter('Source')) if sources is not None else ())
+                    # 清空父元素，已处理的 Result 不再被树引用
+                    if parent is not None:
+                        parent.clear()
+                    else:
+                        elem.clear()
+                elif tag == 'PerformanceEntry':
+                    self.performance[elem.get('Name')] = elem.get('Value')
+                    elem.clear()
+
+
+def read_results(xml_file: Path, access_paths: bool = True, taint_paths: bool = True) -> Iterator[Result]:
+    """ResultsReader 的简写"""
+    return iter(ResultsReader(xml_file, access_paths, taint_paths))
+
+
+def flow_pairs(xml_file: Path) -> Set[Tuple[str, str]]:
+    """(source 定义, sink 定义) 对（不构造访问路径和重建路径）"""
+    pairs = set()
+    for result in read_results(xml_file, access_paths=False, taint_paths=False):
+        if result.sink is None:
+            continue
+        for source in result.sources:
+            pairs.add((source.definition, result.sink.definition))
+    return pairs
+
+
+def success_pairs(xml_file: Path, leaks: Optional[int]) -> Optional[Set[Tuple[str, str]]]:
+    """
+    成功作业的 flow_pairs：没有泄露时 FlowDroid 不写结果文件，此时为空集；
+    结果文件应有却缺失或损坏时为 None（这样的"成功"不能当作有效结果）
+    """
+    if leaks == 0 and compressed_io.resolve(xml_file) is None:
+        return set()
+    try:
+        return flow_pairs(xml_file)
+    except READ_ERRORS:
+        return None
+
+
+def performance_data(xml_file: Path) -> Dict[str, str]:
+    """<PerformanceData> 的条目（流式读取，不构造 Result 记录；文件缺失或损坏时为空）"""
+    entries = {}
+    try:
+        with compressed_io.open_binary(xml_file) as f:
+            for _, elem in ET.iterparse(f):
+                if elem.tag == 'PerformanceEntry':
+                    entries[elem.get('Name')] = elem.get('Value')
+                elif elem.tag == 'Result':
+                    elem.clear()
+    except READ_ERRORS:
+        pass
+    return entries
@@ -0,0 +1,416 @@
+#!/usr/bin/env python3
+"""
+FlowDroid 结果库
+把 OUTPUT_BASE 下所有运行目录（普通、重试、阶梯、矩阵、队列）的 results_summary.csv
+和 events.jsonl 增量导入一个 SQLite 数据库，报表脚本直接查询，不再逐个 glob 目录读 CSV。
+
+表结构:
+  runs    每个运行目录（单元格）一行
+          id, path（相对 OUTPUT_BASE）, kind（39apps / retry / ladder / matrix / queue / other）,
+          started（目录名中的时间戳）, mode, timeout_multiplier, callgraph, source_sink, jar,
+          csv_mtime_ns, csv_size（判断是否需要重新导入）, ingested_at
+  jobs    每个 (运行, APK) 一行，对应 CSV 的一行
+          run_id, apk, status, exit_class, leaks, sources, sinks,
+          callgraph_sec, dataflow_sec, result_sec（FlowDroid 报告，缺失时为日志跟踪值）,
+          jvm_start_sec, manifest_sec, soot_setup_sec, source_sink_sec, serialize_sec（日志跟踪）, total_sec,
+          heap_gb, peak_memory_gb, peak_rss_gb, cpu_sec,
+          exit_code, timeout_reason, cache_hit, accounting, output_file
+          缺失或 N/A 的数值为 NULL；exit_class 见 classify_exit()
+  phases  每个 (运行, APK, 阶段) 一行，来自 events.jsonl 的阶段切换和进程退出事件
+          run_id, apk, phase, seconds
+  effective（视图）每个 (APK, 配置) 的代表结果：任一运行成功即取最新的成功，
+          否则取最新的非跳过结果（NO_RESULT 排在真实失败之后）；重试和阶梯运行都参与
+
+导入时统一旧版 CSV 的写法（job_scheduler.parse_status 等）："FAILED (exit: 137)" 拆为 FAILED 和退出码，
+analysis_time_sec 作为 total_sec，以 MB 记录的峰值换算为 GB。
+既没有报告泄露数、也没有结果文件的 SUCCESS（如 20260211-1811 中启动即退出的 0.01 秒"成功"）
+记为 FAILED / NO_RESULT；没有泄露时 FlowDroid 不写结果文件，报告了泄露数的成功不受影响。
+表结构变化时（SCHEMA_VERSION）自动清空重建。
+"""
+
+import csv
+import json
+import re
+import sqlite3
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+import compressed_io
+from flowdroid_engine import (
+    CALLGRAPH_ALGORITHM, FLOWDROID_JAR, OUTPUT_BASE, SOURCE_SINK, RunConfig
+)
+from job_scheduler import (
+    _to_float, is_no_result, mode_from_dir, parse_status, row_reported_peak_gb, row_total_time
+)
+from precision_ladder import FATAL_PREFIXES, MEMORY_REASONS, classify_failure
+
+RESULTS_DB = OUTPUT_BASE / "results.sqlite"
+# 表结构版本（PRAGMA user_version），不一致时删除旧表重新导入
+SCHEMA_VERSION = 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    kind TEXT NOT NULL,
+    started TEXT,
+    mode TEXT,
+    timeout_multiplier INTEGER NOT NULL DEFAULT 1,
+    callgraph TEXT,
+    source_sink TEXT,
+    jar TEXT,
+    csv_mtime_ns INTEGER NOT NULL,
+    csv_size INTEGER NOT NULL,
+    ingested_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    apk TEXT NOT NULL,
+    status TEXT NOT NULL,
+    exit_class TEXT NOT NULL,
+    leaks INTEGER,
+    sources INTEGER,
+    sinks INTEGER,
+    callgraph_sec REAL,
+    dataflow_sec REAL,
+    result_sec REAL,
+    jvm_start_sec REAL,
+    manifest_sec REAL,
+    soot_setup_sec REAL,
+    source_sink_sec REAL,
+    serialize_sec REAL,
+    total_sec REAL,
+    heap_gb REAL,
+    peak_memory_gb REAL,
+    peak_rss_gb REAL,
+    cpu_sec REAL,
+    exit_code INTEGER,
+    timeout_reason TEXT,
+    cache_hit INTEGER,
+    accounting TEXT,
+    output_file TEXT,
+    PRIMARY KEY (run_id, apk)
+);
+CREATE TABLE IF NOT EXISTS phases (
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    apk TEXT NOT NULL,
+    phase TEXT NOT NULL,
+    seconds REAL NOT NULL,
+    PRIMARY KEY (run_id, apk, phase)
+);
+CREATE INDEX IF NOT EXISTS jobs_apk ON jobs (apk);
+CREATE VIEW IF NOT EXISTS effective AS
+SELECT * FROM (
+    SELECT j.*, r.path, r.kind, r.started, r.mode, r.timeout_multiplier,
+           r.callgraph, r.source_sink, r.jar,
+           ROW_NUMBER() OVER (
+               PARTITION BY j.apk, r.mode, r.timeout_multiplier, r.callgraph, r.source_sink, r.jar
+               ORDER BY j.status = 'SUCCESS' DESC,
+                        j.status NOT IN ('SKIPPED', 'CANCELLED') DESC,
+                        j.exit_class != 'NO_RESULT' DESC,
+                        r.started DESC, r.id DESC) AS rank
+    FROM jobs j JOIN runs r ON r.id = j.run_id
+) WHERE rank = 1;
+"""
+
+CSV_NAME = "results_summary.csv"
+MODE_ORDER = ["full", "ne", "ns", "ne_ns"]
+
+JOB_COLUMNS = [
+    'run_id', 'apk', 'status', 'exit_class', 'leaks', 'sources', 'sinks',
+    'callgraph_sec', 'dataflow_sec', 'result_sec',
+    'jvm_start_sec', 'manifest_sec', 'soot_setup_sec', 'source_sink_sec', 'serialize_sec', 'total_sec',
+    'heap_gb', 'peak_memory_gb', 'peak_rss_gb', 'cpu_sec',
+    'exit_code', 'timeout_reason', 'cache_hit', 'accounting', 'output_file',
+]
+# 按执行顺序的阶段耗时列（jobs 表列名, 报表列名）
+PHASE_COLUMNS = [
+    ('jvm_start_sec', 'JVM 启动'),
+    ('manifest_sec', 'Manifest'),
+    ('soot_setup_sec', 'Soot 初始化'),
+    ('callgraph_sec', '调用图'),
+    ('source_sink_sec', '源汇点'),
+    ('dataflow_sec', '数据流'),
+    ('result_sec', '路径重建'),
+    ('serialize_sec', '写结果'),
+]
+
+# exit_class 取值
+EXIT_CLASSES = ["SUCCESS", "TIMEOUT", "MEMORY", "BUDGET", "ENVIRONMENT", "LOST",
+                "NO_RESULT", "CRASH", "CANCELLED", "SKIPPED"]
+
+
+def classify_exit(status: str, exit_code: Optional[int], timeout_reason: str) -> str:
+    """
+    把 status / exit_code / timeout_reason 归为一类
+
+    TIMEOUT（FlowDroid 自身的阶段超时）、MEMORY（OOM、SIGKILL、RSS 预算、cgroup OOM）、
+    BUDGET（阶段墙钟预算）、ENVIRONMENT（Java 版本等环境错误）、LOST（worker 反复死亡），
+    NO_RESULT（报告成功但没有泄露数和结果文件），其余失败为 CRASH
+    """
+    if status in ("SUCCESS", "SKIPPED", "CANCELLED"):
+        return status
+    reason = classify_failure(exit_code, timeout_reason or "")
+    if reason in MEMORY_REASONS:
+        return "MEMORY"
+    if reason.endswith("_TIMEOUT"):
+        return "TIMEOUT"
+    if reason.startswith("BUDGET_"):
+        return "BUDGET"
+    if reason.startswith(FATAL_PREFIXES):
+        return "ENVIRONMENT"
+    if reason == "LEASE_EXPIRED":
+        return "LOST"
+    if reason == "NO_RESULT":
+        return "NO_RESULT"
+    return "CRASH"
+
+
+def config_label(mode: str, timeout_multiplier: int, callgraph: Optional[str] = None,
+                 source_sink: Optional[str] = None, jar: Optional[str] = None) -> str:
+    """报表中的配置列名，如 "full (1x)"；非默认的调用图 / 列表 / jar 追加在括号内"""
+    extras = [f"{timeout_multiplier}x"]
+    if callgraph and callgraph != CALLGRAPH_ALGORITHM:
+        extras.append(callgraph)
+    if source_sink and source_sink != SOURCE_SINK.name:
+        extras.append(Path(source_sink).stem.replace("_SourcesAndSinks", ""))
+    if jar and jar != FLOWDROID_JAR.name:
+        extras.append(jar)
+    return f"{mode} ({', '.join(extras)})"
+
+
+def _to_int(value: str) -> Optional[int]:
+    number = _to_float(value)
+    return int(number) if number is not None else None
+
+
+def _run_info(run_dir: Path, output_base: Path) -> Dict:
+    """从 cell.json 或目录名推断运行的配置"""
+    rel = run_dir.relative_to(output_base)
+    top = rel.parts[0]
+    match = re.match(r'(\d{8}-\d{4})', top)
+    started = datetime.strptime(match.group(1), "%Y%m%d-%H%M").strftime("%Y-%m-%d %H:%M") if match else None
+    if "-retry-" in top:
+        kind = "retry"
+    elif top.endswith("-39apps-ladder"):
+        kind = "ladder"
+    elif "-matrix-" in top:
+        kind = "matrix"
+    elif "-queue-" in top:
+        kind = "queue"
+    elif "-39apps-" in top:
+        kind = "39apps"
+    else:
+        kind = "other"
+
+    info = {'path': str(rel), 'kind': kind, 'started': started, 'mode': mode_from_dir(run_dir.name),
+            'timeout_multiplier': 1, 'callgraph': CALLGRAPH_ALGORITHM,
+            'source_sink': SOURCE_SINK.name, 'jar': FLOWDROID_JAR.name}
+    cell_file = run_dir / "cell.json"
+    if cell_file.exists():
+        try:
+            with open(cell_file, 'r') as f:
+                config = RunConfig.from_dict(json.load(f))
+            info.update(mode=config.mode, timeout_multiplier=config.timeout_multiplier,
+                        callgraph=config.callgraph, source_sink=config.source_sink.name,
+                        jar=config.jar.name)
+            return info
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+    mult = re.search(r'-(\d+)x(?:-|$)', run_dir.name)
+    if mult:
+        info['timeout_multiplier'] = int(mult.group(1))
+    return info
+
+
+def _phase_rows(events_file: Path) -> Iterator[tuple]:
+    """events.jsonl 中的阶段耗时（同一 APK 重跑时以最后一次为准）"""
+    try:
+        with compressed_io.open_text(events_file) as f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    continue
+                if event.get('event') in ('phase', 'exit') and 'previous' in event:
+                    yield event['apk'], event['previous'], event['previous_sec']
+    except OSError:
+        return
+
+
+class ResultsStore:
+    """结果库（SQLite）"""
+
+    def __init__(self, db_path: Path = RESULTS_DB):
+        self.db_path = db_path
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(db_path))
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        if self.conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            self.conn.executescript("DROP VIEW IF EXISTS effective; DROP TABLE IF EXISTS phases; "
+                                    "DROP TABLE IF EXISTS jobs; DROP TABLE IF EXISTS runs;")
+            self.conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self.conn.executescript(SCHEMA)
+
+    def ingest(self, output_base: Path = OUTPUT_BASE, rebuild: bool = False) -> Dict[str, int]:
+        """
+        增量导入：只处理新增或 CSV 有变化（mtime / 大小）的运行目录，已删除的目录同时移出结果库
+
+        Returns:
+            {'scanned', 'ingested', 'unchanged', 'removed'}
+        """
+        if rebuild:
+            self.conn.execute("DELETE FROM runs")
+        known = {row['path']: (row['id'], row['csv_mtime_ns'], row['csv_size'])
+                 for row in self.conn.execute("SELECT id, path, csv_mtime_ns, csv_size FROM runs")}
+        seen = set()
+        stats = {'scanned': 0, 'ingested': 0, 'unchanged': 0, 'removed': 0}
+
+        # 运行目录位于 OUTPUT_BASE 下一层（普通 / 重试）或两层（阶梯 / 矩阵 / 队列的单元格）
+        csv_files = sorted(list(output_base.glob(f"*/{CSV_NAME}")) + list(output_base.glob(f"*/*/{CSV_NAME}")))
+        with self.conn:
+            for csv_file in csv_files:
+                stats['scanned'] += 1
+                rel = str(csv_file.parent.relative_to(output_base))
+                seen.add(rel)
+                st = csv_file.stat()
+                previous = known.get(rel)
+                if previous and previous[1:] == (st.st_mtime_ns, st.st_size):
+                    stats['unchanged'] += 1
+                    continue
+                if previous:
+                    self.conn.execute("DELETE FROM runs WHERE id = ?", (previous[0],))
+                self._ingest_run(csv_file.parent, output_base, st)
+                stats['ingested'] += 1
+            for rel, (run_id, _, _) in known.items():
+                if rel not in seen:
+                    self.conn.execute("DELETE FROM runs WHERE id = ?", (run_id,))
+                    stats['removed'] += 1
+        return stats
+
+    def _ingest_run(self, run_dir: Path, output_base: Path, st):
+        info = _run_info(run_dir, output_base)
+        run_id = self.conn.execute(
+            "INSERT INTO runs (path, kind, started, mode, timeout_multiplier, callgraph, source_sink, jar, "
+            "csv_mtime_ns, csv_size, ingested_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (info['path'], info['kind'], info['started'], info['mode'], info['timeout_multiplier'],
+             info['callgraph'], info['source_sink'], info['jar'], st.st_mtime_ns, st.st_size,
+             time.time())).lastrowid
+
+        rows = []
+        try:
+            with open(run_dir / CSV_NAME, 'r', newline='') as f:
+                for row in csv.DictReader(f):
+                    apk = row.get('apk_name')
+                    if not apk:
+                        continue
+                    status, exit_code = parse_status(row)
+                    reason = row.get('timeout_reason', '') or ''
+                    leaks = _to_int(row.get('leaks_found'))
+                    if status == 'SUCCESS' and is_no_result(row, run_dir):
+                        status, reason = 'FAILED', reason or 'NO_RESULT'
+                    rows.append((
+                        run_id, apk, status, classify_exit(status, exit_code, reason),
+                        leaks, _to_int(row.get('sources_found')),
+                        _to_int(row.get('sinks_found')),
+                        _to_float(row.get('callgraph_time_sec')), _to_float(row.get('dataflow_time_sec')),
+                        _to_float(row.get('result_time_sec')),
+                        *(_to_float(row.get(k)) for k in ('jvm_start_sec', 'manifest_sec', 'soot_setup_sec',
+                                                          'source_sink_sec', 'serialize_sec')),
+                        row_total_time(row),
+                        _to_float(row.get('heap_gb')), row_reported_peak_gb(row),
+                        _to_float(row.get('peak_rss_gb')), _to_float(row.get('cpu_time_sec')),
+                        exit_code, reason, 1 if row.get('cache_hit') == 'yes' else 0,
+                        row.get('accounting'), row.get('output_file'),
+                    ))
+        except (OSError, csv.Error):
+            pass
+        # 同一 CSV 中重复的 APK（旧版重试覆盖写入）以最后一行为准
+        self.conn.executemany(
+            f"INSERT OR REPLACE INTO jobs ({', '.join(JOB_COLUMNS)}) "
+            f"VALUES ({', '.join('?' * len(JOB_COLUMNS))})",
+            rows)
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO phases VALUES (?, ?, ?, ?)",
+            ((run_id, apk, phase, sec) for apk, phase, sec in _phase_rows(run_dir / "events.jsonl")))
+
+    def query(self, sql: str, params: tuple = ()) -> List[sqlite3.Row]:
+        return self.conn.execute(sql, params).fetchall()
+
+    def configs(self) -> List[sqlite3.Row]:
+        """结果库中出现过的配置，按模式、超时倍数排序"""
+        rows = self.query(
+            "SELECT DISTINCT mode, timeout_multiplier, callgraph, source_sink, jar FROM runs "
+            "WHERE mode IS NOT NULL")
+        return sorted(rows, key=lambda r: (
+            r['timeout_multiplier'],
+            r['callgraph'] != CALLGRAPH_ALGORITHM, r['callgraph'],
+            r['source_sink'] != SOURCE_SINK.name, r['source_sink'],
+            r['jar'] != FLOWDROID_JAR.name, r['jar'],
+            MODE_ORDER.index(r['mode']) if r['mode'] in MODE_ORDER else len(MODE_ORDER)))
+
+    def effective(self) -> Dict[str, Dict[str, sqlite3.Row]]:
+        """{APK: {配置列名: 代表结果}}"""
+        table: Dict[str, Dict[str, sqlite3.Row]] = {}
+        for row in self.query("SELECT * FROM effective WHERE mode IS NOT NULL"):
+            label = config_label(row['mode'], row['timeout_multiplier'], row['callgraph'],
+                                 row['source_sink'], row['jar'])
+            table.setdefault(row['apk'], {})[label] = row
+        return table
+
+    def phase_breakdown(self) -> Dict[str, Dict[str, Optional[float]]]:
+        """
+        每个配置成功作业（代表结果）的各阶段平均秒数
+
+        Returns:
+            {配置列名: {'n': 作业数, <PHASE_COLUMNS 的列名>: 平均秒数（无数据时为 None）, 'total_sec': ...}}
+        """
+        columns = [column for column, _ in PHASE_COLUMNS] + ['total_sec']
+        rows = self.query(
+            "SELECT mode, timeout_multiplier, callgraph, source_sink, jar, COUNT(*) AS n, "
+            + ", ".join(f"AVG({column}) AS {column}" for column in columns)
+            + " FROM effective WHERE mode IS NOT NULL AND status = 'SUCCESS' "
+              "GROUP BY mode, timeout_multiplier, callgraph, source_sink, jar")
+        return {config_label(r['mode'], r['timeout_multiplier'], r['callgraph'], r['source_sink'], r['jar']):
+                {'n': r['n'], **{column: r[column] for column in columns}} for r in rows}
+
+    def run_counts(self) -> List[sqlite3.Row]:
+        """每次运行的状态计数"""
+        return self.query(
+            "SELECT r.*, COUNT(j.apk) AS total, "
+            "SUM(j.status = 'SUCCESS') AS success, SUM(j.status = 'FAILED') AS failed, "
+            "SUM(j.status = 'SKIPPED') AS skipped, SUM(j.status = 'CANCELLED') AS cancelled "
+            "FROM runs r LEFT JOIN jobs j ON j.run_id = r.id GROUP BY r.id ORDER BY r.started, r.path")
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='FlowDroid 结果库')
+    parser.add_argument('--db', type=Path, default=RESULTS_DB, help=f'结果库路径（默认 {RESULTS_DB}）')
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('ingest', help='增量导入 OUTPUT_BASE 下的运行目录')
+    p.add_argument('--rebuild', action='store_true', help='清空后重新导入')
+    p = sub.add_parser('sql', help='执行 SQL 查询并以 CSV 输出')
+    p.add_argument('statement')
+    args = parser.parse_args()
+
+    store = ResultsStore(args.db)
+    if args.command == 'ingest':
+        start = time.time()
+        stats = store.ingest(rebuild=args.rebuild)
+        print(f"导入完成: {stats} ({time.time() - start:.3f}s) -> {args.db}")
+    else:
+        import sys
+        rows = store.query(args.statement)
+        writer = csv.writer(sys.stdout)
+        if rows:
+            writer.writerow(rows[0].keys())
+        writer.writerows(tuple(r) for r in rows)
+
+
+if __name__ == '__main__':
+    main()
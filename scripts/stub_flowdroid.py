@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+FlowDroid 替身（用于测试和评测批量分析框架本身）
+命令行与 soot-infoflow-cmd 相同，不做任何分析，只按配置输出逼真的日志行
+（Callgraph construction took / found N sources and M sinks / Path reconstruction took /
+Found N leaks、OOM、超时）
+和指定大小的结果 XML；或者回放 output/ 中某次真实运行的日志和结果。
+
+通过 --launcher 接入引擎（堆通过环境变量 FLOWDROID_XMX 传入）：
+    python3 scripts/batch_flowdroid_analyzer.py --launcher "python3 scripts/stub_flowdroid.py"
+
+合成模式的环境变量（每个 APK 的耗时系数和失败类型由 APK 名的哈希决定，可复现）：
+    STUB_FLOWDROID_LATENCY      每个 APK 的平均耗时秒数，按阶段分摊（默认 0）
+    STUB_FLOWDROID_RESULTS      平均结果（泄露）数，决定 XML 大小（默认 10）
+    STUB_FLOWDROID_SOURCES      每个结果的源点数（默认 2）
+    STUB_FLOWDROID_LOG_LINES    额外的 INFO / WARN 日志行数（默认 50）
+    STUB_FLOWDROID_FAIL_RATE    失败 APK 的比例，失败类型在 OOM / 调用图超时 / 数据流超时中选择（默认 0）
+    STUB_FLOWDROID_OOM_HEAP     OOM 类 APK 成功所需的堆（默认 16g，堆自动放大后可以成功）
+    STUB_FLOWDROID_CG_NEED      调用图超时类 APK 成功所需的 -ct 秒数（默认 1800，即 3 倍超时）
+    STUB_FLOWDROID_DF_NEED      数据流超时类 APK 成功所需的 -dt 秒数（默认 5400）
+    STUB_FLOWDROID_SEED         哈希盐，改变各 APK 的取值（默认空）
+回放模式：
+    STUB_FLOWDROID_REPLAY       运行目录；按其 results_summary.csv 中该 APK 的行（及 <apk>.log、
+                                <apk>_results.xml，压缩与否均可）重现日志、结果和退出码
+    STUB_FLOWDROID_SPEED        回放加速倍数，按记录的阶段耗时 / SPEED 等待（默认 0，即不等待）
+"""
+
+import argparse
+import csv
+import hashlib
+import os
+import shutil
+import signal
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+from xml.sax.saxutils import quoteattr
+
+import compressed_io
+from flowdroid_pool import parse_mem_gb
+from job_scheduler import parse_status
+
+ENV_PREFIX = "STUB_FLOWDROID_"
+LOGGER = "[main] INFO soot.jimple.infoflow"
+
+# 合成模式各阶段占总耗时的比例
+PHASE_SHARES = {
+    "soot": 0.10,
+    "manifest": 0.05,
+    "callgraph": 0.35,
+    "source_sink": 0.05,
+    "dataflow": 0.40,
+    "results": 0.05,
+}
+FAILURE_KINDS = ["OUT_OF_MEMORY", "CALLGRAPH_TIMEOUT", "DATAFLOW_TIMEOUT"]
+
+# 失败原因 -> 日志中的标志行（与引擎识别 timeout_reason 的字符串一致）
+FAILURE_LINES = {
+    "OUT_OF_MEMORY": 'Exception in thread "main" java.lang.OutOfMemoryError: Java heap space',
+    "CALLGRAPH_TIMEOUT": f"{LOGGER}.android.SetupApplication - Callgraph creation timed out",
+    "DATAFLOW_TIMEOUT": f"{LOGGER}.Infoflow - Data flow computation timed out",
+    "RESULT_TIMEOUT": f"{LOGGER}.Infoflow - Result computation timed out",
+}
+
+
+def _env(name: str, default: str) -> str:
+    return os.environ.get(ENV_PREFIX + name, default)
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    """soot-infoflow-cmd 的命令行（未知选项忽略）"""
+    parser = argparse.ArgumentParser(prog="soot-infoflow-cmd", allow_abbrev=False)
+    parser.add_argument('-a', '--apkfile', required=True)
+    parser.add_argument('-p', '--platformsdir')
+    parser.add_argument('-s', '--sourcessinksfile')
+    parser.add_argument('-o', '--outputfile')
+    parser.add_argument('-cg', '--cgalgo', default="SPARK")
+    parser.add_argument('-ct', '--callgraphtimeout', type=int, default=0)
+    parser.add_argument('-dt', '--dataflowtimeout', type=int, default=0)
+    parser.add_argument('-rt', '--resulttimeout', type=int, default=0)
+    parser.add_argument('-mt', '--maxthreadnum', type=int, default=None)
+    parser.add_argument('-ne', '--noexceptions', action='store_true')
+    parser.add_argument('-ns', '--nostatic', action='store_true')
+    args, _ = parser.parse_known_args(argv)
+    return args
+
+
+def _uniform(apk_name: str, salt: str) -> float:
+    """APK 名哈希得到的 [0, 1) 均匀值"""
+    digest = hashlib.sha256(f"{_env('SEED', '')}:{salt}:{apk_name}".encode()).digest()
+    return int.from_bytes(digest[:8], 'big') / 2 ** 64
+
+
+def results_xml(apk_name: str, results: int, sources_per_result: int = 2, path_length: int = 0) -> str:
+    """
+    结构与 FlowDroid 输出相同的结果 XML（results 个 Result，每个 sources_per_result 个 Source）
+
+    path_length > 0 时每个 Source 带 path_length 步的 TaintPath（相当于开启路径重建）
+    """
+    access_path = "<AccessPath Value=\"$r{}\" Type=\"java.lang.String\" TaintSubFields=\"true\"></AccessPath>"
+
+    def element(tag: str, i: int, j: int) -> str:
+        cls = f"com.{apk_name}.C{i}"
+        api = "android.telephony.TelephonyManager: java.lang.String getDeviceId()" if tag == "Source" \
+            else "android.telephony.SmsManager: void sendTextMessage(java.lang.String,java.lang.String," \
+                 "java.lang.String,android.app.PendingIntent,android.app.PendingIntent)"
+        path = ""
+        if tag == "Source" and path_length:
+            path = "<TaintPath>" + "".join(
+                f"<PathElement Statement={quoteattr(f'$r{k + 1} = $r{k}')} "
+                f"Method={quoteattr(f'<{cls}: void m{j}()>')}>{access_path.format(k + 1)}</PathElement>"
+                for k in range(path_length)) + "</TaintPath>"
+        return (f"<{tag} Statement={quoteattr(f'$r{j} = virtualinvoke $r0.<{api}>()')} "
+                f"Method={quoteattr(f'<{cls}: void m{j}()>')} "
+                f"MethodSourceSinkDefinition={quoteattr(f'<{api}>')}>"
+                f"{access_path.format(j)}{path}</{tag}>")
+
+    parts = ['<?xml version="1.0" encoding="UTF-8"?>'
+             '<DataFlowResults FileFormatVersion="102" TerminationState="Success"><Results>']
+    for i in range(results):
+        sources = ''.join(element("Source", i, j) for j in range(sources_per_result))
+        parts.append(f"<Result>{element('Sink', i, sources_per_result)}<Sources>{sources}</Sources></Result>")
+    parts.append('</Results><PerformanceData></PerformanceData></DataFlowResults>')
+    return ''.join(parts)
+
+
+def synthetic_log(apk_name: str, callgraph_sec: float, dataflow_sec: float, sources: int, sinks: int,
+                  leaks: int, noise_lines: int = 50, failure: str = "", result_sec: float = 0.0) -> List[str]:
+    """合成一份 FlowDroid 日志的所有行（failure 非空时在对应阶段中止）"""
+    noise = [f"[main] WARN soot.jimple.infoflow.android.resources.ARSCFileParser - "
+             f"Unsupported resource type {i} in {apk_name}" for i in range(noise_lines)]
+    half = noise_lines // 2
+    lines = [f"{LOGGER}.cmd.MainClass - Analyzing app {apk_name}.apk",
+             f"{LOGGER}.android.SetupApplication - Parsing manifest and resource files...",
+             *noise[:half],
+             f"{LOGGER}.android.SetupApplication - Initializing Soot...",
+             f"{LOGGER}.android.SetupApplication - Loading dex files...",
+             f"{LOGGER}.android.SetupApplication - Constructing the callgraph..."]
+    if failure in ("OUT_OF_MEMORY", "CALLGRAPH_TIMEOUT"):
+        return lines + [FAILURE_LINES[failure]]
+    lines += [f"{LOGGER}.android.SetupApplication - Callgraph construction took {callgraph_sec:.0f} seconds",
+              f"{LOGGER}.android.SetupApplication - Looking for sources and sinks...",
+              f"{LOGGER}.android.SetupApplication - Source lookup done, found {sources} sources and {sinks} sinks.",
+              f"{LOGGER}.Infoflow - Running data flow analysis on {sources} sources and {sinks} sinks...",
+              *noise[half:]]
+    if failure:
+        return lines + [FAILURE_LINES[failure]]
+    return lines + [
+        f"{LOGGER}.Infoflow - IFDS problem with {sources * 1000} forward and 0 backward edges "
+        f"solved in {dataflow_sec:.0f} seconds, processing {leaks} results...",
+        f"{LOGGER}.Infoflow - Data flow solver took {dataflow_sec:.0f} seconds. "
+        f"Maximum memory consumption: {512 + 64 * leaks} MB",
+        f"{LOGGER}.Infoflow - Path reconstruction took {result_sec:.0f} seconds",
+        f"{LOGGER}.Infoflow - Found {leaks} leaks",
+    ]
+
+
+def _emit(line: str):
+    sys.stdout.write(line + '\n')
+    sys.stdout.flush()
+
+
+def _wait(seconds: float):
+    if seconds > 0:
+        time.sleep(seconds)
+
+
+def run_synthetic(args: argparse.Namespace) -> int:
+    apk_name = Path(args.apkfile).stem
+    latency = float(_env('LATENCY', '0')) * (0.5 + _uniform(apk_name, "time"))
+    leaks = round(int(_env('RESULTS', '10')) * (0.5 + _uniform(apk_name, "leaks")))
+    sources_per_result = int(_env('SOURCES', '2'))
+
+    failure = ""
+    if _uniform(apk_name, "fail") < float(_env('FAIL_RATE', '0')):
+        kind = FAILURE_KINDS[int(_uniform(apk_name, "kind") * len(FAILURE_KINDS))]
+        heap_gb = parse_mem_gb(os.environ.get('FLOWDROID_XMX', '0g'))
+        if ((kind == "OUT_OF_MEMORY" and heap_gb < parse_mem_gb(_env('OOM_HEAP', '16g')))
+                or (kind == "CALLGRAPH_TIMEOUT" and args.callgraphtimeout < int(_env('CG_NEED', '1800')))
+                or (kind == "DATAFLOW_TIMEOUT" and args.dataflowtimeout < int(_env('DF_NEED', '5400')))):
+            failure = kind
+
+    lines = synthetic_log(apk_name, latency * PHASE_SHARES["callgraph"], latency * PHASE_SHARES["dataflow"],
+                          sources=10 + leaks, sinks=5 + leaks // 2, leaks=leaks,
+                          noise_lines=int(_env('LOG_LINES', '50')), failure=failure,
+                          result_sec=latency * PHASE_SHARES["results"])
+    # 进入每个阶段前等待上一阶段的份额
+    waits = {"Initializing Soot": "manifest", "Constructing the callgraph": "soot",
+             "Callgraph construction took": "callgraph", "Source lookup done": "source_sink",
+             "IFDS problem": "dataflow", "Data flow computation timed out": "dataflow",
+             "Path reconstruction took": "results"}
+    for line in lines:
+        for marker, phase in waits.items():
+            if marker in line:
+                _wait(latency * PHASE_SHARES[phase])
+        if line == FAILURE_LINES.get("CALLGRAPH_TIMEOUT") or line == FAILURE_LINES.get("OUT_OF_MEMORY"):
+            _wait(latency * PHASE_SHARES["callgraph"])
+        _emit(line)
+    if failure:
+        return 1
+    if args.outputfile:
+        with open(args.outputfile, 'w') as f:
+            f.write(results_xml(apk_name, leaks, sources_per_result))
+    return 0
+
+
+def _recorded_row(run_dir: Path, apk_name: str) -> Optional[Dict]:
+    try:
+        with open(run_dir / "results_summary.csv", 'r', newline='') as f:
+            for row in csv.DictReader(f):
+                if row.get('apk_name') == apk_name:
+                    return row
+    except OSError:
+        pass
+    return None
+
+
+def _float(row: Dict, *keys: str) -> float:
+    for key in keys:
+        try:
+            return float(row.get(key))
+        except (TypeError, ValueError):
+            continue
+    return 0.0
+
+
+def run_replay(args: argparse.Namespace, run_dir: Path) -> int:
+    apk_name = Path(args.apkfile).stem
+    row = _recorded_row(run_dir, apk_name)
+    # 旧版 CSV 的状态带退出码（"FAILED (exit: 137)"）
+    status, recorded_exit = parse_status(row) if row else (None, None)
+    if status not in ('SUCCESS', 'FAILED'):
+        _emit(f"[main] ERROR stub - {run_dir} 中没有 {apk_name} 的运行记录")
+        return 2
+    speed = float(_env('SPEED', '0'))
+    cg_sec = _float(row, 'callgraph_time_sec')
+    df_sec = _float(row, 'dataflow_time_sec', 'analysis_time_sec')
+    rt_sec = _float(row, 'result_time_sec')
+
+    log_file = run_dir / f"{apk_name}.log"
+    if compressed_io.exists(log_file):
+        with compressed_io.open_text(log_file) as f:
+            lines = [line.rstrip('\n') for line in f]
+    else:
+        reason = row.get('timeout_reason', '')
+        leaks = int(_float(row, 'leaks_found'))
+        lines = synthetic_log(apk_name, cg_sec, df_sec, int(_float(row, 'sources_found')),
+                              int(_float(row, 'sinks_found')), leaks,
+                              failure=reason if reason in FAILURE_LINES else "", result_sec=rt_sec)
+    for line in lines:
+        if speed > 0 and ("Callgraph construction took" in line or "Data flow solver took" in line):
+            _wait((cg_sec if "Callgraph" in line else df_sec) / speed)
+        _emit(line)
+
+    xml_file = run_dir / f"{apk_name}_results.xml"
+    if status == 'SUCCESS' and args.outputfile and compressed_io.exists(xml_file):
+        with compressed_io.open_binary(xml_file) as src, open(args.outputfile, 'wb') as dst:
+            shutil.copyfileobj(src, dst)
+
+    exit_code = recorded_exit if recorded_exit is not None else (0 if status == 'SUCCESS' else 1)
+    if exit_code in (-9, 137):
+        os.kill(os.getpid(), signal.SIGKILL)
+    return exit_code if exit_code >= 0 else 1
+
+
+def main():
+    args = parse_args(sys.argv[1:])
+    replay = _env('REPLAY', '')
+    sys.exit(run_replay(args, Path(replay).expanduser()) if replay else run_synthetic(args))
+
+
+if __name__ == '__main__':
+    main()
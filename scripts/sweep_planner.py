@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+扫描启动前的成本估计
+根据 OUTPUT_BASE 中的历史运行和 APK 的 dex 大小，预测一次扫描的 makespan、
+峰值并发内存预留和可能失败的作业，不启动任何 JVM。
+
+预测由 FlowDroidEngine.plan 生成（耗时: HistoryScheduler，堆: HeapModel，
+失败概率: FailureModel，makespan / 峰值内存: simulate_schedule），结构为
+    {'created', 'slots', 'mem_budget_gb', 'cache_hits', 'makespan_sec', 'serial_sec',
+     'peak_mem_gb', 'peak_jobs', 'expected_failures',
+     'jobs': [{'key', 'apk', 'mode', 'timeout_multiplier', 'callgraph', 'cells', 'cached',
+               'predicted_sec', 'time_source', 'heap_gb', 'p_fail', 'fail_source',
+               'fail_reason', 'predicted_start'}]}
+引擎每次运行开始时把预测写入运行目录的 plan.json，结束时在其中补充 accuracy（预测 vs 实际）；
+work_queue enqueue 同样写出 plan.json，collect 之后可用 accuracy 命令对比。
+"""
+
+import csv
+import json
+import statistics
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# p_fail 不低于该值的作业列为"可能失败"
+LIKELY_FAILURE = 0.5
+
+
+def _hms(sec: float) -> str:
+    sec = int(round(sec))
+    return f"{sec // 3600}:{sec % 3600 // 60:02d}:{sec % 60:02d}"
+
+
+def plan_accuracy(plan: Dict, results: List[Dict], makespan: Optional[float] = None,
+                  peak_mem_gb: Optional[float] = None) -> Dict:
+    """
+    比较预测与实际结果
+
+    Args:
+        plan: FlowDroidEngine.plan 的预测
+        results: 每个 (单元格, APK) 的结果（engine.record 的返回值或 results_summary.csv 的行），
+                 需要 'cell', 'apk_name', 'status', 'total_time', 'cached'，可选 'shared'
+        makespan / peak_mem_gb: 实际 makespan 和峰值内存预留（未知时为 None）
+    Returns:
+        耗时只比较实际运行的作业（缓存命中、被取消的除外）；失败比较所有完成的作业
+    """
+    actual = {(r['cell'], r['apk_name']): r for r in results if not r.get('shared')}
+    errors = []
+    predicted_serial = actual_serial = 0.0
+    brier = []
+    actual_failures = 0
+    likely = likely_failed = missed = 0
+    for e in plan['jobs']:
+        r = actual.get((e['cells'][0], e['apk']))
+        if r is None or r['status'] not in ('SUCCESS', 'FAILED'):
+            continue
+        failed = r['status'] == 'FAILED'
+        actual_failures += failed
+        brier.append((e['p_fail'] - failed) ** 2)
+        if e['p_fail'] >= LIKELY_FAILURE:
+            likely += 1
+            likely_failed += failed
+        elif failed:
+            missed += 1
+        if not r['cached'] and not e['cached'] and r['total_time'] > 0:
+            errors.append(abs(e['predicted_sec'] - r['total_time']) / r['total_time'])
+            predicted_serial += e['predicted_sec']
+            actual_serial += r['total_time']
+
+    return {
+        'jobs_compared': len(errors),
+        'time_mape': round(statistics.mean(errors), 3) if errors else None,
+        'time_median_error': round(statistics.median(errors), 3) if errors else None,
+        'time_within_50pct': round(sum(1 for x in errors if x <= 0.5) / len(errors), 3) if errors else None,
+        'predicted_serial_sec': round(predicted_serial, 2),
+        'actual_serial_sec': round(actual_serial, 2),
+        'predicted_makespan_sec': plan['makespan_sec'],
+        'actual_makespan_sec': round(makespan, 2) if makespan is not None else None,
+        'predicted_peak_mem_gb': plan['peak_mem_gb'],
+        'actual_peak_mem_gb': round(peak_mem_gb, 2) if peak_mem_gb is not None else None,
+        'jobs_finished': len(brier),
+        'expected_failures': round(sum(e['p_fail'] for e in plan['jobs']), 2),
+        'actual_failures': actual_failures,
+        'brier': round(statistics.mean(brier), 4) if brier else None,
+        'likely_failures': likely,
+        'likely_failures_failed': likely_failed,
+        'missed_failures': missed,
+    }
+
+
+def load_results(run_dir: Path) -> List[Dict]:
+    """运行目录下所有 results_summary.csv 的行（plan_accuracy 的 results 格式）"""
+    results = []
+    for csv_file in sorted(run_dir.rglob("results_summary.csv")):
+        with open(csv_file, 'r', newline='') as f:
+            for row in csv.DictReader(f):
+                try:
+                    total_time = float(row['total_time_sec'])
+                except (KeyError, ValueError):
+                    total_time = 0.0
+                results.append({'cell': csv_file.parent.name, 'apk_name': row['apk_name'],
+                                'status': row['status'], 'total_time': total_time,
+                                'cached': row.get('cache_hit') == 'yes'})
+    return results
+
+
+def format_plan(plan: Dict, top: int = 10) -> List[str]:
+    """预测的文字摘要"""
+    jobs = plan['jobs']
+    sources = [e['time_source'] for e in jobs]
+    lines = [
+        f"作业: {len(jobs)} 个（去重后）, 缓存命中 {plan['cache_hits']} 个",
+        f"耗时来源: 历史 {sources.count('history')} 个, 按 dex 估计 {sources.count('dex')} 个",
+        f"预测 makespan: {_hms(plan['makespan_sec'])} ({plan['makespan_sec']:.0f}s), "
+        f"串行 {_hms(plan['serial_sec'])}, 并发槽位 {plan['slots']}, 内存预算 {plan['mem_budget_gb']:g} GB",
+        f"峰值内存预留: {plan['peak_mem_gb']:g} GB（{plan['peak_jobs']} 个并发作业）",
+        f"预计失败: {plan['expected_failures']:.1f} 个",
+    ]
+    likely = sorted((e for e in jobs if e['p_fail'] >= LIKELY_FAILURE), key=lambda e: -e['p_fail'])
+    if likely:
+        lines.append(f"可能失败（p ≥ {LIKELY_FAILURE}）: {len(likely)} 个")
+        for e in likely[:top]:
+            lines.append(f"  {e['apk']} ({e['mode']} {e['timeout_multiplier']}x {e['callgraph']}): "
+                         f"{e['p_fail']:.0%} {e['fail_reason'] or ''} ({e['fail_source']})")
+    longest = sorted((e for e in jobs if not e['cached']), key=lambda e: -e['predicted_sec'])[:top]
+    if longest:
+        lines.append(f"最长的 {len(longest)} 个作业:")
+        for e in longest:
+            lines.append(f"  {e['apk']} ({e['mode']} {e['timeout_multiplier']}x {e['callgraph']}): "
+                         f"{e['predicted_sec']:.0f}s ({e['time_source']}), -Xmx{e['heap_gb']:g}g")
+    return lines
+
+
+def format_accuracy(accuracy: Dict) -> List[str]:
+    """预测准确度的文字摘要"""
+    def pair(predicted, actual, unit):
+        return f"预测 {predicted:g}{unit}, 实际 " + (f"{actual:g}{unit}" if actual is not None else "N/A")
+
+    lines = [
+        f"makespan: {pair(accuracy['predicted_makespan_sec'], accuracy['actual_makespan_sec'], 's')}",
+        f"峰值内存预留: {pair(accuracy['predicted_peak_mem_gb'], accuracy['actual_peak_mem_gb'], ' GB')}",
+    ]
+    if accuracy['jobs_compared']:
+        lines.append(f"作业耗时: {accuracy['jobs_compared']} 个作业, 平均误差 {accuracy['time_mape']:.0%}, "
+                     f"中位误差 {accuracy['time_median_error']:.0%}, "
+                     f"{accuracy['time_within_50pct']:.0%} 在 ±50% 以内; 串行 "
+                     f"{pair(accuracy['predicted_serial_sec'], accuracy['actual_serial_sec'], 's')}")
+    if accuracy['jobs_finished']:
+        lines.append(f"失败: 预计 {accuracy['expected_failures']:.1f} 个, 实际 {accuracy['actual_failures']} 个 "
+                     f"(Brier {accuracy['brier']:.3f}); 可能失败的 {accuracy['likely_failures']} 个中 "
+                     f"{accuracy['likely_failures_failed']} 个失败, 未预见的失败 {accuracy['missed_failures']} 个")
+    return lines
+
+
+def main():
+    import argparse
+    import os
+
+    from flowdroid_engine import (
+        OUTPUT_BASE, FlowDroidEngine, add_engine_arguments, add_spec_arguments,
+        engine_kwargs, spec_from_args
+    )
+
+    parser = argparse.ArgumentParser(description='FlowDroid 扫描成本估计（不启动 JVM）')
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('plan', help='预测扫描的 makespan、峰值内存和可能失败的作业')
+    add_spec_arguments(p)
+    add_engine_arguments(p)
+    p.add_argument('--top', type=int, default=10, help='列出的可能失败 / 最长作业数（默认 10）')
+    p.add_argument('--save', type=Path, default=None, metavar='PLAN.json', help='保存完整预测')
+    p = sub.add_parser('accuracy', help='比较运行目录中 plan.json 的预测与实际结果')
+    p.add_argument('run_dir', type=Path)
+    args = parser.parse_args()
+
+    if args.command == 'plan':
+        start = time.time()
+        spec = spec_from_args(args, "plan")
+        # 只预测，不创建运行目录；堆预测的日志只输出到控制台
+        cells = spec.cells(OUTPUT_BASE / "plan")
+        engine = FlowDroidEngine(Path(os.devnull), **engine_kwargs(args))
+        jobs, owners = engine.expand(cells)
+        _, plan = engine.plan(jobs, owners)
+        print(f"扫描: {len(cells)} 个单元格, {sum(len(c.apks) for c in cells)} 个 APK × 单元格")
+        print('\n'.join(format_plan(plan, args.top)))
+        if args.save:
+            with open(args.save, 'w') as f:
+                json.dump(plan, f, ensure_ascii=False, indent=2)
+            print(f"预测已保存: {args.save}")
+        print(f"({time.time() - start:.2f}s，未启动 JVM)")
+    else:
+        with open(args.run_dir / "plan.json", 'r') as f:
+            plan = json.load(f)
+        recorded = plan.get('accuracy') or {}
+        accuracy = plan_accuracy(plan, load_results(args.run_dir),
+                                 recorded.get('actual_makespan_sec'), recorded.get('actual_peak_mem_gb'))
+        print('\n'.join(format_accuracy(accuracy)))
+
+
+if __name__ == '__main__':
+    main()
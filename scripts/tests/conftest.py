@@ -0,0 +1,44 @@
+"""
+scripts/ 下的模块互相按顶层模块名导入（python3 scripts/xxx.py 的运行方式），测试同样把 scripts/ 放进 sys.path。
+REPO_OUTPUT 为仓库自带的历史运行（CSV 和部分结果 XML），用作真实数据的夹具。
+"""
+
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+REPO_OUTPUT = SCRIPTS_DIR.parent / "output"
+
+from results_store import ResultsStore  # noqa: E402  (需要先设置 sys.path)
+
+
+@pytest.fixture
+def repo_output() -> Path:
+    if not any(REPO_OUTPUT.glob("*/results_summary.csv")):
+        pytest.skip("仓库中没有历史运行目录")
+    return REPO_OUTPUT
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ResultsStore(tmp_path / "results.sqlite")
+    yield store
+    store.conn.close()
+
+
+@pytest.fixture
+def fake_java(tmp_path, monkeypatch):
+    """PATH 上放一个转给 stub_flowdroid.py 的 java（丢掉 -Xmx 和 -jar <jar>），引擎按真实运行的路径执行"""
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    java = bin_dir / "java"
+    stub = SCRIPTS_DIR / "stub_flowdroid.py"
+    java.write_text(f'#!/bin/sh\nshift 3\nexec "{sys.executable}" "{stub}" "$@"\n')
+    java.chmod(0o755)
+    monkeypatch.setenv('PATH', f"{bin_dir}{os.pathsep}{os.environ.get('PATH', '')}")
+    return java
@@ -0,0 +1,32 @@
+"""callgraph_report.build_points：结果不可读的 SUCCESS 不参与比较"""
+
+from xml.sax.saxutils import quoteattr
+
+from callgraph_report import build_points
+from test_results_store import write_run
+
+SOURCE = "<android.telephony.TelephonyManager: java.lang.String getDeviceId()>"
+SINK = "<android.telephony.SmsManager: void sendTextMessage(java.lang.String,java.lang.String,java.lang.String," \
+       "android.app.PendingIntent,android.app.PendingIntent)>"
+RESULTS = f"""<DataFlowResults><Results><Result>
+<Sink Statement="s" Method="m" MethodSourceSinkDefinition={quoteattr(SINK)}/>
+<Sources><Source Statement="s" Method="m" MethodSourceSinkDefinition={quoteattr(SOURCE)}/></Sources>
+</Result></Results></DataFlowResults>"""
+
+
+def test_unreadable_success_is_excluded(tmp_path, store):
+    run = write_run(tmp_path, "20260101-1000-39apps-max-precision", [
+        {'apk_name': 'found', 'status': 'SUCCESS', 'leaks_found': '1', 'total_time_sec': '3', 'exit_code': '0'},
+        {'apk_name': 'empty', 'status': 'SUCCESS', 'leaks_found': '0', 'total_time_sec': '3', 'exit_code': '0'},
+        {'apk_name': 'corrupt', 'status': 'SUCCESS', 'leaks_found': '4', 'total_time_sec': '3', 'exit_code': '0'},
+        {'apk_name': 'killed', 'status': 'FAILED', 'total_time_sec': '90', 'exit_code': '-9'},
+    ])
+    (run / "found_results.xml").write_text(RESULTS)
+    (run / "corrupt_results.xml").write_text("<DataFlowResults><Results>")
+    store.ingest(tmp_path)
+    truth = {apk: {(SOURCE, SINK)} for apk in ('found', 'empty', 'corrupt', 'killed')}
+
+    points = {apk: next(iter(p.values())) for apk, p in build_points(store, truth, tmp_path).items()}
+    assert set(points) == {'found', 'empty', 'killed'}
+    assert points['found']['recall'] == 1 and points['empty']['recall'] == 0
+    assert points['killed']['status'] == 'FAILED'
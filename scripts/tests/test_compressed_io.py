@@ -0,0 +1,72 @@
+"""compressed_io：压缩往返、逻辑路径解析、复制保留后缀和对已有运行目录的迁移"""
+
+import os
+
+import pytest
+
+import compressed_io
+from compressed_io import check_codec, compress_file, compress_outputs, migrate, open_text, resolve
+
+XML = "<DataFlowResults>" + "<Result/>" * 1000 + "</DataFlowResults>"
+
+
+@pytest.mark.parametrize("codec", ["gzip", "zstd"])
+def test_round_trip(tmp_path, codec):
+    if codec == "zstd":
+        pytest.importorskip("zstandard")
+    path = tmp_path / "app_results.xml"
+    path.write_text(XML)
+    os.utime(path, ns=(1, 10 ** 18))
+    target = compress_file(path, codec)
+
+    assert target.name == "app_results.xml" + compressed_io.CODECS[codec]
+    assert not path.exists() and target.stat().st_size < len(XML)
+    assert target.stat().st_mtime_ns == 10 ** 18
+    assert resolve(path) == target and compressed_io.exists(path)
+    with open_text(path) as f:
+        assert f.read() == XML
+    assert not list(tmp_path.glob(".*.tmp"))
+
+
+def test_resolve_and_copy(tmp_path):
+    log = tmp_path / "app.log"
+    assert resolve(log) is None
+    with pytest.raises(FileNotFoundError):
+        open_text(log)
+    log.write_text("Found 2 leaks\n")
+    assert compress_outputs([log, tmp_path / "missing.log"], "none") == []
+    assert resolve(log) == log
+    (gz,) = compress_outputs([log, tmp_path / "missing.log"])
+    assert resolve(log) == gz
+
+    (tmp_path / "copy").mkdir()
+    assert compressed_io.copy(log, tmp_path / "copy" / "app.log") == tmp_path / "copy" / "app.log.gz"
+    with open_text(tmp_path / "copy" / "app.log") as f:
+        assert f.read() == "Found 2 leaks\n"
+    assert compressed_io.copy(tmp_path / "missing.log", tmp_path / "copy" / "missing.log") is None
+
+
+def test_check_codec():
+    assert check_codec("none") == "none" and check_codec("gzip") == "gzip"
+    with pytest.raises(ValueError):
+        check_codec("lzma")
+
+
+def test_migrate_skips_live_files(tmp_path):
+    run = tmp_path / "20260101-1000-39apps-max-precision"
+    (run / "workers").mkdir(parents=True)
+    for name in ("app_results.xml", "app.log", "analysis_summary.log", "results_summary.csv"):
+        (run / name).write_text(XML)
+    (run / "workers" / "w1.log").write_text("worker")
+    (run / "new.log").write_text("still running")
+    old = 1_000_000_000
+    for path in run.rglob("*"):
+        if path.is_file() and path.name != "new.log":
+            os.utime(path, (old, old))
+
+    assert migrate([tmp_path], dry_run=True)['files'] == 2
+    stats = migrate([tmp_path])
+    assert (stats['files'], stats['skipped']) == (2, 1) and stats['bytes_after'] < stats['bytes_before']
+    assert sorted(p.name for p in run.iterdir() if p.is_file()) == [
+        "analysis_summary.log", "app.log.gz", "app_results.xml.gz", "new.log", "results_summary.csv"]
+    assert (run / "workers" / "w1.log").exists()
@@ -0,0 +1,27 @@
+"""failure_triage.triage：旧版失败状态参与聚类，结果不可读的成功不算修复"""
+
+from failure_triage import triage
+from test_results_store import write_run
+
+
+def test_triage_counts_only_readable_successes(tmp_path, store):
+    write_run(tmp_path, "20260101-1000-39apps-max-precision", [
+        {'apk_name': 'legacy', 'status': 'FAILED (exit: 137)', 'analysis_time_sec': '90'},
+        {'apk_name': 'corrupt', 'status': 'FAILED', 'total_time_sec': '50', 'exit_code': '-9'},
+        {'apk_name': 'empty', 'status': 'FAILED', 'total_time_sec': '50', 'exit_code': '-9'},
+    ])
+    run = write_run(tmp_path, "20260101-1100-39apps-no-exception-no-static", [
+        {'apk_name': 'legacy', 'status': 'SUCCESS', 'leaks_found': '3', 'total_time_sec': '20', 'exit_code': '0'},
+        {'apk_name': 'corrupt', 'status': 'SUCCESS', 'leaks_found': '2', 'total_time_sec': '20', 'exit_code': '0'},
+        # 没有泄露时 FlowDroid 不写结果文件，仍是有效的成功
+        {'apk_name': 'empty', 'status': 'SUCCESS', 'leaks_found': '0', 'total_time_sec': '20', 'exit_code': '0'},
+    ], results=['legacy'])
+    (run / "corrupt_results.xml").write_text("<DataFlowResults><Results><Result>")
+    store.ingest(tmp_path)
+
+    clusters = triage(store, tmp_path)
+    assert sum(c['count'] for c in clusters) == 3
+    (killed,) = clusters
+    assert killed['label'] == "KILLED @ startup" and set(killed['apks']) == {'legacy', 'corrupt', 'empty'}
+    assert killed['fixed']['cheaper_mode'] == 2 and killed['fixed']['never'] == 1
+    assert killed['fix_modes'] == {'ne_ns': 2}
@@ -0,0 +1,28 @@
+"""flow_diff：0 泄露且没有结果文件的成功是空流集合，应有结果却缺失时为 UNREADABLE"""
+
+from flow_diff import diff, resolve_side
+from test_flow_table import SINK, results
+from test_results_store import write_run
+
+
+def test_zero_leak_success_without_file(tmp_path, store):
+    base = write_run(tmp_path, "20260101-1000-39apps-max-precision", [
+        {'apk_name': 'leaky', 'status': 'SUCCESS', 'leaks_found': '1', 'exit_code': '0'},
+        {'apk_name': 'quiet', 'status': 'SUCCESS', 'leaks_found': '0', 'exit_code': '0'},
+        {'apk_name': 'broken', 'status': 'SUCCESS', 'leaks_found': '2', 'exit_code': '0'},
+    ])
+    (base / "leaky_results.xml").write_text(results(SINK))
+    write_run(tmp_path, "20260101-1100-39apps-no-exceptions", [
+        {'apk_name': 'leaky', 'status': 'SUCCESS', 'leaks_found': '0', 'exit_code': '0'},
+        {'apk_name': 'quiet', 'status': 'SUCCESS', 'leaks_found': '0', 'exit_code': '0'},
+        {'apk_name': 'broken', 'status': 'SUCCESS', 'leaks_found': '0', 'exit_code': '0'},
+    ])
+    store.ingest(tmp_path)
+    sides = [resolve_side(store, "20260101-1000-39apps-max-precision"), resolve_side(store, "ne")]
+    rows, _ = diff(sides, {}, output_base=tmp_path, workers=1)
+    rows = {row['apk']: row for row in rows}
+
+    assert (rows['leaky']['other_status'], rows['leaky']['other_flows'], rows['leaky']['removed']) == ('SUCCESS', 0, 1)
+    assert (rows['quiet']['baseline_flows'], rows['quiet']['other_flows'], rows['quiet']['common']) == (0, 0, 0)
+    assert rows['broken']['baseline_status'] == 'UNREADABLE' and rows['broken']['baseline_flows'] is None
+    assert rows['broken']['other_status'] == 'SUCCESS'
@@ -0,0 +1,53 @@
+"""flow_table：构建、mmap 载入、查询和指纹失效"""
+
+from xml.sax.saxutils import quoteattr
+
+from flow_table import FlowTable, build, load
+from test_results_store import write_run
+
+SOURCE = "<android.telephony.TelephonyManager: java.lang.String getDeviceId()>"
+SINK = "<android.util.Log: int i(java.lang.String,java.lang.String)>"
+METHOD = "<com.foo.Main: void onCreate(android.os.Bundle)>"
+
+
+def results(*sinks):
+    body = "".join(
+        f"<Result><Sink Statement={quoteattr(f'staticinvoke {sink}($r1, $r{i})')} Method={quoteattr(METHOD)} "
+        f"MethodSourceSinkDefinition={quoteattr(sink)}/><Sources><Source "
+        f"Statement={quoteattr(f'$r{i} = virtualinvoke $r0.{SOURCE}()')} Method={quoteattr(METHOD)} "
+        f"MethodSourceSinkDefinition={quoteattr(SOURCE)}/></Sources></Result>"
+        for i, sink in enumerate(sinks, 2))
+    return f"<DataFlowResults><Results>{body}</Results></DataFlowResults>"
+
+
+def test_build_and_query(tmp_path, store):
+    run = write_run(tmp_path, "20260101-1000-39apps-max-precision", [
+        {'apk_name': 'one', 'status': 'SUCCESS', 'leaks_found': '2', 'total_time_sec': '3', 'exit_code': '0'},
+        {'apk_name': 'two', 'status': 'SUCCESS', 'leaks_found': '1', 'total_time_sec': '3', 'exit_code': '0'},
+        # 0 泄露的成功没有结果文件，不算读取失败；应有结果却缺失的才算
+        {'apk_name': 'quiet', 'status': 'SUCCESS', 'leaks_found': '0', 'total_time_sec': '3', 'exit_code': '0'},
+        {'apk_name': 'lost', 'status': 'SUCCESS', 'leaks_found': '4', 'total_time_sec': '3', 'exit_code': '0'},
+    ])
+    (run / "one_results.xml").write_text(results(SINK, "<java.io.Writer: void write(java.lang.String)>"))
+    (run / "two_results.xml").write_text(results(SINK))
+    store.ingest(tmp_path)
+    table_file = tmp_path / "flow_table.bin"
+    stats = build(store, tmp_path, table_file)
+    assert (stats['rows'], stats['files'], stats['unreadable']) == (3, 3, 1)
+
+    with FlowTable(table_file) as table:
+        assert table.rows == 3
+        rows = table.select(source="getDeviceId", sink="android.util.Log")
+        assert table.group_count(['apk'], rows) == {('one',): 1, ('two',): 1}
+        # 语句列为规范化后的语句，不同的寄存器名落到同一个字符串
+        assert len(table.group_count(['source_statement'])) == 1
+        assert table.select(sink="no.such.Sink") == []
+
+    # 结果库有新的成功作业时重新构建
+    write_run(tmp_path, "20260101-1100-39apps-max-precision", [
+        {'apk_name': 'three', 'status': 'SUCCESS', 'leaks_found': '1', 'total_time_sec': '3', 'exit_code': '0'},
+    ], results=[])
+    (tmp_path / "20260101-1100-39apps-max-precision" / "three_results.xml").write_text(results(SINK))
+    store.ingest(tmp_path)
+    with load(store, table_file, tmp_path) as table:
+        assert table.rows == 4
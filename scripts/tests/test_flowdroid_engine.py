@@ -0,0 +1,74 @@
+"""flowdroid_engine：deadline 取消时运行中和等待预算池的作业都写出 CANCELLED 行；替身运行不进入结果缓存"""
+
+import argparse
+import asyncio
+import csv
+import sys
+
+import pytest
+
+import flowdroid_engine
+from conftest import SCRIPTS_DIR
+from flowdroid_engine import Cell, FlowDroidEngine, RunConfig, add_engine_arguments, engine_kwargs
+
+STUB = f"{sys.executable} {SCRIPTS_DIR / 'stub_flowdroid.py'}"
+
+
+def test_deadline_cancels_running_and_waiting_jobs(tmp_path, monkeypatch):
+    monkeypatch.setattr(flowdroid_engine, 'OUTPUT_BASE', tmp_path)
+    monkeypatch.setattr(flowdroid_engine, 'CACHE_DIR', tmp_path / ".cache")
+    monkeypatch.setenv('STUB_FLOWDROID_LATENCY', '60')
+    apks = []
+    for name in ('first', 'second', 'third'):
+        apks.append(tmp_path / f"{name}.apk")
+        apks[-1].write_bytes(name.encode())
+    (tmp_path / "SourcesAndSinks.txt").write_text("")
+    (tmp_path / "flowdroid.jar").write_bytes(b"")
+    config = RunConfig(source_sink=tmp_path / "SourcesAndSinks.txt", jar=tmp_path / "flowdroid.jar")
+    cell = Cell(config, apks, tmp_path / "run")
+    # 预算只够一个 4g 的堆：第二个作业阻塞在预算池，第三个还在队列中
+    engine = FlowDroidEngine(tmp_path / "run" / "analysis_summary.log", jobs=2, heap="4g", mem_budget="4g",
+                             schedule="alpha", deadline=2, object_store=None,
+                             launcher=STUB)
+    summary = asyncio.run(engine.run_async([cell]))
+
+    assert summary['cancelled']
+    assert (summary['interrupted'], summary['not_started'], summary['failed']) == (1, 2, 0)
+    with open(cell.summary_file) as f:
+        rows = {row['apk_name']: row for row in csv.DictReader(f)}
+    assert set(rows) == {'first', 'second'}
+    assert rows['first']['status'] == rows['second']['status'] == 'CANCELLED'
+    assert float(rows['second']['total_time_sec']) == 0
+
+
+def test_launcher_run_never_hits_for_real_run(tmp_path, monkeypatch):
+    monkeypatch.setattr(flowdroid_engine, 'OUTPUT_BASE', tmp_path)
+    monkeypatch.setattr(flowdroid_engine, 'CACHE_DIR', tmp_path / ".cache")
+    (tmp_path / "app.apk").write_bytes(b"app")
+    (tmp_path / "SourcesAndSinks.txt").write_text("")
+    (tmp_path / "flowdroid.jar").write_bytes(b"")
+    config = RunConfig(source_sink=tmp_path / "SourcesAndSinks.txt", jar=tmp_path / "flowdroid.jar")
+    cell = Cell(config, [tmp_path / "app.apk"], tmp_path / "stub")
+
+    stub = FlowDroidEngine(tmp_path / "stub" / "analysis_summary.log", heap="4g", schedule="alpha",
+                           object_store=None, launcher=STUB)
+    assert asyncio.run(stub.run_async([cell]))['success'] == 1
+    real = FlowDroidEngine(tmp_path / "real" / "analysis_summary.log", heap="4g", schedule="alpha",
+                           object_store=None)
+    (stub_job,), _ = stub.expand([cell])
+    (real_job,), _ = real.expand([cell])
+
+    assert stub_job.key != real_job.key
+    assert real.cache.lookup(real_job.key) is None
+    assert stub.cache.lookup(stub_job.key) is None
+
+
+def test_launcher_requires_separate_output_base(monkeypatch):
+    parser = argparse.ArgumentParser()
+    add_engine_arguments(parser)
+    args = parser.parse_args(['--launcher', STUB])
+    monkeypatch.setattr(flowdroid_engine, 'OUTPUT_BASE', flowdroid_engine.DEFAULT_OUTPUT_BASE)
+    with pytest.raises(ValueError):
+        engine_kwargs(args)
+    monkeypatch.setattr(flowdroid_engine, 'OUTPUT_BASE', flowdroid_engine.DEFAULT_OUTPUT_BASE / "stub")
+    assert engine_kwargs(args)['launcher'] == STUB
@@ -0,0 +1,69 @@
+"""flowdroid_pool：内存大小解析和预算池的准入规则"""
+
+import asyncio
+
+import pytest
+
+from flowdroid_pool import AsyncMemoryBudgetPool, format_mem, parse_mem_gb
+
+
+def test_parse_and_format_mem():
+    assert parse_mem_gb("180g") == parse_mem_gb("180G") == parse_mem_gb("180gb") == parse_mem_gb(" 180 ") == 180
+    assert parse_mem_gb("512m") == 0.5 and parse_mem_gb("1t") == 1024
+    assert parse_mem_gb("1048576k") == 1 and parse_mem_gb(2.5) == 2.5
+    with pytest.raises(ValueError):
+        parse_mem_gb("lots")
+    assert format_mem(40) == "40g" and format_mem(1.5) == "1536m"
+    assert parse_mem_gb(format_mem(2.75)) == 2.75
+
+
+def test_pool_admits_within_budget():
+    async def scenario():
+        pool = AsyncMemoryBudgetPool(mem_budget_gb=10, max_cores=4)
+        order = []
+
+        async def job(name, mem_gb, cores, hold):
+            async with pool.reserve(mem_gb, cores):
+                order.append(name)
+                await hold.wait()
+
+        holds = {name: asyncio.Event() for name in "abcd"}
+        tasks = [asyncio.create_task(job('a', 6, 1, holds['a'])),
+                 asyncio.create_task(job('b', 4, 1, holds['b'])),
+                 asyncio.create_task(job('c', 2, 1, holds['c'])),   # 内存不够：等 a 或 b 结束
+                 asyncio.create_task(job('d', 1, 3, holds['d']))]   # 核数不够
+        await asyncio.sleep(0.01)
+        assert order == ['a', 'b'] and (pool.used_mem_gb, pool.used_cores) == (10, 2)
+        holds['a'].set()
+        await asyncio.sleep(0.01)
+        assert order == ['a', 'b', 'c'] and pool.running == 2
+        holds['b'].set()
+        holds['c'].set()
+        await asyncio.sleep(0.01)
+        assert order[-1] == 'd'
+        holds['d'].set()
+        await asyncio.gather(*tasks)
+        assert (pool.running, pool.used_mem_gb, pool.used_cores) == (0, 0, 0)
+        assert (pool.peak_mem_gb, pool.peak_running) == (10, 2)
+
+    asyncio.run(scenario())
+
+
+def test_oversized_job_runs_alone_and_waiter_can_be_cancelled():
+    async def scenario():
+        pool = AsyncMemoryBudgetPool(mem_budget_gb=8, max_cores=8)
+        await pool.acquire(2)
+        waiter = asyncio.create_task(pool.acquire(16))
+        await asyncio.sleep(0.01)
+        # 超过整个预算的作业只在池空闲时独占运行
+        assert not waiter.done()
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert pool.running == 1
+        await pool.release(2)
+        async with pool.reserve(16):
+            assert pool.running == 1 and pool.used_mem_gb == 16
+        assert pool.running == 0
+
+    asyncio.run(scenario())
@@ -0,0 +1,63 @@
+"""ground_truth_eval：标注载入、TP / FN / FP 计数，0 泄露且没有结果文件的成功不是 UNREADABLE"""
+
+import json
+
+from ground_truth_eval import evaluate, load_findings, select_jobs, summarize
+from test_flow_table import SINK, SOURCE, results
+from test_results_store import write_run
+
+WRITER = "<java.io.Writer: void write(java.lang.String)>"
+
+
+def finding(fid, sink, negative=False):
+    location = {'className': "com.foo.Main", 'methodName': "protected void onCreate(Bundle b)"}
+    return {'ID': fid, 'isNegative': negative,
+            'source': {**location, 'IRs': [{'IRstatement': f"r5 = virtualinvoke r4.{SOURCE}()"}]},
+            'sink': {**location, 'IRs': [{'IRstatement': f"staticinvoke {sink}(r9, r5)"}]}}
+
+
+def write_findings(findings_dir):
+    findings_dir.mkdir()
+    unlocated = {'ID': 4, 'source': {'IRs': []}, 'sink': {'IRs': []}}
+    (findings_dir / "app_findings.json").write_text(json.dumps({'findings': [
+        finding(1, SINK), finding(2, "<android.util.Log: int e(java.lang.String,java.lang.String)>"),
+        finding(3, WRITER, negative=True), unlocated]}))
+    return findings_dir
+
+
+def test_load_findings(tmp_path):
+    findings = load_findings(write_findings(tmp_path / "findings"))
+    positives, negatives = findings['app']
+    # 没有 IR 语句的 finding 不参与评估
+    assert (len(positives), len(negatives)) == (2, 1)
+    (signatures,) = load_findings(tmp_path / "findings", 'signature')['app'][1]
+    assert signatures == [(SOURCE, WRITER)]
+
+
+def test_evaluate_counts_and_zero_leak_success(tmp_path, store):
+    findings = load_findings(write_findings(tmp_path / "findings"))
+    full = write_run(tmp_path, "20260101-1000-39apps-max-precision", [
+        {'apk_name': 'app', 'status': 'SUCCESS', 'leaks_found': '2', 'exit_code': '0'},
+        {'apk_name': 'unannotated', 'status': 'SUCCESS', 'leaks_found': '0', 'exit_code': '0'}])
+    (full / "app_results.xml").write_text(results(SINK, WRITER))
+    write_run(tmp_path, "20260101-1100-39apps-no-exceptions", [
+        {'apk_name': 'app', 'status': 'SUCCESS', 'leaks_found': '0', 'exit_code': '0'}])
+    write_run(tmp_path, "20260101-1200-39apps-no-static", [
+        {'apk_name': 'app', 'status': 'SUCCESS', 'leaks_found': '3', 'exit_code': '0'}])
+    write_run(tmp_path, "20260101-1300-39apps-no-exception-no-static", [
+        {'apk_name': 'app', 'status': 'FAILED (exit: 1)', 'exit_code': '1'}])
+    store.ingest(tmp_path)
+    table = evaluate(select_jobs(store, []), findings, output_base=tmp_path, workers=1)
+    rows = {row['mode']: row for row in table}
+
+    assert len(table) == 4
+    # isNegative 的 finding 被检出计为 FP
+    assert (rows['full']['status'], rows['full']['tp'], rows['full']['fn'], rows['full']['fp']) == ('SUCCESS', 1, 1, 1)
+    assert rows['full']['precision'] == 0.5 and rows['full']['recall'] == 0.5
+    assert (rows['ne']['status'], rows['ne']['tp'], rows['ne']['fn'], rows['ne']['detected_pairs']) == \
+        ('SUCCESS', 0, 2, 0)
+    assert rows['ns']['status'] == 'UNREADABLE'
+    assert (rows['ne_ns']['status'], rows['ne_ns']['fn']) == ('FAILED', 2)
+    assert [s['success'] for s in summarize(table)] == [1, 1, 0, 0]
+    assert len(evaluate(select_jobs(store, ["20260101-1100-39apps-no-exceptions"]), findings,
+                        output_base=tmp_path, workers=1)) == 1
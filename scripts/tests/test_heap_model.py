@@ -0,0 +1,80 @@
+"""heap_model.HeapModel.predict：历史峰值、OOM 放大、被杀下限和 dex 系数拟合"""
+
+import zipfile
+from pathlib import Path
+
+import flowdroid_engine
+from flowdroid_engine import FlowDroidEngine, Job, RunConfig
+from heap_model import HeapModel
+
+
+def record(status, peak_gb=None, heap_gb=None, exit_code='', timeout_reason='', mode='full'):
+    return {'mode': mode, 'multiplier': 1, 'status': status, 'total_time': 100.0, 'callgraph_time': None,
+            'dataflow_time': None, 'peak_gb': peak_gb, 'heap_gb': heap_gb, 'exit_code': exit_code,
+            'timeout_reason': timeout_reason}
+
+
+def model(history, **kwargs):
+    return HeapModel(Path("/nonexistent"), mode='full', history=history, **kwargs)
+
+
+def test_history_peak_with_margin():
+    assert model({'a': [record('SUCCESS', peak_gb=10)]}).predict(Path("a.apk")) == (15, "history")
+    assert model({'a': [record('SUCCESS', peak_gb=0.4)]}).predict(Path("a.apk")) == (4, "history")
+
+
+def test_oom_bumps_heap():
+    history = {'a': [record('SUCCESS', peak_gb=4), record('FAILED', heap_gb=16, exit_code='1',
+                                                          timeout_reason='OUT_OF_MEMORY')]}
+    assert model(history).predict(Path("a.apk")) == (32, "oom")
+
+
+def test_killed_attempt_is_a_floor():
+    # 旧记录没有 heap_gb：按当时的全局上限，被杀的 APK 不能被预测成更小的堆
+    history = {'a': [record('SUCCESS', peak_gb=2, mode='ne_ns'), record('FAILED', exit_code='-9')],
+               'b': [record('FAILED', heap_gb=48, exit_code='137'), record('SUCCESS', peak_gb=8)]}
+    heap = model(history)
+    assert heap.predict(Path("a.apk")) == (180, "killed")
+    assert heap.predict(Path("b.apk")) == (48, "killed")
+    # 有明确原因的失败（超时后被杀）不是内存下限
+    timeout = {'c': [record('SUCCESS', peak_gb=2), record('FAILED', exit_code='-9',
+                                                          timeout_reason='DATAFLOW_TIMEOUT')]}
+    assert model(timeout).predict(Path("c.apk")) == (4, "history")
+
+
+def test_repo_history(repo_output):
+    heap = HeapModel(repo_output, mode='full', max_heap_gb=180)
+    for apk in ('xbot_android_samp', 'scipiex', 'remote_control_smack', 'vibleaker_android_samp'):
+        assert heap.predict(Path(f"{apk}.apk")) == (180, "killed")
+    # 20260211-1657 的 peak_memory_gb 列实际为 MB
+    gb, source = heap.predict(Path("backflash.apk"))
+    assert source == "history" and gb == 4
+
+
+def write_apk(path, dex_mb):
+    with zipfile.ZipFile(path, 'w') as zf:
+        zf.writestr("classes.dex", b"\0" * int(dex_mb * 1024 ** 2))
+    return path
+
+
+def test_dex_rate_does_not_depend_on_planned_set(tmp_path, monkeypatch):
+    monkeypatch.setattr(flowdroid_engine, 'OUTPUT_BASE', tmp_path)
+    monkeypatch.setattr(flowdroid_engine, 'CACHE_DIR', tmp_path / ".cache")
+    apk_dir = tmp_path / "apks"
+    apk_dir.mkdir()
+    write_apk(apk_dir / "a.apk", 1)
+    write_apk(apk_dir / "b.apk", 2)
+    job = Job(write_apk(apk_dir / "c.apk", 3), RunConfig(), "c-key")
+    # a、b 的峰值拟合出每 MB dex 2.5 GB：c 需要 3 × 2.5 × 1.5 余量
+    history = {'a': [record('SUCCESS', peak_gb=2)], 'b': [record('SUCCESS', peak_gb=6)]}
+
+    heaps = []
+    for plan in (True, False):
+        engine = FlowDroidEngine(tmp_path / "run" / "analysis_summary.log", heap="auto", object_store=None)
+        engine.history = history
+        if plan:
+            engine._plan_heaps([job])  # 本地扫描：整体规划
+            heaps.append(engine.heaps[job.key])
+        else:
+            heaps.append(engine._heap_for(job))  # 队列 worker：逐个领取
+    assert heaps == [12, 12]
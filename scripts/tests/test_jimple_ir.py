@@ -0,0 +1,80 @@
+"""jimple_ir：语句规范化（alpha 重命名）、语句分类和所在方法键"""
+
+import pickle
+
+from jimple_ir import (
+    FlowStatementIndex, java_method_key, jimple_method_keys, parse_statement, taintbench_keys
+)
+from results_reader import Endpoint, Result
+
+GET_ISO = "<android.telephony.TelephonyManager: java.lang.String getSimCountryIso()>"
+SEND_SMS = ("<android.telephony.SmsManager: void sendTextMessage(java.lang.String,java.lang.String,"
+            "java.lang.String,android.app.PendingIntent,android.app.PendingIntent)>")
+
+
+def test_locals_are_renamed_in_order():
+    taintbench = parse_statement(f"$r9 = virtualinvoke $r4.{GET_ISO}()")
+    flowdroid = parse_statement(f"r27 = virtualinvoke r3.{GET_ISO}()")
+    assert taintbench == flowdroid and hash(taintbench) == hash(flowdroid)
+    assert taintbench.text == f"v0 = virtualinvoke v1.{GET_ISO}()"
+    assert (taintbench.kind, taintbench.invoke, taintbench.signature, taintbench.result) == \
+        ("assign_invoke", "virtualinvoke", GET_ISO, True)
+
+
+def test_aliases_and_constants_are_kept():
+    log = "<android.util.Log: int d(java.lang.String,java.lang.String)>"
+    same = parse_statement(f"$r5 = staticinvoke {log}($r1, $r1)")
+    different = parse_statement(f"$r5 = staticinvoke {log}($r1, $r2)")
+    assert same.args == ('v1', 'v1') and different.args == ('v1', 'v2')
+    assert same != different
+
+    sms = parse_statement(f'virtualinvoke $r2.{SEND_SMS}($r3, null, "a, b", null, null)')
+    assert (sms.kind, sms.result) == ("invoke", False)
+    assert sms.args == ('v1', 'null', '"a, b"', 'null', 'null')
+    assert sms != parse_statement(f'virtualinvoke $r2.{SEND_SMS}($r3, null, "other", null, null)')
+
+
+def test_statement_kinds():
+    field = "<com.foo.Bar: java.lang.String id>"
+    assert parse_statement("r0 := @this: com.foo.Bar").kind == "identity"
+    assert parse_statement("$r1 := @parameter0: java.lang.String").text == "v0 := @parameter0: java.lang.String"
+    assert parse_statement(f"$r1 = r0.{field}").kind == "field_read"
+    assert parse_statement(f"r0.{field} = $r1").kind == "field_write"
+    assert parse_statement("$r1 = <com.foo.Bar: int COUNT>").signature == "<com.foo.Bar: int COUNT>"
+    assert parse_statement("return $r2").kind == "return"
+    assert parse_statement("$i1 = $i0 + 1").kind == "assign"
+    assert parse_statement("specialinvoke r0.<com.foo.Bar: void <init>()>()").signature == \
+        "<com.foo.Bar: void <init>()>"
+
+
+def test_statement_pickles():
+    statement = parse_statement(f"$r9 = virtualinvoke $r4.{GET_ISO}()")
+    assert pickle.loads(pickle.dumps(statement)) == statement
+
+
+def test_method_keys_match_both_notations():
+    flowdroid = jimple_method_keys("<com.foo.Outer$1: void onClick(android.view.View)>")
+    assert flowdroid == {('com.foo.Outer.1', 'onClick', 1), ('com.foo.Outer', 'onClick', 1)}
+    assert java_method_key("com.foo.Outer.AnonymousClass1", "public void onClick(View v)") in flowdroid
+    assert java_method_key("com.foo.Outer", "public void onClick(View view)") in flowdroid
+    assert java_method_key("com.foo.Outer", "public Outer(Context c, Map<String, Integer> m)") == \
+        ('com.foo.Outer', '<init>', 2)
+    assert java_method_key("com.foo.Outer", "static {}") == ('com.foo.Outer', '<clinit>', 0)
+    assert jimple_method_keys(None) == frozenset() and java_method_key("com.foo.Outer", "") is None
+
+
+def test_index_detects_statement_pairs():
+    method = "<com.foo.Main: void onCreate(android.os.Bundle)>"
+    source = Endpoint(f"$r3 = virtualinvoke $r2.{GET_ISO}()", method, GET_ISO, None, ())
+    sink = Endpoint(f'virtualinvoke $r4.{SEND_SMS}($r5, null, $r3, null, null)', method, SEND_SMS, None, ())
+    index = FlowStatementIndex([Result(sink, (source,))])
+
+    location = {'className': "com.foo.Main", 'methodName': "protected void onCreate(Bundle b)"}
+    truth_source = taintbench_keys({**location, 'IRs': [{'IRstatement': f"r7 = virtualinvoke r6.{GET_ISO}()"}]})
+    truth_sink = taintbench_keys({**location, 'IRs': [
+        {'IRstatement': f'virtualinvoke r8.{SEND_SMS}(r9, null, r7, null, null)'}]})
+    assert index.detects(truth_source, truth_sink)
+    # 同一 API 的另一个调用点（参数形状不同）不算检出
+    other_sink = taintbench_keys({**location, 'IRs': [
+        {'IRstatement': f'virtualinvoke r8.{SEND_SMS}(r9, null, "x", null, null)'}]})
+    assert not index.detects(truth_source, other_sink)
@@ -0,0 +1,67 @@
+"""job_cgroup：在伪造的 cgroupfs 目录上检查父 cgroup、子 cgroup 的限额写入、计量读取和删除"""
+
+import pytest
+
+import job_cgroup
+from job_cgroup import CPU_PERIOD_USEC, JobCgroup, check_parent
+
+
+@pytest.fixture
+def cgroupfs(tmp_path, monkeypatch):
+    root = tmp_path / "cgroup"
+    root.mkdir()
+    (root / "cgroup.controllers").write_text("cpuset cpu io memory pids\n")
+    monkeypatch.setattr(job_cgroup, 'CGROUP_ROOT', root)
+    parent = root / "flowdroid"
+    parent.mkdir()
+    (parent / "cgroup.controllers").write_text("cpu io memory\n")
+    (parent / "cgroup.subtree_control").write_text("")
+    return parent
+
+
+def test_check_parent(cgroupfs):
+    assert check_parent(cgroupfs) == cgroupfs
+    assert (cgroupfs / "cgroup.subtree_control").read_text() == "+memory +cpu"
+    (cgroupfs / "cgroup.controllers").write_text("io\n")
+    with pytest.raises(RuntimeError, match="cpu, memory"):
+        check_parent(cgroupfs)
+
+
+def test_check_parent_requires_cgroup_v2(cgroupfs):
+    (job_cgroup.CGROUP_ROOT / "cgroup.controllers").unlink()
+    with pytest.raises(RuntimeError):
+        check_parent(cgroupfs)
+
+
+def test_job_cgroup_limits_and_stats(cgroupfs):
+    cg = JobCgroup(cgroupfs, "app:ne/1x", mem_max_gb=2, cpus=1.5)
+    assert cg.path == cgroupfs / "app_ne_1x"
+    assert (cg.path / "memory.max").read_text() == str(2 * 1024 ** 3)
+    assert (cg.path / "cpu.max").read_text() == f"{int(1.5 * CPU_PERIOD_USEC)} {CPU_PERIOD_USEC}"
+    assert cg.wrap(["java", "-jar", "x.jar"])[-4:] == [str(cg.path / "cgroup.procs"), "java", "-jar", "x.jar"]
+
+    # 较早的内核没有 memory.peak / cpu.stat：计量为 None，由 /proc 采样补上
+    assert cg.stats() == {'peak_gb': None, 'cpu_time_sec': None, 'throttled_sec': 0, 'oom_kills': 0}
+    (cg.path / "memory.peak").write_text(f"{3 * 1024 ** 3}\n")
+    (cg.path / "memory.current").write_text(f"{1024 ** 3}\n")
+    (cg.path / "cpu.stat").write_text("usage_usec 2500000\nuser_usec 2000000\nthrottled_usec 500000\n")
+    (cg.path / "memory.events").write_text("low 0\nhigh 0\nmax 4\noom 1\noom_kill 1\n")
+    assert cg.stats() == {'peak_gb': 3, 'cpu_time_sec': 2.5, 'throttled_sec': 0.5, 'oom_kills': 1}
+    assert cg.current_gb == 1
+
+    (cg.path / "cgroup.kill").write_text("")
+    cg.kill()
+    assert (cg.path / "cgroup.kill").read_text() == "1"
+
+
+def test_stale_cgroup_is_replaced_and_removed(cgroupfs):
+    stale = cgroupfs / "app"
+    stale.mkdir()
+    cg = JobCgroup(cgroupfs, "app", mem_max_gb=1, cpus=1)
+    assert (cg.path / "memory.max").exists()
+    # 真实 cgroupfs 中控制文件随目录一起删除；伪造目录里先清掉
+    for f in cg.path.iterdir():
+        f.unlink()
+    cg.remove()
+    assert not cg.path.exists()
+    cg.remove()
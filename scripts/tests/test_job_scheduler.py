@@ -0,0 +1,25 @@
+"""job_scheduler.load_history：旧版 CSV 与无效 SUCCESS 的处理"""
+
+from job_scheduler import load_history
+from test_results_store import write_run
+
+
+def test_load_history_legacy_and_no_result(tmp_path):
+    write_run(tmp_path, "20260101-1000-39apps-max-precision", [
+        {'apk_name': 'heavy', 'status': 'FAILED (exit: 137)', 'total_time_sec': '276'},
+        {'apk_name': 'bogus', 'status': 'SUCCESS', 'total_time_sec': '0.01', 'exit_code': '0'},
+        {'apk_name': 'found', 'status': 'SUCCESS', 'total_time_sec': '3', 'peak_memory_gb': '1.5',
+         'exit_code': '0'},
+    ], results=['found'])
+    history = load_history(tmp_path)
+    assert [(r['status'], r['exit_code'], r['total_time']) for r in history['heavy']] == [('FAILED', '137', 276)]
+    assert 'bogus' not in history
+    assert history['found'][0]['peak_gb'] == 1.5
+
+
+def test_load_history_repo(repo_output):
+    history = load_history(repo_output)
+    # 20260211-1657 只有 analysis_time_sec，且状态为 "FAILED (exit: 137)"
+    assert any(r['exit_code'] == '137' and r['total_time'] == 276 for r in history['cajino_baidu'])
+    assert all(r['status'] in ('SUCCESS', 'FAILED') for runs in history.values() for r in runs)
+    assert all(r['total_time'] > 0.05 for r in history['godwon_samp'] if r['status'] == 'SUCCESS')
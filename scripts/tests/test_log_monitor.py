@@ -0,0 +1,82 @@
+"""log_monitor：增量读取日志、阶段识别（只向前推进）、源汇点 / 泄露事件和预算判断"""
+
+import json
+
+import pytest
+
+from log_monitor import EventLog, LogTailer, PhaseMonitor, parse_budgets
+
+INFO = "[main] INFO soot.jimple.infoflow"
+LOG = [
+    f"{INFO}.android.SetupApplication - Initializing Soot...",
+    f"{INFO}.android.SetupApplication - Constructing the callgraph...",
+    f"{INFO}.android.SetupApplication - Callgraph construction took 12 seconds",
+    f"{INFO}.android.SetupApplication - Source lookup done, found 31 sources and 17 sinks.",
+    f"{INFO}.Infoflow - IFDS problem with 51234 forward and 0 backward edges solved in 40 seconds",
+    f"{INFO}.Infoflow - Found 3 leaks",
+]
+
+
+def test_tailer_returns_complete_lines(tmp_path):
+    log = tmp_path / "app.log"
+    tailer = LogTailer(log)
+    assert tailer.poll() == []
+    with open(log, 'w') as f:
+        f.write("first\nsec")
+    assert tailer.poll() == ["first"]
+    with open(log, 'a') as f:
+        f.write("ond\n\xe4\n")
+    assert tailer.poll() == ["second", "\xe4"]
+    assert tailer.poll() == []
+
+
+def test_phases_and_events():
+    monitor = PhaseMonitor("app")
+    t0 = monitor.start
+    events = monitor.feed(LOG[:2], now=t0 + 2)
+    assert [e['event'] for e in events] == ['first_output', 'phase', 'phase']
+    assert monitor.phase == 'callgraph'
+
+    events = monitor.feed(LOG[2:4], now=t0 + 14)
+    assert [(e['event'], e['phase']) for e in events] == [
+        ('phase', 'source_sink'), ('phase', 'dataflow'), ('sources_sinks', 'dataflow')]
+    assert (events[-1]['sources'], events[-1]['sinks']) == (31, 17)
+    assert events[0]['previous'] == 'callgraph' and events[0]['previous_sec'] == 12
+
+    # 已经过去的阶段的标志不会让阶段后退
+    assert monitor.feed([LOG[0]], now=t0 + 20) == []
+    events = monitor.feed(LOG[4:], now=t0 + 54)
+    assert [e['event'] for e in events] == ['phase', 'phase', 'leaks'] and events[-1]['leaks'] == 3
+    assert monitor.phase == 'serialize'
+    (exit_event,) = monitor.finish(now=t0 + 55)
+    assert exit_event['event'] == 'exit' and exit_event['elapsed_sec'] == 55
+
+    timings = monitor.timings()
+    assert timings['jvm_start'] == 2 and timings['callgraph'] == 12 and timings['dataflow'] == 40
+    assert timings['serialize'] == 1 and 'manifest' not in timings
+    assert sum(sec for phase, sec in timings.items() if phase != 'jvm_start') == 55
+
+
+def test_budgets():
+    assert parse_budgets(["callgraph=600", "dataflow=1800.5"]) == {'callgraph': 600, 'dataflow': 1800.5}
+    with pytest.raises(ValueError):
+        parse_budgets(["solver=10"])
+
+    monitor = PhaseMonitor("app", {'callgraph': 60}, rss_budget_gb=8)
+    t0 = monitor.start
+    assert monitor.check_budget(4, now=t0 + 3600) is None  # startup 阶段没有预算
+    monitor.feed(LOG[1:2], now=t0 + 10)
+    assert monitor.check_budget(4, now=t0 + 69) is None
+    assert monitor.check_budget(4, now=t0 + 71) == "BUDGET_CALLGRAPH"
+    monitor.feed(LOG[2:3], now=t0 + 72)
+    assert monitor.check_budget(8.5, now=t0 + 73) == "BUDGET_RSS"
+
+
+def test_event_log(tmp_path):
+    log = EventLog(tmp_path / "events.jsonl")
+    log.write([])
+    assert not log.path.exists()
+    log.write([{'event': 'phase', 'apk': '应用'}])
+    log.write([{'event': 'exit'}])
+    with open(log.path) as f:
+        assert [json.loads(line)['event'] for line in f] == ['phase', 'exit']
@@ -0,0 +1,81 @@
+"""object_store / result_cache：缓存条目只引用对象库中的对象，CSV 记录逻辑路径"""
+
+import csv
+
+import compressed_io
+import flowdroid_engine
+from flowdroid_engine import Cell, FlowDroidEngine, RunConfig
+from object_store import ObjectStore, gc, migrate, usage
+from result_cache import ResultCache
+
+
+def run_cell(tmp_path, name):
+    config = RunConfig(source_sink=tmp_path / "SourcesAndSinks.txt", jar=tmp_path / "flowdroid.jar")
+    cell = Cell(config, [tmp_path / "app.apk"], tmp_path / name)
+    engine = FlowDroidEngine(tmp_path / name / "analysis_summary.log", heap="4g", schedule="alpha",
+                             compress="none", object_store=tmp_path / "objects")
+    summary = engine.run([cell])
+    with open(cell.summary_file) as f:
+        return summary, list(csv.DictReader(f))
+
+
+def test_cache_entries_reference_objects(tmp_path, monkeypatch, fake_java):
+    monkeypatch.setattr(flowdroid_engine, 'OUTPUT_BASE', tmp_path)
+    monkeypatch.setattr(flowdroid_engine, 'CACHE_DIR', tmp_path / ".cache")
+    (tmp_path / "app.apk").write_bytes(b"app")
+    (tmp_path / "SourcesAndSinks.txt").write_text("")
+    (tmp_path / "flowdroid.jar").write_bytes(b"")
+
+    first, (row,) = run_cell(tmp_path, "run1")
+    assert first['success'] == 1 and row['output_file'] == str(tmp_path / "run1" / "app_results.xml")
+    second, (row,) = run_cell(tmp_path, "run2")
+    assert second['cache_hits'] == 1 and row['output_file'] == str(tmp_path / "run2" / "app_results.xml")
+
+    # 缓存条目没有自己的结果文件，只有清单；两次运行和缓存共用同一组对象
+    (entry,) = [p.parent for p in (tmp_path / ".cache").rglob("metrics.json")]
+    assert sorted(p.name for p in entry.iterdir()) == [compressed_io.MANIFEST, "metrics.json"]
+    assert compressed_io.resolve(entry / "results.xml").parent.parent == tmp_path / "objects"
+    stats = usage(tmp_path, ObjectStore(tmp_path / "objects"))
+    assert stats['references'] == 3 * stats['referenced_objects'] and stats['missing'] == 0
+
+    # 只被缓存引用的对象不会被 gc 回收
+    for run in ("run1", "run2"):
+        (tmp_path / run / compressed_io.MANIFEST).unlink()
+    assert gc(tmp_path, ObjectStore(tmp_path / "objects"), min_age_sec=0)['removed'] == 0
+    assert compressed_io.resolve(entry / "analysis.log") is not None
+
+
+def test_migrate_dedups_cache_entries(tmp_path):
+    cache = ResultCache(tmp_path / ".cache")
+    (tmp_path / "run").mkdir()
+    xml, log = tmp_path / "run" / "app_results.xml", tmp_path / "run" / "app.log"
+    xml.write_text("<DataFlowResults/>")
+    log.write_text("log")
+    cache.store("ab" * 32, xml, log, {'exit_code': 0})
+    store = ObjectStore(tmp_path / "objects")
+    stats = migrate([tmp_path], store, min_age_sec=0)
+    assert stats['files'] == 4 and stats['new_objects'] == 2
+    entry = tmp_path / ".cache" / "ab" / ("ab" * 32)
+    assert not (entry / "results.xml").exists()
+    with compressed_io.open_text(entry / "results.xml") as f:
+        assert f.read() == "<DataFlowResults/>"
+
+
+def test_manifest_reader_skips_torn_lines(tmp_path):
+    run_dir = tmp_path / "run"
+    run_dir.mkdir()
+    (run_dir / "app_results.xml").write_text("<DataFlowResults/>")
+    entry = ObjectStore(tmp_path / "objects").put(run_dir / "app_results.xml")
+    assert entry['new']
+
+    # 没有锁服务的 NFS 上并发追加可能交错；最后一行可能还在写入中
+    with open(run_dir / compressed_io.MANIFEST, 'a') as f:
+        f.write('{"name": "other_res{"name": "other.log", "object": "x"}\n')
+        f.write('{"name": "lost.log"}\n')
+        f.write('["app_results.xml"]\n')
+        f.write('{"name": "app_results.xml", "object": "../objects/00/partial"}')
+
+    assert set(compressed_io.manifest_entries(run_dir)) == {"app_results.xml"}
+    assert compressed_io.resolve(run_dir / "app_results.xml").parent.parent == tmp_path / "objects"
+    with compressed_io.open_text(run_dir / "app_results.xml") as f:
+        assert f.read() == "<DataFlowResults/>"
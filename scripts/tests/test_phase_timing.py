@@ -0,0 +1,90 @@
+"""阶段耗时：日志 / PerformanceData 报告值的解析、日志跟踪阶段写入 CSV、FlowDroid 未报告时回退到墙钟时间"""
+
+import asyncio
+import csv
+import sys
+
+import flowdroid_engine
+from conftest import SCRIPTS_DIR
+from flowdroid_engine import CSV_HEADER, OBSERVED_PHASE_COLUMNS, Cell, FlowDroidEngine, RunConfig
+
+STUB = f"{sys.executable} {SCRIPTS_DIR / 'stub_flowdroid.py'}"
+INFO = "[main] INFO soot.jimple.infoflow"
+
+
+def _engine(tmp_path, **kwargs):
+    return FlowDroidEngine(tmp_path / "run" / "analysis_summary.log", heap="4g", schedule="alpha",
+                           object_store=None, **kwargs)
+
+
+def _rows(cell):
+    with open(cell.summary_file, newline='') as f:
+        return [dict(zip(CSV_HEADER, row)) for row in csv.reader(f) if row and row[0] != 'apk_name']
+
+
+def test_parse_log_reports_reconstruction_time(tmp_path):
+    log = tmp_path / "app.log"
+    log.write_text("\n".join([
+        f"{INFO}.android.SetupApplication - Callgraph construction took 12 seconds",
+        f"{INFO}.android.SetupApplication - Source lookup done, found 31 sources and 17 sinks.",
+        f"{INFO}.Infoflow - Data flow solver took 40 seconds",
+        f"{INFO}.Infoflow - Path reconstruction took 3 seconds",
+        f"{INFO}.Infoflow - Found 2 leaks",
+        f"{INFO}.Infoflow - Maximum memory consumption: 2048 MB",
+    ]) + "\n")
+    parsed = _engine(tmp_path)._parse_log_file(log)
+    assert (parsed['callgraph_time'], parsed['dataflow_time'], parsed['result_time']) == ('12', '40', '3')
+    assert (parsed['leaks'], parsed['sources'], parsed['sinks'], parsed['memory_gb']) == ('2', '31', '17', '2.00')
+
+
+def test_parse_log_falls_back_to_performance_data(tmp_path):
+    log = tmp_path / "app.log"
+    log.write_text(f"{INFO}.android.SetupApplication - Callgraph construction took 12 seconds\n")
+    xml = tmp_path / "app_results.xml"
+    xml.write_text(
+        '<DataFlowResults><Results/><PerformanceData>'
+        '<PerformanceEntry Name="CallgraphConstructionSeconds" Value="99"/>'
+        '<PerformanceEntry Name="TaintPropagationSeconds" Value="41"/>'
+        '<PerformanceEntry Name="PathReconstructionSeconds" Value="5"/>'
+        '<PerformanceEntry Name="MaxMemoryConsumption" Value="1024"/>'
+        '</PerformanceData></DataFlowResults>')
+    parsed = _engine(tmp_path)._parse_log_file(log, xml)
+    # 日志中的报告值优先
+    assert (parsed['callgraph_time'], parsed['dataflow_time'], parsed['result_time']) == ('12', '41', '5')
+    assert parsed['memory_gb'] == '1.00'
+
+
+def test_stub_run_writes_every_phase_column(tmp_path, monkeypatch):
+    monkeypatch.setattr(flowdroid_engine, 'OUTPUT_BASE', tmp_path)
+    monkeypatch.setattr(flowdroid_engine, 'CACHE_DIR', tmp_path / ".cache")
+    monkeypatch.setenv('STUB_FLOWDROID_LATENCY', '0.5')
+    monkeypatch.setenv('STUB_FLOWDROID_FAIL_RATE', '0')
+    (tmp_path / "app.apk").write_bytes(b"app")
+    (tmp_path / "SourcesAndSinks.txt").write_text("")
+    (tmp_path / "flowdroid.jar").write_bytes(b"")
+    config = RunConfig(source_sink=tmp_path / "SourcesAndSinks.txt", jar=tmp_path / "flowdroid.jar")
+    cell = Cell(config, [tmp_path / "app.apk"], tmp_path / "run")
+    assert asyncio.run(_engine(tmp_path, launcher=STUB).run_async([cell]))['success'] == 1
+
+    (row,) = _rows(cell)
+    for column in ['callgraph_time_sec', 'dataflow_time_sec', 'result_time_sec',
+                   *OBSERVED_PHASE_COLUMNS.values()]:
+        assert float(row[column]) >= 0, column
+
+
+def test_unreported_phase_uses_tracked_wall_clock(tmp_path):
+    cell = Cell(RunConfig(source_sink=tmp_path / "s.txt", jar=tmp_path / "f.jar"), [], tmp_path / "run")
+    cell.output_dir.mkdir()
+    parsed = {'leaks': 'N/A', 'sources': 'N/A', 'sinks': 'N/A', 'memory_gb': 'N/A',
+              'callgraph_time': 'N/A', 'dataflow_time': 'N/A', 'result_time': 'N/A'}
+    # 调用图阶段超时被终止：FlowDroid 没有报告，日志跟踪记录了 jvm_start / soot_setup / callgraph
+    outcome = {'parsed': parsed, 'heap_gb': 4, 'total_time': 30.0, 'exit_code': -9,
+               'timeout_reason': 'CALLGRAPH_TIMEOUT', 'cached': False,
+               'usage': {'peak_rss_gb': 'N/A', 'cpu_time_sec': 'N/A', 'accounting': 'proc',
+                         'phases': {'jvm_start': 0.4, 'soot_setup': 2.5, 'callgraph': 27.1}}}
+    _engine(tmp_path).record(cell, "app", outcome, shared=False)
+
+    (row,) = _rows(cell)
+    assert row['status'] == 'FAILED'
+    assert (row['callgraph_time_sec'], row['dataflow_time_sec']) == ('27.10', 'N/A')
+    assert (row['jvm_start_sec'], row['soot_setup_sec'], row['manifest_sec']) == ('0.40', '2.50', 'N/A')
@@ -0,0 +1,63 @@
+"""precise_comparison：按集合运算把 TaintBench finding 分为完整 / 部分 / 未检测，以及所在方法、Jimple 语句是否一致"""
+
+import sys
+
+from conftest import SCRIPTS_DIR
+from results_reader import Endpoint, Result
+
+sys.path.insert(0, str(SCRIPTS_DIR / "flowdroid_analysis"))
+from precise_comparison import FlowIndex, classify, expected_flow  # noqa: E402
+
+GET_ISO = "<android.telephony.TelephonyManager: java.lang.String getSimCountryIso()>"
+GET_ID = "<android.telephony.TelephonyManager: java.lang.String getDeviceId()>"
+GET_LOCATION = "<android.location.Location: double getLatitude()>"
+SEND_SMS = ("<android.telephony.SmsManager: void sendTextMessage(java.lang.String,java.lang.String,"
+            "java.lang.String,android.app.PendingIntent,android.app.PendingIntent)>")
+LOG = "<android.util.Log: int d(java.lang.String,java.lang.String)>"
+ON_CREATE = "<com.foo.Main: void onCreate(android.os.Bundle)>"
+
+SOURCE_ISO = f"$r3 = virtualinvoke $r2.{GET_ISO}()"
+SINK_SMS = f"virtualinvoke $r4.{SEND_SMS}($r5, null, $r3, null, null)"
+
+
+def _index():
+    return FlowIndex([
+        Result(Endpoint(SINK_SMS, ON_CREATE, SEND_SMS, None, ()),
+               (Endpoint(SOURCE_ISO, ON_CREATE, GET_ISO, None, ()),)),
+        Result(Endpoint(f"staticinvoke {LOG}($r1, $r6)", ON_CREATE, LOG, None, ()),
+               (Endpoint(f"$r6 = virtualinvoke $r2.{GET_ID}()", ON_CREATE, GET_ID, None, ()),)),
+        Result(None, ()),
+    ])
+
+
+def _finding(fid, source_ir, sink_ir, class_name="com.foo.Main", method="protected void onCreate(Bundle b)"):
+    location = {'className': class_name, 'methodName': method}
+    return fid, expected_flow({'ID': fid,
+                               'source': {**location, 'IRs': [{'IRstatement': source_ir}]},
+                               'sink': {**location, 'IRs': [{'IRstatement': sink_ir}]}})
+
+
+def test_classify():
+    flows = dict([
+        # 同一个 Result，所在方法和（重命名后的）语句都一致
+        _finding(1, f"r7 = virtualinvoke r6.{GET_ISO}()", f"virtualinvoke r8.{SEND_SMS}(r9, null, r7, null, null)"),
+        # 同一对定义，但 TaintBench 标在另一个方法里
+        _finding(2, f"r7 = virtualinvoke r6.{GET_ISO}()", f"virtualinvoke r8.{SEND_SMS}(r9, null, r7, null, null)",
+                 class_name="com.foo.Other", method="public void run()"),
+        # source 和 sink 都检测到，但不在同一个 Result 中
+        _finding(3, f"r1 = virtualinvoke r0.{GET_ID}()", f"virtualinvoke r2.{SEND_SMS}(r3, null, r1, null, null)"),
+        # source 没有检测到
+        _finding(4, f"d0 = virtualinvoke r0.{GET_LOCATION}()", f"staticinvoke {LOG}(r1, r2)"),
+    ])
+    classes = classify(flows, _index())
+
+    assert classes == {'complete': {1, 2}, 'partial': {3}, 'missed': {4},
+                       'same_method': {1}, 'same_statement': {1}}
+
+
+def test_index_and_empty_findings():
+    index = _index()
+    assert index.pairs == {(GET_ISO, SEND_SMS), (GET_ID, LOG)}
+    assert index.sources_of(SEND_SMS) == {GET_ISO} and index.sources_of(GET_LOCATION) == set()
+    assert classify({}, index) == {'complete': set(), 'partial': set(), 'missed': set(),
+                                   'same_method': set(), 'same_statement': set()}
@@ -0,0 +1,95 @@
+"""precision_ladder：按失败原因跳过无助的阶梯、逐级重试、中断时停止并上报"""
+
+import csv
+import sys
+from functools import partial
+
+import pytest
+
+import flowdroid_engine
+import precision_ladder
+from conftest import SCRIPTS_DIR
+from precision_ladder import PrecisionLadder, classify_failure, parse_rung, rung_can_help
+from stub_flowdroid import FAILURE_KINDS, _uniform
+
+STUB = f"{sys.executable} {SCRIPTS_DIR / 'stub_flowdroid.py'}"
+
+
+def attempt(mode, multiplier, reason):
+    return {'mode': mode, 'multiplier': multiplier, 'reason': reason}
+
+
+def test_rung_can_help():
+    oom = [attempt('full', 1, 'OUT_OF_MEMORY')]
+    assert rung_can_help(('ne', 1), oom) and not rung_can_help(('full', 3), oom)
+    cg = [attempt('full', 1, 'CALLGRAPH_TIMEOUT')]
+    assert not rung_can_help(('ne_ns', 1), cg) and rung_can_help(('full', 3), cg)
+    df = [attempt('ne', 1, 'DATAFLOW_TIMEOUT')]
+    assert rung_can_help(('ne_ns', 1), df) and rung_can_help(('ne', 3), df)
+    assert not rung_can_help(('ne', 1), df) and not rung_can_help(('full', 1), df)
+    assert not rung_can_help(('ne_ns', 3), [attempt('full', 1, 'JAVA_VERSION_ERROR')])
+    # 所有之前的失败都要可能被修复
+    assert not rung_can_help(('ne', 3), oom + [attempt('ne', 1, 'OUT_OF_MEMORY')])
+    assert classify_failure(137, '') == 'KILLED' and classify_failure(1, '') == 'UNKNOWN'
+    assert parse_rung('ne_ns:3') == ('ne_ns', 3) and parse_rung('ns') == ('ns', 1)
+    with pytest.raises(ValueError):
+        parse_rung('fast')
+
+
+@pytest.fixture
+def apks(tmp_path, monkeypatch):
+    apk_dir = tmp_path / "apks"
+    apk_dir.mkdir()
+    names = [f"app{i}" for i in range(12)]
+    for name in names:
+        (apk_dir / f"{name}.apk").write_bytes(name.encode())
+    (tmp_path / "SourcesAndSinks.txt").write_text("")
+    (tmp_path / "flowdroid.jar").write_bytes(b"")
+    monkeypatch.setattr(precision_ladder, 'APK_DIR', apk_dir)
+    monkeypatch.setattr(precision_ladder, 'OUTPUT_BASE', tmp_path / "output")
+    monkeypatch.setattr(flowdroid_engine, 'OUTPUT_BASE', tmp_path / "output")
+    monkeypatch.setattr(flowdroid_engine, 'CACHE_DIR', tmp_path / "output" / ".cache")
+    monkeypatch.setattr(precision_ladder, 'RunConfig', partial(
+        flowdroid_engine.RunConfig, source_sink=tmp_path / "SourcesAndSinks.txt", jar=tmp_path / "flowdroid.jar"))
+    return names
+
+
+def ladder_rows(ladder):
+    with open(ladder.summary_file) as f:
+        return {row['apk_name']: row for row in csv.DictReader(f)}
+
+
+def test_rung_progression(apks, monkeypatch):
+    # 所有 APK 都失败：OOM 在 4g 堆下永远失败，调用图 / 数据流超时在 3 倍超时时成功
+    monkeypatch.setenv('STUB_FLOWDROID_FAIL_RATE', '1')
+    monkeypatch.setenv('STUB_FLOWDROID_OOM_HEAP', '1000g')
+    ladder = PrecisionLadder(heap="4g", jobs=4, schedule="alpha", object_store=None, launcher=STUB,
+                             blacklist=['app0'])
+    result = ladder.run()
+    rows = ladder_rows(ladder)
+
+    expected = {  # 失败类型 -> (最终状态, 成功的阶梯, 尝试次数)
+        'OUT_OF_MEMORY': ('FAILED', '', '4'),       # full → ne → ns → ne_ns，更长超时无助
+        'CALLGRAPH_TIMEOUT': ('SUCCESS', '5', '2'),  # 1x 的更便宜模式不影响调用图
+        'DATAFLOW_TIMEOUT': ('SUCCESS', '5', '5'),
+    }
+    kinds = {name: FAILURE_KINDS[int(_uniform(name, "kind") * len(FAILURE_KINDS))] for name in apks[1:]}
+    assert len(set(kinds.values())) == len(FAILURE_KINDS)
+    for name, kind in kinds.items():
+        assert (rows[name]['final_status'], rows[name]['final_rung'], rows[name]['attempts']) == expected[kind]
+    assert rows['app0']['final_status'] == 'SKIPPED'
+    assert result['success'] == sum(kind != 'OUT_OF_MEMORY' for kind in kinds.values())
+    assert not result['cancelled']
+
+
+def test_cancel_stops_ladder(apks, monkeypatch):
+    monkeypatch.setenv('STUB_FLOWDROID_LATENCY', '60')
+    ladder = PrecisionLadder(heap="4g", jobs=2, schedule="alpha", object_store=None, launcher=STUB, deadline=1)
+    result = ladder.run()
+
+    assert result['cancelled'] and (result['success'], result['failed'], result['interrupted']) == (0, 0, 12)
+    rows = ladder_rows(ladder).values()
+    assert {row['final_status'] for row in rows} == {'CANCELLED'}
+    # 只有运行中的两个 APK 留下了第一级的尝试
+    assert sorted(row['attempt_history'] for row in rows).count('full@1x:CANCELLED') == 2
+    assert [p.name for p in ladder.output_dir.iterdir() if p.is_dir()] == ['rung1-full-1x']
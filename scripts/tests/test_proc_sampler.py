@@ -0,0 +1,57 @@
+"""proc_sampler：进程树发现、RSS / CPU 采样、峰值保持和时间序列"""
+
+import csv
+import os
+import signal
+import subprocess
+import sys
+
+from proc_sampler import ProcessSampler, process_tree
+
+# 占用约 64MB 内存、烧一点 CPU，再启动一个孙进程后等待
+CHILD = """
+import subprocess, sys, time
+data = bytearray(64 * 1024 * 1024)
+for i in range(0, len(data), 4096):
+    data[i] = 1
+end = time.time() + 0.3
+while time.time() < end:
+    pass
+grandchild = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"])
+print(grandchild.pid, flush=True)
+time.sleep(30)
+"""
+
+
+def test_samples_whole_process_tree(tmp_path):
+    proc = subprocess.Popen([sys.executable, "-c", CHILD], stdout=subprocess.PIPE, text=True)
+    try:
+        grandchild = int(proc.stdout.readline())
+        assert process_tree(proc.pid)[0] == proc.pid and grandchild in process_tree(proc.pid)
+
+        sampler = ProcessSampler(proc.pid, interval=60)
+        assert sampler.due()
+        rss, cpu = sampler.sample()
+        assert not sampler.due()
+        assert rss >= 64 * 1024 ** 2 and sampler.last_rss_gb == rss / 1024 ** 3
+        assert cpu >= 0.2 and sampler.cpu_time_sec == cpu
+        assert sampler.peak_rss_bytes >= rss
+    finally:
+        for pid in process_tree(proc.pid)[::-1]:
+            os.kill(pid, signal.SIGKILL)
+        proc.wait()
+
+    # 进程退出后采样为空，峰值和 CPU 时间保留
+    peak = sampler.peak_rss_gb
+    assert sampler.sample() == (0, 0.0)
+    assert sampler.peak_rss_gb == peak and len(sampler.series) == 1
+
+    sampler.write_series(tmp_path / "app.resources.csv")
+    with open(tmp_path / "app.resources.csv") as f:
+        (row,) = list(csv.DictReader(f))
+    assert float(row['rss_gb']) >= 0.06 and float(row['cpu_sec']) >= 0.2
+
+
+def test_missing_process():
+    sampler = ProcessSampler(2 ** 22 + 1)  # 大于 pid_max 上限，不可能存在
+    assert sampler.sample() == (0, 0.0) and sampler.series == [] and sampler.peak_rss_gb == 0
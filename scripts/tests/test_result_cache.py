@@ -0,0 +1,79 @@
+"""result_cache：缓存键的组成、写入 / 查找 / 恢复（无对象库时复制并保留压缩后缀）"""
+
+import gzip
+import json
+import os
+
+import compressed_io
+from result_cache import ResultCache, cache_key, file_sha256
+
+
+def inputs(tmp_path):
+    files = {}
+    for name, content in (("app.apk", b"apk"), ("ss.txt", b"sources"), ("fd.jar", b"jar")):
+        files[name] = tmp_path / name
+        files[name].write_bytes(content)
+    return files["app.apk"], files["ss.txt"], files["fd.jar"]
+
+
+def test_cache_key_covers_inputs_and_settings(tmp_path):
+    apk, ss, jar = inputs(tmp_path)
+    key = cache_key(apk, ss, jar, ["-ne", "-ns"], "CHA", (600, 1800, 120))
+    assert key == cache_key(apk, ss, jar, ["-ns", "-ne"], "CHA", (600, 1800, 120))
+    # 按内容而不是路径：复制到别处的相同 APK 命中同一条目
+    (tmp_path / "copy").mkdir()
+    copy = tmp_path / "copy" / "app.apk"
+    copy.write_bytes(b"apk")
+    assert cache_key(copy, ss, jar, ["-ne", "-ns"], "CHA", (600, 1800, 120)) == key
+
+    others = [
+        cache_key(apk, ss, jar, ["-ne"], "CHA", (600, 1800, 120)),
+        cache_key(apk, ss, jar, ["-ne", "-ns"], "SPARK", (600, 1800, 120)),
+        cache_key(apk, ss, jar, ["-ne", "-ns"], "CHA", (1800, 5400, 360)),
+        cache_key(apk, ss, jar, ["-ne", "-ns"], "CHA", (600, 1800, 120), ["python3", "stub_flowdroid.py"]),
+    ]
+    assert len({key, *others}) == 5
+
+    # APK 内容变化（大小和修改时间随之变化）时摘要重新计算
+    before = file_sha256(apk)
+    apk.write_bytes(b"apk v2")
+    os.utime(apk, ns=(1, 1))
+    assert file_sha256(apk) != before
+    assert cache_key(apk, ss, jar, ["-ne", "-ns"], "CHA", (600, 1800, 120)) != key
+
+
+def test_store_lookup_restore(tmp_path):
+    cache = ResultCache(tmp_path / ".cache")
+    run = tmp_path / "run1"
+    run.mkdir()
+    (run / "app_results.xml").write_text("<DataFlowResults/>")
+    (run / "app.log").write_text("Found 0 leaks")
+    compressed_io.compress_outputs([run / "app.log"])
+    key = "ab" * 32
+    assert cache.lookup(key) is None
+
+    cache.store(key, run / "app_results.xml", run / "app.log", {'exit_code': 0, 'total_time': 3.5})
+    assert cache.lookup(key) == {'exit_code': 0, 'total_time': 3.5}
+    # 同一键只保留第一次写入
+    cache.store(key, run / "app_results.xml", run / "app.log", {'exit_code': 0, 'total_time': 9})
+    assert cache.lookup(key)['total_time'] == 3.5
+    assert not [p for p in (tmp_path / ".cache" / "ab").iterdir() if p.name.startswith(".tmp-")]
+
+    restored = tmp_path / "run2"
+    restored.mkdir()
+    cache.restore(key, restored / "app_results.xml", restored / "app.log")
+    assert (restored / "app_results.xml").read_text() == "<DataFlowResults/>"
+    # 压缩的日志原样复制，不解压
+    assert not (restored / "app.log").exists()
+    with gzip.open(restored / "app.log.gz", 'rt') as f:
+        assert f.read() == "Found 0 leaks"
+
+
+def test_corrupt_metrics_is_a_miss(tmp_path):
+    cache = ResultCache(tmp_path / ".cache")
+    entry = tmp_path / ".cache" / "cd" / ("cd" * 32)
+    entry.mkdir(parents=True)
+    (entry / "metrics.json").write_text('{"exit_code": 0')
+    assert cache.lookup("cd" * 32) is None
+    (entry / "metrics.json").write_text(json.dumps({'exit_code': 0}))
+    assert cache.lookup("cd" * 32) == {'exit_code': 0}
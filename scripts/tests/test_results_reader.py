@@ -0,0 +1,97 @@
+"""results_reader：流式读取时清除已处理的 Result、PerformanceData、截断文件、按需构造访问路径 / 重建路径"""
+
+import xml.etree.ElementTree as ET
+
+import pytest
+
+import results_reader
+from results_reader import READ_ERRORS, ResultsReader, flow_pairs, performance_data, success_pairs
+
+ACCESS_PATH = ('<AccessPath Value="$r1" Type="java.lang.String" TaintSubFields="true">'
+               '<Fields><Field Value="&lt;A: java.lang.String f&gt;" Type="java.lang.String"/></Fields>'
+               '</AccessPath>')
+
+
+def _result(i):
+    return (f'<Result><Sink Statement="sink{i}" Method="m{i}" MethodSourceSinkDefinition="SINK{i % 2}">'
+            f'{ACCESS_PATH}</Sink><Sources>'
+            f'<Source Statement="src{i}" Method="m{i}" MethodSourceSinkDefinition="SOURCE">{ACCESS_PATH}'
+            f'<TaintPath><PathElement Statement="src{i}" Method="m{i}">{ACCESS_PATH}</PathElement>'
+            f'<PathElement Statement="sink{i}" Method="m{i}"/></TaintPath></Source>'
+            f'</Sources></Result>')
+
+
+def _write(path, n=3):
+    path.write_text(
+        '<DataFlowResults FileFormatVersion="102" TerminationState="Success"><Results>'
+        + "".join(_result(i) for i in range(n))
+        + '</Results><PerformanceData>'
+          '<PerformanceEntry Name="CallgraphConstructionSeconds" Value="12"/>'
+          '<PerformanceEntry Name="TaintPropagationSeconds" Value="40"/>'
+          '</PerformanceData></DataFlowResults>')
+    return path
+
+
+def test_reads_results_and_performance(tmp_path):
+    reader = ResultsReader(_write(tmp_path / "app_results.xml"))
+    results = list(reader)
+
+    assert (reader.termination_state, reader.file_format_version) == ("Success", "102")
+    assert reader.performance == {'CallgraphConstructionSeconds': '12', 'TaintPropagationSeconds': '40'}
+    assert [r.sink.statement for r in results] == ["sink0", "sink1", "sink2"]
+    source = results[0].sources[0]
+    assert source.definition == "SOURCE"
+    assert source.access_path.fields == (("<A: java.lang.String f>", "java.lang.String"),)
+    assert source.access_path.taint_sub_fields
+    assert [p.statement for p in source.path] == ["src0", "sink0"]
+    assert source.path[1].access_path is None
+
+
+def test_processed_results_are_cleared(tmp_path, monkeypatch):
+    seen = {}
+    iterparse = ET.iterparse
+
+    def recording_iterparse(*args, **kwargs):
+        for event, elem in iterparse(*args, **kwargs):
+            seen.setdefault(elem.tag, elem)
+            yield event, elem
+
+    monkeypatch.setattr(results_reader.ET, 'iterparse', recording_iterparse)
+    held = []
+    for _ in ResultsReader(_write(tmp_path / "app_results.xml", n=2000)):
+        held.append(len(seen['Results']))
+
+    # iterparse 按块预读，树中只挂着最近一块内尚未处理的 Result；结束后全部被清除
+    assert len(held) == 2000
+    assert max(held) < 200
+    assert len(seen['Results']) == 0
+
+
+def test_skips_optional_parts(tmp_path):
+    (result, *_) = ResultsReader(_write(tmp_path / "app_results.xml"), access_paths=False, taint_paths=False)
+    assert result.sink.access_path is None
+    assert result.sources[0].access_path is None and result.sources[0].path == ()
+
+
+def test_truncated_file_raises_read_error(tmp_path):
+    xml = _write(tmp_path / "app_results.xml")
+    content = xml.read_text()
+    xml.write_text(content[:len(content) // 2])
+
+    with pytest.raises(READ_ERRORS):
+        list(ResultsReader(xml))
+    with pytest.raises(READ_ERRORS):
+        list(ResultsReader(tmp_path / "missing_results.xml"))
+    # performance_data 只是尽力读取
+    assert performance_data(xml) == {}
+
+
+def test_success_pairs(tmp_path):
+    xml = _write(tmp_path / "app_results.xml")
+    assert flow_pairs(xml) == success_pairs(xml, 3) == {("SOURCE", "SINK0"), ("SOURCE", "SINK1")}
+    # 没有泄露时 FlowDroid 不写文件
+    assert success_pairs(tmp_path / "quiet_results.xml", 0) == set()
+    # 有泄露却没有文件，或文件损坏，都不是有效结果
+    assert success_pairs(tmp_path / "lost_results.xml", 2) is None
+    (tmp_path / "broken_results.xml").write_text("<DataFlowResults><Results><Result>")
+    assert success_pairs(tmp_path / "broken_results.xml", 1) is None
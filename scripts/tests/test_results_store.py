@@ -0,0 +1,105 @@
+"""results_store：导入旧版 CSV、无效 SUCCESS 和 effective 视图的选择规则"""
+
+import csv
+from pathlib import Path
+
+import pytest
+
+from job_scheduler import parse_status, row_reported_peak_gb, row_total_time
+
+HEADER = ['apk_name', 'status', 'leaks_found', 'sources_found', 'sinks_found', 'callgraph_time_sec',
+          'dataflow_time_sec', 'result_time_sec', 'total_time_sec', 'peak_memory_gb', 'exit_code',
+          'timeout_reason', 'output_file']
+
+
+def write_run(output_base: Path, name: str, rows, results=()):
+    run_dir = output_base / name
+    run_dir.mkdir(parents=True)
+    with open(run_dir / "results_summary.csv", 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=HEADER)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow({k: row.get(k, '' if k in ('timeout_reason', 'output_file') else 'N/A')
+                             for k in HEADER})
+    for apk in results:
+        (run_dir / f"{apk}_results.xml").write_text("<DataFlowResults/>")
+    return run_dir
+
+
+def job(store, path, apk):
+    return store.query("SELECT j.* FROM jobs j JOIN runs r ON r.id = j.run_id WHERE r.path = ? AND j.apk = ?",
+                       (path, apk))[0]
+
+
+def test_parse_status():
+    assert parse_status({'status': 'FAILED (exit: 137)'}) == ('FAILED', 137)
+    assert parse_status({'status': 'FAILED (exit: -9)', 'exit_code': 'N/A'}) == ('FAILED', -9)
+    assert parse_status({'status': 'FAILED', 'exit_code': '-9'}) == ('FAILED', -9)
+    assert parse_status({'status': 'SUCCESS', 'exit_code': ''}) == ('SUCCESS', None)
+
+
+def test_legacy_columns():
+    legacy = {'analysis_time_sec': '276', 'peak_memory_gb': '471'}
+    assert row_total_time(legacy) == 276
+    assert row_reported_peak_gb(legacy) == pytest.approx(471 / 1024)
+    assert row_reported_peak_gb({'analysis_time_sec': '1', 'peak_memory_mb': '512'}) == 0.5
+    current = {'total_time_sec': '10.5', 'peak_memory_gb': '3.2', 'callgraph_time_sec': '4'}
+    assert row_total_time(current) == 10.5
+    assert row_reported_peak_gb(current) == 3.2
+    assert row_total_time({'callgraph_time_sec': '4', 'dataflow_time_sec': '6'}) == 10
+
+
+def test_success_without_result_is_no_result(tmp_path, store):
+    write_run(tmp_path, "20260101-1000-39apps-max-precision", [
+        {'apk_name': 'bogus', 'status': 'SUCCESS', 'total_time_sec': '0.01', 'exit_code': '0'},
+        {'apk_name': 'empty', 'status': 'SUCCESS', 'leaks_found': '0', 'total_time_sec': '0.6', 'exit_code': '0'},
+        {'apk_name': 'found', 'status': 'SUCCESS', 'total_time_sec': '3', 'exit_code': '0'},
+    ], results=['found'])
+    store.ingest(tmp_path)
+    path = "20260101-1000-39apps-max-precision"
+    bogus = job(store, path, 'bogus')
+    assert (bogus['status'], bogus['exit_class'], bogus['timeout_reason']) == ('FAILED', 'NO_RESULT', 'NO_RESULT')
+    # 没有泄露时 FlowDroid 不写结果文件，报告了泄露数的成功仍然有效
+    assert job(store, path, 'empty')['status'] == 'SUCCESS'
+    assert job(store, path, 'found')['status'] == 'SUCCESS'
+
+
+def test_effective_prefers_real_failure_over_no_result(tmp_path, store):
+    write_run(tmp_path, "20260101-1000-39apps-max-precision", [
+        {'apk_name': 'heavy', 'status': 'FAILED', 'total_time_sec': '300', 'exit_code': '-9'},
+        {'apk_name': 'flaky', 'status': 'SUCCESS', 'leaks_found': '2', 'total_time_sec': '30', 'exit_code': '0'},
+        {'apk_name': 'skipped', 'status': 'FAILED (exit: 137)', 'total_time_sec': '90'},
+    ], results=['flaky'])
+    write_run(tmp_path, "20260101-1100-39apps-max-precision", [
+        {'apk_name': 'heavy', 'status': 'SUCCESS', 'total_time_sec': '0.01', 'exit_code': '0'},
+        {'apk_name': 'flaky', 'status': 'FAILED', 'total_time_sec': '40', 'exit_code': '1'},
+        {'apk_name': 'skipped', 'status': 'SKIPPED'},
+    ])
+    store.ingest(tmp_path)
+    effective = {apk: results['full (1x)'] for apk, results in store.effective().items()}
+    assert effective['heavy']['status'] == 'FAILED' and effective['heavy']['exit_code'] == -9
+    assert effective['heavy']['path'] == "20260101-1000-39apps-max-precision"
+    assert effective['flaky']['status'] == 'SUCCESS'
+    assert (effective['skipped']['status'], effective['skipped']['exit_code']) == ('FAILED', 137)
+
+
+def test_repo_history(repo_output, store):
+    """仓库自带的历史运行：与 output/FINAL_SUMMARY.md 一致"""
+    store.ingest(repo_output)
+    legacy = job(store, "20260211-1657-39apps-max-precision", 'cajino_baidu')
+    assert (legacy['status'], legacy['exit_code'], legacy['exit_class']) == ('FAILED', 137, 'MEMORY')
+    assert legacy['total_sec'] == 276
+    assert job(store, "20260211-1657-39apps-max-precision", 'backflash')['peak_memory_gb'] < 1
+    assert store.query("SELECT COUNT(*) AS n FROM jobs WHERE status LIKE '%(%'")[0]['n'] == 0
+    # 20260211-1811 的 0.01 秒"成功"不能掩盖 1812 的 -9
+    assert job(store, "20260211-1811-39apps-max-precision", 'xbot_android_samp')['exit_class'] == 'NO_RESULT'
+    assert job(store, "20260211-1812-39apps-max-precision", 'godwon_samp')['status'] == 'SUCCESS'
+
+    full = {apk: results['full (1x)'] for apk, results in store.effective().items() if 'full (1x)' in results}
+    assert len(full) == 39
+    failed = {apk for apk, row in full.items() if row['status'] == 'FAILED'}
+    assert {'xbot_android_samp', 'scipiex', 'remote_control_smack', 'vibleaker_android_samp'} <= failed
+    assert all(full[apk]['exit_code'] == -9 for apk in ('xbot_android_samp', 'scipiex', 'remote_control_smack',
+                                                        'vibleaker_android_samp'))
+    assert sum(row['status'] == 'SUCCESS' for row in full.values()) == 31
+    assert sum(row['status'] == 'SUCCESS' for row in full.values()) + len(failed) == 39
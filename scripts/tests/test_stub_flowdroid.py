@@ -0,0 +1,81 @@
+"""stub_flowdroid：合成模式的日志 / 结果 / 失败类型（可复现，满足条件后成功）和回放模式"""
+
+import gzip
+import subprocess
+import sys
+
+import pytest
+
+from conftest import SCRIPTS_DIR
+from results_reader import read_results
+from stub_flowdroid import FAILURE_KINDS, FAILURE_LINES, _uniform
+from test_results_store import write_run
+
+STUB = SCRIPTS_DIR / "stub_flowdroid.py"
+
+
+def run_stub(tmp_path, apk, *args, env=None):
+    output = tmp_path / f"{apk}_results.xml"
+    proc = subprocess.run([sys.executable, str(STUB), "-a", f"/apks/{apk}.apk", "-o", str(output), *args],
+                          capture_output=True, text=True, env={'PATH': '/usr/bin:/bin', **(env or {})})
+    return proc, output
+
+
+def apk_of_kind(kind):
+    """失败类型为 kind 的 APK 名（类型由 APK 名哈希决定）"""
+    return next(name for name in (f"app{i}" for i in range(100))
+                if FAILURE_KINDS[int(_uniform(name, "kind") * len(FAILURE_KINDS))] == kind)
+
+
+def test_synthetic_success_is_reproducible(tmp_path):
+    proc, output = run_stub(tmp_path, "app", env={'STUB_FLOWDROID_RESULTS': '6', 'STUB_FLOWDROID_SOURCES': '3'})
+    assert proc.returncode == 0
+    leaks = int(proc.stdout.rsplit("Found ", 1)[1].split()[0])
+    results = list(read_results(output))
+    assert len(results) == leaks and all(len(r.sources) == 3 for r in results)
+    assert "found" in proc.stdout and "Callgraph construction took" in proc.stdout
+    again, _ = run_stub(tmp_path, "app", env={'STUB_FLOWDROID_RESULTS': '6', 'STUB_FLOWDROID_SOURCES': '3'})
+    assert again.stdout == proc.stdout
+
+
+@pytest.mark.parametrize("kind, fixed", [
+    ("OUT_OF_MEMORY", {'FLOWDROID_XMX': '16g'}),
+    ("CALLGRAPH_TIMEOUT", {'-ct': '1800'}),
+    ("DATAFLOW_TIMEOUT", {'-dt': '5400'}),
+])
+def test_failures_clear_once_requirement_is_met(tmp_path, kind, fixed):
+    apk = apk_of_kind(kind)
+    env = {'STUB_FLOWDROID_FAIL_RATE': '1', 'FLOWDROID_XMX': '4g'}
+    base = ['-ct', '600', '-dt', '1800']
+    proc, output = run_stub(tmp_path, apk, *base, env=env)
+    assert proc.returncode == 1 and FAILURE_LINES[kind] in proc.stdout and not output.exists()
+
+    args = [a for k, v in fixed.items() if k.startswith('-') for a in (k, v)]
+    env.update({k: v for k, v in fixed.items() if not k.startswith('-')})
+    proc, output = run_stub(tmp_path, apk, *base, *args, env=env)
+    assert proc.returncode == 0 and output.exists()
+
+
+def test_replay(tmp_path):
+    run = write_run(tmp_path, "20260101-1000-39apps-max-precision", [
+        {'apk_name': 'ok', 'status': 'SUCCESS', 'leaks_found': '1', 'exit_code': '0'},
+        {'apk_name': 'killed', 'status': 'FAILED (exit: 137)'},  # 旧版状态，退出码在括号里
+        {'apk_name': 'synth', 'status': 'FAILED', 'exit_code': '1', 'timeout_reason': 'DATAFLOW_TIMEOUT'},
+    ])
+    with gzip.open(run / "ok_results.xml.gz", 'wt') as f:
+        f.write("<DataFlowResults/>")
+    (run / "ok.log").write_text("recorded line 1\nrecorded line 2\n")
+    env = {'STUB_FLOWDROID_REPLAY': str(run)}
+    out = tmp_path / "out"
+    out.mkdir()
+
+    proc, output = run_stub(out, "ok", env=env)
+    assert proc.returncode == 0 and proc.stdout == "recorded line 1\nrecorded line 2\n"
+    assert output.read_text() == "<DataFlowResults/>"
+    # 没有日志时按记录合成，失败原因与记录相同
+    proc, _ = run_stub(out, "synth", env=env)
+    assert proc.returncode == 1 and FAILURE_LINES["DATAFLOW_TIMEOUT"] in proc.stdout
+    proc, _ = run_stub(out, "killed", env=env)
+    assert proc.returncode == -9  # 137 按 SIGKILL 重现
+    proc, _ = run_stub(out, "unknown", env=env)
+    assert proc.returncode == 2
@@ -0,0 +1,93 @@
+"""sweep_planner：引擎的扫描预测（历史耗时、LJF 顺序、堆 / 预算约束下的 makespan、失败概率）和预测准确度"""
+
+import json
+import sys
+
+import flowdroid_engine
+from conftest import SCRIPTS_DIR
+from flowdroid_engine import Cell, FlowDroidEngine, RunConfig
+from sweep_planner import LIKELY_FAILURE, format_accuracy, format_plan, load_results, plan_accuracy
+
+
+def record(status, total_time, timeout_reason=''):
+    return {'mode': 'full', 'multiplier': 1, 'status': status, 'total_time': total_time, 'callgraph_time': None,
+            'dataflow_time': None, 'peak_gb': None, 'heap_gb': None,
+            'exit_code': '0' if status == 'SUCCESS' else '1', 'timeout_reason': timeout_reason}
+
+
+def cell(tmp_path, names):
+    apks = []
+    for name in names:
+        apks.append(tmp_path / f"{name}.apk")
+        apks[-1].write_bytes(name.encode())
+    (tmp_path / "SourcesAndSinks.txt").write_text("")
+    (tmp_path / "flowdroid.jar").write_bytes(b"")
+    config = RunConfig(source_sink=tmp_path / "SourcesAndSinks.txt", jar=tmp_path / "flowdroid.jar")
+    return Cell(config, apks, tmp_path / "run")
+
+
+def test_plan_from_history(tmp_path, monkeypatch):
+    monkeypatch.setattr(flowdroid_engine, 'OUTPUT_BASE', tmp_path)
+    monkeypatch.setattr(flowdroid_engine, 'CACHE_DIR', tmp_path / ".cache")
+    engine = FlowDroidEngine(tmp_path / "run" / "analysis_summary.log", jobs=4, heap="4g", mem_budget="8g",
+                             cores=8, object_store=None)
+    engine.history = {
+        'long': [record('SUCCESS', 300), record('SUCCESS', 500), record('SUCCESS', 400)],
+        'short': [record('SUCCESS', 100)],
+        'flaky': [record('FAILED', 50, 'OUT_OF_MEMORY'), record('FAILED', 60, 'OUT_OF_MEMORY')],
+    }
+    jobs, owners = engine.expand([cell(tmp_path, ['short', 'flaky', 'long', 'new'])])
+    ordered, plan = engine.plan(jobs, owners)
+    entries = {e['apk']: e for e in plan['jobs']}
+
+    # 最长预期优先；历史耗时取中位数
+    assert ordered[0].apk.stem == 'long' and plan['jobs'][0]['apk'] == 'long'
+    assert (entries['long']['predicted_sec'], entries['long']['time_source']) == (400, 'history')
+    assert entries['new']['time_source'] == 'dex'
+    assert entries['flaky']['p_fail'] >= LIKELY_FAILURE > entries['short']['p_fail']
+    # 8g 预算、每个作业 4g：最多两个并发，makespan 不短于最长作业，不长于串行
+    assert plan['peak_jobs'] == 2 and plan['peak_mem_gb'] == 8
+    assert entries['long']['predicted_sec'] <= plan['makespan_sec'] <= plan['serial_sec']
+    assert plan['cache_hits'] == 0
+    assert any(line.startswith("可能失败") for line in format_plan(plan))
+
+
+def test_plan_accuracy():
+    def entry(apk, predicted_sec, p_fail, cached=False):
+        return {'apk': apk, 'cells': ['run'], 'predicted_sec': predicted_sec, 'p_fail': p_fail, 'cached': cached}
+
+    plan = {'makespan_sec': 300, 'peak_mem_gb': 8,
+            'jobs': [entry('a', 100, 0.1), entry('b', 300, 0.9), entry('c', 50, 0.2), entry('d', 10, 0, True),
+                     entry('e', 10, 0.5)]}
+    results = [
+        {'cell': 'run', 'apk_name': 'a', 'status': 'SUCCESS', 'total_time': 200, 'cached': False},
+        {'cell': 'run', 'apk_name': 'b', 'status': 'FAILED', 'total_time': 300, 'cached': False},
+        {'cell': 'run', 'apk_name': 'c', 'status': 'FAILED', 'total_time': 50, 'cached': False},
+        {'cell': 'run', 'apk_name': 'd', 'status': 'SUCCESS', 'total_time': 0, 'cached': True},
+        {'cell': 'run', 'apk_name': 'e', 'status': 'CANCELLED', 'total_time': 5, 'cached': False},
+    ]
+    accuracy = plan_accuracy(plan, results, makespan=320, peak_mem_gb=8)
+    # 耗时只比较实际运行的 a、b、c；被取消的 e 不计入失败比较
+    assert accuracy['jobs_compared'] == 3 and accuracy['time_mape'] == round(0.5 / 3, 3)
+    assert (accuracy['predicted_serial_sec'], accuracy['actual_serial_sec']) == (450, 550)
+    assert (accuracy['jobs_finished'], accuracy['actual_failures']) == (4, 2)
+    assert (accuracy['likely_failures'], accuracy['likely_failures_failed'], accuracy['missed_failures']) == (1, 1, 1)
+    assert accuracy['brier'] == round((0.01 + 0.01 + 0.64 + 0) / 4, 4)
+    assert accuracy['actual_makespan_sec'] == 320 and len(format_accuracy(accuracy)) == 4
+
+
+def test_run_records_accuracy(tmp_path, monkeypatch):
+    monkeypatch.setattr(flowdroid_engine, 'OUTPUT_BASE', tmp_path)
+    monkeypatch.setattr(flowdroid_engine, 'CACHE_DIR', tmp_path / ".cache")
+    run = cell(tmp_path, ['one', 'two'])
+    engine = FlowDroidEngine(tmp_path / "run" / "analysis_summary.log", heap="4g", object_store=None,
+                             launcher=f"{sys.executable} {SCRIPTS_DIR / 'stub_flowdroid.py'}")
+    engine.run([run])
+
+    with open(tmp_path / "run" / "plan.json") as f:
+        plan = json.load(f)
+    assert sorted(e['apk'] for e in plan['jobs']) == ['one', 'two']
+    assert plan['accuracy']['jobs_finished'] == 2 and plan['accuracy']['actual_failures'] == 0
+    results = load_results(tmp_path / "run")
+    assert sorted(r['apk_name'] for r in results) == ['one', 'two']
+    assert plan_accuracy(plan, results)['jobs_compared'] == plan['accuracy']['jobs_compared']
@@ -0,0 +1,143 @@
+"""work_queue：租约的领取、续约、回收、放回，以及 worker 在租约丢失 / 被取消时的处理"""
+
+import asyncio
+import json
+import time
+from pathlib import Path
+
+import pytest
+
+import flowdroid_engine
+from flowdroid_engine import Cell, Job, RunConfig
+from work_queue import MAX_ATTEMPTS, QueueWorker, WorkQueue
+
+
+def make_sweep(queue: WorkQueue, tmp_path: Path, apks=('a', 'b')) -> int:
+    config = RunConfig()
+    cell = Cell(config, [tmp_path / f"{apk}.apk" for apk in apks], tmp_path / "cell")
+    jobs = [Job(tmp_path / f"{apk}.apk", config, f"key-{apk}") for apk in apks]
+    return queue.create_sweep("test", tmp_path, [cell], jobs, {job.key: [cell] for job in jobs},
+                              {f"key-{apk}": float(len(apks) - i) for i, apk in enumerate(apks)})
+
+
+def status(queue: WorkQueue, job_id: int) -> str:
+    return queue.conn.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()[0]
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = WorkQueue(tmp_path / "queue.sqlite")
+    yield queue
+    queue.conn.close()
+
+
+def test_claim_order_and_exclusive_lease(queue, tmp_path):
+    sweep = make_sweep(queue, tmp_path)
+    first, previous = queue.claim("w1", 60, sweep)
+    assert Path(first['apk']).stem == 'a' and previous is None
+    second, _ = queue.claim("w2", 60, sweep)
+    assert Path(second['apk']).stem == 'b'
+    assert queue.claim("w3", 60, sweep) == (None, None)
+    assert queue.renew(first['id'], "w1", 60)
+    assert not queue.renew(first['id'], "w2", 60)
+    assert queue.unfinished(sweep) == 2
+
+
+def test_expired_lease_is_reclaimed(queue, tmp_path):
+    sweep = make_sweep(queue, tmp_path, apks=('a',))
+    row, _ = queue.claim("w1", -1, sweep)
+    reclaimed, previous = queue.claim("w2", 60, sweep)
+    assert reclaimed['id'] == row['id'] and previous == "w1"
+    # 原 worker 不能再续约、提交或放回
+    assert not queue.renew(row['id'], "w1", 60)
+    assert not queue.complete(row['id'], "w1", {'exit_code': 0})
+    queue.release(row['id'], "w1")
+    assert status(queue, row['id']) == 'leased'
+    assert queue.complete(row['id'], "w2", {'exit_code': 0})
+    assert status(queue, row['id']) == 'done' and queue.unfinished(sweep) == 0
+
+
+def test_release_and_attempt_limit(queue, tmp_path):
+    sweep = make_sweep(queue, tmp_path, apks=('a',))
+    row, _ = queue.claim("w1", 60, sweep)
+    queue.release(row['id'], "w1")
+    assert status(queue, row['id']) == 'pending'
+    assert queue.conn.execute("SELECT attempts FROM jobs").fetchone()[0] == 0
+    for _ in range(MAX_ATTEMPTS):
+        assert queue.claim("w1", -1, sweep)[0] is not None
+    assert queue.claim("w2", 60, sweep) == (None, None)
+    failed = queue.conn.execute("SELECT status, outcome FROM jobs").fetchone()
+    assert failed['status'] == 'failed'
+    assert json.loads(failed['outcome'])['timeout_reason'] == 'LEASE_EXPIRED'
+
+
+@pytest.fixture
+def worker(tmp_path, monkeypatch):
+    monkeypatch.setattr(flowdroid_engine, 'OUTPUT_BASE', tmp_path)
+    monkeypatch.setattr(flowdroid_engine, 'CACHE_DIR', tmp_path / ".cache")
+    worker = QueueWorker(tmp_path / "queue.sqlite", lease_sec=0.3, poll_interval=0.05, object_store=None)
+    yield worker
+    worker._db_executor.shutdown()
+    worker.queue.conn.close()
+
+
+def blocking_execute(events):
+    """一直运行到被取消的作业：记录是否被取消（引擎在此时杀掉进程组）"""
+    async def execute(job, output_dir, total_jobs=0):
+        events.append('started')
+        try:
+            await asyncio.sleep(3600)
+        except asyncio.CancelledError:
+            events.append('cancelled')
+            raise
+    return execute
+
+
+def test_lost_lease_cancels_job(worker, tmp_path, monkeypatch):
+    events = []
+    monkeypatch.setattr(worker.engine, 'execute', blocking_execute(events))
+    sweep = make_sweep(worker.queue, tmp_path, apks=('a',))
+    row, _ = worker.queue.claim(worker.worker_id, 0.3, sweep)
+
+    async def run():
+        task = asyncio.create_task(worker._run_job(row))
+        await asyncio.sleep(0.05)
+        # 模拟租约过期后被其他 worker 回收
+        worker.queue.conn.execute("UPDATE jobs SET worker = 'other' WHERE id = ?", (row['id'],))
+        await asyncio.wait_for(task, timeout=5)
+
+    asyncio.run(run())
+    assert events == ['started', 'cancelled']
+    assert worker.completed == 0
+    assert worker.queue.conn.execute("SELECT status, worker FROM jobs").fetchone()[:] == ('leased', 'other')
+
+
+def test_cancelled_worker_releases_lease(worker, tmp_path, monkeypatch):
+    events = []
+    monkeypatch.setattr(worker.engine, 'execute', blocking_execute(events))
+    sweep = make_sweep(worker.queue, tmp_path, apks=('a',))
+    row, _ = worker.queue.claim(worker.worker_id, 60, sweep)
+
+    async def run():
+        task = asyncio.create_task(worker._run_job(row))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(run())
+    assert events == ['started', 'cancelled']
+    assert status(worker.queue, row['id']) == 'pending'
+
+
+def test_worker_completes_jobs(worker, tmp_path, monkeypatch):
+    async def execute(job, output_dir, total_jobs=0):
+        await asyncio.sleep(0.01)
+        return {'exit_code': 0, 'timeout_reason': '', 'total_time': 0.01, 'cached': False}
+
+    monkeypatch.setattr(worker.engine, 'execute', execute)
+    sweep = make_sweep(worker.queue, tmp_path)
+    start = time.time()
+    result = worker.run()
+    assert result['completed'] == 2 and not result['cancelled']
+    assert worker.queue.unfinished(sweep) == 0 and time.time() - start < 5
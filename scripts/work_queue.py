@@ -0,0 +1,555 @@
+#!/usr/bin/env python3
+"""
+FlowDroid 多机分布式扫描
+协调者把 (APK, 配置) 作业写入共享存储上的 SQLite 队列，任意多台主机上的 worker
+以租约方式领取作业、运行 FlowDroid 并把结果写回队列；worker 异常退出后租约过期，
+作业由其他 worker 回收。所有 worker 结束后由 collect 统一写出各单元格的 results_summary.csv。
+
+要求：
+  - APK、Source/Sink 列表、FlowDroid jar、OUTPUT_BASE 在所有主机上挂载到相同路径
+  - 共享文件系统支持 POSIX 锁（NFSv4、Lustre 等）；使用默认的回滚日志模式，
+    不使用 WAL（WAL 依赖同一主机上的共享内存）
+"""
+
+import asyncio
+import json
+import multiprocessing
+import os
+import socket
+import sqlite3
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from flowdroid_engine import (
+    OUTPUT_BASE, Cell, FlowDroidEngine, Job, RunConfig,
+    add_engine_arguments, add_spec_arguments, engine_kwargs, spec_from_args, timestamp
+)
+
+QUEUE_DB = OUTPUT_BASE / "queue.sqlite"
+LEASE_SEC = 300            # 租约时长，运行期间每 LEASE_SEC / 3 续约一次
+POLL_INTERVAL = 5.0        # 没有可领取的作业时的轮询间隔
+MAX_ATTEMPTS = 3           # 租约过期（worker 死亡）超过该次数后放弃该作业
+BUSY_TIMEOUT = 60.0        # SQLite 锁等待秒数
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sweeps (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    output_dir TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS cells (
+    id INTEGER PRIMARY KEY,
+    sweep_id INTEGER NOT NULL REFERENCES sweeps(id),
+    output_dir TEXT NOT NULL,
+    config TEXT NOT NULL,          -- RunConfig.to_dict() 的 JSON
+    apks TEXT NOT NULL,            -- APK 路径 JSON 列表
+    blacklist TEXT NOT NULL        -- 黑名单 JSON 列表
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    sweep_id INTEGER NOT NULL REFERENCES sweeps(id),
+    job_key TEXT NOT NULL,         -- 结果缓存键，同一扫描内唯一
+    apk TEXT NOT NULL,
+    config TEXT NOT NULL,
+    cells TEXT NOT NULL,           -- 引用该作业的单元格 id JSON 列表，结果写入第一个
+    priority REAL NOT NULL,        -- 预测耗时，越大越先领取（LJF）
+    status TEXT NOT NULL DEFAULT 'pending',   -- pending / leased / done / failed
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    lease_until REAL,
+    started_at REAL,
+    finished_at REAL,
+    outcome TEXT,                  -- FlowDroidEngine.execute() 返回值的 JSON
+    UNIQUE (sweep_id, job_key)
+);
+CREATE INDEX IF NOT EXISTS jobs_claim ON jobs (status, sweep_id, priority);
+"""
+
+
+def _lease_expired_outcome(attempts: int) -> Dict:
+    """worker 多次在运行该作业时死亡（通常是主机 OOM），放弃时记录的结果"""
+    return {
+        'exit_code': -1,
+        'timeout_reason': 'LEASE_EXPIRED',
+        'total_time': 0.0,
+        'usage': {'peak_rss_gb': 'N/A', 'cpu_time_sec': 'N/A', 'accounting': 'proc', 'phases': {}},
+        'parsed': {k: 'N/A' for k in ('leaks', 'sources', 'sinks', 'callgraph_time',
+                                      'dataflow_time', 'result_time', 'memory_gb')},
+        'heap_gb': None,
+        'cached': False,
+        'attempts': attempts,
+    }
+
+
+class WorkQueue:
+    """
+    SQLite 作业队列（每个进程一个连接）
+
+    连接不限定创建它的线程：QueueWorker 在专用的单线程执行器中调用，同一时刻只有一个线程使用连接。
+    """
+
+    def __init__(self, db_path: Path = QUEUE_DB):
+        self.db_path = db_path
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(db_path), timeout=BUSY_TIMEOUT, isolation_level=None,
+                                    check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _transaction(self):
+        """写事务：BEGIN IMMEDIATE 立即取得写锁，领取作业时不会两个 worker 拿到同一行"""
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield self.conn
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+
+    def create_sweep(self, name: str, output_dir: Path, cells: List[Cell], jobs: List[Job],
+                     owners: Dict[str, List[Cell]], priorities: Dict[str, float]) -> int:
+        """写入一次扫描的单元格和去重后的作业，返回扫描 id"""
+        with self._transaction() as db:
+            sweep_id = db.execute(
+                "INSERT INTO sweeps (name, output_dir, created_at) VALUES (?, ?, ?)",
+                (name, str(output_dir), time.time())).lastrowid
+            cell_ids = {}
+            for cell in cells:
+                cell_ids[str(cell.output_dir)] = db.execute(
+                    "INSERT INTO cells (sweep_id, output_dir, config, apks, blacklist) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (sweep_id, str(cell.output_dir), json.dumps(cell.config.to_dict()),
+                     json.dumps([str(p) for p in cell.apks]), json.dumps(cell.blacklist))).lastrowid
+            db.executemany(
+                "INSERT INTO jobs (sweep_id, job_key, apk, config, cells, priority) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(sweep_id, job.key, str(job.apk), json.dumps(job.config.to_dict()),
+                  json.dumps([cell_ids[str(c.output_dir)] for c in owners[job.key]]),
+                  priorities.get(job.key, 0.0))
+                 for job in jobs])
+        return sweep_id
+
+    def claim(self, worker: str, lease_sec: float,
+              sweep_id: Optional[int] = None) -> Tuple[Optional[sqlite3.Row], Optional[str]]:
+        """
+        领取优先级最高的待运行作业，租约过期的作业同样可以被领取
+
+        Returns:
+            (作业行, 被回收租约的原 worker)；没有可领取的作业时返回 (None, None)
+        """
+        now = time.time()
+        scope = "" if sweep_id is None else " AND sweep_id = ?"
+        args = () if sweep_id is None else (sweep_id,)
+        with self._transaction() as db:
+            # 反复导致 worker 死亡的作业不再重试
+            for row in db.execute(
+                    "SELECT id, attempts FROM jobs WHERE status = 'leased' AND lease_until < ? "
+                    "AND attempts >= ?" + scope, (now, MAX_ATTEMPTS, *args)).fetchall():
+                db.execute(
+                    "UPDATE jobs SET status = 'failed', finished_at = ?, outcome = ? WHERE id = ?",
+                    (now, json.dumps(_lease_expired_outcome(row['attempts'])), row['id']))
+            row = db.execute(
+                "SELECT * FROM jobs WHERE (status = 'pending' OR (status = 'leased' AND lease_until < ?))"
+                + scope + " ORDER BY sweep_id, priority DESC, id LIMIT 1", (now, *args)).fetchone()
+            if row is None:
+                return None, None
+            db.execute(
+                "UPDATE jobs SET status = 'leased', worker = ?, lease_until = ?, "
+                "attempts = attempts + 1, started_at = ? WHERE id = ?",
+                (worker, now + lease_sec, now, row['id']))
+        return row, (row['worker'] if row['status'] == 'leased' else None)
+
+    def renew(self, job_id: int, worker: str, lease_sec: float) -> bool:
+        """续约；租约已被其他 worker 回收时返回 False"""
+        with self._transaction() as db:
+            cur = db.execute(
+                "UPDATE jobs SET lease_until = ? WHERE id = ? AND worker = ? AND status = 'leased'",
+                (time.time() + lease_sec, job_id, worker))
+        return cur.rowcount == 1
+
+    def complete(self, job_id: int, worker: str, outcome: Dict) -> bool:
+        """提交结果；租约已被其他 worker 回收时返回 False（以对方的结果为准）"""
+        with self._transaction() as db:
+            cur = db.execute(
+                "UPDATE jobs SET status = 'done', finished_at = ?, outcome = ?, lease_until = NULL "
+                "WHERE id = ? AND worker = ? AND status = 'leased'",
+                (time.time(), json.dumps(outcome), job_id, worker))
+        return cur.rowcount == 1
+
+    def release(self, job_id: int, worker: str):
+        """放回队列（worker 被中断时），不计入尝试次数"""
+        with self._transaction() as db:
+            db.execute(
+                "UPDATE jobs SET status = 'pending', worker = NULL, lease_until = NULL, "
+                "attempts = attempts - 1 WHERE id = ? AND worker = ? AND status = 'leased'",
+                (job_id, worker))
+
+    def unfinished(self, sweep_id: Optional[int] = None) -> int:
+        """待运行和运行中的作业数"""
+        scope = "" if sweep_id is None else " AND sweep_id = ?"
+        args = () if sweep_id is None else (sweep_id,)
+        return self.conn.execute(
+            "SELECT COUNT(*) FROM jobs WHERE status IN ('pending', 'leased')" + scope, args).fetchone()[0]
+
+    def total(self, sweep_id: int) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM jobs WHERE sweep_id = ?", (sweep_id,)).fetchone()[0]
+
+    def sweep(self, sweep_id: int) -> sqlite3.Row:
+        row = self.conn.execute("SELECT * FROM sweeps WHERE id = ?", (sweep_id,)).fetchone()
+        if row is None:
+            raise ValueError(f"扫描不存在: {sweep_id}")
+        return row
+
+    def latest_sweep(self) -> int:
+        row = self.conn.execute("SELECT MAX(id) FROM sweeps").fetchone()
+        if row[0] is None:
+            raise ValueError(f"队列中没有扫描: {self.db_path}")
+        return row[0]
+
+    def cells(self, sweep_id: int) -> Dict[int, Cell]:
+        return {
+            row['id']: Cell(RunConfig.from_dict(json.loads(row['config'])),
+                            [Path(p) for p in json.loads(row['apks'])],
+                            Path(row['output_dir']), json.loads(row['blacklist']))
+            for row in self.conn.execute("SELECT * FROM cells WHERE sweep_id = ? ORDER BY id", (sweep_id,))
+        }
+
+    def cell_dir(self, cell_id: int) -> Path:
+        return Path(self.conn.execute("SELECT output_dir FROM cells WHERE id = ?",
+                                      (cell_id,)).fetchone()[0])
+
+    def jobs(self, sweep_id: int) -> List[sqlite3.Row]:
+        return self.conn.execute("SELECT * FROM jobs WHERE sweep_id = ? ORDER BY id", (sweep_id,)).fetchall()
+
+
+def job_from_row(row: sqlite3.Row) -> Job:
+    return Job(Path(row['apk']), RunConfig.from_dict(json.loads(row['config'])), row['job_key'])
+
+
+def enqueue(cells: List[Cell], name: str, output_dir: Path, db_path: Path = QUEUE_DB,
+            schedule: str = "ljf") -> int:
+    """展开单元格、按缓存键去重、预测耗时后写入队列，返回扫描 id"""
+    engine = FlowDroidEngine(output_dir / "analysis_summary.log", schedule=schedule)
+    for cell in cells:
+        cell.output_dir.mkdir(parents=True, exist_ok=True)
+        with open(cell.output_dir / "cell.json", 'w') as f:
+            json.dump(cell.config.to_dict(), f, indent=2)
+    jobs, owners = engine.expand(cells)
+    jobs, plan = engine.plan(jobs, owners)
+    with open(output_dir / "plan.json", 'w') as f:
+        json.dump(plan, f, ensure_ascii=False, indent=2)
+    priorities = {}
+    if schedule == "ljf":
+        priorities = {e['key']: e['predicted_sec'] for e in plan['jobs']}
+    sweep_id = WorkQueue(db_path).create_sweep(name, output_dir, cells, jobs, owners, priorities)
+    engine._log(f"扫描 {sweep_id} 已入队: {len(cells)} 个单元格, {len(jobs)} 个作业 -> {db_path}")
+    return sweep_id
+
+
+class QueueWorker:
+    def __init__(self, db_path: Path = QUEUE_DB, sweep_id: Optional[int] = None,
+                 lease_sec: float = LEASE_SEC, poll_interval: float = POLL_INTERVAL,
+                 exit_when_idle: bool = True, **engine_kwargs):
+        """
+        初始化 worker
+
+        Args:
+            db_path: 共享的队列数据库
+            sweep_id: 只领取该扫描的作业，None 表示任意扫描
+            lease_sec: 租约时长；worker 死亡后最多这么久作业被回收
+            poll_interval: 暂时没有可领取作业时的等待间隔
+            exit_when_idle: 队列中不再有待运行或运行中的作业时退出
+            engine_kwargs: FlowDroidEngine 参数；jobs 为本 worker 同时运行的作业数
+        """
+        self.queue = WorkQueue(db_path)
+        # 队列操作是阻塞的 SQLite 调用（共享文件系统上等锁最长 BUSY_TIMEOUT 秒），
+        # 全部放到一个专用线程上串行执行，不阻塞运行中作业的监控
+        self._db_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="work-queue")
+        self.sweep_id = sweep_id
+        self.lease_sec = lease_sec
+        self.poll_interval = poll_interval
+        self.exit_when_idle = exit_when_idle
+        self.worker_id = f"{socket.gethostname()}-{os.getpid()}"
+        log_file = db_path.parent / "workers" / f"{self.worker_id}.log"
+        self.engine = FlowDroidEngine(log_file, **engine_kwargs)
+        self.completed = 0
+        self.reclaimed = 0
+
+    def run(self) -> Dict:
+        """领取并运行作业直到队列清空（或被中断），返回本 worker 的统计"""
+        try:
+            return asyncio.run(self._run())
+        finally:
+            self._db_executor.shutdown()
+
+    async def _db(self, method, *args):
+        """在专用线程中执行 WorkQueue 的方法"""
+        return await asyncio.get_running_loop().run_in_executor(self._db_executor, method, *args)
+
+    async def _run(self) -> Dict:
+        self.engine._log(f"worker {self.worker_id} 启动: {self.queue.db_path}, "
+                         f"扫描 {self.sweep_id or '全部'}, 并发 {self.engine.jobs}")
+        slots = [asyncio.create_task(self._slot()) for _ in range(self.engine.jobs)]
+        cancelled = False
+        try:
+            _, pending = await asyncio.wait(slots, timeout=self.engine.deadline)
+            if pending:
+                cancelled = True
+                self.engine._log("超过 deadline，运行中的作业放回队列")
+        except asyncio.CancelledError:
+            cancelled = True
+            self.engine._log("收到取消，运行中的作业放回队列")
+        if cancelled:
+            # 与 FlowDroidEngine.run_async 相同：每个槽只取消一次，等运行中的作业放回队列
+            for slot in slots:
+                slot.cancel()
+        for outcome in await asyncio.gather(*slots, return_exceptions=True):
+            if isinstance(outcome, Exception):
+                raise outcome
+        self.engine._log(f"worker {self.worker_id} 结束: 完成 {self.completed} 个作业, "
+                         f"回收过期租约 {self.reclaimed} 个{'（被中断）' if cancelled else ''}")
+        return {'worker': self.worker_id, 'completed': self.completed,
+                'reclaimed': self.reclaimed, 'cancelled': cancelled}
+
+    async def _slot(self):
+        while True:
+            row, previous = await self._db(self.queue.claim, self.worker_id, self.lease_sec, self.sweep_id)
+            if row is None:
+                if self.exit_when_idle and not await self._db(self.queue.unfinished, self.sweep_id):
+                    return
+                await asyncio.sleep(self.poll_interval)
+                continue
+            if previous:
+                self.reclaimed += 1
+                self.engine._log(f"回收过期租约: {Path(row['apk']).stem} (原 worker {previous}, "
+                                 f"第 {row['attempts'] + 1} 次尝试)")
+            await self._run_job(row)
+
+    async def _heartbeat(self, job_id: int, execution: asyncio.Future):
+        """
+        定期续约；租约已被其他 worker 回收时取消作业（FlowDroidEngine 杀掉整个进程组）后返回，
+        不与新的持有者重复运行同一作业。续约本身出错（如锁等待超时）时下一轮重试
+        """
+        while True:
+            await asyncio.sleep(self.lease_sec / 3)
+            try:
+                renewed = await self._db(self.queue.renew, job_id, self.worker_id, self.lease_sec)
+            except sqlite3.Error as e:
+                self.engine._log(f"作业 {job_id} 续约出错: {e}")
+                continue
+            if not renewed:
+                self.engine._log(f"作业 {job_id} 的租约已被其他 worker 回收，停止运行")
+                execution.cancel()
+                return
+
+    @staticmethod
+    def _lease_lost(heartbeat: asyncio.Task) -> bool:
+        """心跳只在发现租约被回收时正常返回"""
+        return heartbeat.done() and not heartbeat.cancelled() and heartbeat.exception() is None
+
+    async def _run_job(self, row: sqlite3.Row):
+        """
+        运行领取到的作业并提交结果
+
+        没有提交结果就退出时（被取消，包括还在等待预算池时被取消）在 finally 中放回队列；
+        租约已被回收时放回不会生效，作业归新的持有者
+        """
+        job = job_from_row(row)
+        submitted = False
+        try:
+            output_dir = await self._db(self.queue.cell_dir, json.loads(row['cells'])[0])
+            output_dir.mkdir(parents=True, exist_ok=True)
+            total = await self._db(self.queue.total, row['sweep_id'])
+            execution = asyncio.ensure_future(self.engine.execute(job, output_dir, total))
+            heartbeat = asyncio.create_task(self._heartbeat(row['id'], execution))
+            try:
+                outcome = await execution
+            except asyncio.CancelledError:
+                # 只有心跳取消作业时才在这里结束本作业，否则是 worker 被取消，继续传播
+                if not self._lease_lost(heartbeat):
+                    raise
+                outcome = None
+            finally:
+                heartbeat.cancel()
+
+            if self._lease_lost(heartbeat):
+                self.engine._log(f"  {job.apk.stem}: 租约已被回收，已停止运行")
+                return
+            if outcome['timeout_reason'] == "CANCELLED":
+                raise asyncio.CancelledError()
+
+            outcome['worker'] = self.worker_id
+            status = "SUCCESS" if outcome['exit_code'] == 0 else f"FAILED {outcome['timeout_reason']}"
+            completed = await self._db(self.queue.complete, row['id'], self.worker_id, outcome)
+            submitted = True
+            if completed:
+                self.completed += 1
+                self.engine._log(f"  {job.apk.stem} ({job.config.mode}): {status}, "
+                                 f"{outcome['total_time']:.2f}s")
+            else:
+                self.engine._log(f"  {job.apk.stem}: 租约已失效，结果丢弃")
+        finally:
+            if not submitted:
+                await self._db(self.queue.release, row['id'], self.worker_id)
+
+
+def collect(sweep_id: int, db_path: Path = QUEUE_DB) -> Dict:
+    """把队列中的结果写成各单元格的 results_summary.csv，返回汇总统计"""
+    queue = WorkQueue(db_path)
+    sweep = queue.sweep(sweep_id)
+    cells = queue.cells(sweep_id)
+    engine = FlowDroidEngine(Path(sweep['output_dir']) / "analysis_summary.log")
+
+    skipped = sum(engine.prepare_cell(cell) for cell in cells.values())
+    results = []
+    unfinished = 0
+    per_worker: Dict[str, int] = {}
+    starts, ends = [], []
+    for row in queue.jobs(sweep_id):
+        if row['status'] not in ('done', 'failed'):
+            unfinished += 1
+            continue
+        outcome = json.loads(row['outcome'])
+        apk_name = Path(row['apk']).stem
+        owner_ids = json.loads(row['cells'])
+        primary = cells[owner_ids[0]]
+        results.append(engine.record(primary, apk_name, outcome, shared=False))
+        for cell_id in owner_ids[1:]:
+            engine.copy_outputs(apk_name, primary.output_dir, cells[cell_id].output_dir)
+            results.append(engine.record(cells[cell_id], apk_name, outcome, shared=True))
+        worker = outcome.get('worker', '')
+        per_worker[worker] = per_worker.get(worker, 0) + 1
+        if row['started_at'] and row['finished_at'] and not outcome['cached']:
+            starts.append(row['started_at'])
+            ends.append(row['finished_at'])
+
+    success = sum(1 for r in results if r['status'] == 'SUCCESS')
+    makespan = max(ends) - min(starts) if starts else 0.0
+    serial_time = sum(r['total_time'] for r in results if not r['cached'] and not r['shared'])
+    speedup = serial_time / makespan if makespan > 0 else 0.0
+
+    engine._log("=" * 60)
+    engine._log(f"扫描 {sweep_id} ({sweep['name']}) 汇总")
+    engine._log(f"总计: {len(results)} 个 APK × 单元格, 成功 {success}, 失败 {len(results) - success}, "
+                f"跳过 {skipped}, 未完成作业 {unfinished}")
+    for worker, count in sorted(per_worker.items()):
+        engine._log(f"  {worker or '(缓存)'}: {count} 个作业")
+    engine._log(f"makespan: {makespan:.2f}s, 串行基线: {serial_time:.2f}s, 加速比: {speedup:.2f}x "
+                f"({len(per_worker)} 个 worker)")
+    for cell in cells.values():
+        engine._log(f"汇总文件: {cell.summary_file}")
+    engine._log("=" * 60)
+
+    return {
+        'sweep': sweep_id,
+        'total': len(results),
+        'success': success,
+        'failed': len(results) - success,
+        'skipped': skipped,
+        'unfinished': unfinished,
+        'workers': len(per_worker),
+        'makespan_sec': round(makespan, 2),
+        'serial_time_sec': round(serial_time, 2),
+        'speedup': round(speedup, 2),
+    }
+
+
+def status(sweep_id: int, db_path: Path = QUEUE_DB) -> Dict:
+    """各状态的作业数和运行中作业的租约情况"""
+    queue = WorkQueue(db_path)
+    counts = dict(queue.conn.execute(
+        "SELECT status, COUNT(*) FROM jobs WHERE sweep_id = ? GROUP BY status", (sweep_id,)).fetchall())
+    now = time.time()
+    leased = [
+        {'apk': Path(row['apk']).stem, 'mode': json.loads(row['config'])['mode'], 'worker': row['worker'],
+         'running_sec': round(now - row['started_at'], 1),
+         'lease_left_sec': round(row['lease_until'] - now, 1)}
+        for row in queue.conn.execute(
+            "SELECT * FROM jobs WHERE sweep_id = ? AND status = 'leased' ORDER BY started_at", (sweep_id,))
+    ]
+    return {'sweep': sweep_id, 'counts': counts, 'leased': leased}
+
+
+def _worker_main(db_path: Path, sweep_id: Optional[int], lease_sec: float, kwargs: Dict):
+    try:
+        QueueWorker(db_path, sweep_id, lease_sec, **kwargs).run()
+    except KeyboardInterrupt:
+        pass
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='FlowDroid 分布式扫描（SQLite 共享队列）')
+    parser.add_argument('--db', type=Path, default=QUEUE_DB,
+                        help=f'共享存储上的队列数据库（默认 {QUEUE_DB}）')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('enqueue', help='把扫描写入队列')
+    add_spec_arguments(p)
+
+    p = sub.add_parser('worker', help='领取并运行作业（可在任意主机上启动多个）')
+    p.add_argument('--sweep', type=int, default=None, help='只运行该扫描（默认任意）')
+    p.add_argument('--lease', type=float, default=LEASE_SEC, help=f'租约秒数（默认 {LEASE_SEC}）')
+    p.add_argument('--stay', action='store_true', help='队列清空后继续等待新作业')
+    add_engine_arguments(p)
+
+    p = sub.add_parser('local', help='入队并在本机启动多个 worker，结束后汇总（单机测试用）')
+    add_spec_arguments(p)
+    p.add_argument('--workers', type=int, default=2, help='本机 worker 进程数（默认 2）')
+    p.add_argument('--lease', type=float, default=LEASE_SEC, help=f'租约秒数（默认 {LEASE_SEC}）')
+    add_engine_arguments(p)
+
+    p = sub.add_parser('status', help='查看扫描进度')
+    p.add_argument('--sweep', type=int, default=None, help='扫描 id（默认最新）')
+
+    p = sub.add_parser('collect', help='把队列中的结果写成 results_summary.csv')
+    p.add_argument('--sweep', type=int, default=None, help='扫描 id（默认最新）')
+
+    args = parser.parse_args()
+
+    if args.command in ('enqueue', 'local'):
+        spec = spec_from_args(args, "queue")
+        output_dir = OUTPUT_BASE / f"{timestamp()}-queue-{spec.name}"
+        sweep_id = enqueue(spec.cells(output_dir), spec.name, output_dir, args.db,
+                           schedule=getattr(args, 'schedule', 'ljf'))
+        if args.command == 'enqueue':
+            print(f"扫描 id: {sweep_id}")
+            return
+        kwargs = engine_kwargs(args)
+        workers = [multiprocessing.Process(target=_worker_main,
+                                           args=(args.db, sweep_id, args.lease, kwargs))
+                   for _ in range(args.workers)]
+        for w in workers:
+            w.start()
+        try:
+            for w in workers:
+                w.join()
+        except KeyboardInterrupt:
+            # worker 与本进程同属一个进程组，已各自收到 SIGINT 并把运行中的作业放回队列
+            for w in workers:
+                w.join()
+        print(f"\\n分析结果: {collect(sweep_id, args.db)}")
+    elif args.command == 'worker':
+        result = QueueWorker(args.db, args.sweep, args.lease, exit_when_idle=not args.stay,
+                             **engine_kwargs(args)).run()
+        # 被 Ctrl-C / --deadline 中断时以 130 退出，便于外层脚本区分
+        if result['cancelled']:
+            sys.exit(130)
+    else:
+        queue = WorkQueue(args.db)
+        sweep_id = args.sweep or queue.latest_sweep()
+        if args.command == 'status':
+            print(json.dumps(status(sweep_id, args.db), ensure_ascii=False, indent=2))
+        else:
+            print(f"\\n分析结果: {collect(sweep_id, args.db)}")
+
+
+if __name__ == '__main__':
+    main()